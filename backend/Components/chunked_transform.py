@@ -0,0 +1,475 @@
+# chunked_transform.py - Code module to run feature engineering steps out of core, streaming the dataset in row chunks
+
+import os
+import copy
+import time
+import asyncio
+import tempfile
+import threading
+import tracemalloc
+from typing import Optional, List, Tuple, Iterator
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from dotenv import load_dotenv
+from fastapi import HTTPException
+
+from Components.Logger import logger
+from Components.storage import storage
+from Components.feature_engineering import FeatureEngineering, split_train_test
+from Components.dataset_versions import get_version_log, head_source, commit_stored_step
+from Components.dataset_io import iter_dataset_chunks, preview_records, file_digest, UPLOAD_SPOOL_PATH, UPLOAD_CHUNK_SIZE
+
+load_dotenv()
+
+# Rows read, transformed and written at a time
+CHUNKED_CHUNK_ROWS = int(os.getenv("CHUNKED_CHUNK_ROWS", "100000"))
+
+# Rows of the uniform sample of the training set the transformers are fitted on
+CHUNKED_FIT_ROWS = int(os.getenv("CHUNKED_FIT_ROWS", "200000"))
+
+# Sub tasks whose fitted values are category counts, counted over the whole training set rather than the sample
+COUNTED_SUB_TASKS = ("CountEncoder", "FrequencyEncoder")
+
+# Chunked runs take one at a time per worker, which bounds their memory and keeps the traced peak their own
+_chunked_run_lock = threading.Lock()
+
+
+class ChunkedFeatureEngineering(FeatureEngineering):
+
+    """
+    Feature engineering step fitted once on a sample of the training set and then applied to any number of row chunks
+    """
+
+    def __init__(self, *args, **kwargs):
+
+        super().__init__(*args, **kwargs)
+        self.fitted = None  # (transformer, features, as_object) once fitted, None for steps without a fit
+
+    def apply_transformer(self,
+                          transformer,
+                          dataset: pd.DataFrame,
+                          independent_features: List[str],
+                          supervised: bool = False,
+                          as_object: bool = False
+                          ) -> pd.DataFrame:
+
+        # The whole sample is the training set, every chunk is transformed with the same fit
+        X_train = dataset[independent_features]
+        if as_object:
+            X_train = X_train.astype({feature: object for feature in independent_features})
+        y_train = dataset[self.target_feature] if supervised else None
+
+        transformer = self.fit_transformer(transformer, X_train, y_train)
+        self.fitted = (transformer, independent_features, as_object)
+
+        return self.transform_chunk(dataset)
+
+    def refit_counts(self, chunks: Iterator[pd.DataFrame]):
+
+        """
+        Replace the category counts or frequencies the encoder learnt from the sample with those of every row of the chunks
+
+        Args:
+            chunks (Iterator[pd.DataFrame]): Training rows of the dataset, as transformed by the steps before this one
+        """
+
+        transformer, features, as_object = self.fitted
+
+        counts = {feature: Counter() for feature in features}
+        for chunk in chunks:
+            X = chunk[features]
+            if as_object:
+                X = X.astype({feature: object for feature in features})
+            for feature in features:
+                counts[feature].update(X[feature].value_counts().to_dict())
+
+        # The fitted transformer may be shared with the transformer store
+        transformer = copy.deepcopy(transformer)
+        for feature in transformer.variables_:
+            if transformer.encoding_method == "count":
+                transformer.encoder_dict_[feature] = dict(counts[feature])
+            else:
+                total = sum(counts[feature].values())
+                transformer.encoder_dict_[feature] = {category: count / total for category, count in counts[feature].items()}
+
+        self.fitted = (transformer, features, as_object)
+
+    def transform_chunk(self, chunk: pd.DataFrame) -> pd.DataFrame:
+
+        """
+        Apply the fitted step to a row chunk
+
+        Args:
+            chunk (pd.DataFrame): Row chunk
+
+        Returns:
+            pd.DataFrame: The edited row chunk
+        """
+
+        if self.fitted is None:
+            # Row filters and steps without a fit work on each chunk independently
+            return self.manager(chunk)
+
+        transformer, features, as_object = self.fitted
+
+        X = chunk[features]
+        if as_object:
+            X = X.astype({feature: object for feature in features})
+        X = transformer.transform(X)
+
+        edited_chunk = chunk.copy(deep=False)
+        for column in X.columns:
+            edited_chunk[column] = X[column]
+
+        replaced_columns = [feature for feature in features if feature not in X.columns]
+        if replaced_columns:
+            edited_chunk = edited_chunk.drop(columns=replaced_columns)
+
+        return edited_chunk
+
+
+def _unified_dtypes(seen_dtypes: dict) -> dict:
+
+    # Chunks infer their own dtypes, e.g. integers in one and floats where another has missing values
+    dtypes = {}
+    for column, column_dtypes in seen_dtypes.items():
+        if len(column_dtypes) == 1:
+            dtypes[column] = next(iter(column_dtypes))
+        elif all(pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype) for dtype in column_dtypes):
+            dtypes[column] = np.dtype("float64")
+        else:
+            dtypes[column] = np.dtype("object")
+    return dtypes
+
+
+def _cast_chunk(chunk: pd.DataFrame, dtypes: dict) -> pd.DataFrame:
+
+    changed = {column: dtype for column, dtype in dtypes.items() if chunk[column].dtype != dtype}
+    return chunk.astype(changed) if changed else chunk
+
+
+def count_rows(filename: str,
+               path: str,
+               chunk_rows: int,
+               schema_profile: Optional[dict] = None
+               ) -> int:
+
+    """
+    Count the rows of a local CSV or Parquet file, from the Parquet metadata without reading the rows
+
+    Args:
+        filename (str): File name, used to detect the file type
+        path (str): Path of the local file
+        chunk_rows (int): Rows per chunk of a CSV file
+        schema_profile (Optional[dict]): Schema profile recorded at upload
+
+    Returns:
+        int: Number of rows of the file
+    """
+
+    if filename.split('.')[-1].lower() == 'parquet':
+        return pq.ParquetFile(path).metadata.num_rows
+
+    return sum(len(chunk) for chunk in iter_dataset_chunks(filename, path, chunk_rows, schema_profile))
+
+
+def positioned_chunks(chunks: Iterator[pd.DataFrame], dtypes: Optional[dict] = None) -> Iterator[pd.DataFrame]:
+
+    """
+    Index row chunks by the position of their rows in the file, row filters keep the positions of the rows they keep
+
+    Args:
+        chunks (Iterator[pd.DataFrame]): Consecutive row chunks of the file
+        dtypes (Optional[dict]): Dtypes the chunks are cast to, as read if None
+
+    Yields:
+        pd.DataFrame: The row chunks
+    """
+
+    start = 0
+    for chunk in chunks:
+        chunk.index = pd.RangeIndex(start, start + len(chunk))
+        start += len(chunk)
+        yield chunk if dtypes is None else _cast_chunk(chunk, dtypes)
+
+
+def sample_chunks(chunks: Iterator[pd.DataFrame], fit_positions: np.ndarray) -> Tuple[pd.DataFrame, dict]:
+
+    """
+    Collect the rows at the given positions from a stream of chunks, keeping only those rows in memory
+
+    Args:
+        chunks (Iterator[pd.DataFrame]): Row chunks indexed by their positions, see positioned_chunks
+        fit_positions (np.ndarray): Positions of the rows to collect, in the order the transformers are fitted on
+
+    Returns:
+        Tuple[pd.DataFrame, dict]: Rows in the order of fit_positions and the dtypes unified over all chunks
+    """
+
+    wanted = np.sort(fit_positions)
+    parts = []
+    seen_dtypes = {}
+
+    for chunk in chunks:
+        for column, dtype in chunk.dtypes.items():
+            seen_dtypes.setdefault(column, set()).add(dtype)
+
+        if len(chunk) == 0:
+            continue
+
+        # Chunks hold consecutive positions, the wanted ones are a slice of the sorted positions
+        first, last = np.searchsorted(wanted, [chunk.index[0], chunk.index[-1] + 1])
+        if last > first:
+            parts.append(chunk.loc[wanted[first:last]])
+
+    if not parts:
+        raise ValueError("The dataset has no rows")
+
+    dtypes = _unified_dtypes(seen_dtypes)
+    sample = _cast_chunk(pd.concat(parts), dtypes).loc[fit_positions].reset_index(drop=True)
+
+    return sample, dtypes
+
+
+def _training_chunks(chunks: Iterator[pd.DataFrame],
+                     operations: List[ChunkedFeatureEngineering],
+                     training: np.ndarray
+                     ) -> Iterator[pd.DataFrame]:
+
+    # The training rows of every chunk, as the fitted operations transform them
+    for chunk in chunks:
+        for operation in operations:
+            chunk = operation.transform_chunk(chunk)
+        yield chunk[training[chunk.index.to_numpy()]]
+
+
+def _output_schema(dataset: pd.DataFrame) -> pa.Schema:
+
+    # Integer columns may see missing values in a later chunk (e.g. categories unseen by the fit), Arrow integers are nullable
+    schema = pa.Schema.from_pandas(dataset, preserve_index=False)
+    for index, field in enumerate(schema):
+        if pa.types.is_integer(field.type):
+            schema = schema.set(index, field.with_type(pa.int64()))
+    return schema
+
+
+def run_chunked_steps(filename: str,
+                      source_path: str,
+                      output_path: str,
+                      steps: List[dict],
+                      chunk_rows: int = CHUNKED_CHUNK_ROWS,
+                      fit_rows: int = CHUNKED_FIT_ROWS,
+                      schema_profile: Optional[dict] = None
+                      ) -> dict:
+
+    """
+    Fit feature engineering steps on a sample of the training set of a local file, then stream the file through them
+    into a Parquet file
+
+    The training set is the split memory mode fits on, so a fitRows of at least the training rows fits every step on
+    the same rows in the same order. Count and frequency encoders count the categories over the whole training set in
+    an extra pass, the sample holds only a fraction of each count. Row filters keep the split of the source rows, where
+    memory mode splits the remaining rows anew.
+
+    Args:
+        filename (str): Name of the source file, used to detect the file type
+        source_path (str): Path of the local source file
+        output_path (str): Path of the Parquet file to write
+        steps (List[dict]): Feature engineering steps with columns, targetFeature, featureTask and featureSubTask
+        chunk_rows (int): Rows per chunk
+        fit_rows (int): Rows of the training set sample the steps are fitted on
+        schema_profile (Optional[dict]): Schema profile recorded at upload
+
+    Returns:
+        dict: Shape, column types and first rows of the output, with the fit/transform timings and the traced peak memory
+
+    Raises:
+        HTTPException: Bad request if a step has an invalid task or sub task
+    """
+
+    logger.info(f"Entered run_chunked_steps on {filename} with {len(steps)} steps")
+
+    with _chunked_run_lock:
+        already_tracing = tracemalloc.is_tracing()
+        if already_tracing:
+            tracemalloc.reset_peak()
+        else:
+            tracemalloc.start()
+        baseline_bytes, _ = tracemalloc.get_traced_memory()
+
+        try:
+            start = time.perf_counter()
+
+            def read_chunks(dtypes=None):
+                return positioned_chunks(iter_dataset_chunks(filename, source_path, chunk_rows, schema_profile), dtypes)
+
+            # A uniform sample of the training set, its first rows in the order memory mode fits on
+            total_rows = count_rows(filename, source_path, chunk_rows, schema_profile)
+            train_positions, _ = split_train_test(total_rows)
+            sample, dtypes = sample_chunks(read_chunks(), train_positions[:fit_rows])
+            sampled_rows = len(sample)
+
+            training = None
+            if any(step["featureSubTask"] in COUNTED_SUB_TASKS for step in steps):
+                training = np.zeros(total_rows, dtype=bool)
+                training[train_positions] = True
+            del train_positions
+
+            # Each step is fitted on the sample as transformed by the steps before it
+            operations = []
+            for index, step in enumerate(steps):
+                operation = ChunkedFeatureEngineering({}, engineering_columns=step["columns"],
+                                                      target_feature=step["targetFeature"],
+                                                      featureengineeringTask=step["featureTask"],
+                                                      featureengineeringSubTask=step["featureSubTask"])
+                edited_sample = operation.manager(sample)
+                if edited_sample is None:
+                    raise HTTPException(status_code=400, detail=f"Invalid task or sub task in pipeline step {index}: {step['featureTask']} / {step['featureSubTask']}")
+
+                if step["featureSubTask"] in COUNTED_SUB_TASKS:
+                    operation.refit_counts(_training_chunks(read_chunks(dtypes), operations, training))
+                    edited_sample = operation.transform_chunk(sample)
+
+                sample = edited_sample
+                operations.append(operation)
+
+            fit_ms = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+
+            schema = _output_schema(sample)
+            column_types = {str(column): str(dtype) for column, dtype in sample.dtypes.items()}
+            del sample
+
+            output_rows = 0
+            chunks = 0
+            top_rows = []
+
+            with pq.ParquetWriter(output_path, schema) as writer:
+                for chunk in read_chunks(dtypes):
+                    for operation in operations:
+                        chunk = operation.transform_chunk(chunk)
+
+                    writer.write_table(pa.Table.from_pandas(chunk[schema.names], schema=schema, preserve_index=False))
+
+                    if len(top_rows) < 10:
+                        top_rows += preview_records(chunk, rows=10 - len(top_rows))
+                    output_rows += len(chunk)
+                    chunks += 1
+
+            transform_ms = (time.perf_counter() - start) * 1000
+            _, peak_bytes = tracemalloc.get_traced_memory()
+
+        finally:
+            if not already_tracing:
+                tracemalloc.stop()
+
+    return {
+        "topRows": top_rows,
+        "rowCount": output_rows,
+        "columnCount": len(schema.names),
+        "columnTypes": column_types,
+        "chunked": {
+            "sourceRows": total_rows,
+            "fitRows": sampled_rows,
+            "chunkRows": chunk_rows,
+            "chunks": chunks,
+            "fitMs": round(fit_ms, 1),
+            "transformMs": round(transform_ms, 1),
+            "peakMemoryBytes": peak_bytes - baseline_bytes
+        }
+    }
+
+
+async def download_to_spool(filename: str, file_url: str) -> str:
+
+    """
+    Stream a stored file to a temporary local file
+
+    Args:
+        filename (str): File name, its extension is kept
+        file_url (str): Download URL of the file
+
+    Returns:
+        str: Path of the local file, the caller removes the file
+    """
+
+    descriptor, path = tempfile.mkstemp(dir=UPLOAD_SPOOL_PATH, suffix=os.path.splitext(filename)[1])
+
+    try:
+        with os.fdopen(descriptor, "wb") as spool_file:
+            async for chunk in storage.stream(file_url, chunk_size=UPLOAD_CHUNK_SIZE):
+                await asyncio.to_thread(spool_file.write, chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+
+    return path
+
+
+async def run_chunked_pipeline(user_data: dict,
+                               steps: List[dict],
+                               chunk_rows: Optional[int] = None,
+                               fit_rows: Optional[int] = None
+                               ) -> Tuple[dict, dict]:
+
+    """
+    Run feature engineering steps out of core on the head version and record the output as one new version
+
+    Args:
+        user_data (dict): User record
+        steps (List[dict]): Feature engineering steps
+        chunk_rows (Optional[int]): Rows per chunk, CHUNKED_CHUNK_ROWS if None
+        fit_rows (Optional[int]): Rows of the fitting sample, CHUNKED_FIT_ROWS if None
+
+    Returns:
+        Tuple[dict, dict]: Output information with the chunked run statistics and timings, and the updated version log
+
+    Raises:
+        HTTPException: Bad request if a step is not a feature engineering step or the head version is not stored as a file
+    """
+
+    logger.info(f"Entered run_chunked_pipeline with {len(steps)} steps")
+
+    if any(step["kind"] != "engineering" for step in steps):
+        raise HTTPException(status_code=400, detail="Chunked pipelines only run feature engineering steps")
+
+    version_log = await get_version_log(user_data)
+
+    source = await head_source(user_data, version_log)
+    if source is None:
+        raise HTTPException(status_code=400, detail="The head version is not stored as a file, check out the uploaded dataset or a checkpoint version to run a chunked pipeline")
+
+    chunk_rows = chunk_rows or CHUNKED_CHUNK_ROWS
+    fit_rows = fit_rows or CHUNKED_FIT_ROWS
+
+    # The schema profile describes the uploaded file, sidecars and checkpoints carry their own types
+    schema_profile = user_data.get("file_schema") if source["file"] == user_data["file"] else None
+
+    start = time.perf_counter()
+    source_path = await download_to_spool(source["file"], source["url"])
+    load_ms = (time.perf_counter() - start) * 1000
+
+    descriptor, output_path = tempfile.mkstemp(dir=UPLOAD_SPOOL_PATH, suffix=".parquet")
+    os.close(descriptor)
+
+    try:
+        info = await asyncio.to_thread(run_chunked_steps, source["file"], source_path, output_path, steps,
+                                       chunk_rows, fit_rows, schema_profile)
+
+        # The whole run is one version, stored as its checkpoint
+        start = time.perf_counter()
+        sha256, size = await asyncio.to_thread(file_digest, output_path)
+        step = {"kind": "chunked", "steps": steps, "chunkRows": chunk_rows, "fitRows": fit_rows}
+        version_log = await commit_stored_step(user_data, version_log, step, output_path, sha256, size)
+        persist_ms = (time.perf_counter() - start) * 1000
+    finally:
+        os.remove(source_path)
+        os.remove(output_path)
+
+    info["timings"] = {"loadMs": round(load_ms, 1), "persistMs": round(persist_ms, 1)}
+
+    return info, version_log
@@ -0,0 +1,163 @@
+# column_hashing.py - Code module to find constant, quasi-constant and duplicate columns from one hash per column
+
+from collections import defaultdict
+from typing import Optional, List, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype, is_complex_dtype, is_integer_dtype, is_unsigned_integer_dtype
+
+from Components.Logger import logger
+
+# Seed of the row weights combining the row hashes of a column into its hash
+HASH_SEED = 0
+
+
+def _is_numerical(series: pd.Series) -> bool:
+
+    return (is_numeric_dtype(series) or is_bool_dtype(series)) and not is_complex_dtype(series)
+
+
+def _normalized_values(series: pd.Series) -> np.ndarray:
+
+    # Numerical and boolean columns compare by their float64 value, so equal integer and float columns are duplicates.
+    # Negative zero and NaN payloads are normalized, equal values must have equal bits to hash the same
+    values = series.to_numpy(dtype=np.float64, na_value=np.nan) + 0.0
+    values[np.isnan(values)] = np.nan
+    return values
+
+
+def _integer_values(series: pd.Series) -> np.ndarray:
+
+    # Integers in their native width, missing values of nullable integer columns as 0
+    dtype = np.uint64 if is_unsigned_integer_dtype(series) else np.int64
+    return series.to_numpy(dtype=dtype, na_value=0)
+
+
+def _inexact_rows(series: pd.Series, values: np.ndarray) -> np.ndarray:
+
+    # Rows of an integer column whose float64 value is not the integer itself, integers beyond 2**53 share
+    # float64 values with their neighbours and are hashed and compared in their native dtype instead
+    if not is_integer_dtype(series) or is_bool_dtype(series):
+        return np.zeros(len(values), dtype=bool)
+
+    integers = _integer_values(series)
+    dtype_range = (0.0, 2.0 ** 64) if integers.dtype == np.uint64 else (-2.0 ** 63, 2.0 ** 63)
+    in_range = (values >= dtype_range[0]) & (values < dtype_range[1])
+    round_trip = np.where(in_range, values, 0.0).astype(integers.dtype)
+
+    return ~np.isnan(values) & ~(in_range & (round_trip == integers))
+
+
+def row_hashes(series: pd.Series) -> np.ndarray:
+
+    """
+    Hash every value of a column, equal values hash the same
+
+    Args:
+        series (pd.Series): The column
+
+    Returns:
+        np.ndarray: uint64 hash per row
+    """
+
+    if _is_numerical(series):
+        values = _normalized_values(series)
+        hashes = pd.util.hash_array(values)
+
+        inexact = _inexact_rows(series, values)
+        if inexact.any():
+            hashes[inexact] = pd.util.hash_array(_integer_values(series)[inexact])
+
+        return hashes
+
+    return pd.util.hash_pandas_object(series, index=False).to_numpy()
+
+
+def _equal_columns(left: pd.Series, right: pd.Series) -> bool:
+
+    if _is_numerical(left) and _is_numerical(right):
+        left_values, right_values = _normalized_values(left), _normalized_values(right)
+        if not np.array_equal(left_values, right_values, equal_nan=True):
+            return False
+
+        # Equal float64 values are only equal integers where float64 holds the integers exactly
+        inexact = _inexact_rows(left, left_values) | _inexact_rows(right, right_values)
+        if not inexact.any():
+            return True
+        if not (is_integer_dtype(left) and is_integer_dtype(right)):
+            return False
+        return np.array_equal(_integer_values(left)[inexact], _integer_values(right)[inexact])
+
+    return left.reset_index(drop=True).equals(right.reset_index(drop=True))
+
+
+def find_constant_and_duplicate_columns(dataset: pd.DataFrame,
+                                        tol: float = 1,
+                                        shares: bool = False
+                                        ) -> Tuple[List[str], dict, Optional[dict]]:
+
+    """
+    Find the constant or quasi-constant columns and the duplicates of other columns in one pass over the columns
+
+    Every column is hashed once: its row hashes decide whether it is constant, their counts give the share of its
+    predominant value and, weighted by position and summed, they give the column hash. Columns with equal column
+    hashes are compared value by value, so hash collisions never drop a column. Missing values count as a value.
+
+    Args:
+        dataset (pd.DataFrame): The dataframe
+        tol (float): Share of the predominant value from which a column is quasi-constant, 1 for constant columns only
+        shares (bool): Also return the share of the predominant value of every column
+
+    Returns:
+        List[str]: Constant or quasi-constant columns
+        dict: Duplicate column -> the first equal column, which is kept
+        Optional[dict]: Share of the predominant value per column if shares is set
+
+    Raises:
+        ValueError: If tol is not in (0, 1]
+    """
+
+    if not 0 < tol <= 1:
+        raise ValueError(f"tol must be a float between 0 and 1, got {tol}")
+
+    rows = len(dataset)
+    weights = np.random.default_rng(HASH_SEED).integers(0, np.iinfo(np.uint64).max, size=rows, dtype=np.uint64,
+                                                       endpoint=True) | np.uint64(1)
+
+    constant = []
+    share_of = {} if shares else None
+    columns_by_hash = defaultdict(list)
+
+    for column in dataset.columns:
+        hashes = row_hashes(dataset[column])
+
+        share = None
+        if shares or tol < 1:
+            share = pd.Series(hashes).value_counts().iloc[0] / rows if rows else 0.0
+            if shares:
+                share_of[column] = float(share)
+
+        # Hash equality is only a candidate, the values are counted again for the columns it flags
+        if rows and (share >= tol if tol < 1 else (hashes == hashes[0]).all()):
+            values = dataset[column].value_counts(dropna=False)
+            if values.iloc[0] / rows >= tol:
+                constant.append(column)
+                continue
+
+        # Position-weighted sum with uint64 wraparound, so the same values in another order hash differently
+        columns_by_hash[int(np.sum(hashes * weights, dtype=np.uint64))].append(column)
+
+    duplicate_of = {}
+    for columns in columns_by_hash.values():
+        kept = []
+        for column in columns:
+            original = next((candidate for candidate in kept if _equal_columns(dataset[candidate], dataset[column])), None)
+            if original is None:
+                kept.append(column)
+            else:
+                duplicate_of[column] = original
+
+    logger.info(f"Found {len(constant)} constant and {len(duplicate_of)} duplicate columns of {len(dataset.columns)}")
+
+    return constant, duplicate_of, share_of
@@ -0,0 +1,300 @@
+# correlations.py - Code module to compute, cache and threshold the Pearson correlation matrix of dataset versions
+
+import os
+import warnings
+import threading
+from collections import OrderedDict
+from typing import Optional, List, Tuple
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+from Components.Logger import logger
+from Components.dataset_versions import changes_rows
+
+load_dotenv()
+
+# Correlation matrices kept per worker, one per dataset version
+CORRELATION_CACHE_ENTRIES = int(os.getenv("CORRELATION_CACHE_ENTRIES", "16"))
+
+# Rows converted to float64 at once by the kernel
+CORRELATION_BLOCK_ROWS = int(os.getenv("CORRELATION_BLOCK_ROWS", "65536"))
+
+
+class CorrelationCache:
+
+    """
+    LRU cache of Pearson correlation matrices, keyed by dataset version fingerprint
+    """
+
+    def __init__(self, max_entries: int):
+
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # version fingerprint -> correlation matrix
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+
+        with self._lock:
+            matrix = self._entries.get(key)
+            if matrix is not None:
+                self._entries.move_to_end(key)
+            return matrix
+
+    def put(self, key: str, matrix: pd.DataFrame):
+
+        with self._lock:
+            self._entries[key] = matrix
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+
+        with self._lock:
+            return {"entries": len(self._entries), "maxEntries": self.max_entries, "hits": self.hits, "misses": self.misses}
+
+
+correlation_cache = CorrelationCache(max_entries=CORRELATION_CACHE_ENTRIES)
+
+
+def numerical_columns(dataset: pd.DataFrame) -> List[str]:
+
+    """
+    Get the columns the correlation matrix covers, the ones feature_engine treats as numerical
+
+    Args:
+        dataset (pd.DataFrame): The dataframe
+
+    Returns:
+        List[str]: Numerical columns in dataset order
+    """
+
+    return list(dataset.select_dtypes(include="number").columns)
+
+
+def pearson_block(dataset: pd.DataFrame,
+                  left: List[str],
+                  right: List[str]
+                  ) -> np.ndarray:
+
+    """
+    Pearson correlations between two sets of columns without missing values, computed in row blocks
+
+    Only one block of rows is converted to float64 and centered at a time, the cross products of the blocks
+    are accumulated with a matrix multiplication.
+
+    Args:
+        dataset (pd.DataFrame): The dataframe
+        left (List[str]): Row columns of the result
+        right (List[str]): Column columns of the result
+
+    Returns:
+        np.ndarray: Correlations of shape (len(left), len(right)), NaN for constant columns
+    """
+
+    columns = list(dict.fromkeys(left + right))
+    position = {column: index for index, column in enumerate(columns)}
+    left_index = np.array([position[column] for column in left], dtype=np.intp)
+    right_index = np.array([position[column] for column in right], dtype=np.intp)
+
+    frame = dataset[columns]
+    means = frame.mean().to_numpy(dtype=np.float64)
+
+    cross = np.zeros((len(left), len(right)))
+    squares = np.zeros(len(columns))
+    for start in range(0, len(frame), CORRELATION_BLOCK_ROWS):
+        block = frame.iloc[start:start + CORRELATION_BLOCK_ROWS].to_numpy(dtype=np.float64) - means
+        cross += block[:, left_index].T @ block[:, right_index]
+        squares += np.einsum("ij,ij->j", block, block)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        correlations = cross / np.sqrt(np.outer(squares[left_index], squares[right_index]))
+        correlations[np.outer(squares[left_index] == 0, squares[right_index] == 0) | ~np.isfinite(correlations)] = np.nan
+
+    return np.clip(correlations, -1.0, 1.0)
+
+
+def _unit_diagonal(values: np.ndarray) -> np.ndarray:
+
+    # Exactly 1 on the diagonal as pandas has it, rounding leaves the products of centered columns slightly off
+    diagonal = np.diag_indices_from(values)
+    values[diagonal] = np.where(np.isnan(values[diagonal]), np.nan, 1.0)
+    return values
+
+
+def _compute(dataset: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+
+    if dataset[columns].isna().to_numpy().any():
+        # Missing values need pairwise complete observations, as pandas computes them
+        return dataset[columns].corr(method="pearson")
+
+    return pd.DataFrame(_unit_diagonal(pearson_block(dataset, columns, columns)), index=columns, columns=columns)
+
+
+def correlation_matrix(dataset: pd.DataFrame,
+                       lineage: Optional[List[Tuple[str, Optional[dict]]]] = None
+                       ) -> Tuple[pd.DataFrame, str]:
+
+    """
+    Get the Pearson correlation matrix of the numerical columns of a dataset version
+
+    A cached matrix of an ancestor version with the same rows is reused: columns dropped since then are
+    sliced out and only the columns engineering steps rewrote or added are recomputed.
+
+    Args:
+        dataset (pd.DataFrame): The dataframe
+        lineage (Optional[List[Tuple[str, Optional[dict]]]]): Fingerprint of the version and the step that produced it,
+                                                              then of its ancestors, from dataset_versions.version_lineage.
+                                                              None computes the matrix without caching it
+
+    Returns:
+        pd.DataFrame: Correlation matrix over the numerical columns, in dataset order
+        str: "cached", "sliced", "updated" or "computed"
+    """
+
+    columns = numerical_columns(dataset)
+
+    if not lineage:
+        return _compute(dataset, columns), "computed"
+
+    fingerprint = lineage[0][0]
+    matrix = correlation_cache.get(fingerprint)
+    if matrix is not None:
+        correlation_cache.hits += 1
+        return matrix, "cached"
+
+    correlation_cache.misses += 1
+
+    # Walk up to the nearest cached ancestor with the same rows, collecting the columns rewritten on the way
+    ancestor = None
+    rewritten = set()
+    for (_, step), (parent_fingerprint, _) in zip(lineage, lineage[1:]):
+        if step is None or changes_rows(step):
+            break
+        if step["kind"] == "engineering":
+            rewritten.update(step.get("columns") or [])
+        ancestor = correlation_cache.get(parent_fingerprint)
+        if ancestor is not None:
+            break
+
+    source = "computed"
+    if ancestor is not None:
+        kept = [column for column in columns if column in ancestor.columns and column not in rewritten]
+        fresh = [column for column in columns if column not in kept]
+
+        if not fresh:
+            matrix, source = ancestor.loc[columns, columns], "sliced"
+        elif not dataset[columns].isna().to_numpy().any():
+            values = ancestor.reindex(index=columns, columns=columns).to_numpy(copy=True)
+            fresh_index = [columns.index(column) for column in fresh]
+            block = pearson_block(dataset, fresh, columns)
+            values[fresh_index, :] = block
+            values[:, fresh_index] = block.T
+            matrix, source = pd.DataFrame(_unit_diagonal(values), index=columns, columns=columns), "updated"
+
+    if source == "computed":
+        matrix = _compute(dataset, columns)
+
+    logger.info(f"Correlation matrix of {len(columns)} columns {source}")
+    correlation_cache.put(fingerprint, matrix)
+
+    return matrix, source
+
+
+def correlated_groups(matrix: pd.DataFrame,
+                      features: List[str],
+                      threshold: float
+                      ) -> Tuple[list, list, dict]:
+
+    """
+    Group correlated features the way feature_engine's find_correlated_features does, from a precomputed matrix
+
+    Every feature not yet examined, in the given order, takes the later features whose absolute correlation
+    with it is above the threshold into its group, and those features are dropped.
+
+    Args:
+        matrix (pd.DataFrame): Correlation matrix covering the features
+        features (List[str]): Features in examination order
+        threshold (float): Absolute correlation above which two features are correlated
+
+    Returns:
+        list: Sets of correlated features
+        list: Features to drop
+        dict: Correlated features of every retained feature
+    """
+
+    values = matrix.loc[features, features].to_numpy()
+    with np.errstate(invalid="ignore"):
+        correlated = np.triu(np.abs(values), 1) > threshold
+
+    examined = np.zeros(len(features), dtype=bool)
+    groups, features_to_drop, correlated_dict = [], [], {}
+
+    for index, feature in enumerate(features):
+        if examined[index]:
+            continue
+        examined[index] = True
+
+        partners = np.flatnonzero(correlated[index] & ~examined)
+        if len(partners) == 0:
+            continue
+
+        examined[partners] = True
+        partner_features = [features[partner] for partner in partners]
+        features_to_drop.extend(partner_features)
+        groups.append({feature, *partner_features})
+        correlated_dict[feature] = set(partner_features)
+
+    return groups, features_to_drop, correlated_dict
+
+
+def max_abs_correlations(matrix: pd.DataFrame, features: List[str]) -> dict:
+
+    """
+    Get the highest absolute correlation of every feature with any other feature
+
+    Args:
+        matrix (pd.DataFrame): Correlation matrix covering the features
+        features (List[str]): Features to score
+
+    Returns:
+        dict: Highest absolute correlation per feature, NaN if it is not correlated with any other feature
+    """
+
+    values = np.abs(matrix.loc[features, features].to_numpy(copy=True))
+    np.fill_diagonal(values, np.nan)
+
+    with np.errstate(invalid="ignore"), warnings.catch_warnings():
+        # Features with only undefined correlations have no maximum
+        warnings.simplefilter("ignore", RuntimeWarning)
+        highest = np.nanmax(values, axis=1) if len(features) > 1 else np.full(len(features), np.nan)
+
+    return {feature: float(score) for feature, score in zip(features, highest)}
+
+
+def correlated_pairs(matrix: pd.DataFrame, threshold: float) -> List[dict]:
+
+    """
+    List the pairs of columns whose absolute correlation is above a threshold
+
+    Args:
+        matrix (pd.DataFrame): Correlation matrix
+        threshold (float): Absolute correlation above which a pair is listed
+
+    Returns:
+        List[dict]: Both columns and their correlation, strongest first
+    """
+
+    values = matrix.to_numpy()
+    with np.errstate(invalid="ignore"):
+        rows, columns = np.nonzero(np.triu(np.abs(values), 1) > threshold)
+
+    order = np.argsort(-np.abs(values[rows, columns]), kind="stable")
+    names = list(matrix.columns)
+
+    return [{"left": names[rows[index]], "right": names[columns[index]], "correlation": float(values[rows[index], columns[index]])}
+            for index in order]
@@ -1,6 +1,6 @@
 import io
 import base64
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 import matplotlib.pyplot as plt
 from fastapi.responses import JSONResponse
 from fastapi import APIRouter, HTTPException, Depends
@@ -22,6 +22,7 @@ from Components.goal_generator import GoalGeneration
 from Components.database import users_visual_code_collection
 from Components.visualization_manager import VisualizationManager
 from Components.data import get_user_details, fetch_and_read_github_file
+from Components.sampling import SamplingPolicy
 
 router = APIRouter()
 
@@ -49,6 +50,7 @@ class VisualizationsGenerationRequest(BaseModel):
     visualization_option : str
     visualization_count : int
     visualization_title : str
+    sampling : SamplingPolicy = Field(default_factory=SamplingPolicy, description="Rows to plot, method 'full' for all rows")
 
 class VisualizationTitleGenerationRequest(BaseModel):
     """
@@ -224,19 +226,21 @@ async def handle_visualizations_generation(visualization_request: Visualizations
 
         visualization_manager = VisualizationManager()
         user_data = get_user_details(username=user_details['username'], role=user_details['role'])
-        dataset = await fetch_and_read_github_file(user_data["file"], user_data["file_url"])
+        dataset = await fetch_and_read_github_file(user_data["file"], user_data["file_url"],
+                                                   schema_profile=user_data.get("file_schema"))
 
         # Clear any existing plots
         plt.clf()
 
         # Get the visualization
-        selected_viz = await visualization_manager.visual_generator(
+        selected_viz, sample_info = await visualization_manager.visual_generator(
             visualization_request.goal,
             visualization_request.visualization_option,
             visualization_request.visualization_count,
             visualization_request.visualization_title,
             user_data,
-            dataset
+            dataset,
+            visualization_request.sampling
         )
 
         # Create a new figure with specific size
@@ -276,7 +280,8 @@ async def handle_visualizations_generation(visualization_request: Visualizations
             "visualization": {
                 "raster": base64_string,
                 "type": "image/png"
-            }
+            },
+            "sample": sample_info
         }
 
     except Exception as e:
@@ -313,7 +318,8 @@ async def handle_visual_editing(instruction : VisualEditRequest,
 
         # Fetching dataset
         user_data = get_user_details(username=user_details['username'], role=user_details['role'])
-        dataset = await fetch_and_read_github_file(user_data["file"], user_data["file_url"])
+        dataset = await fetch_and_read_github_file(user_data["file"], user_data["file_url"],
+                                                   schema_profile=user_data.get("file_schema"))
 
         # Instantiate the visualization generator
         visualization_manager = VisualizationManager()
@@ -360,7 +366,8 @@ async def handle_visual_editing(instruction : VisualEditRequest,
             "visualization": {
                 "raster": base64_string,
                 "type": "image/png"
-            }
+            },
+            "sample": sample_info
         }
 
     except Exception as e:
@@ -389,7 +396,8 @@ async def undo_editing(user_details: dict = Depends(get_current_user)):
         user_data = get_user_details(username=user_details['username'], role=user_details['role'])
 
         # Fetch data from database
-        dataset = await fetch_and_read_github_file(user_data["file"], user_data["file_url"])
+        dataset = await fetch_and_read_github_file(user_data["file"], user_data["file_url"],
+                                                   schema_profile=user_data.get("file_schema"))
         
         last_edited_visual = await visualization_manager.visual_edit_undoer(user_data, dataset)
 
@@ -433,7 +441,8 @@ async def undo_editing(user_details: dict = Depends(get_current_user)):
             "visualization": {
                 "raster": base64_string,
                 "type": "image/png"
-            }
+            },
+            "sample": sample_info
         }
 
 
@@ -1,27 +1,26 @@
 import os
-import httpx
-import base64
-import requests
-import pandas as pd
-from io import BytesIO
+import asyncio
+from datetime import datetime, timezone
 from dotenv import load_dotenv
-from fastapi import HTTPException, UploadFile
+from fastapi import HTTPException
 
 from Components.Logger import logger
+from Components.dataset_cache import dataset_cache, arrow_cache
+from Components.storage import storage
+from Components.dataset_io import parse_dataset, convert_to_sidecar, SpooledUpload, SIDECAR_SUFFIX
 from Components.database import user_secrets_collection, users_edited_dataframe_collection
 
 load_dotenv()
 
-GITHUB_USERNAME = os.getenv("GITHUB_USERNAME")
-GITHUB_REPO = os.getenv("GITHUB_REPO")
-GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
-
 # Secret details    
 SECRET_KEY = os.getenv("SECRET_KEY")
 if not SECRET_KEY:
     raise ValueError("SECRET_KEY not set in environment variables")
 ALGORITHM = os.getenv("ALGORITHM")
 
+# File formats accepted as datasets
+UPLOAD_SUFFIXES = (".csv", ".xlsx")
+
 def get_user_details(username,
                      role
                      ):
@@ -87,7 +86,11 @@ def create_user_record(username,
             "gcp_account_key": None,
             "gcp_project_ID": None,
             "file": None,
-            "file_url": None
+            "file_url": None,
+            "file_version": None,
+            "file_size": None,
+            "file_uploaded_at": None,
+            "file_schema": None
         }
         
         result = user_secrets_collection.insert_one(new_user)
@@ -123,165 +126,194 @@ def update_user_details(username,
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error in updating user details: {str(e)}")
 
-async def upload_file_to_github(file: UploadFile, 
+async def upload_file_to_github(spooled_upload: SpooledUpload,
                                 current_file: str = None
                                 ):
     """
-    Upload a file to GitHub
+    Upload a file spooled from the request to the configured storage backend (GitHub by default), the caller removes
+    the spooled file
     """
 
-    logger.info("Uploading file to GitHub")
+    logger.info("Uploading file to storage")
 
     try:
 
         # Validate file type
-        if not (file.filename.endswith('.csv') or file.filename.endswith('.xlsx')):
+        if not spooled_upload.filename.endswith(UPLOAD_SUFFIXES):
             raise HTTPException(status_code=400, detail="File must be a CSV or XLSX format.")
 
-        # GitHub API URL for uploading the new file
-        url = f"https://api.github.com/repos/{GITHUB_USERNAME}/{GITHUB_REPO}/contents/{file.filename}"
-        headers = {
-            "Authorization": f"token {GITHUB_TOKEN}",
-            "Accept": "application/vnd.github.v3+json",
+        # Check if the new file is the same as the current file
+        if current_file and current_file == spooled_upload.filename:
+            raise HTTPException(status_code=400, detail="Similar file already in use")
+
+        # If it's a different file, delete the old one first
+        if current_file and await storage.exists(current_file):
+            await delete_file_from_github(current_file)
+
+        # Upload/update the file
+        upload_result = await storage.put_file(spooled_upload.filename, spooled_upload.path, spooled_upload.sha256, spooled_upload.size)
+        download_url = upload_result["download_url"]
+
+        # Drop the stale parsed copy of the replaced file
+        dataset_cache.invalidate(download_url)
+        arrow_cache.invalidate(download_url)
+
+        # Store the columnar copy used by later reads, profiling the column dtypes on the way
+        schema_profile = await upload_sidecar_to_github(spooled_upload.filename, spooled_upload.path)
+
+        # Return the file name, the download URL and the details used for conditional downloads
+        return {
+            "file_name": spooled_upload.filename,
+            "download_url": download_url,
+            "version": upload_result["version"],
+            "size": spooled_upload.size,
+            "uploaded_at": datetime.now(timezone.utc),
+            "schema_profile": schema_profile
         }
 
-        # Read the file content
-        file_content = await file.read()
-        encoded_content = base64.b64encode(file_content).decode('utf-8')
-
-        async with httpx.AsyncClient() as client:
-            # Check if the new file is the same as the current file
-            if current_file and current_file == file.filename:
-                raise HTTPException(status_code=400, detail="Similar file already in use")
-
-            # Check if the new file already exists in the repo
-            response = await client.get(url, headers=headers)
-
-            if response.status_code == 200:  # File exists
-                existing_file_info = response.json()
-                sha = existing_file_info['sha']
-
-                # If it's a different file, delete the old one first
-                if current_file and current_file != file.filename:
-                    delete_url = f"https://api.github.com/repos/{GITHUB_USERNAME}/{GITHUB_REPO}/contents/{current_file}"
-                    delete_data = {
-                        "message": f"Remove old file {current_file}",
-                        "sha": sha
-                    }
-
-                    delete_response = await client.delete(delete_url, headers=headers, json=delete_data)
-
-                    if delete_response.status_code != 200:
-                        raise HTTPException(status_code=500, detail=f"Failed to delete old file: {delete_response.text}")
-
-                # Prepare to update the existing file
-                upload_data = {
-                    "message": f"Update {file.filename}",
-                    "content": encoded_content,
-                    "sha": sha
-                }
-            else:
-                # File doesn't exist, prepare to create a new file
-                upload_data = {
-                    "message": f"Add {file.filename}",
-                    "content": encoded_content
-                }
-
-            # Upload/update the file
-            upload_response = await client.put(url, headers=headers, json=upload_data)
-
-            if upload_response.status_code not in (201, 200):
-                raise HTTPException(status_code=500, detail=f"GitHub upload failed: {upload_response.text}")
-
-            # Retrieve the download URL
-            download_url = upload_response.json()["content"]["download_url"]
-
-            # Return both the file name and the GitHub download URL
-            return {
-                "file_name": file.filename,
-                "download_url": download_url
-            }
+    except HTTPException as http_exc:
+        raise http_exc
         
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error in uploading file to GitHub: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error in uploading file to storage: {str(e)}")
+
+async def upload_sidecar_to_github(filename: str,
+                                   file_content
+                                   ):
+    """
+    Upload the Parquet sidecar of a CSV/XLSX file and return its schema profile, removing a stale sidecar if the file cannot be converted
+    """
+
+    logger.info(f"Uploading Parquet sidecar of {filename} to storage")
+
+    sidecar = None
+    try:
+        sidecar, schema_profile = await convert_to_sidecar(filename, file_content)
+        sidecar_info = await storage.put_file(filename + SIDECAR_SUFFIX, sidecar.path, sidecar.sha256, sidecar.size)
+    except Exception as e:
+        # Reads fall back to the original file, so a stale sidecar must not survive
+        logger.warning(f"Could not store Parquet sidecar of {filename}: {str(e)}")
+        try:
+            await delete_file_from_github(filename + SIDECAR_SUFFIX)
+        except HTTPException:
+            pass
+        return None
+    finally:
+        if sidecar is not None:
+            os.remove(sidecar.path)
+
+    dataset_cache.invalidate(sidecar_info["download_url"])
+    arrow_cache.invalidate(sidecar_info["download_url"])
+
+    return schema_profile
+
+async def read_cached_file(filename,
+                           file_url,
+                           columns=None,
+                           missing_ok=False,
+                           schema_profile=None
+                           ):
+    """
+    Read and parse a file, reusing the parsed dataset from the in-memory cache, then from the node-local
+    Arrow cache, when the file is unchanged
+    """
+
+    # Ask the backend to skip the download if a cached version is still current
+    cached_version = dataset_cache.version(file_url, columns) or await asyncio.to_thread(arrow_cache.version, file_url)
+
+    try:
+        content, version = await storage.get(file_url, if_none_match=cached_version)
+    except FileNotFoundError:
+        if missing_ok:
+            return None
+        raise
+
+    cached_dataset = dataset_cache.get(file_url, version, columns)
+    if cached_dataset is not None:
+        return cached_dataset
+
+    # Another worker, or this one before a restart, may already have parsed this version
+    mapped_dataset = await asyncio.to_thread(arrow_cache.get, file_url, version, columns)
+    if mapped_dataset is not None:
+        return dataset_cache.put(file_url, version, mapped_dataset, columns)
+
+    if content is None:
+        content, version = await storage.get(file_url)
+
+    # Parse the content off the event loop
+    file_content = await parse_dataset(filename, content, columns, schema_profile)
+
+    # Share whole datasets with the other workers, keeping the memory-mapped copy in memory
+    if not columns:
+        file_content = await asyncio.to_thread(arrow_cache.put, file_url, version, file_content)
+
+    return dataset_cache.put(file_url, version, file_content, columns)
 
 async def fetch_and_read_github_file(filename,
-                                     file_url
+                                     file_url,
+                                     columns=None,
+                                     schema_profile=None
                                      ):
     """
-    Fetch and read a file from GitHub
+    Fetch and read a file from the storage backend, preferring its Parquet sidecar and reading only the requested columns
+    with the dtypes of the schema profile recorded at upload
     """
 
     try:
-        # Make a request to GitHub to get the file
-        response = requests.get(file_url)
-        response.raise_for_status()
-    
-        # Get the file extension (CSV or XLSX)
-        file_extension = filename.split('.')[-1].lower()
-    
-        # Read the file content into a pandas DataFrame based on the file type
-        if file_extension == 'csv':
-            # Read CSV file
-            file_content = pd.read_csv(BytesIO(response.content))
-        elif file_extension == 'xlsx':
-            # Read Excel file
-            file_content = pd.read_excel(BytesIO(response.content))
-        else:
-            raise ValueError("Unsupported file format. Only CSV and XLSX are supported.")
+        # Read the columnar sidecar written at upload time, Parquet files are their own sidecar
+        file_content = None
+        if not filename.endswith(SIDECAR_SUFFIX):
+            file_content = await read_cached_file(filename + SIDECAR_SUFFIX, file_url + SIDECAR_SUFFIX, columns,
+                                                 missing_ok=True, schema_profile=schema_profile)
+
+        # Fall back to parsing the original file when the sidecar does not exist
+        if file_content is None:
+            file_content = await read_cached_file(filename, file_url, columns, schema_profile=schema_profile)
     
         # Return the DataFrame for further use
         return file_content
     
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error in fetching and reading GitHub file: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error in fetching and reading file: {str(e)}")
+
+def cached_dataset_version(file_url,
+                           columns=None
+                           ):
+    """
+    Get the content version of the dataset last read for a file URL, from its sidecar or the original file
+    """
+
+    return dataset_cache.version(file_url + SIDECAR_SUFFIX, columns) or dataset_cache.version(file_url, columns)
 
 async def delete_file_from_github(file_name: str):
     """
-    Delete a file from GitHub
+    Delete a file from the storage backend
     """
 
-    logger.info(f"Deleting file {file_name} from GitHub")
+    logger.info(f"Deleting file {file_name} from storage")
 
     try:
 
-        # GitHub API URL for deleting the file
-        url = f"https://api.github.com/repos/{GITHUB_USERNAME}/{GITHUB_REPO}/contents/{file_name}"
-        headers = {
-            "Authorization": f"token {GITHUB_TOKEN}",
-            "Accept": "application/vnd.github.v3+json",
-        }
+        try:
+            deleted_url = await storage.delete(file_name)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="File not found in storage")
 
-        async with httpx.AsyncClient() as client:
-            # Get the file's SHA to delete it
-            response = await client.get(url, headers=headers)
-
-            if response.status_code == 200:  # File exists
-                file_info = response.json()
-                sha = file_info['sha']
-
-                # Prepare the delete request
-                delete_data = {
-                    "message": f"Delete {file_name}",
-                    "sha": sha
-                }
-
-                # Send the delete request using request() method instead
-                delete_response = await client.request(
-                    "DELETE",
-                    url,
-                    headers=headers,
-                    json=delete_data
-                )
-
-                if delete_response.status_code == 200:
-                    logger.info(f"File {file_name} deleted successfully")
-                    return {"message": f"File {file_name} deleted successfully"}
-                else:
-                    raise HTTPException(status_code=500, detail=f"Failed to delete file: {delete_response.text}")
-            else:
-                raise HTTPException(status_code=404, detail="File not found on GitHub")
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error in deleting file from GitHub: {str(e)}")
+        dataset_cache.invalidate(deleted_url)
+        arrow_cache.invalidate(deleted_url)
+        logger.info(f"File {file_name} deleted successfully")
 
+        # Remove the Parquet sidecar together with the original file
+        if not file_name.endswith(SIDECAR_SUFFIX):
+            try:
+                await delete_file_from_github(file_name + SIDECAR_SUFFIX)
+            except HTTPException:
+                pass
+
+        return {"message": f"File {file_name} deleted successfully"}
+
+    except HTTPException as http_exc:
+        raise http_exc
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error in deleting file from storage: {str(e)}")
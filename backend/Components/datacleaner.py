@@ -1,20 +1,26 @@
+import time
+import asyncio
+import numpy as np
 import pandas as pd
-from io import BytesIO
-from typing import List
-from pydantic import BaseModel
+from typing import List, Optional, Literal
+from pydantic import BaseModel, Field
 from fastapi.responses import JSONResponse, StreamingResponse
-from fastapi import APIRouter, HTTPException, Depends, UploadFile
-import io
+from fastapi import APIRouter, HTTPException, Depends, Header, Query
 
 from Components.Logger import logger
 from Components.auth import get_current_user
-from Components.feature_engineering import FeatureEngineering
-from Components.feature_selection import FeatureSelection
-from Components.data import users_edited_dataframe_collection
-
-from Components.data import (fetch_and_read_github_file, upload_file_to_github, 
-                             get_user_details, delete_file_from_github,
-                             get_edited_dataframe_details)
+from Components.feature_engineering import FeatureEngineering, ENGINEERING_SUB_TASKS
+from Components.feature_selection import FeatureSelection, SELECTION_SUB_TASKS, check_selection_estimator
+from Components.dataset_io import iter_csv, choose_content_encoding, compress_chunks, preview_records
+from Components.row_browser import row_order, row_page, row_order_cache, FilterOperator, MAX_PAGE_ROWS
+from Components.chunked_transform import run_chunked_pipeline
+from Components.correlations import correlation_matrix, correlated_pairs
+from Components.jobs import job_runner, job_store, JobProgress, BACKGROUND_SUB_TASKS
+
+from Components.data import fetch_and_read_github_file, get_user_details, cached_dataset_version
+from Components.dataset_versions import (get_version_log, load_current_dataset, materialize, commit_steps,
+                                         move_head, version_summary, version_fingerprint, step_fingerprint,
+                                         rows_fingerprint, changes_rows, version_lineage)
 
 router = APIRouter()
 
@@ -38,6 +44,44 @@ class FeatureSelectionConfig(BaseModel):
     columns: List[str]
     featureSubTask: str
     targetFeature: str
+    estimator: Optional[Literal["random_forest", "hist_gradient_boosting"]] = Field(None, description="Estimator of the model-based selectors, SELECTION_ESTIMATOR by default")
+    threshold: Optional[float] = Field(None, description="Threshold of the sub task, its default if None")
+    dropFraction: Optional[float] = Field(None, gt=0, lt=1, description="Share of the remaining features StepRecursiveFeatureElimination drops per round, RFE_DROP_FRACTION by default")
+    dryRun: bool = Field(False, description="Only fit the selector and report the features it would drop with their scores")
+
+class PipelineStep(BaseModel):
+
+    """
+    Pydantic model for one step of a feature engineering/selection pipeline
+    """
+
+    kind: Literal["engineering", "selection"]
+    columns: List[str] = []
+    featureTask: Optional[str] = Field(None, description="Feature engineering task, engineering steps only")
+    featureSubTask: str
+    targetFeature: Optional[str] = None
+    estimator: Optional[Literal["random_forest", "hist_gradient_boosting"]] = Field(None, description="Estimator of the model-based selectors, selection steps only")
+    threshold: Optional[float] = Field(None, description="Threshold of the selection sub task, selection steps only")
+    dropFraction: Optional[float] = Field(None, gt=0, lt=1, description="Share of the remaining features StepRecursiveFeatureElimination drops per round, selection steps only")
+
+class CheckoutRequest(BaseModel):
+
+    """
+    Pydantic model for checking out a dataset version
+    """
+
+    version: int
+
+class PipelineConfig(BaseModel):
+
+    """
+    Pydantic model for a feature engineering/selection pipeline
+    """
+
+    steps: List[PipelineStep] = Field(..., min_length=1)
+    mode: Literal["memory", "chunked"] = Field("memory", description="'chunked' streams the dataset in row chunks, for datasets larger than memory")
+    chunkRows: Optional[int] = Field(None, gt=0, description="Rows per chunk in chunked mode")
+    fitRows: Optional[int] = Field(None, gt=0, description="Rows of the sample the transformers are fitted on in chunked mode")
     
 async def get_dataframe_info(dataset: pd.DataFrame):
     """
@@ -58,27 +102,14 @@ async def get_dataframe_info(dataset: pd.DataFrame):
 
     try:
         
-        # Function to safely convert values to JSON-compatible format
-        def safe_convert(val):
-            if pd.isna(val) or val is None:
-                return ''
-            if isinstance(val, (float, int)):
-                # Convert to string if the number is too large
-                if abs(val) > 1e15:
-                    return str(val)
-                return float(val)
-            return str(val)  # Convert all other types to string
-        
-        # Apply safe conversion to all elements in the dataframe
-        safe_dataset = dataset.applymap(safe_convert)
-        
         # Add column data types information
         column_types = {
             column: str(dtype) for column, dtype in dataset.dtypes.items()
         }
         
         info = {
-            "topRows": safe_dataset.head(10).to_dict('records'),
+            # Only the previewed rows are converted to JSON-compatible values
+            "topRows": preview_records(dataset, rows=10),
             "rowCount": len(dataset),
             "columnCount": len(dataset.columns),
             "columnTypes": column_types
@@ -88,16 +119,281 @@ async def get_dataframe_info(dataset: pd.DataFrame):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error in get_dataframe_info: {str(e)}")
 
+async def run_operation_job(user_details: dict,
+                            kind: str,
+                            config: dict,
+                            progress: JobProgress
+                            ) -> dict:
+    """
+    Run a feature engineering or selection step as a background job and record it as a new version,
+    or for a selection dry run only report the features the selector would drop
+
+    Args:
+        user_details (dict): User details
+        kind (str): "engineering" or "selection"
+        config (dict): Feature engineering or selection configuration
+        progress (JobProgress): Progress of the job
+
+    Returns:
+        dict: Dataframe information with the head version, the dry run preview for dry runs
+
+    Raises:
+        HTTPException: Conflict if the dataset was replaced while the job ran
+    """
+
+    logger.info(f"Entered run_operation_job with kind: {kind}, sub task: {config['featureSubTask']}")
+
+    user_data = get_user_details(username=user_details['username'], role=user_details['role'])
+    dataset, version_log = await load_current_dataset(user_data)
+    base_version, start_head = version_log["base_version"], version_log["head"]
+
+    if kind == "engineering":
+        operation = FeatureEngineering(user_details, engineering_columns=config["columns"],
+                                       target_feature=config["targetFeature"],
+                                       featureengineeringTask=config["featureTask"],
+                                       featureengineeringSubTask=config["featureSubTask"],
+                                       dataset_version=version_fingerprint(version_log, start_head),
+                                       rows_version=rows_fingerprint(version_log, start_head),
+                                       progress=progress)
+    else:
+        operation = FeatureSelection(user_details, selection_columns=config["columns"],
+                                     featureselectionSubTask=config["featureSubTask"],
+                                     target_feature=config["targetFeature"],
+                                     progress=progress,
+                                     estimator=config.get("estimator"),
+                                     lineage=version_lineage(version_log, start_head),
+                                     threshold=config.get("threshold"),
+                                     dry_run=config.get("dryRun", False),
+                                     drop_fraction=config.get("dropFraction"))
+
+    await asyncio.to_thread(progress.set_total, operation.expected_folds(dataset))
+
+    # The operation runs off the event loop, the worker keeps serving requests
+    edited_dataset = await asyncio.to_thread(operation.manager, dataset)
+    await asyncio.to_thread(progress.check)
+
+    if kind == "selection" and operation.dry_run:
+        return dry_run_info(operation, dataset, version_log)
+
+    # The user may have edited the dataset while the job ran, the step is applied to the version it ran on
+    version_log = await get_version_log(user_data)
+    if version_log["base_version"] != base_version:
+        raise HTTPException(status_code=409, detail="The dataset was replaced while the job ran")
+    if version_log["head"] != start_head:
+        logger.info(f"Head moved from version {start_head} to {version_log['head']} while the job ran, branching from {start_head}")
+
+    step = {"kind": kind, "featureTask": None, **config}
+    fitted_transformer = operation.fitted_transformer if kind == "engineering" else None
+    version_log = await commit_steps(user_data, version_log, [(step, dataset, edited_dataset, fitted_transformer)],
+                                     parent_id=start_head)
+
+    info = await get_dataframe_info(edited_dataset)
+    info["version"] = version_summary(version_log)
+    if kind == "selection" and operation.report is not None:
+        info["selection"] = operation.report
+
+    return info
+
+def dry_run_info(feature_selection: FeatureSelection,
+                 dataset: pd.DataFrame,
+                 version_log: dict
+                 ) -> dict:
+    """
+    Describe the outcome of a feature selection dry run
+
+    Args:
+        feature_selection (FeatureSelection): Feature selection that ran as a dry run
+        dataset (pd.DataFrame): The dataframe it ran on
+        version_log (dict): Version log of the dataframe, no version is recorded
+
+    Returns:
+        dict: Features the selector would drop, the score of every evaluated feature, the resulting
+              column count and the model-based selector report
+    """
+
+    info = {
+        "dryRun": True,
+        "featureSubTask": feature_selection.featureselectionSubTask,
+        **feature_selection.preview,
+        "columnCount": len(dataset.columns) - len(feature_selection.preview["featuresToDrop"]),
+        "version": version_summary(version_log)
+    }
+    if feature_selection.report is not None:
+        info["selection"] = feature_selection.report
+
+    return info
+
+async def submit_operation_job(user_details: dict,
+                               kind: str,
+                               config: dict
+                               ) -> JSONResponse:
+    """
+    Queue a feature engineering or selection step as a background job
+
+    Args:
+        user_details (dict): User details
+        kind (str): "engineering" or "selection"
+        config (dict): Feature engineering or selection configuration
+
+    Returns:
+        JSONResponse: Accepted, with the queued job
+    """
+
+    job = await job_runner.submit(user_details['username'], kind, config,
+                                  lambda progress: run_operation_job(user_details, kind, config, progress))
+
+    return JSONResponse(status_code=202, content=job)
+
+def validate_pipeline_steps(steps: List[PipelineStep]):
+    """
+    Check the task and sub task of every pipeline step before any step runs
+
+    Args:
+        steps (List[PipelineStep]): Ordered pipeline steps
+
+    Raises:
+        HTTPException: Bad request naming the first step with an unknown task or sub task, or an estimator its sub task cannot use
+    """
+
+    for index, step in enumerate(steps):
+        if step.kind == "engineering":
+            known = step.featureSubTask in ENGINEERING_SUB_TASKS.get(step.featureTask, [])
+        else:
+            known = step.featureSubTask in SELECTION_SUB_TASKS
+
+        if not known:
+            raise HTTPException(status_code=400, detail=f"Invalid task or sub task in pipeline step {index}: {step.featureTask} / {step.featureSubTask}")
+
+        if step.kind == "selection":
+            try:
+                check_selection_estimator(step.featureSubTask, step.estimator)
+            except HTTPException as http_exc:
+                raise HTTPException(status_code=400, detail=f"Invalid estimator in pipeline step {index}: {http_exc.detail}")
+
+async def run_pipeline(user_details: dict,
+                       pipeline_config: PipelineConfig,
+                       progress: Optional[JobProgress] = None
+                       ) -> dict:
+    """
+    Run the steps of an in-memory pipeline on one dataframe, each off the event loop, and record them as versions
+
+    Args:
+        user_details (dict): User details
+        pipeline_config (PipelineConfig): Ordered pipeline steps, already validated
+        progress (Optional[JobProgress]): Progress of the job when the pipeline runs as a background job
+
+    Returns:
+        dict: Dataframe information with the head version and the load, per-step and persist timings
+
+    Raises:
+        HTTPException: Bad request if a step has an invalid task or sub task, conflict if the dataset was
+                       replaced while the steps ran, or for a request edited
+    """
+
+    logger.info(f"Entered run_pipeline with {len(pipeline_config.steps)} steps")
+
+    user_data = get_user_details(username=user_details['username'], role=user_details['role'])
+
+    start = time.perf_counter()
+    dataset, version_log = await FeatureEngineering(user_details).handle_dataframe(user_details)
+    load_ms = (time.perf_counter() - start) * 1000
+    base_version, start_head = version_log["base_version"], version_log["head"]
+
+    step_timings = []
+    committed_steps = []
+    total_folds = 0
+    dataset_version = version_fingerprint(version_log, start_head)
+    rows_version = rows_fingerprint(version_log, start_head)
+    lineage = version_lineage(version_log, start_head)
+    for index, step in enumerate(pipeline_config.steps):
+        if step.kind == "engineering":
+            operation = FeatureEngineering(user_details, engineering_columns=step.columns,
+                                           target_feature=step.targetFeature,
+                                           featureengineeringTask=step.featureTask,
+                                           featureengineeringSubTask=step.featureSubTask,
+                                           dataset_version=dataset_version,
+                                           rows_version=rows_version,
+                                           progress=progress)
+        else:
+            operation = FeatureSelection(user_details, selection_columns=step.columns,
+                                         featureselectionSubTask=step.featureSubTask,
+                                         target_feature=step.targetFeature,
+                                         progress=progress,
+                                         estimator=step.estimator,
+                                         lineage=lineage,
+                                         threshold=step.threshold,
+                                         drop_fraction=step.dropFraction)
+
+        # The total grows by the folds of every step as it starts, the columns a step sees are only known then
+        if progress is not None:
+            total_folds += operation.expected_folds(dataset) or 0
+            await asyncio.to_thread(progress.set_total, total_folds or None)
+
+        # Steps run off the event loop, the worker keeps serving requests
+        start = time.perf_counter()
+        edited_dataset = await asyncio.to_thread(operation.manager, dataset)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        if progress is not None:
+            await asyncio.to_thread(progress.check)
+
+        if edited_dataset is None:
+            raise HTTPException(status_code=400, detail=f"Invalid task or sub task in pipeline step {index}: {step.featureTask} / {step.featureSubTask}")
+
+        # Engineering steps are recorded like the engineering endpoint records them, without the selection settings
+        step_config = step.model_dump(exclude={"estimator", "threshold", "dropFraction"} if step.kind == "engineering" else None)
+        committed_steps.append((step_config, dataset, edited_dataset,
+                                operation.fitted_transformer if step.kind == "engineering" else None))
+        dataset = edited_dataset
+        dataset_version = step_fingerprint(dataset_version, step_config)
+        lineage = [(dataset_version, step_config)] + lineage
+        if changes_rows(step_config):
+            rows_version = dataset_version
+        step_timings.append({
+            "step": index,
+            "kind": step.kind,
+            "featureTask": step.featureTask,
+            "featureSubTask": step.featureSubTask,
+            "elapsedMs": round(elapsed_ms, 1),
+            "rowCount": len(dataset),
+            "columnCount": len(dataset.columns),
+            "selection": getattr(operation, "report", None)
+        })
+
+    # A request answers a conflict if the dataset was edited meanwhile, a job applies its steps to the version
+    # they ran on, like run_operation_job
+    parent_id = None
+    if progress is not None:
+        version_log = await get_version_log(user_data)
+        if version_log["base_version"] != base_version:
+            raise HTTPException(status_code=409, detail="The dataset was replaced while the pipeline ran")
+        parent_id = start_head
+
+    # Record every step as a version in one update
+    start = time.perf_counter()
+    version_log = await commit_steps(user_data, version_log, committed_steps, parent_id=parent_id)
+    persist_ms = (time.perf_counter() - start) * 1000
+
+    info = await get_dataframe_info(dataset)
+    info["version"] = version_summary(version_log)
+    info["timings"] = {
+        "loadMs": round(load_ms, 1),
+        "steps": step_timings,
+        "persistMs": round(persist_ms, 1)
+    }
+
+    return info
+
 @router.get("/datacleaner/dataframe-info")
 async def handle_dataframe_info(user_details: dict = Depends(get_current_user)):
     """
-    Handle request to get dataframe information including feature types, and delete the edited dataframe information and the edited file from the database
+    Handle request to get dataframe information including feature types, at the head version of the user's edits
 
     Args:
         user_details (dict): User details
 
     Returns:
-        JSONResponse: Dataframe information
+        JSONResponse: Dataframe information with the head version
 
     Raises:
         HTTPException: Internal server error if an error occurs during dataframe information fetching
@@ -108,19 +404,12 @@ async def handle_dataframe_info(user_details: dict = Depends(get_current_user)):
     try:
 
         user_data = get_user_details(username=user_details['username'], role=user_details['role'])
-        dataset = await fetch_and_read_github_file(user_data["file"], user_data["file_url"])
 
-        info = await get_dataframe_info(dataset)
-
-        # Delete the edited file from the database
-        edited_dataframe_details = get_edited_dataframe_details(user_data['username'], user_data['role'], user_data['file'])
+        # Edits are kept as versions, going back to the uploaded dataset is an explicit undo or checkout
+        dataset, version_log = await load_current_dataset(user_data)
 
-        if edited_dataframe_details:
-            await delete_file_from_github(edited_dataframe_details['edited_file'])
-            # Delete the edited dataframe information and the edited file from the database
-            users_edited_dataframe_collection.delete_one({"username": user_data['username'], "role": user_data['role'], "file": user_data['file']})
-        else:
-            pass
+        info = await get_dataframe_info(dataset)
+        info["version"] = version_summary(version_log)
 
         return JSONResponse(content=info)
     except Exception as e:
@@ -140,16 +429,21 @@ async def handle_engineering_columns(
         user_details (dict): User details
 
     Returns:
-        JSONResponse: Dataframe information
+        JSONResponse: Dataframe information, or accepted with the queued job for long-running sub tasks
 
     Raises:
-        HTTPException: Internal server error if an error occurs during feature engineering
+        HTTPException: Bad request if the task or sub task is invalid, too many requests if the user has too many jobs,
+                       internal server error if an error occurs during feature engineering
     """
 
     logger.info(f"Entered handle_engineering_columns")
 
     try:
 
+        # Long-running operations return a job to poll instead of holding the request open
+        if ("engineering", feature_engineering_config.featureSubTask) in BACKGROUND_SUB_TASKS:
+            return await submit_operation_job(user_details, "engineering", feature_engineering_config.model_dump())
+
         feature_engineering = FeatureEngineering(user_details, engineering_columns=feature_engineering_config.columns, 
                                                target_feature=feature_engineering_config.targetFeature,
                                                featureengineeringTask=feature_engineering_config.featureTask, 
@@ -157,36 +451,32 @@ async def handle_engineering_columns(
         
         user_data = get_user_details(username=user_details['username'], role=user_details['role'])
         
-        dataset, need_to_update = await feature_engineering.handle_dataframe(user_details)
+        dataset, version_log = await feature_engineering.handle_dataframe(user_details)
 
-        edited_dataset = feature_engineering.manager(dataset)
+        # Transformers fitted on this version before are loaded instead of refitted,
+        # and the train/test split is shared with the earlier steps on the same rows
+        feature_engineering.dataset_version = version_fingerprint(version_log, version_log["head"])
+        feature_engineering.rows_version = rows_fingerprint(version_log, version_log["head"])
 
-        # Convert DataFrame to CSV bytes
-        csv_content = edited_dataset.to_csv(index=False).encode('utf-8')
-        
-        # Create a UploadFile object
-        file = UploadFile(
-            filename=f"edited_{user_data['file']}_file_user_{user_data['username']}.csv",
-            file=BytesIO(csv_content)
-        )
+        # The operation runs off the event loop, the worker keeps serving requests
+        edited_dataset = await asyncio.to_thread(feature_engineering.manager, dataset)
 
-        # Upload to GitHub
-        upload_result = await upload_file_to_github(file, user_details.get('current_file'))
+        if edited_dataset is None:
+            raise HTTPException(status_code=400, detail=f"Invalid task or sub task: {feature_engineering_config.featureTask} / {feature_engineering_config.featureSubTask}")
 
-        # Add information about the edited dataframe to the database
-        if need_to_update:
-            users_edited_dataframe_collection.insert_one({
-                "username": user_data['username'],
-                "role": user_data['role'],
-                "file": user_data['file'],
-                "edited_file": file.filename,
-                "edited_file_url": upload_result["download_url"]
-            })
+        # Record the step as a new version instead of uploading the edited dataset
+        step = {"kind": "engineering", **feature_engineering_config.model_dump()}
+        version_log = await commit_steps(user_data, version_log,
+                                         [(step, dataset, edited_dataset, feature_engineering.fitted_transformer)])
 
         info = await get_dataframe_info(edited_dataset)
+        info["version"] = version_summary(version_log)
        
         return JSONResponse(content=info)
     
+    except HTTPException as http_exc:
+        raise http_exc
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error in updating engineering columns: {str(e)}")
 
@@ -203,60 +493,347 @@ async def handle_selection_columns(
         user_details (dict): User details
 
     Returns:
-        JSONResponse: Dataframe information
+        JSONResponse: Dataframe information, the features the selector would drop for dry runs, or accepted with the queued job for long-running sub tasks
 
     Raises:
-        HTTPException: Internal server error if an error occurs during feature selection
+        HTTPException: Bad request if the sub task or estimator is invalid, too many requests if the user has too many jobs,
+                       internal server error if an error occurs during feature selection
     """
 
     logger.info(f"Entered handle_selection_columns")
 
     try:
 
+        # An estimator the sub task cannot use fails the request before a job is queued
+        check_selection_estimator(feature_selection_config.featureSubTask, feature_selection_config.estimator)
+
+        # Long-running operations return a job to poll instead of holding the request open
+        if ("selection", feature_selection_config.featureSubTask) in BACKGROUND_SUB_TASKS:
+            config = feature_selection_config.model_dump(exclude=None if feature_selection_config.dryRun else {"dryRun"})
+            return await submit_operation_job(user_details, "selection", config)
+
         feature_selection = FeatureSelection(user_details, selection_columns=feature_selection_config.columns,  
-                                             featureselectionSubTask=feature_selection_config.featureSubTask,target_feature=feature_selection_config.targetFeature)
+                                             featureselectionSubTask=feature_selection_config.featureSubTask,target_feature=feature_selection_config.targetFeature,
+                                             estimator=feature_selection_config.estimator,
+                                             threshold=feature_selection_config.threshold,
+                                             dry_run=feature_selection_config.dryRun,
+                                             drop_fraction=feature_selection_config.dropFraction)
         user_data = get_user_details(username=user_details['username'], role=user_details['role'])
         
-        dataset, need_to_update = await feature_selection.handle_dataframe(user_details)
+        dataset, version_log = await feature_selection.handle_dataframe(user_details)
+        feature_selection.lineage = version_lineage(version_log, version_log["head"])
 
-        edited_dataset = feature_selection.manager(dataset)
+        # The operation runs off the event loop, the worker keeps serving requests
+        edited_dataset = await asyncio.to_thread(feature_selection.manager, dataset)
 
-        # Convert DataFrame to CSV bytes
-        csv_content = edited_dataset.to_csv(index=False).encode('utf-8')
-        
-        # Create a UploadFile object
-        file = UploadFile(
-            filename=f"edited_{user_data['file']}_file_user_{user_data['username']}.csv",
-            file=BytesIO(csv_content)
-        )
+        if edited_dataset is None:
+            raise HTTPException(status_code=400, detail=f"Invalid sub task: {feature_selection_config.featureSubTask}")
 
-        # Upload to GitHub
-        upload_result = await upload_file_to_github(file, user_details.get('current_file'))
+        # Dry runs only report the features the selector would drop, no version is recorded
+        if feature_selection.dry_run:
+            return JSONResponse(content=dry_run_info(feature_selection, dataset, version_log))
 
-        # Add information about the edited dataframe to the database
-        if need_to_update:
-            users_edited_dataframe_collection.insert_one({
-                "username": user_data['username'],
-                "role": user_data['role'],
-                "file": user_data['file'],
-                "edited_file": file.filename,
-                "edited_file_url": upload_result["download_url"]
-            })
+        # Record the step as a new version instead of uploading the edited dataset
+        step = {"kind": "selection", "featureTask": None, **feature_selection_config.model_dump(exclude={"dryRun"})}
+        version_log = await commit_steps(user_data, version_log, [(step, dataset, edited_dataset, None)])
 
         info = await get_dataframe_info(edited_dataset)
+        info["version"] = version_summary(version_log)
+        # Estimator, cores, fitted rows, wall time and selected features of the model-based selectors
+        if feature_selection.report is not None:
+            info["selection"] = feature_selection.report
        
         return JSONResponse(content=info)
 
+    except HTTPException as http_exc:
+        raise http_exc
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error in updating selection columns: {str(e)}")
 
+@router.post("/datacleaner/pipeline")
+async def handle_pipeline(pipeline_config: PipelineConfig,
+                          user_details: dict = Depends(get_current_user)
+                          ):
+    """
+    Run an ordered list of feature engineering and selection steps on one in-memory dataframe and persist the result once,
+    or in chunked mode stream the dataset through feature engineering steps fitted on a sample
+
+    Args:
+        pipeline_config (PipelineConfig): Ordered pipeline steps
+        user_details (dict): User details
+
+    Returns:
+        JSONResponse: Dataframe information with the load, per-step and persist timings, in chunked mode with the
+                      sample size, chunk count and peak memory under "chunked". Accepted with the queued job if a
+                      step is a long-running sub task
+
+    Raises:
+        HTTPException: Bad request if a step has an invalid task or sub task, internal server error if an error occurs during the pipeline
+    """
+
+    logger.info(f"Entered handle_pipeline with {len(pipeline_config.steps)} steps")
+
+    try:
+
+        # An unknown step fails the request before the dataset is loaded or any step runs
+        validate_pipeline_steps(pipeline_config.steps)
+
+        user_data = get_user_details(username=user_details['username'], role=user_details['role'])
+
+        if pipeline_config.mode == "chunked":
+            steps = [step.model_dump(exclude={"estimator", "threshold", "dropFraction"}) for step in pipeline_config.steps]
+            info, version_log = await run_chunked_pipeline(user_data, steps, pipeline_config.chunkRows, pipeline_config.fitRows)
+            info["version"] = version_summary(version_log)
+            return JSONResponse(content=info)
+
+        # A pipeline with a long-running step runs as a background job instead of holding the request open
+        if any((step.kind, step.featureSubTask) in BACKGROUND_SUB_TASKS for step in pipeline_config.steps):
+            job = await job_runner.submit(user_details['username'], "pipeline", pipeline_config.model_dump(),
+                                          lambda progress: run_pipeline(user_details, pipeline_config, progress))
+            return JSONResponse(status_code=202, content=job)
+
+        info = await run_pipeline(user_details, pipeline_config)
+
+        return JSONResponse(content=info)
+
+    except HTTPException as http_exc:
+        raise http_exc
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error in running the feature pipeline: {str(e)}")
+
+@router.get("/datacleaner/jobs")
+async def list_jobs(user_details: dict = Depends(get_current_user)):
+    """
+    List the background jobs of the user, newest first
+
+    Args:
+        user_details (dict): User details
+
+    Returns:
+        JSONResponse: Jobs with their status and progress
+
+    Raises:
+        HTTPException: Internal server error if an error occurs during listing the jobs
+    """
+
+    logger.info(f"Entered list_jobs")
+
+    try:
+        jobs = await asyncio.to_thread(job_store.list, user_details['username'])
+        return JSONResponse(content={"jobs": jobs})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error in listing jobs: {str(e)}")
+
+@router.get("/datacleaner/jobs/{job_id}")
+async def get_job(job_id: str, user_details: dict = Depends(get_current_user)):
+    """
+    Poll a background job
+
+    Args:
+        job_id (str): Job id
+        user_details (dict): User details
+
+    Returns:
+        JSONResponse: Job with its status, progress in scored folds and, once it succeeded, the dataframe information
+
+    Raises:
+        HTTPException: Not found if the user has no such job, internal server error if an error occurs during polling
+    """
+
+    logger.info(f"Entered get_job with job_id: {job_id}")
+
+    try:
+        job = await asyncio.to_thread(job_store.get, job_id, user_details['username'])
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+
+        return JSONResponse(content=job)
+    except HTTPException as http_exc:
+        raise http_exc
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error in getting job: {str(e)}")
+
+@router.post("/datacleaner/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str, user_details: dict = Depends(get_current_user)):
+    """
+    Cancel a background job, a running job stops at its next scored fold and records no version
+
+    Args:
+        job_id (str): Job id
+        user_details (dict): User details
+
+    Returns:
+        JSONResponse: Job with its status
+
+    Raises:
+        HTTPException: Not found if the user has no such job, internal server error if an error occurs during cancelling
+    """
+
+    logger.info(f"Entered cancel_job with job_id: {job_id}")
+
+    try:
+        job = await asyncio.to_thread(job_store.request_cancel, job_id, user_details['username'])
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+
+        return JSONResponse(content=job)
+    except HTTPException as http_exc:
+        raise http_exc
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error in cancelling job: {str(e)}")
+
+@router.get("/datacleaner/versions")
+async def list_versions(user_details: dict = Depends(get_current_user)):
+    """
+    List the versions of the user's dataset, each one a step applied to its parent version
+
+    Args:
+        user_details (dict): User details
+
+    Returns:
+        JSONResponse: Head version, redo stack and every version with its step
+
+    Raises:
+        HTTPException: Internal server error if an error occurs during listing the versions
+    """
+
+    logger.info(f"Entered list_versions")
+
+    try:
+
+        user_data = get_user_details(username=user_details['username'], role=user_details['role'])
+        version_log = await get_version_log(user_data)
+
+        versions = [{
+            "id": entry["id"],
+            "parent": entry["parent"],
+            "depth": entry["depth"],
+            "step": entry["step"],
+            "checkpoint": entry["checkpoint"] is not None,
+            "createdAt": entry["createdAt"].isoformat()
+        } for entry in version_log["versions"]]
+
+        return JSONResponse(content={**version_summary(version_log), "redo": version_log["redo"], "versions": versions})
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error in listing dataset versions: {str(e)}")
+
+async def move_version_head(user_details: dict,
+                            action: str,
+                            version_id: Optional[int] = None
+                            ):
+    """
+    Move the head version and return the dataframe information of the new head
+
+    Args:
+        user_details (dict): User details
+        action (str): "undo", "redo" or "checkout"
+        version_id (Optional[int]): Version to check out
+
+    Returns:
+        JSONResponse: Dataframe information with the head version
+
+    Raises:
+        HTTPException: Bad request if there is nothing to undo or redo, not found if the version does not exist
+    """
+
+    user_data = get_user_details(username=user_details['username'], role=user_details['role'])
+
+    version_log = move_head(await get_version_log(user_data), action, version_id)
+    dataset = await materialize(user_data, version_log, version_log["head"])
+
+    info = await get_dataframe_info(dataset)
+    info["version"] = version_summary(version_log)
+
+    return JSONResponse(content=info)
+
+@router.post("/datacleaner/undo")
+async def handle_undo(user_details: dict = Depends(get_current_user)):
+    """
+    Move the head back to the parent version
+
+    Args:
+        user_details (dict): User details
+
+    Returns:
+        JSONResponse: Dataframe information with the head version
+
+    Raises:
+        HTTPException: Bad request if there is nothing to undo, internal server error if an error occurs during undo
+    """
+
+    logger.info(f"Entered handle_undo")
+
+    try:
+        return await move_version_head(user_details, "undo")
+    except HTTPException as http_exc:
+        raise http_exc
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error in undoing the last step: {str(e)}")
+
+@router.post("/datacleaner/redo")
+async def handle_redo(user_details: dict = Depends(get_current_user)):
+    """
+    Move the head forward to the last undone version
+
+    Args:
+        user_details (dict): User details
+
+    Returns:
+        JSONResponse: Dataframe information with the head version
+
+    Raises:
+        HTTPException: Bad request if there is nothing to redo, internal server error if an error occurs during redo
+    """
+
+    logger.info(f"Entered handle_redo")
+
+    try:
+        return await move_version_head(user_details, "redo")
+    except HTTPException as http_exc:
+        raise http_exc
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error in redoing the last undone step: {str(e)}")
+
+@router.post("/datacleaner/checkout")
+async def handle_checkout(checkout_request: CheckoutRequest,
+                          user_details: dict = Depends(get_current_user)
+                          ):
+    """
+    Move the head to any version, the next step starts a new branch from it
+
+    Args:
+        checkout_request (CheckoutRequest): Version to check out, 0 for the uploaded dataset
+        user_details (dict): User details
+
+    Returns:
+        JSONResponse: Dataframe information with the head version
+
+    Raises:
+        HTTPException: Not found if the version does not exist, internal server error if an error occurs during checkout
+    """
+
+    logger.info(f"Entered handle_checkout with version: {checkout_request.version}")
+
+    try:
+        return await move_version_head(user_details, "checkout", checkout_request.version)
+    except HTTPException as http_exc:
+        raise http_exc
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error in checking out dataset version: {str(e)}")
+
 @router.get("/datacleaner/download")
-async def download_dataframe(user_details: dict = Depends(get_current_user)):
+async def download_dataframe(user_details: dict = Depends(get_current_user),
+                             accept_encoding: str = Header(None)
+                             ):
     """
-    Download the current state of the dataframe as a CSV file
+    Download the current state of the dataframe as a CSV file, streamed in row batches
 
     Args:
         user_details (dict): User details
+        accept_encoding (str): Accept-Encoding header, enables gzip or zstd compression of the stream
 
     Returns:
         StreamingResponse: CSV file download
@@ -270,34 +847,23 @@ async def download_dataframe(user_details: dict = Depends(get_current_user)):
     try:
         user_data = get_user_details(username=user_details['username'], role=user_details['role'])
         
-        # Check if there's an edited version first
-        edited_dataframe_details = get_edited_dataframe_details(
-            user_data['username'], 
-            user_data['role'], 
-            user_data['file']
-        )
-        
-        if edited_dataframe_details:
-            dataset = await fetch_and_read_github_file(
-                edited_dataframe_details['edited_file'], 
-                edited_dataframe_details['edited_file_url']
-            )
-        else:
-            dataset = await fetch_and_read_github_file(
-                user_data["file"], 
-                user_data["file_url"]
-            )
-
-        # Create CSV string from dataframe
-        stream = io.StringIO()
-        dataset.to_csv(stream, index=False)
-        
+        # Export the head version of the user's edits
+        dataset, _ = await load_current_dataset(user_data)
+
+        content_encoding = choose_content_encoding(accept_encoding)
+
+        headers = {
+            'Content-Disposition': f'attachment; filename=data_export.csv',
+            'Vary': 'Accept-Encoding'
+        }
+        if content_encoding:
+            headers['Content-Encoding'] = content_encoding
+
+        # Serialize and send row batches as they are produced
         response = StreamingResponse(
-            iter([stream.getvalue()]),
+            compress_chunks(iter_csv(dataset), content_encoding),
             media_type="text/csv",
-            headers={
-                'Content-Disposition': f'attachment; filename=data_export.csv'
-            }
+            headers=headers
         )
         
         return response
@@ -307,3 +873,139 @@ async def download_dataframe(user_details: dict = Depends(get_current_user)):
             status_code=500, 
             detail=f"Error downloading dataframe: {str(e)}"
         )
+
+@router.get("/datacleaner/rows")
+async def browse_rows(offset: int = Query(0, ge=0),
+                      limit: int = Query(100, gt=0, le=MAX_PAGE_ROWS),
+                      columns: Optional[List[str]] = Query(None),
+                      sort_by: Optional[str] = None,
+                      descending: bool = False,
+                      filter_column: Optional[str] = None,
+                      filter_operator: FilterOperator = "eq",
+                      filter_value: Optional[str] = None,
+                      user_details: dict = Depends(get_current_user)
+                      ):
+    """
+    Serve one page of the current state of the dataframe, optionally filtered and sorted, as columnar JSON
+
+    Args:
+        offset (int): First row of the page within the filtered/sorted view
+        limit (int): Number of rows in the page
+        columns (Optional[List[str]]): Columns in the page, all columns if None
+        sort_by (Optional[str]): Column to sort by, missing values last
+        descending (bool): Sort in descending order
+        filter_column (Optional[str]): Column to filter on, no filter if None
+        filter_operator (FilterOperator): Comparison of the filter: eq, ne, gt, ge, lt, le, contains, isnull or notnull
+        filter_value (Optional[str]): Value of the filter
+        user_details (dict): User details
+
+    Returns:
+        JSONResponse: Page columns, values per column, file row numbers and the number of rows in the view
+
+    Raises:
+        HTTPException: Bad request if a column or filter value is invalid, internal server error if an error occurs during browsing
+    """
+
+    logger.info(f"Entered browse_rows with offset: {offset}, limit: {limit}, sort_by: {sort_by}, filter_column: {filter_column}")
+
+    try:
+        user_data = get_user_details(username=user_details['username'], role=user_details['role'])
+
+        version_log = await get_version_log(user_data)
+
+        # Read only the columns the page, the sort and the filter need
+        projection = None
+        if columns:
+            projection = list(dict.fromkeys(columns + [name for name in (sort_by, filter_column) if name]))
+
+        if version_log["head"] == 0:
+            dataset = await fetch_and_read_github_file(user_data["file"], user_data["file_url"], columns=projection,
+                                                       schema_profile=user_data.get("file_schema"))
+            order_url, version = user_data["file_url"], cached_dataset_version(user_data["file_url"], projection)
+        else:
+            dataset = await materialize(user_data, version_log, version_log["head"])
+            order_url, version = user_data["file_url"], f"{version_log['base_version']}/{version_log['head']}"
+
+        missing_columns = [name for name in (columns or []) if name not in dataset.columns]
+        if missing_columns:
+            raise HTTPException(status_code=400, detail=f"Columns not in the dataset: {missing_columns}")
+
+        # Reuse the row order of the view while the user scrolls through it
+        positions = None
+        if sort_by or filter_column:
+            order_key = (order_url, version, projection, sort_by, descending, filter_column, filter_operator, filter_value)
+
+            positions = row_order_cache.get(order_key) if version else None
+            if positions is None:
+                try:
+                    positions = row_order(dataset, sort_by, descending, filter_column, filter_operator, filter_value)
+                except ValueError as e:
+                    raise HTTPException(status_code=400, detail=str(e))
+                if version:
+                    row_order_cache.put(order_key, positions)
+
+        return JSONResponse(content=row_page(dataset, positions, offset, limit, columns))
+
+    except HTTPException as http_exc:
+        raise http_exc
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error in browsing dataframe rows: {str(e)}")
+
+@router.get("/datacleaner/correlations")
+async def get_correlations(columns: Optional[List[str]] = Query(None),
+                           threshold: Optional[float] = Query(None, ge=0, le=1),
+                           user_details: dict = Depends(get_current_user)
+                           ):
+    """
+    Serve the Pearson correlation matrix of the numerical columns of the current dataset version
+
+    The matrix is cached per version, derived from a cached ancestor version when only columns changed since then
+
+    Args:
+        columns (Optional[List[str]]): Columns of the matrix, every numerical column if None
+        threshold (Optional[float]): If set, also list the pairs whose absolute correlation is above it
+        user_details (dict): User details
+
+    Returns:
+        JSONResponse: Columns, the matrix row by row with null for undefined correlations, the correlated pairs,
+                      how the matrix was obtained (cached, sliced, updated or computed), wall time and the version
+
+    Raises:
+        HTTPException: Bad request if a column is missing or not numerical, internal server error if an error occurs during computing the correlations
+    """
+
+    logger.info(f"Entered get_correlations with threshold: {threshold}")
+
+    try:
+
+        user_data = get_user_details(username=user_details['username'], role=user_details['role'])
+        dataset, version_log = await load_current_dataset(user_data)
+
+        start = time.perf_counter()
+        matrix, source = await asyncio.to_thread(correlation_matrix, dataset, version_lineage(version_log, version_log["head"]))
+
+        if columns:
+            invalid_columns = [name for name in columns if name not in matrix.columns]
+            if invalid_columns:
+                raise HTTPException(status_code=400, detail=f"Columns not numerical or not in the dataset: {invalid_columns}")
+            matrix = matrix.loc[columns, columns]
+
+        pairs = correlated_pairs(matrix, threshold) if threshold is not None else None
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        values = matrix.to_numpy()
+        return JSONResponse(content={
+            "columns": list(matrix.columns),
+            "matrix": np.where(np.isnan(values), None, values).tolist(),
+            "pairs": pairs,
+            "source": source,
+            "elapsedMs": round(elapsed_ms, 1),
+            "version": version_summary(version_log)
+        })
+
+    except HTTPException as http_exc:
+        raise http_exc
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error in computing the correlations: {str(e)}")
@@ -1,15 +1,21 @@
 # datacontrol.py - Code module to handle data control functionality
 
-import requests
-from typing import Optional
+import os
+from typing import Optional, Tuple
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
 from pydantic import BaseModel, Field
-from fastapi.responses import JSONResponse, StreamingResponse
-from fastapi import APIRouter, HTTPException, Depends, File, UploadFile, Form
+from fastapi.responses import JSONResponse, StreamingResponse, Response
+from fastapi import APIRouter, HTTPException, Depends, Header, Request
 
 from Components.Logger import logger
-from Components.auth import get_current_user
+from Components.auth import get_current_user, admin_required
+from Components.dataset_cache import dataset_cache, arrow_cache
+from Components.transformer_store import transformer_store
+from Components.storage import storage
+from Components.dataset_io import spool_multipart_upload
 from Components.data import (get_user_details, update_user_details, 
-                             upload_file_to_github, create_user_record)
+                             upload_file_to_github, create_user_record, UPLOAD_SUFFIXES)
 
 
 router = APIRouter()
@@ -99,89 +105,140 @@ async def handle_data_control(current_user: dict = Depends(get_current_user)):
         raise HTTPException(status_code=500, detail=f"Error in data control create: {str(e)}")
 
 @router.put("/datacontrol/update")
-async def update_user_data(
-    apiLink: str = Form(...),
-    aws_access_key_ID: str = Form(None),
-    aws_access_key: str = Form(None),
-    aws_region: str = Form(None),
-    gcp_account_key: str = Form(None),
-    gcp_project_ID: str = Form(None),
-    file: UploadFile = File(None),
-    current_user: dict = Depends(get_current_user)
-):
+async def update_user_data(request: Request,
+                           current_user: dict = Depends(get_current_user)
+                           ):
     """
     Handle data control updation in database
 
+    The multipart form is parsed from the request stream so an uploaded file is spooled to disk once, under the
+    upload size limit. Its text fields are apiLink (required), aws_access_key_ID, aws_access_key, aws_region,
+    gcp_account_key and gcp_project_ID, the file is sent in the file field.
+
     Args:
-        apiLink (str): API link
-        aws_access_key_ID (str): AWS Access Key ID
-        aws_access_key (str): AWS Secret Access Key
-        aws_region (str): AWS Region
-        gcp_account_key (str): GCP Service Account Key
-        gcp_project_ID (str): GCP Project ID
-        file (UploadFile): File to upload
+        request (Request): Request with the multipart form
         current_user (dict): Current user details
 
     Returns:
         JSONResponse: Data control response
 
     Raises:
-        HTTPException: Internal server error if an error occurs during data control updation
+        HTTPException: Unprocessable entity if apiLink is missing, bad request or payload too large if the upload
+        is rejected, internal server error if an error occurs during data control updation
     """
 
     logger.info(f"Entered data control update")
 
+    spooled_upload = None
     try:
 
+        form, spooled_upload = await spool_multipart_upload(request, suffixes=UPLOAD_SUFFIXES)
+
+        apiLink = form.get("apiLink")
+        if apiLink is None:
+            raise HTTPException(status_code=422, detail="apiLink is required")
+
         current_user_details = get_user_details(current_user["username"],current_user["role"])
         update_data = {}
 
         # Check and update api Link
-        if apiLink is not None and apiLink != current_user_details["apiLink"]:
+        if apiLink != current_user_details["apiLink"]:
             update_data["apiLink"] = apiLink
 
-        # Check and update aws_access_key_ID
-        if aws_access_key_ID is not None and aws_access_key_ID != current_user_details["aws_access_key_ID"]:
-            update_data["aws_access_key_ID"] = aws_access_key_ID
-
-        # Check and update aws_access_key
-        if aws_access_key is not None and aws_access_key != current_user_details["aws_access_key"]:
-            update_data["aws_access_key"] = aws_access_key
-
-        # Check and update aws_region
-        if aws_region is not None and aws_region != current_user_details["aws_region"]:
-            update_data["aws_region"] = aws_region
-
-        # Check and update gcp_account_key
-        if gcp_account_key is not None and gcp_account_key != current_user_details["gcp_account_key"]:
-            update_data["gcp_account_key"] = gcp_account_key
-
-        # Check and update gcp_project_ID
-        if gcp_project_ID is not None and gcp_project_ID != current_user_details["gcp_project_ID"]:
-            update_data["gcp_project_ID"] = gcp_project_ID
+        # Check and update the cloud credentials
+        for field in ("aws_access_key_ID", "aws_access_key", "aws_region", "gcp_account_key", "gcp_project_ID"):
+            if form.get(field) is not None and form[field] != current_user_details[field]:
+                update_data[field] = form[field]
         
         update_data["role"] = current_user["role"]
 
-        if file:
-            upload_result = await upload_file_to_github(file)
+        if spooled_upload:
+            upload_result = await upload_file_to_github(spooled_upload)
             update_data["file"] = upload_result["file_name"]  # Store the actual filename
             update_data["file_url"] = upload_result["download_url"]  # Store the GitHub link
+            update_data["file_version"] = upload_result["version"]  # Content version of the file
+            update_data["file_size"] = upload_result["size"]
+            update_data["file_uploaded_at"] = upload_result["uploaded_at"]  # Last-Modified of the file
+            update_data["file_schema"] = upload_result["schema_profile"]  # Dtypes applied on every load
 
         result = update_user_details(current_user["username"],update_data)
         
         if result:
             return JSONResponse(content={"message": "User data updated successfully"})
+
+    except HTTPException as http_exc:
+        raise http_exc
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error in data control update: {str(e)}")
 
+    finally:
+        if spooled_upload is not None:
+            os.remove(spooled_upload.path)
+
+def parse_range_header(range_header: str,
+                       file_size: int
+                       ) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single byte range of a Range header
+
+    A header that is not a single valid byte range, for example one whose last byte is before its first,
+    is ignored as RFC 7233 asks and the whole file is sent.
+
+    Args:
+        range_header (str): Range request header, e.g. "bytes=0-1023", "bytes=1024-" or "bytes=-500"
+        file_size (int): Size of the file in bytes
+
+    Returns:
+        Optional[Tuple[int, int]]: First and last byte of the range (inclusive), None to send the whole file
+
+    Raises:
+        HTTPException: Range not satisfiable if the range starts beyond the end of the file or is an empty suffix
+    """
+
+    unit, _, byte_range = range_header.partition("=")
+
+    # Multiple ranges and unknown units are answered with the whole file
+    if unit.strip().lower() != "bytes" or "," in byte_range:
+        return None
+
+    first, dash, last = byte_range.strip().partition("-")
+
+    if not dash or not (first or last) or any(part and not part.isdigit() for part in (first, last)):
+        return None
+
+    if first:
+        start = int(first)
+        if last and int(last) < start:
+            return None
+        end = min(int(last), file_size - 1) if last else file_size - 1
+    else:
+        # Suffix range: the last N bytes
+        start = max(file_size - int(last), 0)
+        end = file_size - 1 if int(last) > 0 else -1
+
+    if start > end or start >= file_size:
+        raise HTTPException(status_code=416, detail="Requested range not satisfiable",
+                            headers={"Content-Range": f"bytes */{file_size}"})
+
+    return start, end
+
 @router.get("/datacontrol/download")
-async def download_file(current_user: dict = Depends(get_current_user)):
+async def download_file(current_user: dict = Depends(get_current_user),
+                        range_header: str = Header(None, alias="Range"),
+                        if_range: str = Header(None),
+                        if_none_match: str = Header(None),
+                        if_modified_since: str = Header(None)
+                        ):
     """
-    Handle data control file download from GitHub
+    Handle data control file download from the storage backend, with byte ranges and conditional requests
 
     Args:
         current_user (dict): Current user details
+        range_header (str): Range header, lets clients resume or download in parallel
+        if_range (str): If-Range header, the range is only honoured while it is the strong ETag of the file
+        if_none_match (str): If-None-Match header, answered with 304 when the ETag matches
+        if_modified_since (str): If-Modified-Since header, answered with 304 when the file is unchanged
 
     Returns:
         StreamingResponse: Data control response
@@ -194,21 +251,132 @@ async def download_file(current_user: dict = Depends(get_current_user)):
 
     try:
 
-        # Fetch the GitHub URL from your database based on the current user
+        # Fetch the file URL from your database based on the current user
         user_details = get_user_details(current_user["username"],current_user["role"])  # Fetching data from database
-        
-        # Make a request to GitHub
-        response = requests.get(user_details["file_url"], stream=True)
-        response.raise_for_status()
-       
-        # Return a StreamingResponse
+
+        file_version = user_details.get("file_version")
+        file_size = user_details.get("file_size")
+        uploaded_at = user_details.get("file_uploaded_at")
+
+        headers = {
+            "Content-Disposition": f'attachment; filename="{user_details["file"]}"'
+        }
+
+        # Validators are recorded at upload time, files uploaded before have none
+        etag = f'"{file_version}"' if file_version else None
+        if etag:
+            headers["ETag"] = etag
+        if uploaded_at:
+            uploaded_at = uploaded_at.replace(tzinfo=timezone.utc, microsecond=0)
+            headers["Last-Modified"] = format_datetime(uploaded_at, usegmt=True)
+
+        # Unchanged file: answer without touching the storage backend
+        if if_none_match is not None:
+            not_modified = etag is not None and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")])
+        elif if_modified_since and uploaded_at:
+            try:
+                not_modified = uploaded_at <= parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                not_modified = False
+        else:
+            not_modified = False
+
+        if not_modified:
+            return Response(status_code=304, headers=headers)
+
+        # Byte ranges need the file size, so they are only offered for files with a recorded size
+        byte_range = None
+        if file_size is not None:
+            headers["Accept-Ranges"] = "bytes"
+
+            # If-Range only keeps the range on a strong ETag match, weak ETags and dates get the whole file
+            range_still_valid = not if_range or (etag is not None and if_range.strip() == etag)
+            if range_header and range_still_valid:
+                byte_range = parse_range_header(range_header, file_size)
+
+        if byte_range:
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+            headers["Content-Length"] = str(end - start + 1)
+
+            return StreamingResponse(
+                storage.stream(user_details["file_url"], chunk_size=65536, start=start, end=end),
+                status_code=206,
+                media_type="application/octet-stream",
+                headers=headers
+            )
+
+        if file_size is not None:
+            headers["Content-Length"] = str(file_size)
+
+        # Return a StreamingResponse reading from the storage backend
         return StreamingResponse(
-            response.iter_content(chunk_size=8192),
+            storage.stream(user_details["file_url"], chunk_size=65536),
             media_type="application/octet-stream",
-            headers={
-                "Content-Disposition": f'attachment; filename="{user_details["file"]}"'
-            }
+            headers=headers
         )
+
+    except HTTPException as http_exc:
+        raise http_exc
     
-    except requests.RequestException as e:
-        raise HTTPException(status_code=500, detail=f"Error in data control download: {str(e)}")
\ No newline at end of file
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error in data control download: {str(e)}")
+
+@router.get("/datacontrol/cache-stats")
+async def get_dataset_cache_stats(current_user: dict = Depends(admin_required)):
+    """
+    Handle fetching the dataset cache counters
+
+    Args:
+        current_user (dict): Current user details, must be an admin
+
+    Returns:
+        JSONResponse: Dataset cache hits, misses, evictions and memory usage, with the Arrow disk cache under "arrowCache"
+                      and the fitted transformer store under "transformerStore"
+
+    Raises:
+        HTTPException: Internal server error if an error occurs during fetching the cache counters
+    """
+
+    logger.info(f"Entered data control cache stats")
+
+    try:
+
+        return JSONResponse(content={**dataset_cache.stats(), "arrowCache": arrow_cache.stats(),
+                                     "transformerStore": transformer_store.stats()})
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error in data control cache stats: {str(e)}")
+
+@router.get("/datacontrol/schema-profile")
+async def get_schema_profile(current_user: dict = Depends(get_current_user)):
+    """
+    Handle fetching the schema profile recorded for the user's dataset at upload
+
+    Args:
+        current_user (dict): Current user details
+
+    Returns:
+        JSONResponse: Per-column dtypes and the memory saved by loading the dataset with them
+
+    Raises:
+        HTTPException: Not found if the dataset has no schema profile, internal server error if an error occurs during fetching
+    """
+
+    logger.info(f"Entered data control schema profile")
+
+    try:
+
+        user_details = get_user_details(current_user["username"], current_user["role"])
+        schema_profile = user_details.get("file_schema")
+
+        if not schema_profile:
+            raise HTTPException(status_code=404, detail="No schema profile recorded for the uploaded file")
+
+        return JSONResponse(content={"file": user_details["file"], **schema_profile})
+
+    except HTTPException as http_exc:
+        raise http_exc
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error in data control schema profile: {str(e)}")
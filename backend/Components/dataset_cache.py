@@ -0,0 +1,403 @@
+# dataset_cache.py - Code module to keep parsed datasets in memory between requests
+
+import os
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional, List
+
+import pandas as pd
+import pyarrow as pa
+from dotenv import load_dotenv
+
+from Components.Logger import logger
+
+load_dotenv()
+
+# Memory budget of the cache in megabytes
+DATASET_CACHE_MAX_MB = int(os.getenv("DATASET_CACHE_MAX_MB", "512"))
+
+# Node-local Arrow IPC cache shared by all workers, disabled when the disk budget is 0
+ARROW_CACHE_PATH = os.getenv("ARROW_CACHE_PATH") or os.path.join(tempfile.gettempdir(), "dataset-arrow-cache")
+ARROW_CACHE_MAX_MB = int(os.getenv("ARROW_CACHE_MAX_MB", "4096"))
+
+
+class DatasetCache:
+
+    """
+    LRU cache of parsed datasets keyed by file URL and content version
+    """
+
+    def __init__(self, max_bytes: int):
+
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # (file_url, columns) -> (version, dataset, size)
+        self._lock = threading.Lock()
+
+    def version(self, file_url: str, columns: Optional[List[str]] = None) -> Optional[str]:
+
+        """
+        Get the content version currently cached for a file URL
+
+        Args:
+            file_url (str): File URL
+            columns (Optional[List[str]]): Projected columns, None for the whole dataset
+
+        Returns:
+            Optional[str]: Cached content version, None if the file is not cached
+        """
+
+        with self._lock:
+            entry = self._entries.get(self._key(file_url, columns))
+            return entry[0] if entry else None
+
+    def get(self, file_url: str, version: str, columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+
+        """
+        Get a cached dataset for a file URL and content version
+
+        Args:
+            file_url (str): File URL
+            version (str): Content version of the file
+            columns (Optional[List[str]]): Projected columns, None for the whole dataset
+
+        Returns:
+            Optional[pd.DataFrame]: Copy-on-write view of the cached dataset, None on a cache miss
+        """
+
+        key = self._key(file_url, columns)
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+            return entry[1].copy(deep=False)
+
+    def put(self,
+            file_url: str,
+            version: str,
+            dataset: pd.DataFrame,
+            columns: Optional[List[str]] = None
+            ) -> pd.DataFrame:
+
+        """
+        Store a dataset in the cache, evicting the least recently used entries when over budget
+
+        Args:
+            file_url (str): File URL
+            version (str): Content version of the file
+            dataset (pd.DataFrame): Parsed dataset
+            columns (Optional[List[str]]): Projected columns, None for the whole dataset
+
+        Returns:
+            pd.DataFrame: Copy-on-write view of the cached dataset
+        """
+
+        key = self._key(file_url, columns)
+        size = int(dataset.memory_usage(index=True, deep=True).sum())
+
+        with self._lock:
+            self._discard(key)
+
+            # Datasets larger than the whole budget are never cached
+            if size > self.max_bytes:
+                logger.info(f"Dataset {file_url} ({size} bytes) exceeds the dataset cache budget, not cached")
+                return dataset
+
+            while self._entries and self.current_bytes + size > self.max_bytes:
+                evicted_key, evicted_entry = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_entry[2]
+                self.evictions += 1
+                logger.info(f"Evicted {evicted_key[0]} from the dataset cache")
+
+            # The cache keeps its own shallow copy: with Copy-on-Write, the only mode of pandas 3, writes through
+            # the caller's frame or the copies get returns copy the written columns instead of changing the cached ones
+            self._entries[key] = (version, dataset.copy(deep=False), size)
+            self.current_bytes += size
+
+        return dataset.copy(deep=False)
+
+    def invalidate(self, file_url: str):
+
+        """
+        Remove a file URL, including all of its column projections, from the cache
+        """
+
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == file_url]:
+                self._discard(key)
+
+    def stats(self) -> dict:
+
+        """
+        Get the cache counters
+
+        Returns:
+            dict: Cache counters and memory usage
+        """
+
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "currentBytes": self.current_bytes,
+                "maxBytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+    @staticmethod
+    def _key(file_url: str, columns: Optional[List[str]]) -> tuple:
+
+        return (file_url, tuple(columns) if columns else None)
+
+    def _discard(self, key: tuple):
+
+        entry = self._entries.pop(key, None)
+        if entry:
+            self.current_bytes -= entry[2]
+
+
+
+class ArrowDiskCache:
+
+    """
+    Disk cache of parsed datasets stored as Arrow IPC files and opened with memory mapping
+
+    Every worker process on the node maps the same files, so the operating system keeps a single
+    copy of the pages for all of them and the cache survives worker restarts. Files are replaced
+    atomically, a worker still mapping a replaced or evicted file keeps reading its old copy.
+    """
+
+    VERSION_KEY = b"dataset_version"
+
+    def __init__(self, root: str, max_bytes: int):
+
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self.enabled:
+            os.makedirs(self.root, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+
+        return self.max_bytes > 0
+
+    def version(self, file_url: str) -> Optional[str]:
+
+        """
+        Get the content version stored on disk for a file URL
+
+        Args:
+            file_url (str): File URL
+
+        Returns:
+            Optional[str]: Stored content version, None if the file is not cached
+        """
+
+        if not self.enabled:
+            return None
+
+        try:
+            with pa.memory_map(self._path(file_url)) as source:
+                metadata = pa.ipc.open_file(source).schema.metadata or {}
+        except (OSError, pa.ArrowInvalid):
+            return None
+
+        version = metadata.get(self.VERSION_KEY)
+        return version.decode("utf-8") if version else None
+
+    def get(self, file_url: str, version: str, columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+
+        """
+        Get a dataset for a file URL and content version, backed by the memory-mapped file
+
+        Args:
+            file_url (str): File URL
+            version (str): Content version of the file
+            columns (Optional[List[str]]): Projected columns, None for the whole dataset
+
+        Returns:
+            Optional[pd.DataFrame]: Read-only dataset, None on a cache miss
+        """
+
+        if not self.enabled:
+            return None
+
+        dataset = self._read(file_url, version, columns)
+
+        if dataset is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+        return dataset
+
+    def put(self, file_url: str, version: str, dataset: pd.DataFrame) -> pd.DataFrame:
+
+        """
+        Store a dataset on disk, evicting the least recently used files when over the disk budget
+
+        Args:
+            file_url (str): File URL
+            version (str): Content version of the file
+            dataset (pd.DataFrame): Parsed dataset with all of its columns
+
+        Returns:
+            pd.DataFrame: Dataset backed by the memory-mapped file, the given dataset if it could not be stored
+        """
+
+        if not self.enabled:
+            return dataset
+
+        path = self._path(file_url)
+        descriptor, temp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+
+        try:
+            table = pa.Table.from_pandas(dataset, preserve_index=False)
+            table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                                   self.VERSION_KEY: version.encode("utf-8")})
+
+            with os.fdopen(descriptor, "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+
+            # Datasets larger than the whole budget are never cached
+            if os.path.getsize(temp_path) > self.max_bytes:
+                logger.info(f"Dataset {file_url} exceeds the Arrow cache budget, not cached")
+                os.remove(temp_path)
+                return dataset
+
+            os.replace(temp_path, path)
+        except (OSError, pa.ArrowException) as e:
+            # Columns Arrow cannot represent, e.g. mixed Python types, are only cached in memory
+            logger.warning(f"Could not store {file_url} in the Arrow cache: {str(e)}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return dataset
+
+        self._evict(keep=path)
+
+        mapped_dataset = self._read(file_url, version)
+        return dataset if mapped_dataset is None else mapped_dataset
+
+    def invalidate(self, file_url: str):
+
+        """
+        Remove a file URL from the disk cache
+        """
+
+        if not self.enabled:
+            return
+
+        try:
+            os.remove(self._path(file_url))
+        except FileNotFoundError:
+            pass
+
+    def stats(self) -> dict:
+
+        """
+        Get the cache counters of this worker and the disk usage shared by all workers
+
+        Returns:
+            dict: Cache counters and disk usage
+        """
+
+        files = self._files()
+
+        return {
+            "entries": len(files),
+            "currentBytes": sum(size for _, size, _ in files),
+            "maxBytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+    def _read(self, file_url: str, version: str, columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+
+        path = self._path(file_url)
+
+        try:
+            table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+        except (OSError, pa.ArrowInvalid):
+            return None
+
+        metadata = table.schema.metadata or {}
+        if metadata.get(self.VERSION_KEY) != version.encode("utf-8") or \
+                (columns and not set(columns).issubset(table.column_names)):
+            return None
+
+        # Mark the file as recently used for the eviction order of every worker
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        if columns:
+            table = table.select(columns)
+
+        # One block per column keeps the numeric columns as zero-copy views of the mapped file
+        return table.to_pandas(split_blocks=True)
+
+    def _path(self, file_url: str) -> str:
+
+        return os.path.join(self.root, hashlib.sha256(file_url.encode("utf-8")).hexdigest() + ".arrow")
+
+    def _files(self) -> list:
+
+        files = []
+
+        if not self.enabled:
+            return files
+
+        for entry in os.scandir(self.root):
+            if not entry.name.endswith(".arrow"):
+                continue
+            try:
+                status = entry.stat()
+            except FileNotFoundError:
+                continue
+            files.append((entry.path, status.st_size, status.st_mtime))
+
+        return files
+
+    def _evict(self, keep: str):
+
+        files = sorted(self._files(), key=lambda file: file[2])
+        current_bytes = sum(size for _, size, _ in files)
+
+        for path, size, _ in files:
+            if current_bytes <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # Already evicted by another worker
+
+            current_bytes -= size
+            self.evictions += 1
+            logger.info(f"Evicted {os.path.basename(path)} from the Arrow cache")
+
+
+dataset_cache = DatasetCache(max_bytes=DATASET_CACHE_MAX_MB * 1024 * 1024)
+arrow_cache = ArrowDiskCache(root=ARROW_CACHE_PATH, max_bytes=ARROW_CACHE_MAX_MB * 1024 * 1024)
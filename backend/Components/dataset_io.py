@@ -0,0 +1,668 @@
+# dataset_io.py - Code module to handle non-blocking dataset downloads and parsing
+
+import os
+import asyncio
+import zlib
+import hashlib
+import tempfile
+from io import BytesIO
+from typing import Optional, List, Tuple, Dict, Union, NamedTuple, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+from dotenv import load_dotenv
+
+from fastapi import HTTPException, Request
+from python_multipart.multipart import MultipartParser, parse_options_header
+from python_multipart.exceptions import FormParserError
+
+from Components.Logger import logger
+from Components.schema_profile import build_schema_profile, apply_schema_profile, read_options, SchemaProfiler
+
+# zstd Content-Encoding is offered only when the optional zstandard package is installed
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+load_dotenv()
+
+# Number of threads parsing CSV/XLSX files off the event loop
+DATASET_PARSER_WORKERS = int(os.getenv("DATASET_PARSER_WORKERS", "4"))
+
+# Connection pool of the shared HTTP client
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "10"))
+
+# Uploads larger than this are rejected before they are buffered
+MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "500"))
+
+# Bytes allowed for the text fields sent in the same form as an upload
+MAX_FORM_FIELDS_BYTES = 64 * 1024
+
+# Folder holding uploads while they are streamed to storage, the system temp folder if unset
+UPLOAD_SPOOL_PATH = os.getenv("UPLOAD_SPOOL_PATH") or None
+
+# Size of the chunks read from an upload and from spooled files
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Rows serialized per chunk of a streamed CSV export
+CSV_EXPORT_BATCH_ROWS = int(os.getenv("CSV_EXPORT_BATCH_ROWS", "50000"))
+
+# Suffix of the columnar copy stored next to every uploaded CSV/XLSX file
+SIDECAR_SUFFIX = ".parquet"
+
+# Bytes of CSV parsed per batch while building a sidecar, the column types are inferred from the first batch
+SIDECAR_BLOCK_MB = int(os.getenv("SIDECAR_BLOCK_MB", "4"))
+
+_http_client: Optional[httpx.AsyncClient] = None
+_parser_pool = ThreadPoolExecutor(max_workers=DATASET_PARSER_WORKERS, thread_name_prefix="dataset-parser")
+
+
+def get_http_client() -> httpx.AsyncClient:
+
+    """
+    Get the app-lifetime HTTP client, creating it on first use
+
+    Returns:
+        httpx.AsyncClient: Shared client with connection pooling and keep-alive
+    """
+
+    global _http_client
+
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS,
+                                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS),
+            timeout=httpx.Timeout(30.0, read=300.0),
+            follow_redirects=True
+        )
+
+    return _http_client
+
+
+async def close_http_client():
+
+    """
+    Close the shared HTTP client and the parser pool on application shutdown
+    """
+
+    global _http_client
+
+    logger.info("Closing the shared HTTP client")
+
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+    _parser_pool.shutdown(wait=False)
+
+
+class SpooledUpload(NamedTuple):
+
+    """
+    Upload streamed to a temporary file
+    """
+
+    path: str
+    sha256: str
+    size: int
+    filename: Optional[str] = None
+
+
+async def spool_multipart_upload(request: Request,
+                                 file_field: str = "file",
+                                 suffixes: Optional[Tuple[str, ...]] = None,
+                                 max_bytes: int = MAX_UPLOAD_MB * 1024 * 1024
+                                 ) -> Tuple[Dict[str, str], Optional[SpooledUpload]]:
+
+    """
+    Parse a multipart/form-data request body as it arrives, streaming the file part to a temporary file and hashing
+    it on the way
+
+    The body is read from the request stream, not through Starlette's form parser, so the file is written to disk
+    once and the size limit holds before anything is buffered.
+
+    Args:
+        request (Request): Request with a multipart/form-data body
+        file_field (str): Name of the form field holding the file
+        suffixes (Optional[Tuple[str, ...]]): File name suffixes accepted for the file, any if None
+        max_bytes (int): Largest accepted file size
+
+    Returns:
+        Tuple[Dict[str, str], Optional[SpooledUpload]]: Text fields of the form and the spooled file, None if no file
+        was sent, the caller removes the file
+
+    Raises:
+        HTTPException: If the body is not multipart/form-data (400), the file has another suffix (400) or the file
+        or the text fields are too large (413)
+    """
+
+    too_large = HTTPException(status_code=413, detail=f"File is larger than the {max_bytes // (1024 * 1024)} MB upload limit")
+
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data body")
+
+    # Reject bodies that declare their size up front before reading anything
+    max_body_bytes = max_bytes + MAX_FORM_FIELDS_BYTES
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > max_body_bytes:
+        raise too_large
+
+    # The parser callbacks only record events, the events are handled after each chunk so file writes can be awaited
+    events = []
+    header_field, header_value, part_headers = bytearray(), bytearray(), {}
+
+    def on_header_end():
+        part_headers[bytes(header_field).lower()] = bytes(header_value)
+        header_field.clear()
+        header_value.clear()
+
+    parser = MultipartParser(params[b"boundary"], {
+        "on_part_begin": part_headers.clear,
+        "on_header_field": lambda data, start, end: header_field.extend(data[start:end]),
+        "on_header_value": lambda data, start, end: header_value.extend(data[start:end]),
+        "on_header_end": on_header_end,
+        "on_headers_finished": lambda: events.append(("headers", dict(part_headers))),
+        "on_part_data": lambda data, start, end: events.append(("data", data[start:end])),
+        "on_part_end": lambda: events.append(("end", None))
+    })
+
+    fields = {}
+    spooled_upload = None
+    spool_file = None
+    digest = hashlib.sha256()
+    filename, field_name, field_value = None, None, bytearray()
+    file_size = body_size = fields_size = 0
+
+    try:
+        async for chunk in request.stream():
+            body_size += len(chunk)
+            if body_size > max_body_bytes:
+                raise too_large
+
+            try:
+                parser.write(chunk)
+            except FormParserError:
+                raise HTTPException(status_code=400, detail="Invalid multipart/form-data body")
+
+            file_data = []
+            for event, value in events:
+                if event == "headers":
+                    _, disposition = parse_options_header(value.get(b"content-disposition", b""))
+                    field_name = disposition.get(b"name", b"").decode("utf-8")
+                    filename = disposition[b"filename"].decode("utf-8") if b"filename" in disposition else None
+                    field_value.clear()
+
+                    # Browsers send an empty file part when no file was chosen
+                    if field_name == file_field and filename:
+                        if spool_file is not None:
+                            raise HTTPException(status_code=400, detail="Only one file can be uploaded")
+                        if suffixes and not filename.endswith(suffixes):
+                            raise HTTPException(status_code=400, detail=f"File must be one of the {', '.join(suffixes)} formats.")
+                        descriptor, path = tempfile.mkstemp(dir=UPLOAD_SPOOL_PATH, suffix=os.path.splitext(filename)[1])
+                        spool_file = os.fdopen(descriptor, "wb")
+                        spooled_upload = SpooledUpload(path=path, sha256="", size=0, filename=filename)
+
+                elif event == "data":
+                    if field_name == file_field and filename:
+                        file_size += len(value)
+                        if file_size > max_bytes:
+                            raise too_large
+                        digest.update(value)
+                        file_data.append(value)
+                    elif filename is None:
+                        fields_size += len(value)
+                        if fields_size > MAX_FORM_FIELDS_BYTES:
+                            raise HTTPException(status_code=413, detail="Form fields are too large")
+                        field_value.extend(value)
+
+                elif filename is None:
+                    fields[field_name] = field_value.decode("utf-8")
+
+            events.clear()
+
+            # Write the file data of the whole chunk at once, off the event loop
+            if file_data:
+                await asyncio.to_thread(spool_file.write, b"".join(file_data))
+
+        parser.finalize()
+
+    except BaseException:
+        if spool_file is not None:
+            spool_file.close()
+            os.remove(spooled_upload.path)
+        raise
+
+    if spool_file is None:
+        return fields, None
+
+    spool_file.close()
+    return fields, spooled_upload._replace(sha256=digest.hexdigest(), size=file_size)
+
+
+def read_dataset(filename: str,
+                 content: Union[bytes, str],
+                 columns: Optional[List[str]] = None,
+                 schema_profile: Optional[dict] = None
+                 ) -> pd.DataFrame:
+
+    """
+    Read the file content into a pandas DataFrame based on the file type
+
+    Args:
+        filename (str): File name, used to detect the file type
+        content (Union[bytes, str]): Raw file content or the path of a local file
+        columns (Optional[List[str]]): Columns to read, all columns if None
+        schema_profile (Optional[dict]): Schema profile recorded at upload, read with default dtypes if None
+
+    Returns:
+        pd.DataFrame: The parsed dataset
+
+    Raises:
+        ValueError: If the file type is not supported
+    """
+
+    # Get the file extension (Parquet sidecar, CSV or XLSX)
+    file_extension = filename.split('.')[-1].lower()
+
+    if file_extension not in ('parquet', 'csv', 'xlsx'):
+        raise ValueError("Unsupported file format. Only CSV and XLSX are supported.")
+
+    # Text readers take the profiled dtypes directly, restricted to the projected columns
+    options = read_options(schema_profile)
+    if options and columns:
+        options = {"dtype": {name: dtype for name, dtype in options["dtype"].items() if name in columns},
+                   "parse_dates": [name for name in options["parse_dates"] if name in columns]}
+
+    def read(**reader_options):
+        source = BytesIO(content) if isinstance(content, bytes) else content
+
+        if file_extension == 'parquet':
+            return pd.read_parquet(source, columns=columns)
+        elif file_extension == 'csv':
+            return pd.read_csv(source, usecols=columns, **reader_options)
+        else:
+            return pd.read_excel(source, usecols=columns, **reader_options)
+
+    try:
+        # Sidecars written before the profile existed are converted after reading
+        dataset = apply_schema_profile(read(**options), schema_profile)
+    except (ValueError, TypeError) as e:
+        # A profile that no longer fits the file must not make it unreadable
+        logger.warning(f"Could not read {filename} with its schema profile, using default dtypes: {str(e)}")
+        dataset = read()
+
+    # Text readers keep the file order of the projected columns
+    return dataset[columns] if columns else dataset
+
+
+def file_digest(path: str) -> Tuple[str, int]:
+
+    """
+    Hash a local file in chunks
+
+    Args:
+        path (str): Path of the local file
+
+    Returns:
+        Tuple[str, int]: SHA-256 hex digest and size of the file
+    """
+
+    digest = hashlib.sha256()
+    size = 0
+
+    with open(path, "rb") as source:
+        while chunk := source.read(UPLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+            size += len(chunk)
+
+    return digest.hexdigest(), size
+
+
+def _csv_convert_options(content: Union[bytes, str]) -> pa_csv.ConvertOptions:
+
+    # Empty fields are missing values, as pandas reads them
+    convert_options = pa_csv.ConvertOptions(strings_can_be_null=True)
+
+    # pandas reads dates and times as text, the profile decides which columns are datetime. All-empty columns
+    # are float64 in pandas, a later batch with text in them makes the file fall back to the whole-file path
+    reader = pa_csv.open_csv(BytesIO(content) if isinstance(content, bytes) else content,
+                             read_options=pa_csv.ReadOptions(block_size=SIDECAR_BLOCK_MB * 1024 * 1024),
+                             convert_options=convert_options)
+    schema = reader.schema
+    reader.close()
+
+    if len(set(schema.names)) < len(schema.names):
+        raise pa.ArrowInvalid("Duplicate column names")
+
+    column_types = {}
+    for field in schema:
+        if pa.types.is_null(field.type):
+            column_types[field.name] = pa.float64()
+        elif not (pa.types.is_integer(field.type) or pa.types.is_floating(field.type)
+                  or pa.types.is_boolean(field.type) or pa.types.is_string(field.type)):
+            column_types[field.name] = pa.string()
+
+    return pa_csv.ConvertOptions(strings_can_be_null=True, column_types=column_types)
+
+
+def _csv_batches(content: Union[bytes, str], convert_options: pa_csv.ConvertOptions) -> Iterator[pd.DataFrame]:
+
+    reader = pa_csv.open_csv(BytesIO(content) if isinstance(content, bytes) else content,
+                             read_options=pa_csv.ReadOptions(block_size=SIDECAR_BLOCK_MB * 1024 * 1024),
+                             convert_options=convert_options)
+    with reader:
+        for batch in reader:
+            yield batch.to_pandas()
+
+
+def _write_csv_sidecar(content: Union[bytes, str], path: str) -> dict:
+
+    convert_options = _csv_convert_options(content)
+
+    # First pass profiles the batches, the second converts them to the profiled dtypes and writes them
+    profiler = SchemaProfiler()
+    for batch in _csv_batches(content, convert_options):
+        profiler.update(batch)
+
+    if not profiler.rows:
+        raise pa.ArrowInvalid("The file has no rows")
+
+    profiler.finish()
+
+    writer = None
+    try:
+        for batch in _csv_batches(content, convert_options):
+            table = pa.Table.from_pandas(profiler.convert(batch), preserve_index=False,
+                                         schema=writer.schema if writer else None)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return profiler.result()
+
+
+def build_sidecar(filename: str, content: Union[bytes, str]) -> Tuple[SpooledUpload, dict]:
+
+    """
+    Profile an uploaded CSV/XLSX file and convert it into its Parquet sidecar with the profiled dtypes
+
+    CSV files are converted in batches, so only one batch of the file is in memory at a time. XLSX files, and
+    CSV files whose later rows do not fit the column types inferred from the first batch, are read whole.
+
+    Args:
+        filename (str): File name, used to detect the file type
+        content (Union[bytes, str]): Raw file content or the path of a local file
+
+    Returns:
+        Tuple[SpooledUpload, dict]: Parquet file written to a temporary file, the caller removes the file,
+                                    and the schema profile of the file
+    """
+
+    descriptor, path = tempfile.mkstemp(dir=UPLOAD_SPOOL_PATH, suffix=SIDECAR_SUFFIX)
+    os.close(descriptor)
+
+    try:
+        schema_profile = None
+        if filename.split('.')[-1].lower() == 'csv':
+            try:
+                schema_profile = _write_csv_sidecar(content, path)
+            except pa.ArrowException as e:
+                logger.warning(f"Could not convert {filename} in batches, reading it whole: {str(e)}")
+
+        if schema_profile is None:
+            dataset = read_dataset(filename, content)
+            schema_profile = build_schema_profile(dataset)
+            apply_schema_profile(dataset, schema_profile).to_parquet(path, index=False)
+
+        sha256, size = file_digest(path)
+    except BaseException:
+        os.remove(path)
+        raise
+
+    return SpooledUpload(path=path, sha256=sha256, size=size), schema_profile
+
+
+async def parse_dataset(filename: str,
+                        content: bytes,
+                        columns: Optional[List[str]] = None,
+                        schema_profile: Optional[dict] = None
+                        ) -> pd.DataFrame:
+
+    """
+    Parse the file content on the bounded parser pool so the event loop keeps serving other requests
+
+    Args:
+        filename (str): File name, used to detect the file type
+        content (bytes): Raw file content
+        columns (Optional[List[str]]): Columns to read, all columns if None
+        schema_profile (Optional[dict]): Schema profile recorded at upload, read with default dtypes if None
+
+    Returns:
+        pd.DataFrame: The parsed dataset
+    """
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_parser_pool, read_dataset, filename, content, columns, schema_profile)
+
+
+async def convert_to_sidecar(filename: str, content: Union[bytes, str]) -> Tuple[SpooledUpload, dict]:
+
+    """
+    Build the Parquet sidecar and the schema profile of an uploaded file on the parser pool
+
+    Args:
+        filename (str): File name, used to detect the file type
+        content (Union[bytes, str]): Raw file content or the path of a local file
+
+    Returns:
+        Tuple[SpooledUpload, dict]: Parquet file written to a temporary file, the caller removes the file,
+                                    and the schema profile of the file
+    """
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_parser_pool, build_sidecar, filename, content)
+
+
+def iter_dataset_chunks(filename: str,
+                        path: str,
+                        chunk_rows: int,
+                        schema_profile: Optional[dict] = None
+                        ) -> Iterator[pd.DataFrame]:
+
+    """
+    Read a local CSV or Parquet file in row chunks, without holding the whole dataset in memory
+
+    Args:
+        filename (str): File name, used to detect the file type
+        path (str): Path of the local file
+        chunk_rows (int): Rows per chunk
+        schema_profile (Optional[dict]): Schema profile recorded at upload, read with default dtypes if None
+
+    Yields:
+        pd.DataFrame: Consecutive row chunks of the file
+
+    Raises:
+        ValueError: If the file type cannot be read in chunks
+    """
+
+    file_extension = filename.split('.')[-1].lower()
+
+    if file_extension == 'parquet':
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+
+    elif file_extension == 'csv':
+        options = read_options(schema_profile)
+        if options:
+            # Every chunk would infer its own categories, the other profiled dtypes hold for any chunk
+            options["dtype"] = {name: dtype for name, dtype in options["dtype"].items() if dtype != "category"}
+
+        with pd.read_csv(path, chunksize=chunk_rows, **options) as reader:
+            for chunk in reader:
+                yield chunk
+
+    else:
+        raise ValueError("Only CSV and Parquet files can be read in chunks.")
+
+
+def iter_csv(dataset: pd.DataFrame, batch_rows: int = CSV_EXPORT_BATCH_ROWS) -> Iterator[bytes]:
+
+    """
+    Serialize a dataset to CSV in row batches, so the first bytes are ready before the whole file is
+
+    Args:
+        dataset (pd.DataFrame): Dataset to export
+        batch_rows (int): Rows serialized per chunk
+
+    Yields:
+        bytes: CSV chunks, the first one starting with the header
+    """
+
+    # The header is written even when the dataset has no rows
+    yield dataset.iloc[:0].to_csv(index=False).encode('utf-8')
+
+    for start in range(0, len(dataset), batch_rows):
+        yield dataset.iloc[start:start + batch_rows].to_csv(index=False, header=False).encode('utf-8')
+
+
+def json_columns(dataset: pd.DataFrame, large_number: float = 1e15) -> dict:
+
+    """
+    Convert the values of a dataset into JSON-compatible lists, one vectorized pass per column
+
+    Missing values become '', numbers become floats unless their magnitude exceeds large_number,
+    in which case they are sent as strings, and every other value is sent as a string.
+
+    Args:
+        dataset (pd.DataFrame): Rows to convert, callers slice the dataset first
+        large_number (float): Magnitude above which numbers are sent as strings
+
+    Returns:
+        dict: Column name -> list of converted values
+    """
+
+    converted = {}
+
+    for column_name, column in dataset.items():
+        missing = column.isna().to_numpy()
+
+        if (pd.api.types.is_numeric_dtype(column) or pd.api.types.is_bool_dtype(column)) \
+                and not pd.api.types.is_complex_dtype(column):
+            numbers = column.astype("float64").to_numpy(na_value=float("nan"))
+            values = numbers.astype(object)
+            large = ~missing & (abs(numbers) > large_number)
+            if large.any():
+                values[large] = column[large].astype(str).to_numpy()
+        else:
+            values = column.astype(str).to_numpy(dtype=object)
+
+        values[missing] = ''
+        converted[column_name] = values.tolist()
+
+    return converted
+
+
+def preview_records(dataset: pd.DataFrame, rows: int = 10) -> List[dict]:
+
+    """
+    Convert the first rows of a dataset into JSON-compatible records
+
+    Args:
+        dataset (pd.DataFrame): Dataset to preview
+        rows (int): Number of leading rows in the preview
+
+    Returns:
+        List[dict]: One record per previewed row
+    """
+
+    converted = json_columns(dataset.head(rows))
+
+    return [dict(zip(converted, record)) for record in zip(*converted.values())]
+
+
+def _accepted_encodings(accept_encoding: str) -> dict:
+
+    # Coding -> q-value of every entry of the header, an entry without a valid q-value has q=1
+    accepted = {}
+    for entry in accept_encoding.split(","):
+        coding, *parameters = [part.strip() for part in entry.split(";")]
+        quality = 1.0
+        for parameter in parameters:
+            name, _, value = parameter.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            accepted[coding.lower()] = quality
+
+    return accepted
+
+
+def choose_content_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+
+    """
+    Pick the compression of a streamed response from the client's Accept-Encoding header
+
+    The coding with the highest q-value wins, zstd before gzip on a tie. Codings with q=0 are refused,
+    "*" stands for the codings the header does not name.
+
+    Args:
+        accept_encoding (Optional[str]): Accept-Encoding request header
+
+    Returns:
+        Optional[str]: "zstd", "gzip" or None for an uncompressed response
+    """
+
+    if not accept_encoding:
+        return None
+
+    accepted = _accepted_encodings(accept_encoding)
+    supported = ["zstd", "gzip"] if zstandard is not None else ["gzip"]
+
+    qualities = {coding: accepted.get(coding, accepted.get("*", 0.0)) for coding in supported}
+    coding = max(supported, key=lambda coding: qualities[coding])
+
+    return coding if qualities[coding] > 0 else None
+
+
+def compress_chunks(chunks: Iterable[bytes], content_encoding: Optional[str]) -> Iterator[bytes]:
+
+    """
+    Compress a stream of chunks incrementally
+
+    Args:
+        chunks (Iterable[bytes]): Uncompressed chunks
+        content_encoding (Optional[str]): "zstd", "gzip" or None to pass the chunks through
+
+    Yields:
+        bytes: Compressed chunks
+    """
+
+    if content_encoding is None:
+        yield from chunks
+        return
+
+    if content_encoding == "zstd":
+        compressor = zstandard.ZstdCompressor().compressobj()
+    else:
+        compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+
+    yield compressor.flush()
@@ -0,0 +1,715 @@
+# dataset_versions.py - Code module to version edited datasets as an operation log over the uploaded file
+
+import os
+import json
+import uuid
+import asyncio
+import hashlib
+from io import BytesIO
+from datetime import datetime, timezone
+from typing import Optional, List, Tuple
+
+import pandas as pd
+from dotenv import load_dotenv
+from fastapi import HTTPException
+
+from Components.Logger import logger
+from Components.storage import storage
+from Components.dataset_cache import dataset_cache
+from Components.database import users_edited_dataframe_collection
+from Components.dataset_io import SIDECAR_SUFFIX
+from Components.transformer_store import dump_transformer, load_transformer, LIBRARY_VERSIONS
+from Components.data import get_edited_dataframe_details, fetch_and_read_github_file, delete_file_from_github
+
+load_dotenv()
+
+# A version at every N steps from the uploaded file is stored as a Parquet checkpoint
+DATASET_CHECKPOINT_INTERVAL = int(os.getenv("DATASET_CHECKPOINT_INTERVAL", "5"))
+
+# Content version of materialized datasets in the dataset cache, a version id never changes content
+MATERIALIZED = "materialized"
+
+# Attempts at moving the head or branching from a given version while other requests keep changing the log
+VERSION_LOG_RETRIES = 3
+
+
+def _record_filter(user_data: dict) -> dict:
+
+    return {"username": user_data['username'], "role": user_data['role'], "file": user_data['file']}
+
+
+def _cache_url(version_log: dict, version_id: int) -> str:
+
+    return f"versions://{version_log['username']}/{version_log['role']}/{version_log['file']}/{version_log['base_version']}/{version_id}"
+
+
+def step_fingerprint(parent_fingerprint: str, step: dict) -> str:
+
+    """
+    Fingerprint the content of the dataset a step produces from its parent dataset
+
+    Args:
+        parent_fingerprint (str): Fingerprint of the parent dataset
+        step (dict): Step configuration
+
+    Returns:
+        str: Hex digest identifying the dataset after the step
+    """
+
+    payload = json.dumps([parent_fingerprint, step], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def version_fingerprint(version_log: dict, version_id: int) -> str:
+
+    """
+    Fingerprint the content of a version, the same for every version reached by the same steps from the same upload
+
+    Args:
+        version_log (dict): Version log of the dataset
+        version_id (int): Version to fingerprint
+
+    Returns:
+        str: Hex digest identifying the dataset of the version
+    """
+
+    steps = []
+    entry = _find_version(version_log, version_id)
+
+    while entry["parent"] is not None:
+        steps.append(entry["step"])
+        entry = _find_version(version_log, entry["parent"])
+
+    fingerprint = hashlib.sha256(str(version_log["base_version"]).encode("utf-8")).hexdigest()
+    for step in reversed(steps):
+        fingerprint = step_fingerprint(fingerprint, step)
+
+    return fingerprint
+
+
+def changes_rows(step: dict) -> bool:
+
+    """
+    Check whether a step can add, remove or reorder rows, which starts a new train/test split
+
+    Args:
+        step (dict): Step configuration
+
+    Returns:
+        bool: True for DropMissingData and steps of unknown effect
+    """
+
+    if step["kind"] == "selection":
+        return False
+
+    return step["kind"] != "engineering" or step.get("featureSubTask") == "DropMissingData"
+
+
+def rows_fingerprint(version_log: dict, version_id: int) -> str:
+
+    """
+    Fingerprint the rows of a version, the fingerprint of the nearest version whose step changed the rows
+
+    Args:
+        version_log (dict): Version log of the dataset
+        version_id (int): Version to fingerprint
+
+    Returns:
+        str: Hex digest identifying the rows of the version
+    """
+
+    entry = _find_version(version_log, version_id)
+
+    while entry["parent"] is not None and not changes_rows(entry["step"]):
+        entry = _find_version(version_log, entry["parent"])
+
+    return version_fingerprint(version_log, entry["id"])
+
+
+def version_lineage(version_log: dict, version_id: int) -> List[Tuple[str, Optional[dict]]]:
+
+    """
+    Fingerprint a version and its ancestors together with the steps that produced them
+
+    Args:
+        version_log (dict): Version log of the dataset
+        version_id (int): Version to start from
+
+    Returns:
+        List[Tuple[str, Optional[dict]]]: Fingerprint and step of the version, then of its parent and so on up to
+                                          the uploaded dataset, whose step is None
+    """
+
+    steps = []
+    entry = _find_version(version_log, version_id)
+
+    while entry["parent"] is not None:
+        steps.append(entry["step"])
+        entry = _find_version(version_log, entry["parent"])
+
+    fingerprint = hashlib.sha256(str(version_log["base_version"]).encode("utf-8")).hexdigest()
+    lineage = [(fingerprint, None)]
+    for step in reversed(steps):
+        fingerprint = step_fingerprint(fingerprint, step)
+        lineage.append((fingerprint, step))
+
+    return lineage[::-1]
+
+
+def _version_entry(version_id: int,
+                   parent: Optional[int],
+                   depth: int,
+                   step: Optional[dict] = None,
+                   dropped_columns: Optional[List[str]] = None,
+                   checkpoint: Optional[dict] = None,
+                   fitted: Optional[dict] = None
+                   ) -> dict:
+
+    return {
+        "id": version_id,
+        "parent": parent,
+        "depth": depth,
+        "step": step,
+        "droppedColumns": dropped_columns,
+        "checkpoint": checkpoint,
+        "fitted": fitted,
+        "createdAt": datetime.now(timezone.utc)
+    }
+
+
+def _new_version_log(user_data: dict) -> dict:
+
+    return {
+        **_record_filter(user_data),
+        "base_version": user_data.get("file_version"),
+        "head": 0,
+        "next_id": 1,
+        "redo": [],
+        "versions": [_version_entry(0, None, 0)]
+    }
+
+
+def _find_version(version_log: dict, version_id: int) -> dict:
+
+    for entry in version_log["versions"]:
+        if entry["id"] == version_id:
+            return entry
+
+    raise HTTPException(status_code=404, detail=f"Dataset version {version_id} not found")
+
+
+def _update_version_log(version_log: dict, new_entries: List[dict], head: int, redo: List[int]) -> bool:
+
+    """
+    Append versions and set the head and redo stack of a stored version log, unless another request changed
+    its head or appended versions since it was read
+
+    The versions are pushed and the head, next id and redo stack set in one atomic update, filtered on the
+    head and next id of the copy that was read, so concurrent writers never overwrite each other's versions.
+
+    Args:
+        version_log (dict): Version log as it was read
+        new_entries (List[dict]): Versions to append, numbered from the log's next id
+        head (int): New head version
+        redo (List[int]): New redo stack
+
+    Returns:
+        bool: False if the stored log changed since it was read and nothing was written
+    """
+
+    update = {"$set": {"head": head, "next_id": version_log["next_id"] + len(new_entries), "redo": redo}}
+    if new_entries:
+        update["$push"] = {"versions": {"$each": new_entries}}
+
+    result = users_edited_dataframe_collection.update_one(
+        {**_record_filter(version_log), "head": version_log["head"], "next_id": version_log["next_id"]}, update)
+
+    return result.matched_count == 1
+
+
+def _reload_version_log(version_log: dict) -> dict:
+
+    """
+    Read the stored copy of a version log again after a conflicting write
+
+    Raises:
+        HTTPException: Conflict if the uploaded file was replaced in the meantime
+    """
+
+    stored_log = get_edited_dataframe_details(version_log['username'], version_log['role'], version_log['file'])
+
+    if not stored_log or stored_log.get("base_version") != version_log["base_version"]:
+        raise HTTPException(status_code=409, detail="The dataset was replaced while the request ran")
+
+    return stored_log
+
+
+async def _discard_version_log(version_log: dict):
+
+    """
+    Remove a version log and its checkpoints, e.g. after the uploaded file was replaced
+    """
+
+    logger.info(f"Discarding the version log of {version_log['file']} for {version_log['username']}")
+
+    fitted_files = set()
+    for entry in version_log.get("versions", []):
+        dataset_cache.invalidate(_cache_url(version_log, entry["id"]))
+        if entry.get("checkpoint"):
+            try:
+                await delete_file_from_github(entry["checkpoint"]["file"])
+            except HTTPException:
+                pass
+        if entry.get("fitted"):
+            fitted_files.add(entry["fitted"]["file"])
+
+    # Versions with the same fit share its file
+    for name in fitted_files:
+        try:
+            await delete_file_from_github(name)
+        except HTTPException:
+            pass
+
+    users_edited_dataframe_collection.delete_one(_record_filter(version_log))
+
+
+async def get_version_log(user_data: dict) -> dict:
+
+    """
+    Get the version log of the user's dataset, starting a new one when there is none or the file was re-uploaded
+
+    Args:
+        user_data (dict): User record
+
+    Returns:
+        dict: Version log with the head version, the redo stack and every version
+    """
+
+    version_log = get_edited_dataframe_details(user_data['username'], user_data['role'], user_data['file'])
+
+    if version_log and "versions" not in version_log:
+        # Records written before versioning point at a single edited CSV, kept as a checkpoint of version 1
+        legacy_log = _new_version_log(user_data)
+        legacy_log.update({"head": 1, "next_id": 2})
+        legacy_log["versions"].append(_version_entry(1, 0, 1, step={"kind": "legacy"},
+                                                     checkpoint={"file": version_log["edited_file"],
+                                                                 "url": version_log["edited_file_url"]}))
+        users_edited_dataframe_collection.replace_one(_record_filter(legacy_log), legacy_log, upsert=True)
+        return legacy_log
+
+    if version_log and version_log.get("base_version") != user_data.get("file_version"):
+        await _discard_version_log(version_log)
+        version_log = None
+
+    if version_log is None:
+        # Stored right away, so every later write is conditional on the head and next id it read.
+        # A log a concurrent request stored first is kept and read back
+        new_log = _new_version_log(user_data)
+        record_filter = _record_filter(user_data)
+        users_edited_dataframe_collection.update_one(
+            record_filter, {"$setOnInsert": {key: value for key, value in new_log.items() if key not in record_filter}},
+            upsert=True)
+        version_log = get_edited_dataframe_details(user_data['username'], user_data['role'], user_data['file'])
+
+    return version_log
+
+
+async def _load_fitted(entry: dict):
+
+    """
+    Load the transformer recorded with the step of a version
+
+    Args:
+        entry (dict): Version log entry
+
+    Returns:
+        The fitted transformer, None if the step recorded none or it cannot be loaded, the step is then refitted
+    """
+
+    fitted = entry.get("fitted")
+    if not fitted:
+        return None
+
+    if fitted["versions"] != LIBRARY_VERSIONS:
+        logger.warning(f"The transformer of version {entry['id']} was fitted with feature_engine/scikit-learn {fitted['versions']}, refitting it")
+        return None
+
+    try:
+        content, _ = await storage.get(fitted["url"])
+        if hashlib.sha256(content).hexdigest() != fitted["sha256"]:
+            raise ValueError("the stored file does not match its digest")
+        return await asyncio.to_thread(load_transformer, content)
+    except Exception as e:
+        logger.warning(f"Could not load the transformer of version {entry['id']}, refitting it: {str(e)}")
+        return None
+
+
+def _apply_step(dataset: pd.DataFrame,
+                entry: dict,
+                user_data: dict,
+                dataset_version: str,
+                rows_version: str,
+                fitted_transformer: Optional[object] = None
+                ) -> pd.DataFrame:
+
+    # Imported here because feature engineering and selection load their datasets through this module
+    from Components.feature_engineering import FeatureEngineering
+
+    step = entry["step"]
+
+    # Chunked runs are only stored as their output, which replaying in memory would not reproduce
+    if step["kind"] == "chunked":
+        raise ValueError(f"The output of chunked version {entry['id']} is missing")
+
+    # Selection steps replay their recorded outcome instead of refitting the selector
+    if step["kind"] == "selection":
+        return dataset.drop(columns=entry["droppedColumns"])
+
+    feature_engineering = FeatureEngineering(user_data, engineering_columns=step["columns"],
+                                             target_feature=step["targetFeature"],
+                                             featureengineeringTask=step["featureTask"],
+                                             featureengineeringSubTask=step["featureSubTask"],
+                                             dataset_version=dataset_version,
+                                             rows_version=rows_version,
+                                             fitted_transformer=fitted_transformer)
+    return feature_engineering.manager(dataset)
+
+
+async def materialize(user_data: dict, version_log: dict, version_id: int) -> pd.DataFrame:
+
+    """
+    Build the dataset of a version from the nearest cached ancestor, checkpoint or the uploaded file,
+    replaying the steps recorded after it with the transformers recorded with them
+
+    Args:
+        user_data (dict): User record
+        version_log (dict): Version log of the dataset
+        version_id (int): Version to materialize
+
+    Returns:
+        pd.DataFrame: Dataset of the version
+    """
+
+    logger.info(f"Materializing version {version_id} of {version_log['file']}")
+
+    pending = []
+    entry = _find_version(version_log, version_id)
+
+    while True:
+        dataset = dataset_cache.get(_cache_url(version_log, entry["id"]), MATERIALIZED)
+        if dataset is not None:
+            break
+
+        if entry["checkpoint"]:
+            dataset = await fetch_and_read_github_file(entry["checkpoint"]["file"], entry["checkpoint"]["url"])
+            break
+
+        if entry["parent"] is None:
+            dataset = await fetch_and_read_github_file(user_data["file"], user_data["file_url"],
+                                                       schema_profile=user_data.get("file_schema"))
+            break
+
+        pending.append(entry)
+        entry = _find_version(version_log, entry["parent"])
+
+    pending.reverse()
+    fitted_transformers = await asyncio.gather(*[_load_fitted(entry) for entry in pending])
+
+    for entry, fitted_transformer in zip(pending, fitted_transformers):
+        # Steps without a recorded transformer are refitted, reusing a fit of the parent version from the transformer store
+        parent_version = version_fingerprint(version_log, entry["parent"])
+        parent_rows = rows_fingerprint(version_log, entry["parent"])
+        dataset = await asyncio.to_thread(_apply_step, dataset, entry, user_data, parent_version, parent_rows,
+                                          fitted_transformer)
+
+    return dataset_cache.put(_cache_url(version_log, version_id), MATERIALIZED, dataset)
+
+
+async def load_current_dataset(user_data: dict) -> Tuple[pd.DataFrame, dict]:
+
+    """
+    Load the dataset at the head version of the user's version log
+
+    Args:
+        user_data (dict): User record
+
+    Returns:
+        Tuple[pd.DataFrame, dict]: Dataset at the head version and the version log
+    """
+
+    version_log = await get_version_log(user_data)
+    dataset = await materialize(user_data, version_log, version_log["head"])
+
+    return dataset, version_log
+
+
+def _checkpoint_name(user_data: dict, version_id: int) -> str:
+
+    # Requests racing for the same version id must not overwrite each other's checkpoint
+    return f"checkpoint_{user_data['file']}_user_{user_data['username']}_v{version_id}_{uuid.uuid4().hex[:8]}.parquet"
+
+
+async def _discard_checkpoints(entries: List[dict]):
+
+    # Checkpoints of versions a conflicting write never recorded
+    for entry in entries:
+        if entry["checkpoint"]:
+            try:
+                await delete_file_from_github(entry["checkpoint"]["file"])
+            except HTTPException:
+                pass
+
+
+async def _store_checkpoint(user_data: dict, version_id: int, dataset: pd.DataFrame) -> Optional[dict]:
+
+    name = _checkpoint_name(user_data, version_id)
+
+    def to_parquet():
+        buffer = BytesIO()
+        dataset.to_parquet(buffer, index=False)
+        return buffer.getvalue()
+
+    try:
+        upload_result = await storage.put(name, await asyncio.to_thread(to_parquet))
+    except Exception as e:
+        # Without a checkpoint the version is still rebuilt by replaying its steps
+        logger.warning(f"Could not store checkpoint {name}: {str(e)}")
+        return None
+
+    return {"file": name, "url": upload_result["download_url"]}
+
+
+async def _store_fitted(user_data: dict, transformer) -> Optional[dict]:
+
+    if transformer is None:
+        return None
+
+    # Named by content, a step fitted the same way again shares the file
+    content = await asyncio.to_thread(dump_transformer, transformer)
+    sha256 = hashlib.sha256(content).hexdigest()
+    name = f"transformer_{user_data['file']}_user_{user_data['username']}_{sha256[:16]}.joblib"
+
+    try:
+        upload_result = await storage.put(name, content)
+    except Exception as e:
+        # Without the transformer the step is refitted when it is replayed
+        logger.warning(f"Could not store transformer {name}: {str(e)}")
+        return None
+
+    return {"file": name, "url": upload_result["download_url"], "sha256": sha256, "versions": LIBRARY_VERSIONS}
+
+
+async def commit_steps(user_data: dict,
+                       version_log: dict,
+                       steps: List[Tuple[dict, pd.DataFrame, pd.DataFrame, Optional[object]]],
+                       parent_id: Optional[int] = None
+                       ) -> dict:
+
+    """
+    Append steps after the head version, or after a given version, one version per step, and move the head to the last one
+
+    The transformer a step fitted is stored with its version, replaying the step loads it instead of fitting again.
+
+    Args:
+        user_data (dict): User record
+        version_log (dict): Version log of the dataset, as read before the steps ran
+        steps (List[Tuple[dict, pd.DataFrame, pd.DataFrame, Optional[object]]]): Step configuration with the dataset
+                                                                                before and after the step and the
+                                                                                transformer it fitted, None if it fitted none
+        parent_id (Optional[int]): Version the steps ran on, the head if None. A given parent is branched from
+                                   even if other requests moved the head or added versions meanwhile
+
+    Returns:
+        dict: Updated version log
+
+    Raises:
+        HTTPException: Conflict if another request changed the head or added versions since the log was read
+    """
+
+    # Stored once, a retry on a reloaded log records the same files
+    fitted = await asyncio.gather(*[_store_fitted(user_data, transformer) for _, _, _, transformer in steps])
+
+    for attempt in range(VERSION_LOG_RETRIES):
+        parent = _find_version(version_log, version_log["head"] if parent_id is None else parent_id)
+        entries = []
+
+        for (step, dataset_before, dataset_after, _), step_fitted in zip(steps, fitted):
+            version_id = version_log["next_id"] + len(entries)
+            depth = parent["depth"] + 1
+
+            dropped_columns = None
+            if step["kind"] == "selection":
+                dropped_columns = [column for column in dataset_before.columns if column not in dataset_after.columns]
+
+            checkpoint = None
+            if DATASET_CHECKPOINT_INTERVAL > 0 and depth % DATASET_CHECKPOINT_INTERVAL == 0:
+                checkpoint = await _store_checkpoint(user_data, version_id, dataset_after)
+
+            entry = _version_entry(version_id, parent["id"], depth, step, dropped_columns, checkpoint, step_fitted)
+            entries.append(entry)
+            parent = entry
+
+        # A new step starts a new branch, the undone versions can no longer be redone
+        if _update_version_log(version_log, entries, parent["id"], []):
+            break
+
+        await _discard_checkpoints(entries)
+
+        # Steps computed from the head that was read would silently undo the other request's change
+        if parent_id is None or attempt == VERSION_LOG_RETRIES - 1:
+            raise HTTPException(status_code=409, detail="The dataset versions changed while the request ran, reload them and try again")
+
+        version_log = _reload_version_log(version_log)
+
+    version_log["versions"].extend(entries)
+    version_log["next_id"] += len(entries)
+    version_log["head"] = parent["id"]
+    version_log["redo"] = []
+
+    for entry, (_, _, dataset_after, _) in zip(entries, steps):
+        dataset_cache.put(_cache_url(version_log, entry["id"]), MATERIALIZED, dataset_after)
+
+    return version_log
+
+
+async def head_source(user_data: dict, version_log: dict) -> Optional[dict]:
+
+    """
+    Find the stored file holding the dataset of the head version, without loading it
+
+    Args:
+        user_data (dict): User record
+        version_log (dict): Version log of the dataset
+
+    Returns:
+        Optional[dict]: File name and download URL, the Parquet sidecar of the upload when it exists,
+        None when the head version only exists as steps to replay
+    """
+
+    head = _find_version(version_log, version_log["head"])
+
+    if head["checkpoint"]:
+        return head["checkpoint"]
+
+    if head["parent"] is not None:
+        return None
+
+    if await storage.exists(user_data["file"] + SIDECAR_SUFFIX):
+        return {"file": user_data["file"] + SIDECAR_SUFFIX, "url": user_data["file_url"] + SIDECAR_SUFFIX}
+
+    return {"file": user_data["file"], "url": user_data["file_url"]}
+
+
+async def commit_stored_step(user_data: dict,
+                             version_log: dict,
+                             step: dict,
+                             path: str,
+                             sha256: str,
+                             size: int
+                             ) -> dict:
+
+    """
+    Append a version after the head whose dataset was written to a local file, storing the file as its checkpoint
+
+    Args:
+        user_data (dict): User record
+        version_log (dict): Version log of the dataset
+        step (dict): Step configuration
+        path (str): Path of the local Parquet file with the dataset of the version
+        sha256 (str): SHA-256 digest of the file
+        size (int): Size of the file in bytes
+
+    Returns:
+        dict: Updated version log
+    """
+
+    parent = _find_version(version_log, version_log["head"])
+    version_id = version_log["next_id"]
+
+    name = _checkpoint_name(user_data, version_id)
+    upload_result = await storage.put_file(name, path, sha256, size)
+
+    entry = _version_entry(version_id, parent["id"], parent["depth"] + 1, step,
+                           checkpoint={"file": name, "url": upload_result["download_url"]})
+
+    if not _update_version_log(version_log, [entry], version_id, []):
+        await _discard_checkpoints([entry])
+        raise HTTPException(status_code=409, detail="The dataset versions changed while the request ran, reload them and try again")
+
+    version_log["versions"].append(entry)
+    version_log["next_id"] = version_id + 1
+    version_log["head"] = version_id
+    version_log["redo"] = []
+
+    return version_log
+
+
+def move_head(version_log: dict, action: str, version_id: Optional[int] = None) -> dict:
+
+    """
+    Move the head of a version log for undo, redo or checkout
+
+    Args:
+        version_log (dict): Version log of the dataset
+        action (str): "undo", "redo" or "checkout"
+        version_id (Optional[int]): Version to check out
+
+    Returns:
+        dict: Updated version log
+
+    Raises:
+        HTTPException: Bad request if there is nothing to undo or redo, not found if the version does not exist,
+                       conflict if other requests kept changing the log
+    """
+
+    for attempt in range(VERSION_LOG_RETRIES):
+        head = _find_version(version_log, version_log["head"])
+        redo = list(version_log["redo"])
+
+        if action == "undo":
+            if head["parent"] is None:
+                raise HTTPException(status_code=400, detail="Nothing to undo")
+            redo.append(head["id"])
+            new_head = head["parent"]
+
+        elif action == "redo":
+            if not redo:
+                raise HTTPException(status_code=400, detail="Nothing to redo")
+            new_head = redo.pop()
+
+        else:
+            new_head = _find_version(version_log, version_id)["id"]
+            redo = []
+
+        if _update_version_log(version_log, [], new_head, redo):
+            version_log["head"] = new_head
+            version_log["redo"] = redo
+            return version_log
+
+        # The action applies to the head as it is now, e.g. undo steps back from the latest version
+        version_log = _reload_version_log(version_log)
+
+    raise HTTPException(status_code=409, detail="The dataset versions changed while the request ran, reload them and try again")
+
+
+def version_summary(version_log: dict) -> dict:
+
+    """
+    Summarize the head of a version log for API responses
+
+    Args:
+        version_log (dict): Version log of the dataset
+
+    Returns:
+        dict: Head version, undo/redo availability and number of versions
+    """
+
+    head = _find_version(version_log, version_log["head"])
+
+    return {
+        "head": head["id"],
+        "depth": head["depth"],
+        "canUndo": head["parent"] is not None,
+        "canRedo": bool(version_log["redo"]),
+        "versionCount": len(version_log["versions"])
+    }
@@ -1,13 +1,14 @@
 # datasummarizer.py - Code module to handle data summarization functionality using LIDA
 
 import numpy as np
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from fastapi.responses import JSONResponse
 from fastapi import APIRouter, HTTPException, Depends
 
 from Components.Logger import logger
 from Components.auth import get_current_user
 from Components.summarizer import data_summarization
+from Components.sampling import SamplingPolicy
 
 
 router = APIRouter()
@@ -20,6 +21,7 @@ class DataSummarizationRequest(BaseModel):
 
     selected_method: str
     temperature: float
+    sampling: SamplingPolicy = Field(default_factory=SamplingPolicy, description="Rows to summarize, method 'full' for all rows")
 
 def sanitize_summary(data):
 
@@ -83,11 +85,11 @@ async def handle_data_control(request: DataSummarizationRequest,
         # Raise an exception if `selected_method` is not valid
             raise ValueError("Invalid selected method provided." , request.selected_method)
 
-        summary = await data_summarization(selected_method_label, request.temperature , user_details)
+        summary, sample_info = await data_summarization(selected_method_label, request.temperature , user_details, request.sampling)
 
         sanitized_summary = sanitize_summary(summary)
 
-        return JSONResponse(content={"summary": sanitized_summary})
+        return JSONResponse(content={"summary": sanitized_summary, "sample": sample_info})
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error in handling data summarization: {str(e)}")
\ No newline at end of file
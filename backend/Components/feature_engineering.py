@@ -1,6 +1,10 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
 import pandas as pd
 from fastapi import HTTPException
-from typing import Optional, List
+from typing import Optional, List, Tuple
 from sklearn.model_selection import train_test_split
 
 from feature_engine.imputation import (MeanMedianImputer,RandomSampleImputer, 
@@ -21,7 +25,108 @@ from feature_engine.scaling import MeanNormalizationScaler
 from feature_engine.datetime import DatetimeFeatures
 
 from Components.Logger import logger
-from Components.data import get_edited_dataframe_details, get_user_details, fetch_and_read_github_file
+from Components.data import get_user_details
+from Components.transformer_store import transformer_store, schema_fingerprint, TRANSFORMER_REUSE_SCOPE
+from Components.parallel_fit import fit_columns
+from Components.jobs import JobProgress, progress_scoring
+from Components.dataset_versions import load_current_dataset
+
+# Share of rows held out as the testing set, and the seed every operation splits with
+TEST_SIZE = 0.2
+SPLIT_SEED = 0
+
+# Train/test splits kept per worker, two position arrays each
+SPLIT_CACHE_ENTRIES = 8
+
+# Folds and default max_depth grid the decision tree discretiser searches per variable
+DECISION_TREE_CV = 3
+DECISION_TREE_DEPTHS = 4
+
+# Sub tasks the manager runs, per task
+ENGINEERING_SUB_TASKS = {
+    "Missing Data Imputation": ["MedianImputer", "MeanImputer", "RandomSampleImputer", "EndTailImputer",
+                                "AddMissingIndicator", "DropMissingData"],
+    "Categorical Encoding": ["OneHotEncoder", "OrdinalEncoder", "CountEncoder", "FrequencyEncoder", "MeanEncoder"],
+    "Discretisation": ["EqualFrequencyDiscretiser", "EqualWidthDiscretiser", "GeometricWidthDiscretiser",
+                       "DecisionTreeDiscretiser"],
+    "Outlier Capping or Removal": ["GaussianOutlierCapper", "IQROutlierCapper"],
+    "Feature Transformation": ["LogTransformer", "LogCpTransformer", "ReciprocalTransformer", "SquareRootTransformer",
+                               "BoxCoxTransformer", "YeoJohnsonTransformer"],
+    "Feature Scaling": ["MeanNormalizationScaler"],
+    "Datetime Feature Handling": ["DatetimeFeatures"]
+}
+
+
+class SplitIndexCache:
+
+    """
+    LRU cache of train/test row positions, keyed by rows version, target and seed
+    """
+
+    def __init__(self, max_entries: int):
+
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (rows_version, target, seed) -> (train_positions, test_positions)
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+
+        with self._lock:
+            positions = self._entries.get(key)
+            if positions is not None:
+                self._entries.move_to_end(key)
+            return positions
+
+    def put(self, key: tuple, positions: Tuple[np.ndarray, np.ndarray]):
+
+        with self._lock:
+            self._entries[key] = positions
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+split_index_cache = SplitIndexCache(max_entries=SPLIT_CACHE_ENTRIES)
+
+
+def _scatter_column(train_column: pd.Series,
+                    test_column: pd.Series,
+                    train_positions: np.ndarray,
+                    test_positions: np.ndarray,
+                    index: pd.Index
+                    ) -> pd.Series:
+
+    # Write the transformed training and testing rows of a column straight into their dataset positions
+    if isinstance(train_column.dtype, np.dtype) and train_column.dtype == test_column.dtype:
+        values = np.empty(len(index), dtype=train_column.dtype)
+        values[train_positions] = train_column.to_numpy()
+        values[test_positions] = test_column.to_numpy()
+        return pd.Series(values, index=index, name=train_column.name, copy=False)
+
+    # Extension or mismatching dtypes, e.g. strings or integers in one set and floats in the other
+    combined = pd.concat([train_column, test_column], ignore_index=True)
+    order = np.empty(len(index), dtype=np.intp)
+    order[np.concatenate([train_positions, test_positions])] = np.arange(len(index))
+    return pd.Series(combined.take(order).array, index=index, name=train_column.name, copy=False)
+
+
+def split_train_test(rows: int) -> Tuple[np.ndarray, np.ndarray]:
+
+    """
+    Split the row positions of a dataset into the training and testing positions every operation on those rows uses
+
+    Args:
+        rows (int): Number of rows of the dataset
+
+    Returns:
+        np.ndarray: Row positions of the training set, in the order the transformers are fitted on
+        np.ndarray: Row positions of the testing set
+    """
+
+    # Splitting the positions gives the same partition as splitting the frames, without copying them
+    dtype = np.int32 if rows < 2 ** 31 else np.int64
+    return train_test_split(np.arange(rows, dtype=dtype), test_size=TEST_SIZE, random_state=SPLIT_SEED)
+
 
 class FeatureEngineering:
 
@@ -34,7 +139,11 @@ class FeatureEngineering:
                  engineering_columns: Optional[List[str]] = None, 
                  target_feature: Optional[str] = None,
                  featureengineeringTask : Optional[str] = None, 
-                 featureengineeringSubTask : Optional[str] = None
+                 featureengineeringSubTask : Optional[str] = None,
+                 dataset_version: Optional[str] = None,
+                 rows_version: Optional[str] = None,
+                 progress: Optional[JobProgress] = None,
+                 fitted_transformer: Optional[object] = None
                  ):
 
         self.user_details = user_details
@@ -42,6 +151,14 @@ class FeatureEngineering:
         self.target_feature = target_feature
         self.featureengineeringTask = featureengineeringTask
         self.featureengineeringSubTask = featureengineeringSubTask
+        # Fingerprint of the dataset version the step runs on, fitted transformers are reused per version
+        self.dataset_version = dataset_version
+        # Fingerprint of the last version that changed the rows, the train/test split is shared until then
+        self.rows_version = rows_version
+        # Progress of the background job running the step, None when it runs in the request
+        self.progress = progress
+        # Transformer of the step, given to replay a recorded fit and set once the step fitted one
+        self.fitted_transformer = fitted_transformer
     
     async def handle_dataframe(self,
                                user_details: dict
@@ -55,6 +172,7 @@ class FeatureEngineering:
 
         Returns:
             pd.DataFrame: The dataframe
+            dict: The version log of the dataframe
 
         Raises:
             HTTPException: Error in handling dataframe during feature engineering
@@ -66,59 +184,177 @@ class FeatureEngineering:
 
             user_data = get_user_details(username=user_details['username'], role=user_details['role'])
 
-            users_edited_dataframe_info = get_edited_dataframe_details(user_details['username'], user_details['role'], user_data["file"])
+            # Load the head version of the user's edits, the uploaded dataset if there are none
+            dataset, version_log = await load_current_dataset(user_data)
 
-            # If the dataframe is already edited, then read the edited dataframe else read the original dataframe
-            if users_edited_dataframe_info:
-                dataset = await fetch_and_read_github_file(users_edited_dataframe_info["edited_file"], users_edited_dataframe_info["edited_file_url"])
-                need_to_update = False
-            else:
-                dataset = await fetch_and_read_github_file(user_data["file"], user_data["file_url"])
-                need_to_update = True
-
-            return dataset,need_to_update
+            return dataset, version_log
         
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error in handling dataframe during feature engineering: {str(e)}")
     
-    def train_test_split(self,
-                         dataset: pd.DataFrame, 
-                         independent_features: List[str], 
-                         target_feature: str
-                         ):
+    def split_positions(self, dataset: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
 
         """
-        Handle the training and testing of the dataset
+        Get the train/test split of the dataset as row positions, computed once per rows version, target and seed
 
         Args:
             dataset (pd.DataFrame): The dataframe
-            independent_features (List[str]): The independent features
-            target_feature (str): The target feature
 
         Returns:
-            pd.DataFrame: The training set  
-            pd.DataFrame: The testing set
-            pd.DataFrame: The training target
-            pd.DataFrame: The testing target
+            np.ndarray: Row positions of the training set
+            np.ndarray: Row positions of the testing set
 
         Raises:
             HTTPException: Error in splitting the dataset into training and testing sets
         """
 
-        logger.info(f"Entered in 'train_test_split' function")
+        logger.info(f"Entered in 'split_positions' function")
 
         try:
 
-            X = dataset[independent_features]
-            y = dataset[target_feature]
+            key = (self.rows_version, self.target_feature, SPLIT_SEED)
+
+            if self.rows_version is not None:
+                positions = split_index_cache.get(key)
+                if positions is not None and len(positions[0]) + len(positions[1]) == len(dataset):
+                    return positions
 
-            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=0)
+            train_positions, test_positions = split_train_test(len(dataset))
 
-            return X_train, X_test, y_train, y_test
+            # Cached arrays are shared by every operation on the same rows
+            train_positions.flags.writeable = False
+            test_positions.flags.writeable = False
+
+            if self.rows_version is not None:
+                split_index_cache.put(key, (train_positions, test_positions))
+
+            return train_positions, test_positions
         
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error in splitting the dataset into training and testing sets: {str(e)}")
-    
+
+    def fit_transformer(self,
+                        transformer,
+                        X_train: pd.DataFrame,
+                        y_train: Optional[pd.Series] = None
+                        ):
+
+        """
+        Fit a transformer on the training set, or load the same transformer fitted earlier on the same data
+
+        A step replayed from the version log uses the transformer recorded with it instead of fitting.
+        Wide training sets are fitted on column partitions across the process pool, see parallel_fit.fit_columns.
+
+        Args:
+            transformer: Unfitted feature_engine transformer
+            X_train (pd.DataFrame): The training set
+            y_train (Optional[pd.Series]): The training target of supervised transformers
+
+        Returns:
+            The fitted transformer
+        """
+
+        logger.info(f"Entered in 'fit_transformer' function")
+
+        if type(self.fitted_transformer) is type(transformer):
+            logger.info(f"Replaying the recorded fit of {type(transformer).__name__}")
+            return self.fitted_transformer
+
+        if TRANSFORMER_REUSE_SCOPE == "schema":
+            dataset_key = schema_fingerprint(X_train)
+        else:
+            dataset_key = self.dataset_version
+
+        if dataset_key is None:
+            return fit_columns(transformer, X_train, y_train)
+
+        target = self.target_feature if y_train is not None else None
+        key = transformer_store.key(dataset_key, transformer, X_train.columns.tolist(), target)
+
+        fitted_transformer = transformer_store.get(key)
+        if fitted_transformer is not None:
+            logger.info(f"Reusing fitted {type(transformer).__name__} {key}")
+            return fitted_transformer
+
+        transformer = fit_columns(transformer, X_train, y_train)
+        transformer_store.put(key, transformer)
+
+        return transformer
+
+    def apply_transformer(self,
+                          transformer,
+                          dataset: pd.DataFrame,
+                          independent_features: List[str],
+                          supervised: bool = False,
+                          as_object: bool = False
+                          ) -> pd.DataFrame:
+
+        """
+        Fit a transformer on the training set, transform both sets and write the transformed columns back into the dataset
+
+        Only the transformed features are split, the target only for supervised transformers.
+        Columns keep their position, columns the transformer replaces (e.g. one hot encoded ones) are dropped
+        and the new columns are appended. The other columns are shared with the input dataset, not copied.
+
+        Args:
+            transformer: Unfitted feature_engine transformer
+            dataset (pd.DataFrame): The dataframe
+            independent_features (List[str]): The transformed features
+            supervised (bool): Fit the transformer with the training target
+            as_object (bool): Convert the features to object type first, as the categorical encoders expect
+
+        Returns:
+            pd.DataFrame: The edited dataframe
+        """
+
+        logger.info(f"Entered in 'apply_transformer' function")
+
+        train_positions, test_positions = self.split_positions(dataset)
+
+        features = dataset[independent_features]
+        X_train = features.take(train_positions)
+        X_test = features.take(test_positions)
+        y_train = dataset[self.target_feature].take(train_positions) if supervised else None
+
+        if as_object:
+            X_train = X_train.astype({feature: object for feature in independent_features})
+            X_test = X_test.astype({feature: object for feature in independent_features})
+
+        transformer = self.fit_transformer(transformer, X_train, y_train)
+        self.fitted_transformer = transformer
+        X_train = transformer.transform(X_train)
+        X_test = transformer.transform(X_test)
+
+        # A shallow copy shares the untouched columns, assigning a column only replaces that column
+        edited_dataset = dataset.copy(deep=False)
+
+        for column in X_train.columns:
+            edited_dataset[column] = _scatter_column(X_train[column], X_test[column],
+                                                     train_positions, test_positions, dataset.index)
+
+        replaced_columns = [feature for feature in independent_features if feature not in X_train.columns]
+        if replaced_columns:
+            edited_dataset = edited_dataset.drop(columns=replaced_columns)
+
+        return edited_dataset
+
+    def expected_folds(self, dataset: pd.DataFrame) -> Optional[int]:
+
+        """
+        Get the number of cross-validation folds the operation scores, the progress total of a background job
+
+        Args:
+            dataset (pd.DataFrame): The dataframe
+
+        Returns:
+            Optional[int]: Number of scored folds, None if the operation does not cross-validate
+        """
+
+        if self.featureengineeringSubTask == "DecisionTreeDiscretiser":
+            # The search of every variable, then the score of its best tree
+            return len(self.engineering_columns) * (DECISION_TREE_DEPTHS * DECISION_TREE_CV + 1)
+
+        return None
 
     def manager(self,dataset: pd.DataFrame):
 
@@ -140,38 +376,39 @@ class FeatureEngineering:
         try:
 
             independent_features = self.engineering_columns
-            target_feature = self.target_feature
             task = self.featureengineeringTask
             sub_task = self.featureengineeringSubTask
 
-            X_train, X_test, y_train, y_test = self.train_test_split(dataset, independent_features, target_feature)
+            if sub_task not in ENGINEERING_SUB_TASKS.get(task, []):
+                raise HTTPException(status_code=400, detail="Invalid task or sub task")
 
+            # Operations that fit split the dataset themselves, DropMissingData and DatetimeFeatures never do
             if task == "Missing Data Imputation":
 
                 if sub_task == "MedianImputer":
                     
-                    edited_dataset = self.median_imputer(X_train, X_test, dataset, independent_features)
+                    edited_dataset = self.median_imputer(dataset, independent_features)
                     return edited_dataset
                 
                 elif sub_task == "MeanImputer":
 
-                    edited_dataset = self.mean_imputer(X_train, X_test, dataset, independent_features)
+                    edited_dataset = self.mean_imputer(dataset, independent_features)
                     return edited_dataset
 
                 elif sub_task == "RandomSampleImputer":
                     
-                    edited_dataset = self.random_sample_imputer(X_train, X_test, dataset, independent_features)
+                    edited_dataset = self.random_sample_imputer(dataset, independent_features)
                     return edited_dataset
                 
                 elif sub_task == "EndTailImputer":
 
-                    edited_dataset = self.end_tail_imputer(X_train, X_test, dataset, independent_features)
+                    edited_dataset = self.end_tail_imputer(dataset, independent_features)
 
                     return edited_dataset
                 
                 elif sub_task == "AddMissingIndicator":
 
-                    edited_dataset = self.categorical_imputer(X_train, X_test, dataset, independent_features)
+                    edited_dataset = self.categorical_imputer(dataset, independent_features)
                     return edited_dataset
                 
                 elif sub_task == "DropMissingData":
@@ -183,49 +420,49 @@ class FeatureEngineering:
                 
                 if sub_task == "OneHotEncoder":
                     
-                    edited_dataset = self.one_hot_encoder(X_train, X_test, dataset, independent_features)
+                    edited_dataset = self.one_hot_encoder(dataset, independent_features)
                     return edited_dataset
                 
                 elif sub_task == "OrdinalEncoder":
                     
-                    edited_dataset = self.ordinal_encoder(X_train, X_test, dataset, independent_features)
+                    edited_dataset = self.ordinal_encoder(dataset, independent_features)
                     return edited_dataset
                 
                 elif sub_task == "CountEncoder":
                     
-                    edited_dataset = self.count_encoder(X_train, X_test, dataset, independent_features)
+                    edited_dataset = self.count_encoder(dataset, independent_features)
                     return edited_dataset
                 
                 elif sub_task == "FrequencyEncoder":
                     
-                    edited_dataset = self.frequency_encoder(X_train, X_test, dataset, independent_features)
+                    edited_dataset = self.frequency_encoder(dataset, independent_features)
                     return edited_dataset
                 
                 elif sub_task == "MeanEncoder":
                     
-                    edited_dataset = self.mean_encoder(X_train, X_test, y_train, dataset, independent_features)
+                    edited_dataset = self.mean_encoder(dataset, independent_features)
                     return edited_dataset
             
             elif task == "Discretisation":
 
                 if sub_task == "EqualFrequencyDiscretiser":
                     
-                    edited_dataset = self.equal_frequency_discretiser(X_train, X_test, dataset, independent_features)
+                    edited_dataset = self.equal_frequency_discretiser(dataset, independent_features)
                     return edited_dataset
                 
                 elif sub_task == "EqualWidthDiscretiser":
                     
-                    edited_dataset = self.equal_width_discretiser(X_train, X_test, dataset, independent_features)
+                    edited_dataset = self.equal_width_discretiser(dataset, independent_features)
                     return edited_dataset
                 
                 elif sub_task == "GeometricWidthDiscretiser":
                     
-                    edited_dataset = self.geometric_width_discretiser(X_train, X_test, dataset, independent_features)
+                    edited_dataset = self.geometric_width_discretiser(dataset, independent_features)
                     return edited_dataset
                 
                 elif sub_task == "DecisionTreeDiscretiser":
                     
-                    edited_dataset = self.decision_tree_discretiser(X_train, X_test, y_train, dataset, independent_features)
+                    edited_dataset = self.decision_tree_discretiser(dataset, independent_features)
                     return edited_dataset
 
             
@@ -233,51 +470,51 @@ class FeatureEngineering:
 
                 if sub_task == "GaussianOutlierCapper":
                     
-                    edited_dataset = self.gaussian_outlier_capping(X_train, X_test, dataset, independent_features)
+                    edited_dataset = self.gaussian_outlier_capping(dataset, independent_features)
                     return edited_dataset
                 
                 elif sub_task == "IQROutlierCapper":
                     
-                    edited_dataset = self.iqr_outlier_capping(X_train, X_test, dataset, independent_features)
+                    edited_dataset = self.iqr_outlier_capping(dataset, independent_features)
                     return edited_dataset
                 
             elif task == "Feature Transformation":
 
                 if sub_task == "LogTransformer":
                     
-                    edited_dataset = self.log_transformer(X_train, X_test, dataset, independent_features)
+                    edited_dataset = self.log_transformer(dataset, independent_features)
                     return edited_dataset
                 
                 elif sub_task == "LogCpTransformer":
                     
-                    edited_dataset = self.log_cp_transformer(X_train, X_test, dataset, independent_features)
+                    edited_dataset = self.log_cp_transformer(dataset, independent_features)
                     return edited_dataset
                 
                 elif sub_task == "ReciprocalTransformer":
 
-                    edited_dataset = self.reciprocal_transformer(X_train, X_test, dataset, independent_features)
+                    edited_dataset = self.reciprocal_transformer(dataset, independent_features)
                     return edited_dataset
                 
                 elif sub_task == "SquareRootTransformer":
                     
-                    edited_dataset = self.square_root_transformer(X_train, X_test, dataset, independent_features)
+                    edited_dataset = self.square_root_transformer(dataset, independent_features)
                     return edited_dataset
                 
                 elif sub_task == "BoxCoxTransformer":
                     
-                    edited_dataset = self.box_cox_transformer(X_train, X_test, dataset, independent_features)
+                    edited_dataset = self.box_cox_transformer(dataset, independent_features)
                     return edited_dataset
                 
                 elif sub_task == "YeoJohnsonTransformer":
                     
-                    edited_dataset = self.yeo_johnson_transformer(X_train, X_test, dataset, independent_features)
+                    edited_dataset = self.yeo_johnson_transformer(dataset, independent_features)
                     return edited_dataset
             
             elif task == "Feature Scaling":
 
                 if sub_task == "MeanNormalizationScaler":
                     
-                    edited_dataset = self.mean_normalization_scaler(X_train, X_test, dataset, independent_features)
+                    edited_dataset = self.mean_normalization_scaler(dataset, independent_features)
                     return edited_dataset
             
             elif task == "Datetime Feature Handling":
@@ -288,13 +525,14 @@ class FeatureEngineering:
                     return edited_dataset
             else:
                 raise HTTPException(status_code=400, detail="Invalid task or sub task")
-        
+
+        except HTTPException as http_exc:
+            raise http_exc
+
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error in manager function during feature engineering: {str(e)}")
     
     def median_imputer(self, 
-                       X_train: pd.DataFrame, 
-                       X_test: pd.DataFrame, 
                        dataset: pd.DataFrame, 
                        independent_features: List[str]
                        ):
@@ -306,30 +544,11 @@ class FeatureEngineering:
 
         try:
 
-            # Store original index and column order
-            original_index = dataset.index
-            original_columns = dataset.columns.tolist()
-            
-            # Create a copy of dataset without the columns to be imputed
-            remaining_cols = [col for col in dataset.columns if col not in independent_features]
-            dataset_remaining = dataset[remaining_cols].copy()
-
             imputer = MeanMedianImputer(imputation_method="median", 
                                         variables=independent_features
                                         )
 
-            X_train = imputer.fit_transform(X_train)
-            X_test = imputer.transform(X_test)
-
-            # Concatenate X_train and X_test vertically and reindex to match original order
-            combined_X = pd.concat([X_train, X_test], axis=0)
-            combined_X = combined_X.reindex(original_index)
-
-            # Concatenate the combined_X with the remaining columns
-            edited_dataset = pd.concat([combined_X, dataset_remaining], axis=1)
-            
-            # Reorder columns to match original order
-            edited_dataset = edited_dataset[original_columns]
+            edited_dataset = self.apply_transformer(imputer, dataset, independent_features)
 
             return edited_dataset
         
@@ -337,8 +556,6 @@ class FeatureEngineering:
             raise HTTPException(status_code=500, detail=f"Error in median_imputer function during feature engineering: {str(e)}")
     
     def mean_imputer(self, 
-                     X_train: pd.DataFrame, 
-                     X_test: pd.DataFrame, 
                      dataset: pd.DataFrame, 
                      independent_features: List[str]
                      ):
@@ -351,30 +568,11 @@ class FeatureEngineering:
 
         try:
 
-            # Store original index and column order
-            original_index = dataset.index
-            original_columns = dataset.columns.tolist()
-            
-            # Create a copy of dataset without the columns to be imputed
-            remaining_cols = [col for col in dataset.columns if col not in independent_features]
-            dataset_remaining = dataset[remaining_cols].copy()
-
             imputer = MeanMedianImputer(imputation_method="mean", 
                                         variables=independent_features
                                         )
 
-            X_train = imputer.fit_transform(X_train)
-            X_test = imputer.transform(X_test)
-
-            # Concatenate X_train and X_test vertically and reindex to match original order
-            combined_X = pd.concat([X_train, X_test], axis=0)
-            combined_X = combined_X.reindex(original_index)
-
-            # Concatenate the combined_X with the remaining columns
-            edited_dataset = pd.concat([combined_X, dataset_remaining], axis=1)
-            
-            # Reorder columns to match original order
-            edited_dataset = edited_dataset[original_columns]
+            edited_dataset = self.apply_transformer(imputer, dataset, independent_features)
 
             return edited_dataset
         
@@ -382,8 +580,6 @@ class FeatureEngineering:
             raise HTTPException(status_code=500, detail=f"Error in mean_imputer function during feature engineering: {str(e)}")
 
     def random_sample_imputer(self, 
-                              X_train: pd.DataFrame, 
-                              X_test: pd.DataFrame, 
                               dataset: pd.DataFrame, 
                               independent_features: List[str]
                               ):
@@ -396,31 +592,12 @@ class FeatureEngineering:
 
         try:
 
-            # Store original index and column order
-            original_index = dataset.index
-            original_columns = dataset.columns.tolist()
-            
-            # Create a copy of dataset without the columns to be imputed
-            remaining_cols = [col for col in dataset.columns if col not in independent_features]
-            dataset_remaining = dataset[remaining_cols].copy()
-
             imputer = RandomSampleImputer(variables=independent_features,
                                           random_state=10,
                                           seed="general"
                                           )
 
-            X_train = imputer.fit_transform(X_train)
-            X_test = imputer.transform(X_test)
-
-            # Concatenate X_train and X_test vertically and reindex to match original order
-            combined_X = pd.concat([X_train, X_test], axis=0)
-            combined_X = combined_X.reindex(original_index)
-
-            # Concatenate the combined_X with the remaining columns
-            edited_dataset = pd.concat([combined_X, dataset_remaining], axis=1)
-            
-            # Reorder columns to match original order
-            edited_dataset = edited_dataset[original_columns]
+            edited_dataset = self.apply_transformer(imputer, dataset, independent_features)
 
             return edited_dataset
         
@@ -428,8 +605,6 @@ class FeatureEngineering:
             raise HTTPException(status_code=500, detail=f"Error in random_sample_imputer function during feature engineering: {str(e)}")
     
     def end_tail_imputer(self, 
-                         X_train: pd.DataFrame, 
-                         X_test: pd.DataFrame, 
                          dataset: pd.DataFrame, 
                          independent_features: List[str]
                          ):
@@ -442,30 +617,11 @@ class FeatureEngineering:
 
         try:
 
-            # Store original index and column order
-            original_index = dataset.index
-            original_columns = dataset.columns.tolist()
-            
-            # Create a copy of dataset without the columns to be imputed
-            remaining_cols = [col for col in dataset.columns if col not in independent_features]
-            dataset_remaining = dataset[remaining_cols].copy()
-
             imputer = EndTailImputer(variables=independent_features,
                                      fold=3,tail="right",
                                      imputation_method="gaussian")
 
-            X_train = imputer.fit_transform(X_train)
-            X_test = imputer.transform(X_test)
-
-            # Concatenate X_train and X_test vertically and reindex to match original order
-            combined_X = pd.concat([X_train, X_test], axis=0)
-            combined_X = combined_X.reindex(original_index)
-
-            # Concatenate the combined_X with the remaining columns
-            edited_dataset = pd.concat([combined_X, dataset_remaining], axis=1)
-            
-            # Reorder columns to match original order
-            edited_dataset = edited_dataset[original_columns]
+            edited_dataset = self.apply_transformer(imputer, dataset, independent_features)
 
             return edited_dataset
         
@@ -473,8 +629,6 @@ class FeatureEngineering:
             raise HTTPException(status_code=500, detail=f"Error in end_tail_imputer function during feature engineering: {str(e)}")
     
     def categorical_imputer(self, 
-                            X_train: pd.DataFrame, 
-                            X_test: pd.DataFrame, 
                             dataset: pd.DataFrame, 
                             independent_features: List[str]
                             ):
@@ -487,30 +641,11 @@ class FeatureEngineering:
 
         try:
 
-            # Store original index and column order
-            original_index = dataset.index
-            original_columns = dataset.columns.tolist()
-            
-            # Create a copy of dataset without the columns to be imputed
-            remaining_cols = [col for col in dataset.columns if col not in independent_features]
-            dataset_remaining = dataset[remaining_cols].copy()
-
             imputer = CategoricalImputer(variables=independent_features,
                                          imputation_method="missing"
                                          )
 
-            X_train = imputer.fit_transform(X_train)
-            X_test = imputer.transform(X_test)
-
-            # Concatenate X_train and X_test vertically and reindex to match original order
-            combined_X = pd.concat([X_train, X_test], axis=0)
-            combined_X = combined_X.reindex(original_index)
-
-            # Concatenate the combined_X with the remaining columns
-            edited_dataset = pd.concat([combined_X, dataset_remaining], axis=1)
-            
-            # Reorder columns to match original order
-            edited_dataset = edited_dataset[original_columns]
+            edited_dataset = self.apply_transformer(imputer, dataset, independent_features)
 
             return edited_dataset
         
@@ -538,8 +673,6 @@ class FeatureEngineering:
             raise HTTPException(status_code=500, detail=f"Error in drop_missing_data function during feature engineering: {str(e)}")
 
     def one_hot_encoder(self, 
-                        X_train: pd.DataFrame, 
-                        X_test: pd.DataFrame, 
                         dataset: pd.DataFrame, 
                         independent_features: List[str]
                         ):
@@ -552,31 +685,12 @@ class FeatureEngineering:
 
         try:
 
-            # Store original index
-            original_index = dataset.index
-
-            # Convert the independent features to object type
-            X_train[independent_features] = X_train[independent_features].astype(object)
-            X_test[independent_features] = X_test[independent_features].astype(object)
-
-            # Create a copy of dataset without the columns to be imputed
-            remaining_cols = [col for col in dataset.columns if col not in independent_features]
-            dataset_remaining = dataset[remaining_cols].copy()
-
             encoder = OneHotEncoder(variables=independent_features,
                                     top_categories=None,
                                     drop_last=False
                                     )
 
-            X_train = encoder.fit_transform(X_train)
-            X_test = encoder.transform(X_test)
-
-            # Concatenate X_train and X_test vertically and reindex to match original order
-            combined_X = pd.concat([X_train, X_test], axis=0)
-            combined_X = combined_X.reindex(original_index)
-
-            # Concatenate the combined_X with the remaining columns
-            edited_dataset = pd.concat([combined_X, dataset_remaining], axis=1)
+            edited_dataset = self.apply_transformer(encoder, dataset, independent_features, as_object=True)
 
             return edited_dataset
         
@@ -584,8 +698,6 @@ class FeatureEngineering:
             raise HTTPException(status_code=500, detail=f"Error in one_hot_encoder function during feature engineering: {str(e)}")
     
     def ordinal_encoder(self, 
-                        X_train: pd.DataFrame, 
-                        X_test: pd.DataFrame, 
                         dataset: pd.DataFrame, 
                         independent_features: List[str]
                         ):
@@ -598,30 +710,11 @@ class FeatureEngineering:
 
         try:
 
-            # Store original index
-            original_index = dataset.index
-
-            # Convert the independent features to object type
-            X_train[independent_features] = X_train[independent_features].astype(object)
-            X_test[independent_features] = X_test[independent_features].astype(object)
-
-            # Create a copy of dataset without the columns to be imputed
-            remaining_cols = [col for col in dataset.columns if col not in independent_features]
-            dataset_remaining = dataset[remaining_cols].copy()
-
             encoder = OrdinalEncoder(variables=independent_features,
                                      encoding_method="arbitrary"
                                      )
 
-            X_train = encoder.fit_transform(X_train)
-            X_test = encoder.transform(X_test)
-
-            # Concatenate X_train and X_test vertically and reindex to match original order
-            combined_X = pd.concat([X_train, X_test], axis=0)
-            combined_X = combined_X.reindex(original_index)
-
-            # Concatenate the combined_X with the remaining columns
-            edited_dataset = pd.concat([combined_X, dataset_remaining], axis=1)
+            edited_dataset = self.apply_transformer(encoder, dataset, independent_features, as_object=True)
 
             return edited_dataset
         
@@ -629,8 +722,6 @@ class FeatureEngineering:
             raise HTTPException(status_code=500, detail=f"Error in ordinal_encoder function during feature engineering: {str(e)}")
     
     def count_encoder(self, 
-                       X_train: pd.DataFrame, 
-                       X_test: pd.DataFrame, 
                        dataset: pd.DataFrame, 
                        independent_features: List[str]
                        ):
@@ -643,30 +734,11 @@ class FeatureEngineering:
 
         try:
 
-            # Store original index
-            original_index = dataset.index
-
-            # Convert the independent features to object type
-            X_train[independent_features] = X_train[independent_features].astype(object)
-            X_test[independent_features] = X_test[independent_features].astype(object)
-
-            # Create a copy of dataset without the columns to be imputed
-            remaining_cols = [col for col in dataset.columns if col not in independent_features]
-            dataset_remaining = dataset[remaining_cols].copy()
-
             encoder = CountFrequencyEncoder(variables=independent_features,
                                             encoding_method="count"
                                             )
 
-            X_train = encoder.fit_transform(X_train)
-            X_test = encoder.transform(X_test)
-
-            # Concatenate X_train and X_test vertically and reindex to match original order
-            combined_X = pd.concat([X_train, X_test], axis=0)
-            combined_X = combined_X.reindex(original_index)
-
-            # Concatenate the combined_X with the remaining columns
-            edited_dataset = pd.concat([combined_X, dataset_remaining], axis=1)
+            edited_dataset = self.apply_transformer(encoder, dataset, independent_features, as_object=True)
 
             return edited_dataset
         
@@ -674,8 +746,6 @@ class FeatureEngineering:
             raise HTTPException(status_code=500, detail=f"Error in count_encoder function during feature engineering: {str(e)}")
     
     def frequency_encoder(self, 
-                          X_train: pd.DataFrame, 
-                          X_test: pd.DataFrame, 
                           dataset: pd.DataFrame, 
                           independent_features: List[str]
                           ):
@@ -688,30 +758,11 @@ class FeatureEngineering:
 
         try:
 
-            # Store original index
-            original_index = dataset.index
-
-            # Convert the independent features to object type
-            X_train[independent_features] = X_train[independent_features].astype(object)
-            X_test[independent_features] = X_test[independent_features].astype(object)
-
-            # Create a copy of dataset without the columns to be imputed
-            remaining_cols = [col for col in dataset.columns if col not in independent_features]
-            dataset_remaining = dataset[remaining_cols].copy()
-
             encoder = CountFrequencyEncoder(variables=independent_features,
                                             encoding_method="frequency"
                                             )
 
-            X_train = encoder.fit_transform(X_train)
-            X_test = encoder.transform(X_test)
-
-            # Concatenate X_train and X_test vertically and reindex to match original order
-            combined_X = pd.concat([X_train, X_test], axis=0)
-            combined_X = combined_X.reindex(original_index)
-
-            # Concatenate the combined_X with the remaining columns
-            edited_dataset = pd.concat([combined_X, dataset_remaining], axis=1)
+            edited_dataset = self.apply_transformer(encoder, dataset, independent_features, as_object=True)
 
             return edited_dataset
         
@@ -719,9 +770,6 @@ class FeatureEngineering:
             raise HTTPException(status_code=500, detail=f"Error in frequency_encoder function during feature engineering: {str(e)}")
     
     def mean_encoder(self, 
-                     X_train: pd.DataFrame, 
-                     X_test: pd.DataFrame, 
-                     y_train: pd.DataFrame, 
                      dataset: pd.DataFrame, 
                      independent_features: List[str]
                      ):
@@ -734,29 +782,9 @@ class FeatureEngineering:
 
         try:
 
-            # Store original index
-            original_index = dataset.index
-
-            # Convert the independent features to object type
-            X_train[independent_features] = X_train[independent_features].astype(object)
-            X_test[independent_features] = X_test[independent_features].astype(object)
-
-            # Create a copy of dataset without the columns to be imputed
-            remaining_cols = [col for col in dataset.columns if col not in independent_features]
-            dataset_remaining = dataset[remaining_cols].copy()
-
             encoder = MeanEncoder(variables=independent_features)
 
-            encoder.fit(X_train,y_train)
-            X_train = encoder.transform(X_train)
-            X_test = encoder.transform(X_test)
-
-            # Concatenate X_train and X_test vertically and reindex to match original order
-            combined_X = pd.concat([X_train, X_test], axis=0)
-            combined_X = combined_X.reindex(original_index)
-
-            # Concatenate the combined_X with the remaining columns
-            edited_dataset = pd.concat([combined_X, dataset_remaining], axis=1)
+            edited_dataset = self.apply_transformer(encoder, dataset, independent_features, supervised=True, as_object=True)
 
             return edited_dataset
         
@@ -764,8 +792,6 @@ class FeatureEngineering:
             raise HTTPException(status_code=500, detail=f"Error in mean_encoder function during feature engineering: {str(e)}")
     
     def equal_frequency_discretiser(self, 
-                                     X_train: pd.DataFrame, 
-                                     X_test: pd.DataFrame, 
                                      dataset: pd.DataFrame, 
                                      independent_features: List[str]
                                      ):
@@ -778,30 +804,11 @@ class FeatureEngineering:
 
         try:
 
-            # Store original index and column order
-            original_index = dataset.index
-            original_columns = dataset.columns.tolist()
-
-            # Create a copy of dataset without the columns to be imputed
-            remaining_cols = [col for col in dataset.columns if col not in independent_features]
-            dataset_remaining = dataset[remaining_cols].copy()
-
             discretiser =   EqualFrequencyDiscretiser(variables=independent_features, 
                                                       q=10
                                                       )
 
-            X_train = discretiser.fit_transform(X_train)
-            X_test = discretiser.transform(X_test)
-
-            # Concatenate X_train and X_test vertically and reindex to match original order
-            combined_X = pd.concat([X_train, X_test], axis=0)
-            combined_X = combined_X.reindex(original_index)
-
-            # Concatenate the combined_X with the remaining columns
-            edited_dataset = pd.concat([combined_X, dataset_remaining], axis=1)
-
-            # Reorder columns to match original order
-            edited_dataset = edited_dataset[original_columns]
+            edited_dataset = self.apply_transformer(discretiser, dataset, independent_features)
 
             return edited_dataset
         
@@ -809,8 +816,6 @@ class FeatureEngineering:
             raise HTTPException(status_code=500, detail=f"Error in equal_frequency_discretiser function during feature engineering: {str(e)}")
     
     def equal_width_discretiser(self, 
-                                 X_train: pd.DataFrame, 
-                                 X_test: pd.DataFrame, 
                                  dataset: pd.DataFrame, 
                                  independent_features: List[str]
                                  ):
@@ -823,30 +828,11 @@ class FeatureEngineering:
 
         try:
 
-            # Store original index and column order
-            original_index = dataset.index
-            original_columns = dataset.columns.tolist()
-
-            # Create a copy of dataset without the columns to be imputed
-            remaining_cols = [col for col in dataset.columns if col not in independent_features]
-            dataset_remaining = dataset[remaining_cols].copy()
-
             discretiser =   EqualWidthDiscretiser(variables=independent_features, 
                                                   bins=10
                                                   )
 
-            X_train = discretiser.fit_transform(X_train)
-            X_test = discretiser.transform(X_test)
-
-            # Concatenate X_train and X_test vertically and reindex to match original order
-            combined_X = pd.concat([X_train, X_test], axis=0)
-            combined_X = combined_X.reindex(original_index)
-
-            # Concatenate the combined_X with the remaining columns
-            edited_dataset = pd.concat([combined_X, dataset_remaining], axis=1)
-
-            # Reorder columns to match original order
-            edited_dataset = edited_dataset[original_columns]
+            edited_dataset = self.apply_transformer(discretiser, dataset, independent_features)
 
             return edited_dataset
         
@@ -854,8 +840,6 @@ class FeatureEngineering:
             raise HTTPException(status_code=500, detail=f"Error in equal_width_discretiser function during feature engineering: {str(e)}")
 
     def geometric_width_discretiser(self, 
-                                     X_train: pd.DataFrame, 
-                                     X_test: pd.DataFrame, 
                                      dataset: pd.DataFrame, 
                                      independent_features: List[str]
                                      ):
@@ -868,30 +852,11 @@ class FeatureEngineering:
 
         try:
 
-            # Store original index and column order
-            original_index = dataset.index
-            original_columns = dataset.columns.tolist()
-
-            # Create a copy of dataset without the columns to be imputed
-            remaining_cols = [col for col in dataset.columns if col not in independent_features]
-            dataset_remaining = dataset[remaining_cols].copy()
-
             discretiser =   GeometricWidthDiscretiser(variables=independent_features, 
                                                       bins=10
                                                       )
 
-            X_train = discretiser.fit_transform(X_train)
-            X_test = discretiser.transform(X_test)
-
-            # Concatenate X_train and X_test vertically and reindex to match original order
-            combined_X = pd.concat([X_train, X_test], axis=0)
-            combined_X = combined_X.reindex(original_index)
-
-            # Concatenate the combined_X with the remaining columns
-            edited_dataset = pd.concat([combined_X, dataset_remaining], axis=1)
-
-            # Reorder columns to match original order
-            edited_dataset = edited_dataset[original_columns]
+            edited_dataset = self.apply_transformer(discretiser, dataset, independent_features)
 
             return edited_dataset
         
@@ -899,9 +864,6 @@ class FeatureEngineering:
             raise HTTPException(status_code=500, detail=f"Error in geometric_width_discretiser function during feature engineering: {str(e)}")
 
     def decision_tree_discretiser(self, 
-                                   X_train: pd.DataFrame, 
-                                   X_test: pd.DataFrame, 
-                                   y_train: pd.DataFrame, 
                                    dataset: pd.DataFrame, 
                                    independent_features: List[str]
                                    ):
@@ -914,34 +876,14 @@ class FeatureEngineering:
 
         try:
 
-            # Store original index and column order
-            original_index = dataset.index
-            original_columns = dataset.columns.tolist()
-
-            # Create a copy of dataset without the columns to be imputed
-            remaining_cols = [col for col in dataset.columns if col not in independent_features]
-            dataset_remaining = dataset[remaining_cols].copy()
-
             discretiser =   DecisionTreeDiscretiser(variables=independent_features, 
-                                                    cv=3, 
-                                                    scoring='neg_mean_squared_error',
+                                                    cv=DECISION_TREE_CV, 
+                                                    scoring=progress_scoring('neg_mean_squared_error', self.progress),
                                                     regression=True, 
                                                     random_state=29
                                                     )
 
-            discretiser.fit(X_train,y_train)
-            X_train = discretiser.transform(X_train)
-            X_test = discretiser.transform(X_test)
-
-            # Concatenate X_train and X_test vertically and reindex to match original order
-            combined_X = pd.concat([X_train, X_test], axis=0)
-            combined_X = combined_X.reindex(original_index)
-
-            # Concatenate the combined_X with the remaining columns
-            edited_dataset = pd.concat([combined_X, dataset_remaining], axis=1)
-
-            # Reorder columns to match original order
-            edited_dataset = edited_dataset[original_columns]
+            edited_dataset = self.apply_transformer(discretiser, dataset, independent_features, supervised=True)
 
             return edited_dataset
         
@@ -949,8 +891,6 @@ class FeatureEngineering:
             raise HTTPException(status_code=500, detail=f"Error in decision_tree_discretiser function during feature engineering: {str(e)}")
     
     def gaussian_outlier_capping(self, 
-                                  X_train: pd.DataFrame, 
-                                  X_test: pd.DataFrame, 
                                   dataset: pd.DataFrame, 
                                   independent_features: List[str]
                                   ):
@@ -963,32 +903,13 @@ class FeatureEngineering:
 
         try:
 
-            # Store original index and column order
-            original_index = dataset.index
-            original_columns = dataset.columns.tolist()
-
-            # Create a copy of dataset without the columns to be imputed
-            remaining_cols = [col for col in dataset.columns if col not in independent_features]
-            dataset_remaining = dataset[remaining_cols].copy()
-
             outlier_capper = Winsorizer(variables=independent_features, 
                                         capping_method='gaussian', 
                                         tail='both', 
                                         fold=3
                                         )
 
-            X_train = outlier_capper.fit_transform(X_train)
-            X_test = outlier_capper.transform(X_test)
-
-            # Concatenate X_train and X_test vertically and reindex to match original order
-            combined_X = pd.concat([X_train, X_test], axis=0)
-            combined_X = combined_X.reindex(original_index)
-
-            # Concatenate the combined_X with the remaining columns
-            edited_dataset = pd.concat([combined_X, dataset_remaining], axis=1)
-
-            # Reorder columns to match original order
-            edited_dataset = edited_dataset[original_columns]
+            edited_dataset = self.apply_transformer(outlier_capper, dataset, independent_features)
 
             return edited_dataset
         
@@ -996,8 +917,6 @@ class FeatureEngineering:
             raise HTTPException(status_code=500, detail=f"Error in gaussian_outlier_capping function during feature engineering: {str(e)}")
         
     def iqr_outlier_capping(self, 
-                            X_train: pd.DataFrame, 
-                            X_test: pd.DataFrame, 
                             dataset: pd.DataFrame, 
                             independent_features: List[str]
                             ):
@@ -1010,31 +929,12 @@ class FeatureEngineering:
 
         try:
 
-            # Store original index and column order
-            original_index = dataset.index
-            original_columns = dataset.columns.tolist()
-
-            # Create a copy of dataset without the columns to be imputed
-            remaining_cols = [col for col in dataset.columns if col not in independent_features]
-            dataset_remaining = dataset[remaining_cols].copy()
-
             outlier_capper =   Winsorizer(variables=independent_features, 
                                           capping_method='iqr', 
                                           tail='both'
                                           )
 
-            X_train = outlier_capper.fit_transform(X_train)
-            X_test = outlier_capper.transform(X_test)
-
-            # Concatenate X_train and X_test vertically and reindex to match original order
-            combined_X = pd.concat([X_train, X_test], axis=0)
-            combined_X = combined_X.reindex(original_index)
-
-            # Concatenate the combined_X with the remaining columns
-            edited_dataset = pd.concat([combined_X, dataset_remaining], axis=1)
-
-            # Reorder columns to match original order
-            edited_dataset = edited_dataset[original_columns]
+            edited_dataset = self.apply_transformer(outlier_capper, dataset, independent_features)
 
             return edited_dataset
         
@@ -1042,8 +942,6 @@ class FeatureEngineering:
             raise HTTPException(status_code=500, detail=f"Error in iqr_outlier_capping function during feature engineering: {str(e)}")
     
     def log_transformer(self, 
-                        X_train: pd.DataFrame, 
-                        X_test: pd.DataFrame, 
                         dataset: pd.DataFrame, 
                         independent_features: List[str]
                         ):
@@ -1056,30 +954,11 @@ class FeatureEngineering:
 
         try:
 
-            # Store original index and column order
-            original_index = dataset.index
-            original_columns = dataset.columns.tolist()
-
-            # Create a copy of dataset without the columns to be imputed
-            remaining_cols = [col for col in dataset.columns if col not in independent_features]
-            dataset_remaining = dataset[remaining_cols].copy()
-
             log_transformer =  LogTransformer(variables=independent_features,
                                               base='e'
                                               )
 
-            X_train = log_transformer.fit_transform(X_train)
-            X_test = log_transformer.transform(X_test)
-
-            # Concatenate X_train and X_test vertically and reindex to match original order
-            combined_X = pd.concat([X_train, X_test], axis=0)
-            combined_X = combined_X.reindex(original_index)
-
-            # Concatenate the combined_X with the remaining columns
-            edited_dataset = pd.concat([combined_X, dataset_remaining], axis=1)
-
-            # Reorder columns to match original order
-            edited_dataset = edited_dataset[original_columns]
+            edited_dataset = self.apply_transformer(log_transformer, dataset, independent_features)
 
             return edited_dataset
         
@@ -1087,8 +966,6 @@ class FeatureEngineering:
             raise HTTPException(status_code=500, detail=f"Error in log_transformer function during feature engineering: {str(e)}")
     
     def log_cp_transformer(self, 
-                           X_train: pd.DataFrame, 
-                           X_test: pd.DataFrame, 
                            dataset: pd.DataFrame, 
                            independent_features: List[str]
                            ):
@@ -1101,30 +978,11 @@ class FeatureEngineering:
 
         try:
 
-            # Store original index and column order
-            original_index = dataset.index
-            original_columns = dataset.columns.tolist()
-
-            # Create a copy of dataset without the columns to be imputed
-            remaining_cols = [col for col in dataset.columns if col not in independent_features]
-            dataset_remaining = dataset[remaining_cols].copy()
-
             log_cp_transformer =  LogCpTransformer(variables=independent_features, 
                                                    C='auto'
                                                    )
 
-            X_train = log_cp_transformer.fit_transform(X_train)
-            X_test = log_cp_transformer.transform(X_test)
-
-            # Concatenate X_train and X_test vertically and reindex to match original order
-            combined_X = pd.concat([X_train, X_test], axis=0)
-            combined_X = combined_X.reindex(original_index)
-
-            # Concatenate the combined_X with the remaining columns
-            edited_dataset = pd.concat([combined_X, dataset_remaining], axis=1)
-
-            # Reorder columns to match original order
-            edited_dataset = edited_dataset[original_columns]
+            edited_dataset = self.apply_transformer(log_cp_transformer, dataset, independent_features)
 
             return edited_dataset
         
@@ -1132,8 +990,6 @@ class FeatureEngineering:
             raise HTTPException(status_code=500, detail=f"Error in log_cp_transformer function during feature engineering: {str(e)}")
     
     def reciprocal_transformer(self, 
-                                X_train: pd.DataFrame, 
-                                X_test: pd.DataFrame, 
                                 dataset: pd.DataFrame, 
                                 independent_features: List[str]
                                 ):
@@ -1146,28 +1002,9 @@ class FeatureEngineering:
 
         try:
 
-            # Store original index and column order
-            original_index = dataset.index
-            original_columns = dataset.columns.tolist()
-
-            # Create a copy of dataset without the columns to be imputed
-            remaining_cols = [col for col in dataset.columns if col not in independent_features]
-            dataset_remaining = dataset[remaining_cols].copy()
-
             reciprocal_transformer =  ReciprocalTransformer(variables=independent_features)
 
-            X_train = reciprocal_transformer.fit_transform(X_train)
-            X_test = reciprocal_transformer.transform(X_test)
-
-            # Concatenate X_train and X_test vertically and reindex to match original order
-            combined_X = pd.concat([X_train, X_test], axis=0)
-            combined_X = combined_X.reindex(original_index)
-
-            # Concatenate the combined_X with the remaining columns
-            edited_dataset = pd.concat([combined_X, dataset_remaining], axis=1)
-
-            # Reorder columns to match original order
-            edited_dataset = edited_dataset[original_columns]
+            edited_dataset = self.apply_transformer(reciprocal_transformer, dataset, independent_features)
 
             return edited_dataset
         
@@ -1175,8 +1012,6 @@ class FeatureEngineering:
             raise HTTPException(status_code=500, detail=f"Error in reciprocal_transformer function during feature engineering: {str(e)}")
     
     def square_root_transformer(self, 
-                                X_train: pd.DataFrame, 
-                                X_test: pd.DataFrame, 
                                 dataset: pd.DataFrame, 
                                 independent_features: List[str]
                                 ):
@@ -1189,30 +1024,11 @@ class FeatureEngineering:
 
         try:
 
-            # Store original index and column order
-            original_index = dataset.index
-            original_columns = dataset.columns.tolist()
-
-            # Create a copy of dataset without the columns to be imputed
-            remaining_cols = [col for col in dataset.columns if col not in independent_features]
-            dataset_remaining = dataset[remaining_cols].copy()
-
             square_root_transformer =  PowerTransformer(variables=independent_features,
                                                         exp=0.5
                                                         )
 
-            X_train = square_root_transformer.fit_transform(X_train)
-            X_test = square_root_transformer.transform(X_test)
-
-            # Concatenate X_train and X_test vertically and reindex to match original order
-            combined_X = pd.concat([X_train, X_test], axis=0)
-            combined_X = combined_X.reindex(original_index)
-
-            # Concatenate the combined_X with the remaining columns
-            edited_dataset = pd.concat([combined_X, dataset_remaining], axis=1)
-
-            # Reorder columns to match original order
-            edited_dataset = edited_dataset[original_columns]
+            edited_dataset = self.apply_transformer(square_root_transformer, dataset, independent_features)
 
             return edited_dataset
         
@@ -1220,8 +1036,6 @@ class FeatureEngineering:
             raise HTTPException(status_code=500, detail=f"Error in square_root_transformer function during feature engineering: {str(e)}")
     
     def box_cox_transformer(self, 
-                            X_train: pd.DataFrame, 
-                            X_test: pd.DataFrame, 
                             dataset: pd.DataFrame, 
                             independent_features: List[str]
                             ):
@@ -1234,28 +1048,9 @@ class FeatureEngineering:
 
         try:
 
-            # Store original index and column order
-            original_index = dataset.index
-            original_columns = dataset.columns.tolist()
-
-            # Create a copy of dataset without the columns to be imputed
-            remaining_cols = [col for col in dataset.columns if col not in independent_features]
-            dataset_remaining = dataset[remaining_cols].copy()
-
             box_cox_transformer =  BoxCoxTransformer(variables=independent_features)
 
-            X_train = box_cox_transformer.fit_transform(X_train)
-            X_test = box_cox_transformer.transform(X_test)
-
-            # Concatenate X_train and X_test vertically and reindex to match original order
-            combined_X = pd.concat([X_train, X_test], axis=0)
-            combined_X = combined_X.reindex(original_index)
-
-            # Concatenate the combined_X with the remaining columns
-            edited_dataset = pd.concat([combined_X, dataset_remaining], axis=1)
-
-            # Reorder columns to match original order
-            edited_dataset = edited_dataset[original_columns]
+            edited_dataset = self.apply_transformer(box_cox_transformer, dataset, independent_features)
 
             return edited_dataset
         
@@ -1263,8 +1058,6 @@ class FeatureEngineering:
             raise HTTPException(status_code=500, detail=f"Error in box_cox_transformer function during feature engineering: {str(e)}")
     
     def yeo_johnson_transformer(self, 
-                                X_train: pd.DataFrame, 
-                                X_test: pd.DataFrame, 
                                 dataset: pd.DataFrame, 
                                 independent_features: List[str]
                                 ):
@@ -1277,28 +1070,9 @@ class FeatureEngineering:
 
         try:
 
-            # Store original index and column order
-            original_index = dataset.index
-            original_columns = dataset.columns.tolist()
-
-            # Create a copy of dataset without the columns to be imputed
-            remaining_cols = [col for col in dataset.columns if col not in independent_features]
-            dataset_remaining = dataset[remaining_cols].copy()
-
             yeo_johnson_transformer =  YeoJohnsonTransformer(variables=independent_features)
 
-            X_train = yeo_johnson_transformer.fit_transform(X_train)
-            X_test = yeo_johnson_transformer.transform(X_test)
-
-            # Concatenate X_train and X_test vertically and reindex to match original order
-            combined_X = pd.concat([X_train, X_test], axis=0)
-            combined_X = combined_X.reindex(original_index)
-
-            # Concatenate the combined_X with the remaining columns
-            edited_dataset = pd.concat([combined_X, dataset_remaining], axis=1)
-
-            # Reorder columns to match original order
-            edited_dataset = edited_dataset[original_columns]
+            edited_dataset = self.apply_transformer(yeo_johnson_transformer, dataset, independent_features)
 
             return edited_dataset
         
@@ -1306,8 +1080,6 @@ class FeatureEngineering:
             raise HTTPException(status_code=500, detail=f"Error in yeo_johnson_transformer function during feature engineering: {str(e)}")
 
     def mean_normalization_scaler(self, 
-                                  X_train: pd.DataFrame, 
-                                  X_test: pd.DataFrame, 
                                   dataset: pd.DataFrame, 
                                   independent_features: List[str]
                                   ):
@@ -1320,28 +1092,9 @@ class FeatureEngineering:
 
         try:
 
-            # Store original index and column order
-            original_index = dataset.index
-            original_columns = dataset.columns.tolist()
-
-            # Create a copy of dataset without the columns to be imputed
-            remaining_cols = [col for col in dataset.columns if col not in independent_features]
-            dataset_remaining = dataset[remaining_cols].copy()
-
             mean_normalization_scaler =  MeanNormalizationScaler(variables=independent_features)
 
-            X_train = mean_normalization_scaler.fit_transform(X_train)
-            X_test = mean_normalization_scaler.transform(X_test)
-
-            # Concatenate X_train and X_test vertically and reindex to match original order
-            combined_X = pd.concat([X_train, X_test], axis=0)
-            combined_X = combined_X.reindex(original_index)
-
-            # Concatenate the combined_X with the remaining columns
-            edited_dataset = pd.concat([combined_X, dataset_remaining], axis=1)
-
-            # Reorder columns to match original order
-            edited_dataset = edited_dataset[original_columns]
+            edited_dataset = self.apply_transformer(mean_normalization_scaler, dataset, independent_features)
 
             return edited_dataset
         
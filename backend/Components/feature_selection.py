@@ -1,16 +1,56 @@
+import numpy as np
 import pandas as pd
 from fastapi import HTTPException
-from typing import Optional, List
-from sklearn.ensemble import RandomForestClassifier
+from typing import Optional, List, Tuple
 
 from feature_engine.selection import (DropFeatures,DropConstantFeatures, 
-                                      DropDuplicateFeatures, DropCorrelatedFeatures, 
-                                      SmartCorrelatedSelection, SelectByShuffling, 
+                                      DropDuplicateFeatures, SelectByShuffling, 
                                       SelectBySingleFeaturePerformance,RecursiveFeatureElimination)
 
 from Components.Logger import logger
-from Components.data import get_edited_dataframe_details, get_user_details, fetch_and_read_github_file
+from Components.data import get_user_details
+from Components.dataset_versions import load_current_dataset
+from Components.jobs import JobProgress, progress_scoring
+from Components.selection_estimators import make_estimator, fit_selector, SELECTION_ESTIMATOR
+from Components.recursive_elimination import (StepRecursiveFeatureElimination, elimination_rounds, RFE_DROP_FRACTION,
+                                              STEP_RFE_ESTIMATORS)
+from Components.column_hashing import find_constant_and_duplicate_columns
+from Components.correlations import correlation_matrix, correlated_groups, max_abs_correlations, numerical_columns
+
+# Folds of the cross-validations of the shuffling and recursive elimination selectors
+SHUFFLE_CV = 2
+RECURSIVE_ELIMINATION_CV = 2
+
+# Thresholds of the selectors unless a request sets one
+DROP_CONSTANT_TOLERANCE = 1  # Share of the predominant value, 1 only drops constant features
+DROP_CORRELATED_THRESHOLD = 0.8  # Absolute Pearson correlation above which features are grouped
+SMART_CORRELATION_THRESHOLD = 0.75
+SINGLE_FEATURE_THRESHOLD = 0.5  # ROC AUC a feature must exceed on its own
+RECURSIVE_ELIMINATION_THRESHOLD = 0.01  # ROC AUC drop that keeps a feature
+
+# Sub tasks the manager runs
+SELECTION_SUB_TASKS = ["DropFeatures", "DropConstantFeatures", "DropDuplicateFeatures", "DropConstantAndDuplicateFeatures",
+                       "DropCorrelatedFeatures", "SmartCorrelationSelection", "ShuffleFeaturesSelector",
+                       "SelectBySingleFeaturePerformance", "RecursiveFeatureElimination", "StepRecursiveFeatureElimination"]
+
+
+def check_selection_estimator(sub_task: Optional[str],
+                              estimator: Optional[str]
+                              ):
 
+    """
+    Check that a selection sub task can use the requested estimator
+
+    Args:
+        sub_task (Optional[str]): Selection sub task
+        estimator (Optional[str]): Requested estimator, None for the sub task's default
+
+    Raises:
+        HTTPException: Bad request if StepRecursiveFeatureElimination is asked for an estimator it cannot grow
+    """
+
+    if sub_task == "StepRecursiveFeatureElimination" and estimator is not None and estimator not in STEP_RFE_ESTIMATORS:
+        raise HTTPException(status_code=400, detail=f"StepRecursiveFeatureElimination supports the estimators {', '.join(STEP_RFE_ESTIMATORS)}, got {estimator}")
 
 
 class FeatureSelection:
@@ -23,13 +63,34 @@ class FeatureSelection:
                  user_details: dict, 
                  selection_columns: Optional[List[str]] = None,
                  featureselectionSubTask : Optional[str] = None,
-                 target_feature: Optional[str] = None
+                 target_feature: Optional[str] = None,
+                 progress: Optional[JobProgress] = None,
+                 estimator: Optional[str] = None,
+                 lineage: Optional[List[Tuple[str, Optional[dict]]]] = None,
+                 threshold: Optional[float] = None,
+                 dry_run: bool = False,
+                 drop_fraction: Optional[float] = None
                  ):
 
         self.user_details = user_details
         self.selection_columns = selection_columns
         self.featureselectionSubTask = featureselectionSubTask
         self.target_feature = target_feature
+        # Progress of the background job running the step, None when it runs in the request
+        self.progress = progress
+        # Estimator of the model-based selectors, and their estimator, cores, rows, wall time and selected features
+        self.estimator = estimator or SELECTION_ESTIMATOR
+        self.requested_estimator = estimator
+        self.report = None
+        # Fingerprints and steps of the dataset version and its ancestors, to reuse their cached correlation matrices
+        self.lineage = lineage
+        # Threshold of the sub task, its default if None
+        self.threshold = threshold
+        # Dry runs only fit the selector, the features it would drop and their scores are kept in preview
+        self.dry_run = dry_run
+        self.preview = None
+        # Share of the remaining features the step recursive elimination drops per round, RFE_DROP_FRACTION if None
+        self.drop_fraction = drop_fraction or RFE_DROP_FRACTION
 
     async def handle_dataframe(self,
                                user_details: dict
@@ -43,6 +104,7 @@ class FeatureSelection:
 
         Returns:
             pd.DataFrame: The dataframe
+            dict: The version log of the dataframe
 
         Raises:
             HTTPException: Error in handling dataframe during feature selection
@@ -51,23 +113,93 @@ class FeatureSelection:
         logger.info(f"Entered in 'handle_dataframe in feature selection' function")
 
         try:
-            user_data = get_user_details(username=user_details['username'], role=user_details['role'])
 
-            users_edited_dataframe_info = get_edited_dataframe_details(user_details['username'], user_details['role'], user_data["file"])
+            user_data = get_user_details(username=user_details['username'], role=user_details['role'])
 
-            # If the dataframe is already edited, then read the edited dataframe else read the original dataframe
-            if users_edited_dataframe_info:
-                dataset = await fetch_and_read_github_file(users_edited_dataframe_info["edited_file"], users_edited_dataframe_info["edited_file_url"])
-                need_to_update = False
-            else:
-                dataset = await fetch_and_read_github_file(user_data["file"], user_data["file_url"])
-                need_to_update = True
+            # Load the head version of the user's edits, the uploaded dataset if there are none
+            dataset, version_log = await load_current_dataset(user_data)
 
-            return dataset,need_to_update
+            return dataset, version_log
         
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error in handling dataframe during feature selection: {str(e)}")
         
+    def expected_folds(self, dataset: pd.DataFrame) -> Optional[int]:
+
+        """
+        Get the number of cross-validation folds the operation scores, the progress total of a background job
+
+        Args:
+            dataset (pd.DataFrame): The dataframe
+
+        Returns:
+            Optional[int]: Number of scored folds, an upper bound for recursive elimination, None if the operation does not cross-validate
+        """
+
+        # Both selectors evaluate every numerical variable but the target
+        variables = len([column for column in dataset.select_dtypes(include="number").columns if column != self.target_feature])
+
+        if self.featureselectionSubTask == "ShuffleFeaturesSelector":
+            # One cross-validation, then every variable shuffled in every fold
+            return SHUFFLE_CV * (1 + variables)
+
+        if self.featureselectionSubTask == "RecursiveFeatureElimination":
+            # One cross-validation, then up to two per eliminated variable
+            return RECURSIVE_ELIMINATION_CV * (2 * variables - 1)
+
+        if self.featureselectionSubTask == "StepRecursiveFeatureElimination":
+            # One out-of-bag scored forest per round, an upper bound as the elimination stops early
+            return elimination_rounds(variables, self.drop_fraction)
+
+        return None
+
+    def threshold_or(self, default: float) -> float:
+
+        """
+        Get the threshold of the sub task
+
+        Args:
+            default (float): Threshold of the sub task if the request did not set one
+
+        Returns:
+            float: The requested threshold, or the default
+        """
+
+        return default if self.threshold is None else self.threshold
+
+    def drop(self,
+             dataset: pd.DataFrame,
+             features_to_drop: List[str],
+             score_name: Optional[str] = None,
+             scores: Optional[dict] = None
+             ) -> pd.DataFrame:
+
+        """
+        Drop the features a fitted selector selected, or in a dry run only record them with their scores
+
+        Args:
+            dataset (pd.DataFrame): The dataframe
+            features_to_drop (List[str]): Features the selector selected for dropping
+            score_name (Optional[str]): What the scores measure
+            scores (Optional[dict]): Score of every evaluated feature
+
+        Returns:
+            pd.DataFrame: The dataframe without the features, the dataframe itself in a dry run
+        """
+
+        if not self.dry_run:
+            return dataset.drop(columns=list(features_to_drop))
+
+        self.preview = {
+            "featuresToDrop": list(features_to_drop),
+            "scoreName": score_name,
+            # NaN scores, such as correlations of constant features, are not valid JSON
+            "scores": {str(feature): (None if isinstance(score, float) and np.isnan(score) else score)
+                       for feature, score in (scores or {}).items()}
+        }
+
+        return dataset
+
     def manager(self,
                 dataset: pd.DataFrame
                 ):
@@ -108,6 +240,11 @@ class FeatureSelection:
                 edited_dataset = self.drop_duplicate_features(dataset)
                 return edited_dataset
             
+            elif sub_task == "DropConstantAndDuplicateFeatures":
+                
+                edited_dataset = self.drop_constant_and_duplicate_features(dataset)
+                return edited_dataset
+            
             elif sub_task == "DropCorrelatedFeatures":
                 
                 edited_dataset = self.drop_correlated_features(dataset)
@@ -134,9 +271,17 @@ class FeatureSelection:
                 edited_dataset = self.recursive_feature_elimination(dataset, target_feature)
                 return edited_dataset
             
+            elif sub_task == "StepRecursiveFeatureElimination":
+                
+                edited_dataset = self.step_recursive_feature_elimination(dataset, target_feature)
+                return edited_dataset
+            
             else:
                 raise HTTPException(status_code=400, detail="Invalid sub task")
-        
+
+        except HTTPException as http_exc:
+            raise http_exc
+
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error in manager function during feature selection: {str(e)}")
     
@@ -154,7 +299,9 @@ class FeatureSelection:
         try:
     
             drop_features = DropFeatures(features_to_drop=selection_columns)
-            edited_dataset = drop_features.fit_transform(dataset)
+            drop_features.fit(dataset)
+
+            edited_dataset = self.drop(dataset, drop_features.features_to_drop_)
             return edited_dataset
         
         except Exception as e:
@@ -171,8 +318,15 @@ class FeatureSelection:
 
         try:
 
-            drop_constant_features = DropConstantFeatures(variables=None)
-            edited_dataset = drop_constant_features.fit_transform(dataset)
+            drop_constant_features = DropConstantFeatures(variables=None, tol=self.threshold_or(DROP_CONSTANT_TOLERANCE))
+            drop_constant_features.fit(dataset)
+
+            scores = None
+            if self.dry_run:
+                scores = {feature: float(dataset[feature].value_counts().iloc[0] / len(dataset))
+                          for feature in drop_constant_features.variables_}
+
+            edited_dataset = self.drop(dataset, drop_constant_features.features_to_drop_, "predominantValueShare", scores)
             return edited_dataset
         
         except Exception as e:
@@ -191,12 +345,53 @@ class FeatureSelection:
         try:
 
             drop_duplicate_features = DropDuplicateFeatures(variables=None)
-            edited_dataset = drop_duplicate_features.fit_transform(dataset)
+            drop_duplicate_features.fit(dataset)
+
+            # Every dropped feature scores the first feature of its set, the one that is kept
+            scores = {}
+            for feature_set in drop_duplicate_features.duplicated_feature_sets_:
+                kept = next(feature for feature in drop_duplicate_features.variables_ if feature in feature_set)
+                scores.update({feature: kept for feature in feature_set if feature != kept})
+
+            edited_dataset = self.drop(dataset, sorted(drop_duplicate_features.features_to_drop_), "duplicateOf", scores)
             return edited_dataset
         
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error in drop duplicate features function during feature selection: {str(e)}")
     
+    def drop_constant_and_duplicate_features(self,
+                                             dataset: pd.DataFrame
+                                             ):
+
+        """
+        Drop the constant or quasi-constant features and the duplicated features from the dataframe,
+        hashing every column once instead of hashing the transposed dataframe
+        """
+
+        logger.info(f"Entered in 'drop_constant_and_duplicate_features in feature selection' function")
+
+        try:
+
+            constant, duplicate_of, shares = find_constant_and_duplicate_columns(dataset,
+                                                                                 tol=self.threshold_or(DROP_CONSTANT_TOLERANCE),
+                                                                                 shares=self.dry_run)
+
+            features_to_drop = [column for column in dataset.columns if column in duplicate_of or column in constant]
+            if len(features_to_drop) == len(dataset.columns):
+                raise ValueError("The resulting dataframe will have no columns after dropping all constant, quasi-constant "
+                                 "and duplicated features. Try changing the threshold value.")
+
+            scores = None
+            if self.dry_run:
+                scores = {column: {"predominantValueShare": shares[column], "duplicateOf": duplicate_of.get(column)}
+                          for column in dataset.columns}
+
+            edited_dataset = self.drop(dataset, features_to_drop, "predominantValueShare, duplicateOf", scores)
+            return edited_dataset
+        
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error in drop constant and duplicate features function during feature selection: {str(e)}")
+    
     def drop_correlated_features(self,
                                  dataset: pd.DataFrame
                                  ):
@@ -209,11 +404,15 @@ class FeatureSelection:
 
         try:
 
-            drop_correlated_features = DropCorrelatedFeatures(method="pearson", 
-                                                              threshold=0.8,
-                                                              variables=None
-                                                              )
-            edited_dataset = drop_correlated_features.fit_transform(dataset)
+            # Same grouping as DropCorrelatedFeatures, which examines the numerical variables alphabetically
+            features = sorted(numerical_columns(dataset))
+            if len(features) < 2:
+                raise ValueError("The selector needs at least 2 numerical variables")
+
+            matrix, _ = correlation_matrix(dataset, self.lineage)
+            _, features_to_drop, _ = correlated_groups(matrix, features, self.threshold_or(DROP_CORRELATED_THRESHOLD))
+
+            edited_dataset = self.drop(dataset, features_to_drop, "maxAbsCorrelation", max_abs_correlations(matrix, features))
             return edited_dataset
         
         except Exception as e:
@@ -231,16 +430,24 @@ class FeatureSelection:
 
         try:
 
-            smart_correlation_selection = SmartCorrelatedSelection(
-                variables=None,
-                method="pearson",
-                threshold=0.75,
-                missing_values="raise",
-                selection_method="variance",
-                estimator=None,
-            )
+            features = numerical_columns(dataset)
+            if len(features) < 2:
+                raise ValueError("The selector needs at least 2 numerical variables")
+
+            values = dataset[features].to_numpy(dtype=np.float64, na_value=np.nan)
+            if np.isnan(values).any():
+                raise ValueError("Some of the variables in the dataset contain NaN. Check and remove those before using this transformer.")
+            if np.isinf(values).any():
+                raise ValueError("Some of the variables in the dataset contain inf values. Check and remove those before using this transformer.")
+
+            # Same grouping as SmartCorrelatedSelection with selection_method="variance": features examined from the
+            # highest standard deviation, so the most variable feature of every group is retained
+            features = dataset[features].std().sort_values(ascending=False, kind="mergesort").index.to_list()
 
-            edited_dataset = smart_correlation_selection.fit_transform(dataset)
+            matrix, _ = correlation_matrix(dataset, self.lineage)
+            _, features_to_drop, _ = correlated_groups(matrix, features, self.threshold_or(SMART_CORRELATION_THRESHOLD))
+
+            edited_dataset = self.drop(dataset, features_to_drop, "maxAbsCorrelation", max_abs_correlations(matrix, features))
 
             return edited_dataset
         
@@ -260,15 +467,20 @@ class FeatureSelection:
 
         try:
 
-            rf = RandomForestClassifier(random_state=42)
+            model = make_estimator(self.estimator, random_state=42)
 
             shuffle_features_selector = SelectByShuffling(
-                estimator=rf,
-                cv=2,
+                estimator=model,
+                scoring=progress_scoring("roc_auc", self.progress),
+                cv=SHUFFLE_CV,
+                threshold=self.threshold,
                 random_state=42,
             )
 
-            edited_dataset = shuffle_features_selector.fit_transform(dataset,dataset[target_feature])
+            self.report = fit_selector(shuffle_features_selector, dataset, target_feature, self.estimator)
+
+            edited_dataset = self.drop(dataset, shuffle_features_selector.features_to_drop_, "performanceDrift",
+                                       shuffle_features_selector.performance_drifts_)
             return edited_dataset
         
         except Exception as e:
@@ -287,20 +499,20 @@ class FeatureSelection:
 
         try:
 
-            rf = RandomForestClassifier(n_estimators=10, 
-                                        random_state=1, 
-                                        n_jobs=4
-                                        )
+            model = make_estimator(self.estimator, random_state=1, n_estimators=10)
 
             select_by_single_feature_performance = SelectBySingleFeaturePerformance(
                 variables=None,
-                estimator=rf,
+                estimator=model,
                 scoring="roc_auc",
                 cv=3,
-                threshold=0.5
+                threshold=self.threshold_or(SINGLE_FEATURE_THRESHOLD)
             )
 
-            edited_dataset = select_by_single_feature_performance.fit_transform(dataset,dataset[target_feature])
+            self.report = fit_selector(select_by_single_feature_performance, dataset, target_feature, self.estimator)
+
+            edited_dataset = self.drop(dataset, select_by_single_feature_performance.features_to_drop_, "performance",
+                                       select_by_single_feature_performance.feature_performance_)
             return edited_dataset
         
         except Exception as e:
@@ -319,30 +531,59 @@ class FeatureSelection:
 
         try:
             
-            rf = RandomForestClassifier(random_state=2)
+            model = make_estimator(self.estimator, random_state=2)
 
-            recursive_feature_elimination = RecursiveFeatureElimination(estimator=rf, 
-                                                                        cv=2
+            recursive_feature_elimination = RecursiveFeatureElimination(estimator=model, 
+                                                                        scoring=progress_scoring("roc_auc", self.progress),
+                                                                        cv=RECURSIVE_ELIMINATION_CV,
+                                                                        threshold=self.threshold_or(RECURSIVE_ELIMINATION_THRESHOLD)
                                                                         )
 
-            edited_dataset = recursive_feature_elimination.fit_transform(dataset,dataset[target_feature])
+            self.report = fit_selector(recursive_feature_elimination, dataset, target_feature, self.estimator)
+
+            edited_dataset = self.drop(dataset, recursive_feature_elimination.features_to_drop_, "performanceDrift",
+                                       recursive_feature_elimination.performance_drifts_)
             return edited_dataset
         
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error in recursive feature elimination function during feature selection: {str(e)}")
     
+    def step_recursive_feature_elimination(self,
+                                           dataset: pd.DataFrame, 
+                                           target_feature: str
+                                           ):
 
-    
-
-    
-    
-
+        """
+        Recursive feature elimination of a fraction of the features per round, stopping once the score plateaus,
+        with the score of every round reported under "rounds"
+        """
 
+        logger.info(f"Entered in 'step_recursive_feature_elimination in feature selection' function")
 
-        
-    
+        try:
 
+            # Rounds grow the forest warm-started and rank the features by its impurity importances, so only the
+            # estimators that support both are accepted and the default is a random forest whatever SELECTION_ESTIMATOR is
+            check_selection_estimator("StepRecursiveFeatureElimination", self.requested_estimator)
+            estimator = self.requested_estimator or STEP_RFE_ESTIMATORS[0]
+            model = make_estimator(estimator, random_state=2)
 
+            step_recursive_feature_elimination = StepRecursiveFeatureElimination(estimator=model,
+                                                                                 drop_fraction=self.drop_fraction,
+                                                                                 tolerance=self.threshold_or(RECURSIVE_ELIMINATION_THRESHOLD),
+                                                                                 progress=self.progress
+                                                                                 )
 
+            self.report = fit_selector(step_recursive_feature_elimination, dataset, target_feature, estimator)
+            self.report["bestScore"] = round(step_recursive_feature_elimination.best_score_, 6)
+            self.report["rounds"] = step_recursive_feature_elimination.rounds_
 
+            edited_dataset = self.drop(dataset, step_recursive_feature_elimination.features_to_drop_, "importance",
+                                       step_recursive_feature_elimination.feature_importances_)
+            return edited_dataset
 
+        except HTTPException as http_exc:
+            raise http_exc
+        
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error in step recursive feature elimination function during feature selection: {str(e)}")
@@ -63,7 +63,7 @@ class GoalGeneration:
             if existing_goals:
                 summary = existing_goals["summary"]      
             else:
-                summary = await data_summarization(selected_method_label="llm", temperature=0.5, user_details=user_data)
+                summary, _ = await data_summarization(selected_method_label="llm", temperature=0.5, user_details=user_data)
 
             # Generate new goals
             new_goals = self.lida.goals(summary, n=goals_count.goalCount, textgen_config=self.textgen_config)
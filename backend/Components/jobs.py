@@ -0,0 +1,485 @@
+# jobs.py - Code module to run long cleaning operations as background jobs with progress and cancellation
+
+import os
+import json
+import uuid
+import asyncio
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Callable, Awaitable
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from sklearn.metrics import get_scorer
+
+from Components.Logger import logger
+
+load_dotenv()
+
+# Node-local SQLite file holding the jobs of all workers, so any worker can report on or cancel a job
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH") or os.path.join(tempfile.gettempdir(), "cleaning-jobs.sqlite")
+
+# Jobs running at once in one worker, the others wait as queued
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+
+# Queued and running jobs a user can have at once
+JOB_MAX_PER_USER = int(os.getenv("JOB_MAX_PER_USER", "1"))
+
+# Finished jobs are deleted after this many hours
+JOB_RETENTION_HOURS = int(os.getenv("JOB_RETENTION_HOURS", "24"))
+
+# Operations that run for minutes on real data and are always run as jobs
+BACKGROUND_SUB_TASKS = {
+    ("engineering", "DecisionTreeDiscretiser"),
+    ("selection", "RecursiveFeatureElimination"),
+    ("selection", "StepRecursiveFeatureElimination"),
+    ("selection", "ShuffleFeaturesSelector")
+}
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class JobCancelled(BaseException):
+
+    """
+    Raised inside a running job when its cancellation was requested
+
+    It derives from BaseException so that neither the operations' error handling nor
+    scikit-learn's error_score handling of failed folds swallow it.
+    """
+
+
+@contextmanager
+def _connect(path: str):
+
+    # Autocommit connection, closed on exit
+    connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+    connection.row_factory = sqlite3.Row
+    try:
+        yield connection
+    finally:
+        connection.close()
+
+
+class JobProgress:
+
+    """
+    Progress counter of one job, picklable so that column partition fits in other processes can report too
+    """
+
+    def __init__(self, job_id: str, path: str):
+
+        self.job_id = job_id
+        self.path = path
+
+    def set_total(self, total: int):
+
+        """
+        Set the number of folds the job is expected to score
+
+        Args:
+            total (int): Expected number of folds
+        """
+
+        with _connect(self.path) as connection:
+            connection.execute("UPDATE jobs SET total = ? WHERE id = ?", (total, self.job_id))
+
+    def advance(self, folds: int = 1):
+
+        """
+        Count scored folds and stop the job if its cancellation was requested
+
+        Args:
+            folds (int): Number of folds scored
+
+        Raises:
+            JobCancelled: If the cancellation of the job was requested
+        """
+
+        with _connect(self.path) as connection:
+            row = connection.execute("UPDATE jobs SET done = done + ? WHERE id = ? RETURNING cancel_requested",
+                                     (folds, self.job_id)).fetchone()
+
+        if row is not None and row["cancel_requested"]:
+            raise JobCancelled(self.job_id)
+
+    def check(self):
+
+        """
+        Stop the job if its cancellation was requested
+
+        Raises:
+            JobCancelled: If the cancellation of the job was requested
+        """
+
+        self.advance(folds=0)
+
+
+class ProgressScorer:
+
+    """
+    Scorer counting every scored fold of a cross-validation as job progress
+    """
+
+    def __init__(self, scoring: str, progress: JobProgress):
+
+        self.scoring = scoring
+        self.progress = progress
+
+    def __call__(self, estimator, X, y):
+
+        score = get_scorer(self.scoring)(estimator, X, y)
+        self.progress.advance()
+        return score
+
+    def __repr__(self) -> str:
+
+        # Fitted transformers are stored under the repr of their parameters, a job must not change the key
+        return repr(self.scoring)
+
+
+def progress_scoring(scoring: str, progress: Optional[JobProgress]):
+
+    """
+    Wrap a scoring name to count the scored folds of a job
+
+    Args:
+        scoring (str): Scikit-learn scoring name
+        progress (Optional[JobProgress]): Progress of the job, None outside a job
+
+    Returns:
+        The scoring name outside a job, a ProgressScorer inside one
+    """
+
+    if progress is None:
+        return scoring
+
+    return ProgressScorer(scoring, progress)
+
+
+class JobStore:
+
+    """
+    SQLite table of the jobs of all workers on this node
+    """
+
+    def __init__(self, path: str):
+
+        self.path = path
+
+        with _connect(self.path) as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    username TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    config TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    pid INTEGER NOT NULL,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0,
+                    done INTEGER NOT NULL DEFAULT 0,
+                    total INTEGER,
+                    error TEXT,
+                    result TEXT,
+                    created_at TEXT NOT NULL,
+                    started_at TEXT,
+                    finished_at TEXT
+                )
+            """)
+            connection.execute("CREATE INDEX IF NOT EXISTS jobs_username ON jobs (username, status)")
+
+    def create(self, username: str, kind: str, config: dict) -> dict:
+
+        """
+        Queue a job, unless the user already has the maximum number of queued and running jobs
+
+        Args:
+            username (str): Owner of the job
+            kind (str): "engineering", "selection" or "pipeline"
+            config (dict): Operation configuration
+
+        Returns:
+            dict: The queued job
+
+        Raises:
+            HTTPException: Too many requests if the user has too many queued and running jobs
+        """
+
+        self._reap()
+        job_id = uuid.uuid4().hex
+        now = datetime.now(timezone.utc).isoformat()
+
+        with _connect(self.path) as connection:
+            # The count and the insert are one transaction, concurrent submissions of all workers see each other
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                active = connection.execute(
+                    f"SELECT COUNT(*) FROM jobs WHERE username = ? AND status IN {ACTIVE_STATUSES}", (username,)
+                ).fetchone()[0]
+                if active >= JOB_MAX_PER_USER:
+                    raise HTTPException(status_code=429, detail=f"Only {JOB_MAX_PER_USER} queued or running jobs are allowed per user")
+
+                connection.execute(
+                    "INSERT INTO jobs (id, username, kind, config, status, pid, created_at) VALUES (?, ?, ?, ?, 'queued', ?, ?)",
+                    (job_id, username, kind, json.dumps(config), os.getpid(), now)
+                )
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+
+        return self.get(job_id, username)
+
+    def get(self, job_id: str, username: str) -> Optional[dict]:
+
+        """
+        Get a job of a user
+
+        Args:
+            job_id (str): Job id
+            username (str): Owner of the job
+
+        Returns:
+            Optional[dict]: The job, None if the user has no such job
+        """
+
+        self._reap()
+
+        with _connect(self.path) as connection:
+            row = connection.execute("SELECT * FROM jobs WHERE id = ? AND username = ?", (job_id, username)).fetchone()
+
+        return self._job(row) if row is not None else None
+
+    def list(self, username: str) -> list:
+
+        """
+        List the jobs of a user, newest first, without their results
+
+        Args:
+            username (str): Owner of the jobs
+
+        Returns:
+            list: The jobs
+        """
+
+        self._reap()
+
+        with _connect(self.path) as connection:
+            rows = connection.execute("SELECT * FROM jobs WHERE username = ? ORDER BY created_at DESC", (username,)).fetchall()
+
+        return [self._job(row, with_result=False) for row in rows]
+
+    def request_cancel(self, job_id: str, username: str) -> Optional[dict]:
+
+        """
+        Request the cancellation of a job, a running job stops at its next scored fold
+
+        Args:
+            job_id (str): Job id
+            username (str): Owner of the job
+
+        Returns:
+            Optional[dict]: The job, None if the user has no such job
+        """
+
+        now = datetime.now(timezone.utc).isoformat()
+
+        with _connect(self.path) as connection:
+            connection.execute(f"UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND username = ? AND status IN {ACTIVE_STATUSES}",
+                               (job_id, username))
+            # A queued job never starts, its runner only records the cancellation again
+            connection.execute("UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND username = ? AND status = 'queued'",
+                               (now, job_id, username))
+
+        return self.get(job_id, username)
+
+    def start(self, job_id: str) -> bool:
+
+        """
+        Mark a queued job as running
+
+        Args:
+            job_id (str): Job id
+
+        Returns:
+            bool: False if the job was cancelled while it was queued
+        """
+
+        now = datetime.now(timezone.utc).isoformat()
+
+        with _connect(self.path) as connection:
+            cursor = connection.execute("UPDATE jobs SET status = 'running', started_at = ? WHERE id = ? AND cancel_requested = 0",
+                                        (now, job_id))
+            return cursor.rowcount == 1
+
+    def finish(self, job_id: str, status: str, result: Optional[dict] = None, error: Optional[str] = None):
+
+        """
+        Record the end of a job
+
+        Args:
+            job_id (str): Job id
+            status (str): "succeeded", "failed" or "cancelled"
+            result (Optional[dict]): Dataframe information of a succeeded job
+            error (Optional[str]): Error of a failed job
+        """
+
+        now = datetime.now(timezone.utc).isoformat()
+
+        with _connect(self.path) as connection:
+            # The expected folds are an upper bound for some operations, a succeeded job scored all of its folds
+            connection.execute("UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, "
+                               "total = CASE WHEN ? = 'succeeded' THEN done ELSE total END WHERE id = ?",
+                               (status, json.dumps(result) if result is not None else None, error, now, status, job_id))
+
+    def fail_worker_jobs(self, pid: int, error: str):
+
+        """
+        Fail the queued and running jobs of a worker
+
+        Args:
+            pid (int): Process id of the worker
+            error (str): Error recorded on the jobs
+        """
+
+        now = datetime.now(timezone.utc).isoformat()
+
+        with _connect(self.path) as connection:
+            connection.execute(f"UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE pid = ? AND status IN {ACTIVE_STATUSES}",
+                               (error, now, pid))
+
+    def _reap(self):
+
+        # Fail the jobs of workers that exited and delete the finished jobs past the retention period
+        with _connect(self.path) as connection:
+            pids = [row[0] for row in connection.execute(f"SELECT DISTINCT pid FROM jobs WHERE status IN {ACTIVE_STATUSES}")]
+
+        for pid in pids:
+            if not _process_alive(pid):
+                self.fail_worker_jobs(pid, "The worker running the job exited")
+
+        cutoff = (datetime.now(timezone.utc) - timedelta(hours=JOB_RETENTION_HOURS)).isoformat()
+
+        with _connect(self.path) as connection:
+            connection.execute(f"DELETE FROM jobs WHERE status NOT IN {ACTIVE_STATUSES} AND finished_at < ?", (cutoff,))
+
+    @staticmethod
+    def _job(row: sqlite3.Row, with_result: bool = True) -> dict:
+
+        job = {
+            "jobId": row["id"],
+            "kind": row["kind"],
+            "config": json.loads(row["config"]),
+            "status": row["status"],
+            "cancelRequested": bool(row["cancel_requested"]),
+            "progress": {"done": row["done"], "total": row["total"], "unit": "folds"},
+            "error": row["error"],
+            "createdAt": row["created_at"],
+            "startedAt": row["started_at"],
+            "finishedAt": row["finished_at"]
+        }
+        if with_result:
+            job["result"] = json.loads(row["result"]) if row["result"] is not None else None
+
+        return job
+
+
+def _process_alive(pid: int) -> bool:
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # Alive, owned by another user
+    return True
+
+
+class JobRunner:
+
+    """
+    Runs the jobs submitted to this worker as tasks of its event loop, JOB_WORKERS at a time
+    """
+
+    def __init__(self, store: JobStore, workers: int):
+
+        self.store = store
+        self.workers = workers
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._tasks = set()
+
+    async def submit(self,
+                     username: str,
+                     kind: str,
+                     config: dict,
+                     work: Callable[[JobProgress], Awaitable[dict]]
+                     ) -> dict:
+
+        """
+        Queue a job and start it once a slot is free
+
+        Args:
+            username (str): Owner of the job
+            kind (str): "engineering", "selection" or "pipeline"
+            config (dict): Operation configuration
+            work (Callable[[JobProgress], Awaitable[dict]]): Runs the operation, reports to the progress and returns the dataframe information
+
+        Returns:
+            dict: The queued job
+
+        Raises:
+            HTTPException: Too many requests if the user has too many queued and running jobs
+        """
+
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+
+        # The store writes to SQLite, off the event loop
+        job = await asyncio.to_thread(self.store.create, username, kind, config)
+        logger.info(f"Queued {kind} job {job['jobId']} of {username}")
+
+        task = asyncio.create_task(self._run(job["jobId"], work))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+        return job
+
+    async def _run(self, job_id: str, work: Callable[[JobProgress], Awaitable[dict]]):
+
+        async with self._slots:
+            if not await asyncio.to_thread(self.store.start, job_id):
+                await asyncio.to_thread(self.store.finish, job_id, "cancelled")
+                return
+
+            logger.info(f"Started job {job_id}")
+
+            try:
+                result = await work(JobProgress(job_id, self.store.path))
+            except JobCancelled:
+                logger.info(f"Cancelled job {job_id}")
+                await asyncio.to_thread(self.store.finish, job_id, "cancelled")
+            except HTTPException as http_exc:
+                logger.error(f"Job {job_id} failed: {http_exc.detail}")
+                await asyncio.to_thread(self.store.finish, job_id, "failed", error=str(http_exc.detail))
+            except Exception as e:
+                logger.error(f"Job {job_id} failed: {str(e)}")
+                await asyncio.to_thread(self.store.finish, job_id, "failed", error=str(e))
+            else:
+                logger.info(f"Finished job {job_id}")
+                await asyncio.to_thread(self.store.finish, job_id, "succeeded", result=result)
+
+    def shutdown(self):
+
+        """
+        Fail the queued and running jobs of this worker on application shutdown
+        """
+
+        logger.info("Failing the unfinished jobs of this worker")
+        self.store.fail_worker_jobs(os.getpid(), "The server shut down while the job ran")
+
+
+job_store = JobStore(JOB_STORE_PATH)
+job_runner = JobRunner(job_store, JOB_WORKERS)
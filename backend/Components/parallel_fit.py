@@ -0,0 +1,186 @@
+# parallel_fit.py - Code module to fit feature_engine transformers on column partitions across a process pool
+
+import os
+import threading
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, List
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from sklearn.base import clone
+
+from feature_engine.imputation import MeanMedianImputer, EndTailImputer, CategoricalImputer
+from feature_engine.encoding import OneHotEncoder, OrdinalEncoder, CountFrequencyEncoder, MeanEncoder
+from feature_engine.discretisation import (EqualFrequencyDiscretiser, EqualWidthDiscretiser,
+                                           GeometricWidthDiscretiser, DecisionTreeDiscretiser)
+from feature_engine.outliers import Winsorizer
+from feature_engine.transformation import (LogTransformer, LogCpTransformer, ReciprocalTransformer,
+                                           PowerTransformer, BoxCoxTransformer, YeoJohnsonTransformer)
+from feature_engine.scaling import MeanNormalizationScaler
+
+from Components.Logger import logger
+
+load_dotenv()
+
+# Processes fitting column partitions, 1 fits every transformer in the request worker
+FIT_WORKERS = int(os.getenv("FIT_WORKERS", "1"))
+
+# Fewer selected columns are fitted in the request worker, the partitions would not pay for the process round trip
+FIT_PARALLEL_MIN_COLUMNS = int(os.getenv("FIT_PARALLEL_MIN_COLUMNS", "8"))
+
+# Transformers that learn each variable on its own, their fitted state is a per-variable dict.
+# RandomSampleImputer keeps the training frame and is always fitted in one piece.
+PARTITIONABLE_TRANSFORMERS = (
+    MeanMedianImputer, EndTailImputer, CategoricalImputer,
+    OneHotEncoder, OrdinalEncoder, CountFrequencyEncoder, MeanEncoder,
+    EqualFrequencyDiscretiser, EqualWidthDiscretiser, GeometricWidthDiscretiser, DecisionTreeDiscretiser,
+    Winsorizer,
+    LogTransformer, LogCpTransformer, ReciprocalTransformer, PowerTransformer, BoxCoxTransformer, YeoJohnsonTransformer,
+    MeanNormalizationScaler
+)
+
+_fit_pool: Optional[ProcessPoolExecutor] = None
+_fit_pool_lock = threading.Lock()
+
+
+def get_fit_pool() -> ProcessPoolExecutor:
+
+    """
+    Get the app-lifetime process pool of column partition fits, creating it on first use
+
+    Returns:
+        ProcessPoolExecutor: Pool of FIT_WORKERS processes
+    """
+
+    global _fit_pool
+
+    with _fit_pool_lock:
+        if _fit_pool is None:
+            # Forking a process that runs the event loop and its threads is unsafe, the workers are spawned
+            _fit_pool = ProcessPoolExecutor(max_workers=FIT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+    return _fit_pool
+
+
+def close_fit_pool():
+
+    """
+    Shut the process pool down on application shutdown
+    """
+
+    global _fit_pool
+
+    with _fit_pool_lock:
+        if _fit_pool is not None:
+            logger.info("Closing the column partition fit pool")
+            _fit_pool.shutdown(wait=False, cancel_futures=True)
+            _fit_pool = None
+
+
+def _fit_partition(transformer, X_partition: pd.DataFrame, y_train: Optional[pd.Series]):
+
+    # Runs in a pool process, the fitted transformer is pickled back
+    return transformer.fit(X_partition, y_train)
+
+
+def _merge_partitions(transformer, fitted_partitions: list, columns: List[str]):
+
+    # Combine the per-variable state of the partition fits into one transformer over all the columns
+    merged = clone(transformer)
+
+    for name in vars(fitted_partitions[0]):
+        if not name.endswith("_") or name.startswith("_") or name in ("feature_names_in_", "n_features_in_", "variables_"):
+            continue
+
+        values = [getattr(partition, name) for partition in fitted_partitions]
+
+        if isinstance(values[0], dict):
+            merged_value = {}
+            for value in values:
+                merged_value.update(value)
+        elif isinstance(values[0], list):
+            merged_value = [item for value in values for item in value]
+        elif all(np.isscalar(value) and value == values[0] for value in values):
+            merged_value = values[0]
+        else:
+            raise ValueError(f"{type(transformer).__name__}.{name} can not be merged across column partitions")
+
+        setattr(merged, name, merged_value)
+
+    merged.variables_ = [variable for partition in fitted_partitions for variable in partition.variables_]
+    merged.feature_names_in_ = list(columns)
+    merged.n_features_in_ = len(columns)
+
+    return merged
+
+
+def fit_in_partitions(transformer,
+                      X_train: pd.DataFrame,
+                      y_train: Optional[pd.Series],
+                      executor: Executor,
+                      partitions: int):
+
+    """
+    Fit a transformer on column partitions of the training set in an executor and merge the fitted parameters
+
+    Args:
+        transformer: Unfitted feature_engine transformer whose variables are the columns of the training set
+        X_train (pd.DataFrame): The training set
+        y_train (Optional[pd.Series]): The training target of supervised transformers
+        executor (Executor): Executor running the partition fits
+        partitions (int): Number of column partitions
+
+    Returns:
+        The fitted transformer, equal to fitting it on the whole training set
+
+    Raises:
+        ValueError: If the fitted state of the transformer is not per variable
+    """
+
+    columns = X_train.columns.tolist()
+    column_groups = [group.tolist() for group in np.array_split(np.array(columns, dtype=object), min(partitions, len(columns)))]
+
+    futures = [executor.submit(_fit_partition, clone(transformer).set_params(variables=group), X_train[group], y_train)
+               for group in column_groups]
+    fitted_partitions = [future.result() for future in futures]
+
+    return _merge_partitions(transformer, fitted_partitions, columns)
+
+
+def fit_columns(transformer,
+                X_train: pd.DataFrame,
+                y_train: Optional[pd.Series] = None):
+
+    """
+    Fit a transformer, across the process pool when it is wide enough and learns each variable on its own
+
+    Args:
+        transformer: Unfitted feature_engine transformer
+        X_train (pd.DataFrame): The training set
+        y_train (Optional[pd.Series]): The training target of supervised transformers
+
+    Returns:
+        The fitted transformer
+    """
+
+    variables = transformer.get_params().get("variables")
+
+    if (FIT_WORKERS <= 1
+            or not isinstance(transformer, PARTITIONABLE_TRANSFORMERS)
+            or not isinstance(variables, list)
+            or variables != X_train.columns.tolist()
+            or len(variables) < FIT_PARALLEL_MIN_COLUMNS):
+        return transformer.fit(X_train, y_train)
+
+    logger.info(f"Fitting {type(transformer).__name__} on {len(variables)} columns across {FIT_WORKERS} processes")
+
+    try:
+        return fit_in_partitions(transformer, X_train, y_train, get_fit_pool(), FIT_WORKERS)
+    except BrokenProcessPool as e:
+        # A pool process died, e.g. out of memory, the next wide fit starts a new pool
+        logger.warning(f"Column partition fit pool broke, fitting {type(transformer).__name__} in one piece: {str(e)}")
+        close_fit_pool()
+        return transformer.fit(X_train, y_train)
@@ -0,0 +1,192 @@
+# recursive_elimination.py - Code module to eliminate features recursively in fractions with early stopping
+
+import os
+import time
+from typing import Optional, List
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from sklearn.base import BaseEstimator, clone
+from sklearn.metrics import roc_auc_score
+
+from Components.Logger import logger
+from Components.jobs import JobProgress
+from Components.selection_estimators import make_estimator
+
+load_dotenv()
+
+# Share of the remaining features eliminated per round, at least one
+RFE_DROP_FRACTION = float(os.getenv("RFE_DROP_FRACTION", "0.2"))
+
+# Rounds not improving on the best score by more than the tolerance before the elimination stops
+RFE_PATIENCE = int(os.getenv("RFE_PATIENCE", "2"))
+
+# Change of the out-of-bag ROC AUC below which a round stops adding trees to its forest
+RFE_TREE_TOLERANCE = float(os.getenv("RFE_TREE_TOLERANCE", "0.005"))
+
+# Estimators the elimination can grow: a warm-started forest with out-of-bag scores and impurity importances
+STEP_RFE_ESTIMATORS = ("random_forest",)
+
+# Trees added to the warm-started forest of a round at a time, until its score settles
+TREE_STEP = 25
+
+
+def elimination_rounds(features: int, drop_fraction: float) -> int:
+
+    """
+    Get the number of rounds eliminating down to one feature takes, the most rounds an elimination runs
+
+    Args:
+        features (int): Number of features
+        drop_fraction (float): Share of the remaining features eliminated per round
+
+    Returns:
+        int: Number of rounds
+    """
+
+    rounds = 1
+    while features > 1:
+        features -= min(features - 1, max(1, int(features * drop_fraction)))
+        rounds += 1
+
+    return rounds
+
+
+class StepRecursiveFeatureElimination(BaseEstimator):
+
+    """
+    Recursive feature elimination dropping a fraction of the features per round and stopping once the score plateaus
+
+    Every round grows a warm-started random forest on the remaining features, TREE_STEP trees at a time, until its
+    out-of-bag ROC AUC moves by less than the tree tolerance, then eliminates the least important features by
+    impurity importance. A round is one forest, often a fraction of its trees, instead of one cross-validation per
+    feature. The elimination stops after patience rounds that do not improve on the best score by more than the
+    tolerance, and the selected features are the smallest set scoring within the tolerance of the best score.
+    Without an estimator the rounds grow the random forest make_estimator builds. Follows the feature_engine
+    selector API: variables, variables_, features_to_drop_.
+    """
+
+    def __init__(self,
+                 estimator=None,
+                 variables: Optional[List[str]] = None,
+                 drop_fraction: float = RFE_DROP_FRACTION,
+                 tolerance: float = 0.01,
+                 patience: int = RFE_PATIENCE,
+                 tree_tolerance: float = RFE_TREE_TOLERANCE,
+                 progress: Optional[JobProgress] = None
+                 ):
+
+        self.estimator = estimator
+        self.variables = variables
+        self.drop_fraction = drop_fraction
+        self.tolerance = tolerance
+        self.patience = patience
+        self.tree_tolerance = tree_tolerance
+        self.progress = progress
+
+    def _score_round(self, X: pd.DataFrame, y: pd.Series, features: List[str]):
+
+        # Trees beyond the ones that pin the score down to the tree tolerance only cost time
+        forest = clone(self.estimator_).set_params(warm_start=True, oob_score=True, n_estimators=0)
+        max_trees = self.estimator_.get_params()["n_estimators"]
+        score = None
+
+        while forest.n_estimators < max_trees:
+            forest.set_params(n_estimators=min(forest.n_estimators + TREE_STEP, max_trees))
+            forest.fit(X[features], y)
+
+            previous, score = score, self._oob_roc_auc(forest, y)
+            if previous is not None and abs(score - previous) < self.tree_tolerance:
+                break
+
+        return score, dict(zip(features, forest.feature_importances_)), forest.n_estimators
+
+    @staticmethod
+    def _oob_roc_auc(forest, y: pd.Series) -> float:
+
+        # Rows that were in the bootstrap sample of every tree have no out-of-bag prediction
+        probabilities = forest.oob_decision_function_
+        scored = ~np.isnan(probabilities).any(axis=1)
+
+        if probabilities.shape[1] == 2:
+            return float(roc_auc_score(y[scored], probabilities[scored, 1]))
+
+        return float(roc_auc_score(y[scored], probabilities[scored], multi_class="ovr", labels=forest.classes_))
+
+    def fit(self, X: pd.DataFrame, y: pd.Series):
+
+        """
+        Eliminate features until one is left or the score did not improve on the best score for patience rounds
+
+        Args:
+            X (pd.DataFrame): Training rows
+            y (pd.Series): Classification target
+
+        Returns:
+            StepRecursiveFeatureElimination: The fitted selector, with the rounds in rounds_, numbered from 1
+
+        Raises:
+            ValueError: If the drop fraction is not in (0, 1) or there are fewer than 2 variables
+        """
+
+        if not 0 < self.drop_fraction < 1:
+            raise ValueError(f"drop_fraction must be between 0 and 1, got {self.drop_fraction}")
+
+        self.variables_ = list(self.variables if self.variables is not None else X.select_dtypes(include="number").columns)
+        if len(self.variables_) < 2:
+            raise ValueError("The selector needs at least 2 variables")
+
+        self.estimator_ = self.estimator if self.estimator is not None else make_estimator("random_forest", random_state=0)
+
+        y = pd.Series(np.asarray(y))
+        X = X.reset_index(drop=True)
+
+        features = list(self.variables_)
+        feature_sets, scores = [], []
+        self.rounds_ = []
+        self.feature_importances_ = {}
+        best_score, rounds_without_improvement = -np.inf, 0
+
+        while True:
+            round_number = len(self.rounds_) + 1
+            start = time.perf_counter()
+            score, importances, trees = self._score_round(X, y, features)
+            self.feature_importances_.update(importances)
+            feature_sets.append(features)
+            scores.append(score)
+
+            # A plateau ends the elimination as well as a decline, only a gain above the tolerance counts
+            rounds_without_improvement = 0 if score > best_score + self.tolerance else rounds_without_improvement + 1
+            best_score = max(best_score, score)
+            stop = len(features) == 1 or rounds_without_improvement >= self.patience
+
+            # The least important features, least important first
+            ranked = sorted(features, key=lambda feature: importances[feature])
+            eliminated = [] if stop else ranked[:min(len(features) - 1, max(1, int(len(features) * self.drop_fraction)))]
+
+            self.rounds_.append({
+                "round": round_number,
+                "features": len(features),
+                "score": round(score, 6),
+                "trees": trees,
+                "eliminated": eliminated,
+                "elapsedMs": round((time.perf_counter() - start) * 1000, 1)
+            })
+            logger.info(f"Elimination round {round_number}: {len(features)} features, ROC AUC {score:.4f}, {trees} trees")
+
+            if self.progress is not None:
+                self.progress.advance()
+
+            if stop:
+                break
+
+            features = [feature for feature in features if feature not in eliminated]
+
+        # The smallest feature set of a round scoring within the tolerance of the best round
+        selected = [feature_set for feature_set, score in zip(feature_sets, scores) if score >= best_score - self.tolerance][-1]
+
+        self.best_score_ = best_score
+        self.features_to_drop_ = [feature for feature in self.variables_ if feature not in selected]
+
+        return self
@@ -0,0 +1,190 @@
+# row_browser.py - Code module to serve filtered, sorted pages of a dataset
+
+import threading
+from collections import OrderedDict
+from typing import Optional, List, Literal
+
+import numpy as np
+import pandas as pd
+
+from Components.dataset_io import json_columns
+
+FilterOperator = Literal["eq", "ne", "gt", "ge", "lt", "le", "contains", "isnull", "notnull"]
+
+# Largest page served by /datacleaner/rows
+MAX_PAGE_ROWS = 1000
+
+# Row orders kept for scrolling through the same sorted/filtered view
+ROW_ORDER_CACHE_ENTRIES = 16
+
+
+class RowOrderCache:
+
+    """
+    LRU cache of the row positions of a sorted/filtered view, keyed by file URL, content version and query
+    """
+
+    def __init__(self, max_entries: int):
+
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (file_url, version, query) -> positions
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[np.ndarray]:
+
+        with self._lock:
+            positions = self._entries.get(key)
+            if positions is not None:
+                self._entries.move_to_end(key)
+            return positions
+
+    def put(self, key: tuple, positions: np.ndarray):
+
+        with self._lock:
+            self._entries[key] = positions
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+row_order_cache = RowOrderCache(max_entries=ROW_ORDER_CACHE_ENTRIES)
+
+
+def _filter_value(column: pd.Series, value: str):
+
+    # Query parameters arrive as text, compare them as the column's own type
+    if pd.api.types.is_bool_dtype(column):
+        return value.strip().lower() in ("true", "1", "yes")
+    if pd.api.types.is_numeric_dtype(column):
+        return float(value)
+    if pd.api.types.is_datetime64_any_dtype(column):
+        return pd.Timestamp(value)
+    return value
+
+
+def filter_mask(dataset: pd.DataFrame,
+                column: str,
+                operator: FilterOperator,
+                value: Optional[str] = None
+                ) -> np.ndarray:
+
+    """
+    Evaluate a single-column filter over a dataset
+
+    Args:
+        dataset (pd.DataFrame): Dataset to filter
+        column (str): Column the filter applies to
+        operator (FilterOperator): Comparison operator
+        value (Optional[str]): Value to compare with, not needed by isnull/notnull
+
+    Returns:
+        np.ndarray: Boolean mask of the matching rows
+
+    Raises:
+        ValueError: If the column does not exist or the value does not fit the column type
+    """
+
+    if column not in dataset.columns:
+        raise ValueError(f"Filter column '{column}' is not in the dataset")
+
+    series = dataset[column]
+
+    if operator == "isnull":
+        return series.isna().to_numpy()
+    if operator == "notnull":
+        return series.notna().to_numpy()
+
+    if value is None:
+        raise ValueError(f"Filter operator '{operator}' needs a value")
+
+    if operator == "contains":
+        mask = series.astype(str).str.contains(value, case=False, regex=False)
+    else:
+        comparisons = {"eq": series.eq, "ne": series.ne, "gt": series.gt,
+                       "ge": series.ge, "lt": series.lt, "le": series.le}
+        mask = comparisons[operator](_filter_value(series, value))
+
+    return mask.fillna(False).to_numpy(dtype=bool)
+
+
+def row_order(dataset: pd.DataFrame,
+              sort_by: Optional[str] = None,
+              descending: bool = False,
+              filter_column: Optional[str] = None,
+              filter_operator: Optional[FilterOperator] = None,
+              filter_value: Optional[str] = None
+              ) -> Optional[np.ndarray]:
+
+    """
+    Compute the row positions of a sorted and/or filtered view of a dataset
+
+    Args:
+        dataset (pd.DataFrame): Dataset to browse
+        sort_by (Optional[str]): Column to sort by, missing values last
+        descending (bool): Sort in descending order
+        filter_column (Optional[str]): Column of the filter, no filter if None
+        filter_operator (Optional[FilterOperator]): Comparison operator of the filter
+        filter_value (Optional[str]): Value of the filter
+
+    Returns:
+        Optional[np.ndarray]: Row positions of the view, None when the view is the dataset itself
+
+    Raises:
+        ValueError: If a column does not exist or the filter value does not fit the column type
+    """
+
+    positions = None
+
+    if filter_column:
+        positions = np.flatnonzero(filter_mask(dataset, filter_column, filter_operator or "eq", filter_value))
+
+    if sort_by:
+        if sort_by not in dataset.columns:
+            raise ValueError(f"Sort column '{sort_by}' is not in the dataset")
+
+        series = dataset[sort_by] if positions is None else dataset[sort_by].iloc[positions]
+        # Stable sort keeps the file order among equal values
+        order = series.reset_index(drop=True).sort_values(ascending=not descending, na_position="last",
+                                                           kind="stable").index.to_numpy()
+        positions = order if positions is None else positions[order]
+
+    return positions
+
+
+def row_page(dataset: pd.DataFrame,
+             positions: Optional[np.ndarray],
+             offset: int,
+             limit: int,
+             columns: Optional[List[str]] = None
+             ) -> dict:
+
+    """
+    Slice one page out of a dataset view and convert it to columnar JSON
+
+    Args:
+        dataset (pd.DataFrame): Dataset to browse
+        positions (Optional[np.ndarray]): Row positions of the view, the whole dataset if None
+        offset (int): First row of the page within the view
+        limit (int): Number of rows in the page
+        columns (Optional[List[str]]): Columns in the page, all columns if None
+
+    Returns:
+        dict: Page columns, values per column, the file row number of every page row and the size of the view
+    """
+
+    total_rows = len(dataset) if positions is None else len(positions)
+    page_positions = np.arange(offset, min(offset + limit, total_rows)) if positions is None \
+        else positions[offset:offset + limit]
+
+    page = dataset.iloc[page_positions]
+    if columns:
+        page = page[columns]
+
+    return {
+        "columns": [str(column) for column in page.columns],
+        "data": {str(column): values for column, values in json_columns(page).items()},
+        "rowNumbers": page_positions.tolist(),
+        "offset": offset,
+        "limit": limit,
+        "totalRows": total_rows
+    }
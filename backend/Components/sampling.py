@@ -0,0 +1,100 @@
+# sampling.py - Code module to sample dataset rows before handing them to LIDA
+
+import os
+from typing import Optional, Literal, Tuple
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from pydantic import BaseModel, Field, model_validator
+
+from Components.Logger import logger
+
+load_dotenv()
+
+# Rows handed to LIDA for summaries and visualizations unless the request asks otherwise
+DEFAULT_SAMPLE_ROWS = int(os.getenv("DEFAULT_SAMPLE_ROWS", "100000"))
+
+
+class SamplingPolicy(BaseModel):
+
+    """
+    Pydantic model for the row sampling policy of a summarization or visualization request
+    """
+
+    method: Literal["reservoir", "stratified", "head", "full"] = Field("reservoir", description="Sampling method, 'full' uses every row")
+    size: int = Field(DEFAULT_SAMPLE_ROWS, gt=0, description="Number of rows in the sample")
+    column: Optional[str] = Field(None, description="Column to stratify by, required by the 'stratified' method")
+    seed: int = Field(42, description="Seed of the random methods, the same seed gives the same sample")
+
+    @model_validator(mode="after")
+    def check_column(self):
+
+        if self.method == "stratified" and not self.column:
+            raise ValueError("The 'stratified' sampling method needs a column")
+        return self
+
+
+def _stratified_positions(strata: pd.Series, size: int, rng: np.random.Generator) -> np.ndarray:
+
+    # Proportional allocation, keeping at least one row of every stratum
+    fraction = size / len(strata)
+    positions = []
+
+    for group_positions in strata.groupby(strata, observed=True, dropna=False, sort=False).indices.values():
+        count = min(len(group_positions), max(1, round(len(group_positions) * fraction)))
+        positions.append(rng.choice(group_positions, size=count, replace=False))
+
+    return np.concatenate(positions)
+
+
+def sample_dataset(dataset: pd.DataFrame,
+                   sampling: Optional[SamplingPolicy] = None
+                   ) -> Tuple[pd.DataFrame, dict]:
+
+    """
+    Sample the rows of a dataset according to a sampling policy
+
+    Args:
+        dataset (pd.DataFrame): Dataset to sample
+        sampling (Optional[SamplingPolicy]): Sampling policy, the default policy if None
+
+    Returns:
+        Tuple[pd.DataFrame, dict]: Sampled rows in their original order, and a description of the sample
+
+    Raises:
+        ValueError: If the stratification column does not exist
+    """
+
+    sampling = sampling or SamplingPolicy()
+    total_rows = len(dataset)
+
+    sample_info = {"method": sampling.method, "rows": total_rows, "totalRows": total_rows, "sampled": False}
+
+    if sampling.method == "full" or total_rows <= sampling.size:
+        return dataset, sample_info
+
+    rng = np.random.default_rng(sampling.seed)
+
+    if sampling.method == "head":
+        sample = dataset.head(sampling.size)
+
+    elif sampling.method == "stratified":
+        if sampling.column not in dataset.columns:
+            raise ValueError(f"Stratification column '{sampling.column}' is not in the dataset")
+
+        positions = _stratified_positions(dataset[sampling.column], sampling.size, rng)
+        sample = dataset.iloc[np.sort(positions)]
+        sample_info.update({"column": sampling.column, "seed": sampling.seed})
+
+    else:
+        # A uniform sample without replacement, the distribution reservoir sampling draws from a stream
+        positions = rng.choice(total_rows, size=sampling.size, replace=False)
+        sample = dataset.iloc[np.sort(positions)]
+        sample_info["seed"] = sampling.seed
+
+    sample_info.update({"rows": len(sample), "sampled": True})
+
+    logger.info(f"Sampled {len(sample)} of {total_rows} rows with the '{sampling.method}' method")
+
+    return sample, sample_info
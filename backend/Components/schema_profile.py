@@ -0,0 +1,325 @@
+# schema_profile.py - Code module to profile dataset columns once and load them with compact dtypes
+
+import warnings
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# String columns with at most this many distinct values, and at most this share of distinct
+# values per row, are loaded as category
+CATEGORY_MAX_UNIQUE = 10000
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+
+# Values of a string column parsed before the whole column is tried as datetime
+DATETIME_SAMPLE_SIZE = 1000
+
+# Integer columns are downcast to int32 at the smallest and stay signed: narrower and unsigned integers wrap
+# around silently on arithmetic (int8 127 + 1 is -128, uint8 0 - 1 is 255), so engineered features built
+# from them could be wrong. The values of an integer column always fit its profiled dtype
+INTEGER_DTYPES = [np.int32, np.int64]
+
+
+def _smallest_integer_dtype(minimum: int, maximum: int) -> Optional[str]:
+
+    for dtype in INTEGER_DTYPES:
+        info = np.iinfo(dtype)
+        if info.min <= minimum and maximum <= info.max:
+            return np.dtype(dtype).name
+
+    return None
+
+
+def _parses_as_datetime(values: pd.Series) -> bool:
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        parsed = pd.to_datetime(values, errors="coerce")
+
+    return parsed.notna().sum() == values.notna().sum() and pd.to_numeric(values, errors="coerce").isna().all()
+
+
+def _profile_column(column: pd.Series) -> dict:
+
+    profile = {"name": column.name, "sourceDtype": str(column.dtype), "dtype": str(column.dtype)}
+    non_null_count = int(column.notna().sum())
+
+    if pd.api.types.is_bool_dtype(column) or non_null_count == 0:
+        return profile
+
+    if pd.api.types.is_integer_dtype(column):
+        minimum, maximum = int(column.min()), int(column.max())
+        profile.update({"dtype": _smallest_integer_dtype(minimum, maximum) or str(column.dtype), "min": minimum, "max": maximum})
+
+    elif pd.api.types.is_float_dtype(column):
+        # float32 only when it represents every value exactly
+        as_float32 = column.astype(np.float32)
+        if np.array_equal(as_float32.astype(column.dtype).to_numpy(), column.to_numpy(), equal_nan=True):
+            profile["dtype"] = "float32"
+
+    elif pd.api.types.is_object_dtype(column) or pd.api.types.is_string_dtype(column):
+        # Datetime columns are strings that all parse as dates and are not plain numbers, a sample
+        # rules out most text columns before the whole column is parsed
+        if _parses_as_datetime(column.dropna().head(DATETIME_SAMPLE_SIZE)) and _parses_as_datetime(column):
+            profile["dtype"] = "datetime"
+        else:
+            unique_count = int(column.nunique(dropna=True))
+            profile["unique"] = unique_count
+            if unique_count <= CATEGORY_MAX_UNIQUE and unique_count <= CATEGORY_MAX_UNIQUE_RATIO * non_null_count:
+                profile["dtype"] = "category"
+
+    return profile
+
+
+def apply_schema_profile(dataset: pd.DataFrame, schema_profile: Optional[dict]) -> pd.DataFrame:
+
+    """
+    Convert the columns of a dataset to the dtypes of its schema profile
+
+    Args:
+        dataset (pd.DataFrame): Dataset read with default dtypes
+        schema_profile (Optional[dict]): Schema profile of the dataset, the dataset is returned unchanged if None
+
+    Returns:
+        pd.DataFrame: Dataset with compact dtypes
+    """
+
+    if not schema_profile:
+        return dataset
+
+    converted = {}
+    for column_profile in schema_profile["columns"]:
+        name, dtype = column_profile["name"], column_profile["dtype"]
+
+        if name not in dataset.columns or dtype == str(dataset[name].dtype):
+            continue
+
+        if dtype == "datetime":
+            if pd.api.types.is_datetime64_any_dtype(dataset[name]):
+                continue
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                converted[name] = pd.to_datetime(dataset[name], errors="coerce")
+        else:
+            converted[name] = dataset[name].astype(dtype)
+
+    return dataset.assign(**converted) if converted else dataset
+
+
+def build_schema_profile(dataset: pd.DataFrame) -> dict:
+
+    """
+    Profile the columns of a freshly uploaded dataset
+
+    Args:
+        dataset (pd.DataFrame): Dataset read with default dtypes
+
+    Returns:
+        dict: Per-column dtypes, integer ranges and distinct counts, plus the memory used before
+        and after applying the profile
+    """
+
+    schema_profile = {"columns": [_profile_column(dataset[name]) for name in dataset.columns]}
+
+    memory_default = int(dataset.memory_usage(index=True, deep=True).sum())
+    memory_optimized = int(apply_schema_profile(dataset, schema_profile).memory_usage(index=True, deep=True).sum())
+
+    schema_profile.update({
+        "memoryDefaultBytes": memory_default,
+        "memoryOptimizedBytes": memory_optimized,
+        "memorySavedBytes": memory_default - memory_optimized
+    })
+
+    return schema_profile
+
+
+class SchemaProfiler:
+
+    """
+    Profile a dataset read in row chunks, giving the profile build_schema_profile gives for the whole dataset
+
+    A first pass over the chunks accumulates the integer ranges, float32 exactness, datetime parsing and the
+    distinct values of every column, a second pass converts the chunks to the profiled dtypes. A column whose
+    chunks have different dtypes gets the dtype pandas gives the whole column: float64 for integers with
+    missing values in some chunks, object otherwise.
+    """
+
+    def __init__(self):
+
+        self.rows = 0
+        self.memory_default = 0
+        self.memory_optimized = 0
+        self.schema_profile = None
+        self._columns = {}  # column name -> accumulated statistics
+        self._dtypes = {}
+        self._categories = {}
+
+    def update(self, chunk: pd.DataFrame):
+
+        """
+        Accumulate the statistics of a chunk read with default dtypes
+
+        Args:
+            chunk (pd.DataFrame): Next row chunk of the dataset
+        """
+
+        self.rows += len(chunk)
+
+        for name in chunk.columns:
+            column = chunk[name]
+            stats = self._columns.setdefault(name, {"dtypes": set(), "nonNull": 0, "min": None, "max": None,
+                                                    "float32": True, "datetime": True, "hashes": [], "values": set()})
+            stats["dtypes"].add(column.dtype)
+
+            values = column.dropna()
+            stats["nonNull"] += len(values)
+            if len(values) == 0 or pd.api.types.is_bool_dtype(column):
+                continue
+
+            if pd.api.types.is_numeric_dtype(column):
+                stats["min"] = values.min() if stats["min"] is None else min(stats["min"], values.min())
+                stats["max"] = values.max() if stats["max"] is None else max(stats["max"], values.max())
+                if stats["float32"]:
+                    as_float64 = values.to_numpy(dtype=np.float64)
+                    stats["float32"] = np.array_equal(as_float64.astype(np.float32).astype(np.float64), as_float64)
+
+            else:
+                if stats["datetime"]:
+                    stats["datetime"] = _parses_as_datetime(values.head(DATETIME_SAMPLE_SIZE)) and _parses_as_datetime(values)
+
+                # Distinct values are counted by their 64-bit hashes, the values are kept up to CATEGORY_MAX_UNIQUE
+                unique_values = values.unique()
+                stats["hashes"].append(pd.util.hash_array(np.asarray(unique_values, dtype=object)))
+                if stats["values"] is not None:
+                    stats["values"] = stats["values"].union(unique_values) if len(unique_values) <= CATEGORY_MAX_UNIQUE else None
+                    if stats["values"] is not None and len(stats["values"]) > CATEGORY_MAX_UNIQUE:
+                        stats["values"] = None
+
+    def finish(self) -> dict:
+
+        """
+        Build the column profiles from the accumulated statistics, after update saw every chunk
+
+        Returns:
+            dict: Schema profile without the memory figures, which convert accumulates
+        """
+
+        columns = []
+        for name, stats in self._columns.items():
+            dtypes = stats["dtypes"]
+            if len(dtypes) == 1:
+                dtype = next(iter(dtypes))
+            elif all(pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype) for dtype in dtypes):
+                dtype = np.dtype("float64")
+            else:
+                dtype = np.dtype("object")
+            self._dtypes[name] = dtype
+
+            profile = {"name": name, "sourceDtype": str(dtype), "dtype": str(dtype)}
+
+            if pd.api.types.is_bool_dtype(dtype) or stats["nonNull"] == 0:
+                pass
+
+            elif pd.api.types.is_integer_dtype(dtype):
+                minimum, maximum = int(stats["min"]), int(stats["max"])
+                profile.update({"dtype": _smallest_integer_dtype(minimum, maximum) or str(dtype), "min": minimum, "max": maximum})
+
+            elif pd.api.types.is_float_dtype(dtype):
+                if stats["float32"]:
+                    profile["dtype"] = "float32"
+
+            elif pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+                if stats["datetime"]:
+                    profile["dtype"] = "datetime"
+                else:
+                    hashes = np.sort(np.concatenate(stats["hashes"]))
+                    unique_count = int(len(hashes) > 0) + int(np.count_nonzero(hashes[1:] != hashes[:-1]))
+                    profile["unique"] = unique_count
+                    if unique_count <= CATEGORY_MAX_UNIQUE and unique_count <= CATEGORY_MAX_UNIQUE_RATIO * stats["nonNull"]:
+                        profile["dtype"] = "category"
+                        try:
+                            categories = sorted(stats["values"])
+                        except TypeError:
+                            categories = list(stats["values"])
+                        # Every chunk gets the categories of the whole column, as astype("category") sorts them
+                        self._categories[name] = pd.CategoricalDtype(categories)
+
+            columns.append(profile)
+
+        self._columns = {}
+        self.schema_profile = {"columns": columns}
+
+        return self.schema_profile
+
+    def convert(self, chunk: pd.DataFrame) -> pd.DataFrame:
+
+        """
+        Convert a chunk read with default dtypes to the profiled dtypes, counting its memory before and after
+
+        Args:
+            chunk (pd.DataFrame): Next row chunk of the dataset
+
+        Returns:
+            pd.DataFrame: Chunk with compact dtypes
+        """
+
+        changed = {name: dtype for name, dtype in self._dtypes.items() if chunk[name].dtype != dtype}
+        chunk = chunk.astype(changed) if changed else chunk
+        self.memory_default += int(chunk.memory_usage(index=False, deep=True).sum())
+
+        converted = apply_schema_profile(chunk.drop(columns=list(self._categories)), self.schema_profile)
+        converted = converted.assign(**{name: chunk[name].astype(dtype) for name, dtype in self._categories.items()})[chunk.columns]
+
+        # The categories are held once for the whole column, not once per chunk
+        self.memory_optimized += int(converted.memory_usage(index=False, deep=True).sum())
+        self.memory_optimized -= sum(int(dtype.categories.memory_usage(deep=True)) for dtype in self._categories.values())
+
+        return converted
+
+    def result(self) -> dict:
+
+        """
+        Get the schema profile with the memory figures, after convert saw every chunk
+
+        Returns:
+            dict: Schema profile, as build_schema_profile gives it for the whole dataset
+        """
+
+        index_bytes = int(pd.RangeIndex(self.rows).memory_usage())
+        category_bytes = sum(int(dtype.categories.memory_usage(deep=True)) for dtype in self._categories.values())
+        memory_default = self.memory_default + index_bytes
+        memory_optimized = self.memory_optimized + category_bytes + index_bytes
+
+        self.schema_profile.update({
+            "memoryDefaultBytes": memory_default,
+            "memoryOptimizedBytes": memory_optimized,
+            "memorySavedBytes": memory_default - memory_optimized
+        })
+
+        return self.schema_profile
+
+
+def read_options(schema_profile: Optional[dict]) -> dict:
+
+    """
+    Translate a schema profile into pandas reader options
+
+    Args:
+        schema_profile (Optional[dict]): Schema profile of the dataset
+
+    Returns:
+        dict: dtype and parse_dates keyword arguments for pd.read_csv / pd.read_excel
+    """
+
+    if not schema_profile:
+        return {}
+
+    dtypes = {}
+    parse_dates = []
+    for column_profile in schema_profile["columns"]:
+        if column_profile["dtype"] == "datetime":
+            parse_dates.append(column_profile["name"])
+        elif column_profile["dtype"] != column_profile["sourceDtype"]:
+            dtypes[column_profile["name"]] = column_profile["dtype"]
+
+    return {"dtype": dtypes, "parse_dates": parse_dates}
@@ -0,0 +1,154 @@
+# selection_estimators.py - Code module to build the estimators of the model-based feature selectors and fit them on a row budget
+
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from threadpoolctl import threadpool_limits
+from sklearn.ensemble import RandomForestClassifier, HistGradientBoostingClassifier
+from sklearn.model_selection import train_test_split
+
+from Components.Logger import logger
+
+load_dotenv()
+
+# Cores the estimators train on, 0 uses every core available to the process
+SELECTION_N_JOBS = int(os.getenv("SELECTION_N_JOBS", "0"))
+
+# Rows the selectors are fitted on, a stratified sample of larger datasets, 0 fits on every row
+SELECTION_MAX_ROWS = int(os.getenv("SELECTION_MAX_ROWS", "100000"))
+
+# Estimator of the selectors unless a request picks one: "random_forest" or "hist_gradient_boosting"
+SELECTION_ESTIMATOR = os.getenv("SELECTION_ESTIMATOR", "random_forest").lower()
+
+ESTIMATORS = ("random_forest", "hist_gradient_boosting")
+
+# Seed of the row sample
+SAMPLE_SEED = 0
+
+
+def selection_n_jobs() -> int:
+
+    """
+    Get the number of cores the estimators train on
+
+    Returns:
+        int: SELECTION_N_JOBS, or the cores available to the process (respecting CPU quotas) if it is 0
+    """
+
+    if SELECTION_N_JOBS > 0:
+        return SELECTION_N_JOBS
+
+    return joblib.cpu_count()
+
+
+def make_estimator(estimator: str,
+                   random_state: int,
+                   n_estimators: int = 100
+                   ):
+
+    """
+    Build the classifier of a model-based selector
+
+    Args:
+        estimator (str): "random_forest" or "hist_gradient_boosting"
+        random_state (int): Seed of the classifier
+        n_estimators (int): Trees of the random forest, the gradient boosting always runs its default iterations
+
+    Returns:
+        The unfitted classifier
+
+    Raises:
+        ValueError: If the estimator is unknown
+    """
+
+    if estimator == "random_forest":
+        return RandomForestClassifier(n_estimators=n_estimators, random_state=random_state, n_jobs=selection_n_jobs())
+
+    if estimator == "hist_gradient_boosting":
+        # Bins the features once and trains with OpenMP threads, limited in fit_selector
+        return HistGradientBoostingClassifier(random_state=random_state)
+
+    raise ValueError(f"Unknown selection estimator {estimator}, expected one of {ESTIMATORS}")
+
+
+def stratified_rows(dataset: pd.DataFrame,
+                    target_feature: str,
+                    max_rows: int
+                    ) -> pd.DataFrame:
+
+    """
+    Sample at most max_rows rows keeping the class proportions of the target
+
+    Args:
+        dataset (pd.DataFrame): The dataframe
+        target_feature (str): Classification target
+        max_rows (int): Maximum number of rows, 0 for no limit
+
+    Returns:
+        pd.DataFrame: The sampled rows in dataset order, the dataset itself if it is small enough
+    """
+
+    if max_rows <= 0 or len(dataset) <= max_rows:
+        return dataset
+
+    positions = np.arange(len(dataset))
+
+    try:
+        positions, _ = train_test_split(positions, train_size=max_rows, stratify=dataset[target_feature],
+                                        random_state=SAMPLE_SEED)
+    except ValueError:
+        # Classes with a single row can not be stratified
+        positions = np.random.default_rng(SAMPLE_SEED).choice(positions, size=max_rows, replace=False)
+
+    return dataset.take(np.sort(positions))
+
+
+def fit_selector(selector,
+                 dataset: pd.DataFrame,
+                 target_feature: str,
+                 estimator: str
+                 ) -> dict:
+
+    """
+    Fit a model-based selector on a row sample, its features_to_drop_ apply to the whole dataset
+
+    Args:
+        selector: Unfitted feature_engine selector built with make_estimator
+        dataset (pd.DataFrame): The dataframe
+        target_feature (str): Classification target
+        estimator (str): Name of the selector's estimator, for the report
+
+    Returns:
+        dict: Estimator, cores, fitted rows, wall time and the selected and dropped features
+    """
+
+    if selector.variables is None:
+        # The target is a column of the dataset, it must not be evaluated as a predictor of itself
+        selector.set_params(variables=[column for column in dataset.select_dtypes(include="number").columns
+                                       if column != target_feature])
+
+    sample = stratified_rows(dataset, target_feature, SELECTION_MAX_ROWS)
+    n_jobs = selection_n_jobs()
+
+    logger.info(f"Fitting {type(selector).__name__} with {estimator} on {len(sample)} of {len(dataset)} rows and {n_jobs} cores")
+
+    start = time.perf_counter()
+    with threadpool_limits(limits=n_jobs, user_api="openmp"):
+        selector.fit(sample, sample[target_feature])
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    report = {
+        "estimator": estimator,
+        "nJobs": n_jobs,
+        "fitRows": len(sample),
+        "sourceRows": len(dataset),
+        "elapsedMs": round(elapsed_ms, 1),
+        "selectedFeatures": [feature for feature in selector.variables_ if feature not in selector.features_to_drop_],
+        "droppedFeatures": list(selector.features_to_drop_)
+    }
+
+    return report
@@ -0,0 +1,555 @@
+# storage.py - Code module with the storage backends holding the uploaded datasets
+
+import os
+import json
+import asyncio
+import base64
+import hashlib
+import shutil
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Optional, Tuple
+from urllib.parse import quote, unquote, urlsplit
+
+from dotenv import load_dotenv
+
+from Components.Logger import logger
+from Components.dataset_io import get_http_client, UPLOAD_CHUNK_SIZE
+
+load_dotenv()
+
+# Storage backend holding the datasets: "github" or "local"
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "github").lower()
+
+# Root folder of the local content-addressed store
+LOCAL_STORAGE_PATH = os.getenv("LOCAL_STORAGE_PATH", "storage")
+
+GITHUB_USERNAME = os.getenv("GITHUB_USERNAME")
+GITHUB_REPO = os.getenv("GITHUB_REPO")
+GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
+
+# Seconds the blob sha of a GitHub file is trusted for conditional reads before the rate-limited contents API is
+# asked again, uploads through other workers can go unnoticed for that long. 0 asks on every conditional read
+GITHUB_SHA_TTL_SECONDS = float(os.getenv("GITHUB_SHA_TTL_SECONDS", "60"))
+
+LOCAL_URL_SCHEME = "local://"
+
+
+class StorageError(Exception):
+
+    """
+    Raised when the storage backend rejects an operation
+    """
+
+
+class StorageBackend(ABC):
+
+    """
+    Interface of the storage backends holding the uploaded datasets
+    """
+
+    @abstractmethod
+    async def exists(self, name: str) -> bool:
+
+        """
+        Check whether a file is stored under the given name
+        """
+
+    @abstractmethod
+    async def put(self, name: str, content: bytes) -> dict:
+
+        """
+        Store a file, replacing any file with the same name
+
+        Args:
+            name (str): File name
+            content (bytes): File content
+
+        Returns:
+            dict: Stored file name, download URL and content version
+        """
+
+    @abstractmethod
+    async def put_file(self, name: str, path: str, sha256: str, size: int) -> dict:
+
+        """
+        Store a local file without loading it into memory, replacing any file with the same name
+
+        Args:
+            name (str): File name
+            path (str): Path of the local file
+            sha256 (str): SHA-256 digest of the file
+            size (int): Size of the file in bytes
+
+        Returns:
+            dict: Stored file name, download URL and content version
+        """
+
+    @abstractmethod
+    async def get(self, file_url: str, if_none_match: Optional[str] = None) -> Tuple[Optional[bytes], str]:
+
+        """
+        Read a file
+
+        Args:
+            file_url (str): Download URL returned by put
+            if_none_match (Optional[str]): Content version already held by the caller
+
+        Returns:
+            Tuple[Optional[bytes], str]: File content, None if the version is unchanged, and the content version
+
+        Raises:
+            FileNotFoundError: If the file does not exist
+        """
+
+    @abstractmethod
+    async def stream(self,
+                     file_url: str,
+                     chunk_size: int = 65536,
+                     start: int = 0,
+                     end: Optional[int] = None
+                     ):
+
+        """
+        Stream a file, or a byte range of it, in chunks
+
+        Args:
+            file_url (str): Download URL returned by put
+            chunk_size (int): Size of the yielded chunks
+            start (int): First byte to stream
+            end (Optional[int]): Last byte to stream (inclusive), the end of the file if None
+
+        Yields:
+            bytes: File content chunks
+        """
+
+    @abstractmethod
+    async def delete(self, name: str) -> str:
+
+        """
+        Delete a file
+
+        Args:
+            name (str): File name
+
+        Returns:
+            str: Download URL of the deleted file
+
+        Raises:
+            FileNotFoundError: If the file does not exist
+        """
+
+
+class GitHubStorageBackend(StorageBackend):
+
+    """
+    Stores the files in a GitHub repository through the contents API
+    """
+
+    def __init__(self, username: str, repo: str, token: str, sha_ttl: float = GITHUB_SHA_TTL_SECONDS):
+
+        self.contents_url = f"https://api.github.com/repos/{username}/{repo}/contents"
+        self.headers = {
+            "Authorization": f"token {token}",
+            "Accept": "application/vnd.github.v3+json",
+        }
+        self.sha_ttl = sha_ttl
+        self._shas = {}  # file name -> (blob sha, monotonic time it expires)
+
+    def _remember_sha(self, name: str, sha: Optional[str]):
+
+        if sha is None:
+            self._shas.pop(name, None)
+        elif self.sha_ttl > 0:
+            self._shas[name] = (sha, time.monotonic() + self.sha_ttl)
+
+    def _cached_sha(self, name: str) -> Optional[str]:
+
+        sha, expires = self._shas.get(name, (None, 0.0))
+        return sha if expires > time.monotonic() else None
+
+    async def _file_info(self, name: str) -> Optional[dict]:
+
+        response = await get_http_client().get(f"{self.contents_url}/{name}", headers=self.headers)
+        file_info = response.json() if response.status_code == 200 else None
+        self._remember_sha(name, file_info["sha"] if file_info else None)
+
+        return file_info
+
+    async def exists(self, name: str) -> bool:
+
+        return await self._file_info(name) is not None
+
+    async def _upload_data(self, name: str) -> dict:
+
+        upload_data = {"message": f"Add {name}"}
+
+        # Updating an existing file requires its SHA
+        existing_file_info = await self._file_info(name)
+        if existing_file_info:
+            upload_data["message"] = f"Update {name}"
+            upload_data["sha"] = existing_file_info['sha']
+
+        return upload_data
+
+    @staticmethod
+    async def stream_upload_body(upload_data: dict, path: str):
+
+        """
+        Stream the JSON body of a contents API upload, base64-encoding the file chunk by chunk
+
+        Args:
+            upload_data (dict): Message and SHA of the upload
+            path (str): Path of the local file
+
+        Yields:
+            bytes: JSON body chunks
+        """
+
+        # Open the JSON object and leave the content string for last
+        yield (json.dumps(upload_data)[:-1] + ', "content": "').encode("utf-8")
+
+        # Chunks are a multiple of 3 bytes so their base64 encodings concatenate without padding
+        with open(path, "rb") as upload_file:
+            while True:
+                chunk = await asyncio.to_thread(upload_file.read, UPLOAD_CHUNK_SIZE * 3)
+                if not chunk:
+                    break
+                yield base64.b64encode(chunk)
+
+        yield b'"}'
+
+    async def put(self, name: str, content: bytes) -> dict:
+
+        upload_data = await self._upload_data(name)
+        upload_data["content"] = base64.b64encode(content).decode('utf-8')
+
+        upload_response = await get_http_client().put(f"{self.contents_url}/{name}", headers=self.headers, json=upload_data)
+
+        return self._upload_result(name, upload_response)
+
+    async def put_file(self, name: str, path: str, sha256: str, size: int) -> dict:
+
+        upload_data = await self._upload_data(name)
+
+        # Length of the streamed body: JSON envelope plus the base64 encoded content
+        envelope_size = len(json.dumps(upload_data)[:-1] + ', "content": "') + len('"}')
+        headers = dict(self.headers)
+        headers["Content-Type"] = "application/json"
+        headers["Content-Length"] = str(envelope_size + 4 * ((size + 2) // 3))
+
+        upload_response = await get_http_client().put(f"{self.contents_url}/{name}", headers=headers,
+                                                      content=self.stream_upload_body(upload_data, path))
+
+        return self._upload_result(name, upload_response)
+
+    def _upload_result(self, name: str, upload_response) -> dict:
+
+        if upload_response.status_code not in (201, 200):
+            self._remember_sha(name, None)
+            raise StorageError(f"GitHub upload failed: {upload_response.text}")
+
+        content_info = upload_response.json()["content"]
+        self._remember_sha(name, content_info["sha"])
+
+        return {
+            "file_name": name,
+            "download_url": content_info["download_url"],
+            "version": content_info["sha"]
+        }
+
+    @staticmethod
+    def blob_sha(content: bytes) -> str:
+
+        """
+        Get the git blob SHA-1 of a file content, the sha the contents API reports for the file
+
+        Args:
+            content (bytes): File content
+
+        Returns:
+            str: Hex digest
+        """
+
+        return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+
+    async def get(self, file_url: str, if_none_match: Optional[str] = None) -> Tuple[Optional[bytes], str]:
+
+        name = unquote(urlsplit(file_url).path.rsplit("/", 1)[-1])
+
+        # The version is the blob sha put returned, the file's metadata tells whether the caller's one is current.
+        # A sha seen within the TTL answers without a contents API call, repeated reads would exhaust its rate limit
+        if if_none_match:
+            sha = self._cached_sha(name)
+            if sha is None:
+                file_info = await self._file_info(name)
+                sha = file_info["sha"] if file_info else None
+            if sha == if_none_match:
+                return None, if_none_match
+
+        response = await get_http_client().get(file_url)
+
+        if response.status_code == 404:
+            self._remember_sha(name, None)
+            raise FileNotFoundError(file_url)
+
+        response.raise_for_status()
+
+        version = await asyncio.to_thread(self.blob_sha, response.content)
+        self._remember_sha(name, version)
+
+        return response.content, version
+
+    async def stream(self,
+                     file_url: str,
+                     chunk_size: int = 65536,
+                     start: int = 0,
+                     end: Optional[int] = None
+                     ):
+
+        headers = {}
+        if start or end is not None:
+            headers["Range"] = f"bytes={start}-{'' if end is None else end}"
+
+        async with get_http_client().stream("GET", file_url, headers=headers) as response:
+            if response.status_code == 404:
+                raise FileNotFoundError(file_url)
+            response.raise_for_status()
+
+            # A server ignoring the Range header sends the whole file, cut the range out of it
+            skip = start if response.status_code == 200 else 0
+            remaining = None if end is None else end - start + 1
+
+            async for chunk in response.aiter_bytes(chunk_size):
+                if skip:
+                    dropped = min(skip, len(chunk))
+                    chunk = chunk[dropped:]
+                    skip -= dropped
+                if remaining is not None:
+                    chunk = chunk[:remaining]
+                    remaining -= len(chunk)
+                if chunk:
+                    yield chunk
+                if remaining == 0:
+                    break
+
+    async def delete(self, name: str) -> str:
+
+        file_info = await self._file_info(name)
+        if not file_info:
+            raise FileNotFoundError(name)
+
+        delete_data = {
+            "message": f"Delete {name}",
+            "sha": file_info['sha']
+        }
+
+        delete_response = await get_http_client().request("DELETE", f"{self.contents_url}/{name}", headers=self.headers, json=delete_data)
+
+        self._remember_sha(name, None)
+        if delete_response.status_code != 200:
+            raise StorageError(f"Failed to delete file: {delete_response.text}")
+
+        return file_info['download_url']
+
+
+class LocalStorageBackend(StorageBackend):
+
+    """
+    Stores the files on the local filesystem, content-addressed by their SHA-256 digest
+
+    Blobs live under blobs/<digest[:2]>/<digest> and every file name is a small JSON reference
+    under refs/ pointing at its current blob, so identical uploads share one blob.
+    """
+
+    def __init__(self, root: str):
+
+        self.root = os.path.abspath(root)
+        self.blobs_path = os.path.join(self.root, "blobs")
+        self.refs_path = os.path.join(self.root, "refs")
+
+        os.makedirs(self.blobs_path, exist_ok=True)
+        os.makedirs(self.refs_path, exist_ok=True)
+
+        # Serializes reference updates and blob collection
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _name_from_url(file_url: str) -> str:
+
+        if not file_url.startswith(LOCAL_URL_SCHEME):
+            raise FileNotFoundError(file_url)
+
+        return unquote(file_url[len(LOCAL_URL_SCHEME):])
+
+    def _ref_path(self, name: str) -> str:
+
+        return os.path.join(self.refs_path, quote(name, safe="") + ".json")
+
+    def _blob_path(self, digest: str) -> str:
+
+        return os.path.join(self.blobs_path, digest[:2], digest)
+
+    def _read_ref(self, name: str) -> dict:
+
+        with open(self._ref_path(name), "r") as ref_file:
+            return json.load(ref_file)
+
+    @staticmethod
+    def _write_atomic(path: str, content: bytes):
+
+        # Write next to the target and rename so readers never see a partial file
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+
+        with os.fdopen(descriptor, "wb") as temp_file:
+            temp_file.write(content)
+
+        os.replace(temp_path, path)
+
+    @staticmethod
+    def _copy_atomic(path: str, source_path: str):
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+
+        with os.fdopen(descriptor, "wb") as temp_file, open(source_path, "rb") as source_file:
+            shutil.copyfileobj(source_file, temp_file, UPLOAD_CHUNK_SIZE)
+
+        os.replace(temp_path, path)
+
+    def _put(self, name: str, content: bytes) -> dict:
+
+        digest = hashlib.sha256(content).hexdigest()
+
+        return self._commit(name, digest, len(content), lambda blob_path: self._write_atomic(blob_path, content))
+
+    def _put_file(self, name: str, path: str, sha256: str, size: int) -> dict:
+
+        return self._commit(name, sha256, size, lambda blob_path: self._copy_atomic(blob_path, path))
+
+    def _commit(self, name: str, digest: str, size: int, write_blob) -> dict:
+
+        blob_path = self._blob_path(digest)
+
+        with self._lock:
+            if not os.path.exists(blob_path):
+                write_blob(blob_path)
+
+            previous_digest = self._read_ref(name)["sha256"] if os.path.exists(self._ref_path(name)) else None
+
+            self._write_atomic(self._ref_path(name), json.dumps({"sha256": digest, "size": size}).encode("utf-8"))
+
+            if previous_digest and previous_digest != digest:
+                self._collect_blob(previous_digest)
+
+        return {
+            "file_name": name,
+            "download_url": LOCAL_URL_SCHEME + quote(name),
+            "version": digest
+        }
+
+    def _get(self, file_url: str, if_none_match: Optional[str]) -> Tuple[Optional[bytes], str]:
+
+        digest = self._read_ref(self._name_from_url(file_url))["sha256"]
+
+        if digest == if_none_match:
+            return None, digest
+
+        with open(self._blob_path(digest), "rb") as blob_file:
+            return blob_file.read(), digest
+
+    def _delete(self, name: str) -> str:
+
+        with self._lock:
+            digest = self._read_ref(name)["sha256"]
+
+            os.remove(self._ref_path(name))
+            self._collect_blob(digest)
+
+        return LOCAL_URL_SCHEME + quote(name)
+
+    def _collect_blob(self, digest: str):
+
+        # Keep the blob while any other file name still references it
+        for ref_name in os.listdir(self.refs_path):
+            with open(os.path.join(self.refs_path, ref_name), "r") as ref_file:
+                if json.load(ref_file)["sha256"] == digest:
+                    return
+
+        try:
+            os.remove(self._blob_path(digest))
+        except FileNotFoundError:
+            pass
+
+    async def exists(self, name: str) -> bool:
+
+        return os.path.exists(self._ref_path(name))
+
+    async def put(self, name: str, content: bytes) -> dict:
+
+        return await asyncio.to_thread(self._put, name, content)
+
+    async def put_file(self, name: str, path: str, sha256: str, size: int) -> dict:
+
+        return await asyncio.to_thread(self._put_file, name, path, sha256, size)
+
+    async def get(self, file_url: str, if_none_match: Optional[str] = None) -> Tuple[Optional[bytes], str]:
+
+        return await asyncio.to_thread(self._get, file_url, if_none_match)
+
+    async def stream(self,
+                     file_url: str,
+                     chunk_size: int = 65536,
+                     start: int = 0,
+                     end: Optional[int] = None
+                     ):
+
+        digest = self._read_ref(self._name_from_url(file_url))["sha256"]
+        blob_file = await asyncio.to_thread(open, self._blob_path(digest), "rb")
+
+        try:
+            blob_file.seek(start)
+            remaining = None if end is None else end - start + 1
+
+            while remaining is None or remaining > 0:
+                read_size = chunk_size if remaining is None else min(chunk_size, remaining)
+                chunk = await asyncio.to_thread(blob_file.read, read_size)
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+        finally:
+            blob_file.close()
+
+    async def delete(self, name: str) -> str:
+
+        return await asyncio.to_thread(self._delete, name)
+
+
+def create_storage_backend() -> StorageBackend:
+
+    """
+    Create the storage backend selected by the STORAGE_BACKEND setting
+
+    Returns:
+        StorageBackend: The configured storage backend
+
+    Raises:
+        ValueError: If the setting names an unknown backend
+    """
+
+    logger.info(f"Using the '{STORAGE_BACKEND}' storage backend")
+
+    if STORAGE_BACKEND == "github":
+        return GitHubStorageBackend(GITHUB_USERNAME, GITHUB_REPO, GITHUB_TOKEN)
+    elif STORAGE_BACKEND == "local":
+        return LocalStorageBackend(LOCAL_STORAGE_PATH)
+    else:
+        raise ValueError(f"Unknown storage backend: {STORAGE_BACKEND}")
+
+
+storage = create_storage_backend()
@@ -5,6 +5,7 @@ from lida import Manager, TextGenerationConfig, llm
 
 from Components.Logger import logger
 from Components.data import user_secrets_collection, fetch_and_read_github_file
+from Components.sampling import SamplingPolicy, sample_dataset
 
 
 load_dotenv()
@@ -12,8 +13,9 @@ load_dotenv()
 async def data_summarization(
         selected_method_label: str, 
         temperature: float, 
-        user_details: dict
-        ) -> str:
+        user_details: dict,
+        sampling: SamplingPolicy = None
+        ) -> tuple:
     try:
 
         """
@@ -23,9 +25,10 @@ async def data_summarization(
             selected_method_label (str): The method label for summarization
             temperature (float): The temperature for summarization
             user_details (dict): User details including username and role
+            sampling (SamplingPolicy): Rows of the dataset LIDA summarizes, the default sample if None
 
         Returns:
-            str: The summary of the dataset
+            tuple: The summary of the dataset and a description of the sample it was computed on
 
         Raises:
             HTTPException: If an unexpected error occurs
@@ -35,6 +38,7 @@ async def data_summarization(
 
         # Initialize summary as empty string
         summary = ""
+        sample_info = None
 
         model_name = os.getenv("MODEL_NAME")
 
@@ -45,8 +49,12 @@ async def data_summarization(
         user_record = user_secrets_collection.find_one({"username": user_details["username"], "role": user_details["role"]})
 
         # Load the dataset
-        selected_dataset = await fetch_and_read_github_file(user_record["file"], user_record["file_url"])
+        selected_dataset = await fetch_and_read_github_file(user_record["file"], user_record["file_url"],
+                                                            schema_profile=user_record.get("file_schema"))
         
+        # LIDA computes its column statistics over every row it is given
+        selected_dataset, sample_info = sample_dataset(selected_dataset, sampling)
+
         # Check if the dataset is not empty and method label is provided
         if (not selected_dataset.empty) and selected_method_label:
             # Initialize LIDA Manager with the model
@@ -65,7 +73,7 @@ async def data_summarization(
                 textgen_config=textgen_config
             )
 
-            return summary
+        return summary, sample_info
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error in data summarization: {str(e)}")
@@ -0,0 +1,244 @@
+# transformer_store.py - Code module to persist fitted feature_engine transformers and reuse them
+
+import os
+import json
+import hashlib
+import tempfile
+from io import BytesIO
+from typing import Optional, List
+
+import joblib
+import sklearn
+import feature_engine
+import pandas as pd
+from dotenv import load_dotenv
+
+from Components.Logger import logger
+
+load_dotenv()
+
+# Node-local folder of fitted transformers, disabled when the disk budget is 0
+TRANSFORMER_CACHE_PATH = os.getenv("TRANSFORMER_CACHE_PATH") or os.path.join(tempfile.gettempdir(), "fitted-transformers")
+TRANSFORMER_CACHE_MAX_MB = int(os.getenv("TRANSFORMER_CACHE_MAX_MB", "1024"))
+
+# "version" reuses a fit only on the same dataset version, "schema" on any dataset with the same columns and dtypes
+TRANSFORMER_REUSE_SCOPE = os.getenv("TRANSFORMER_REUSE_SCOPE", "version").lower()
+
+# Pickled transformers are only loaded by the library versions that wrote them
+LIBRARY_VERSIONS = [feature_engine.__version__, sklearn.__version__]
+
+
+def schema_fingerprint(dataset: pd.DataFrame) -> str:
+
+    """
+    Fingerprint the column names and dtypes of a dataset
+
+    Args:
+        dataset (pd.DataFrame): Dataset
+
+    Returns:
+        str: Hex digest identifying the schema
+    """
+
+    schema = [[str(column), str(dtype)] for column, dtype in dataset.dtypes.items()]
+    return hashlib.sha256(json.dumps(schema).encode("utf-8")).hexdigest()
+
+
+def dump_transformer(transformer) -> bytes:
+
+    """
+    Serialize a fitted transformer
+
+    Args:
+        transformer: Fitted transformer
+
+    Returns:
+        bytes: Joblib pickle of the transformer
+    """
+
+    buffer = BytesIO()
+    joblib.dump(transformer, buffer)
+    return buffer.getvalue()
+
+
+def load_transformer(content: bytes):
+
+    """
+    Load a fitted transformer serialized by dump_transformer
+
+    Args:
+        content (bytes): Joblib pickle of the transformer
+
+    Returns:
+        The fitted transformer
+    """
+
+    return joblib.load(BytesIO(content))
+
+
+class TransformerStore:
+
+    """
+    Disk store of fitted transformers keyed by dataset, transformer class, parameters, columns and target
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        if self.enabled:
+            os.makedirs(self.root, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+
+        return self.max_bytes > 0
+
+    @staticmethod
+    def key(dataset_key: str,
+            transformer,
+            columns: List[str],
+            target: Optional[str] = None
+            ) -> str:
+
+        """
+        Build the store key of a transformer fitted on a dataset
+
+        Args:
+            dataset_key (str): Dataset version or schema fingerprint the transformer is fitted on
+            transformer: Unfitted transformer with its parameters
+            columns (List[str]): Columns of the fitting data
+            target (Optional[str]): Target of supervised transformers
+
+        Returns:
+            str: Hex digest of the key
+        """
+
+        description = {
+            "dataset": dataset_key,
+            "transformer": f"{type(transformer).__module__}.{type(transformer).__qualname__}",
+            "params": {name: repr(value) for name, value in sorted(transformer.get_params().items())},
+            "columns": [str(column) for column in columns],
+            "target": target,
+            "versions": LIBRARY_VERSIONS
+        }
+        return hashlib.sha256(json.dumps(description, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+
+        """
+        Load a fitted transformer
+
+        Args:
+            key (str): Store key
+
+        Returns:
+            The fitted transformer, None if it is not stored
+        """
+
+        if not self.enabled:
+            return None
+
+        path = self._path(key)
+
+        try:
+            transformer = joblib.load(path)
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:
+            logger.warning(f"Could not load fitted transformer {key}: {str(e)}")
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return transformer
+
+    def put(self, key: str, transformer):
+
+        """
+        Store a fitted transformer, evicting the least recently used ones when over the disk budget
+
+        Args:
+            key (str): Store key
+            transformer: Fitted transformer
+        """
+
+        if not self.enabled:
+            return
+
+        descriptor, temp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+
+        try:
+            with os.fdopen(descriptor, "wb") as sink:
+                joblib.dump(transformer, sink)
+            os.replace(temp_path, self._path(key))
+        except Exception as e:
+            logger.warning(f"Could not store fitted transformer {key}: {str(e)}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+
+        self._evict()
+
+    def stats(self) -> dict:
+
+        """
+        Get the store counters of this worker and the disk usage shared by all workers
+
+        Returns:
+            dict: Store counters and disk usage
+        """
+
+        files = self._files()
+
+        return {
+            "entries": len(files),
+            "currentBytes": sum(size for _, size, _ in files),
+            "maxBytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+    def _path(self, key: str) -> str:
+
+        return os.path.join(self.root, key + ".joblib")
+
+    def _files(self) -> list:
+
+        files = []
+
+        if not self.enabled:
+            return files
+
+        for entry in os.scandir(self.root):
+            if not entry.name.endswith(".joblib"):
+                continue
+            try:
+                status = entry.stat()
+            except FileNotFoundError:
+                continue
+            files.append((entry.path, status.st_size, status.st_mtime))
+
+        return files
+
+    def _evict(self):
+
+        files = sorted(self._files(), key=lambda file: file[2])
+        current_bytes = sum(size for _, size, _ in files)
+
+        for path, size, _ in files:
+            if current_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # Already evicted by another worker
+            current_bytes -= size
+
+
+transformer_store = TransformerStore(root=TRANSFORMER_CACHE_PATH, max_bytes=TRANSFORMER_CACHE_MAX_MB * 1024 * 1024)
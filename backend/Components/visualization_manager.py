@@ -15,6 +15,7 @@ from lida import Manager, TextGenerationConfig, llm
 from lida.datamodel import Goal
 
 from Components.Logger import logger
+from Components.sampling import sample_dataset
 from Components.database import users_goals_collection, users_visual_code_collection
 
 
@@ -32,7 +33,7 @@ class VisualizationManager:
         self.text_gen = llm(provider="chatgroq", model=self.model_name)
         self.lida = Manager(text_gen=self.text_gen)
 
-    async def visual_generator(self,selected_goal,visualization_option,num_visualizations,visualization_title,user_data, dataset):
+    async def visual_generator(self,selected_goal,visualization_option,num_visualizations,visualization_title,user_data, dataset, sampling=None):
 
         """
         Generates Visualizations as per user request and goals
@@ -44,15 +45,16 @@ class VisualizationManager:
             visualization_title (str): Visualization title
             user_data (dict): User data
             dataset (pd.DataFrame): Dataset
+            sampling (SamplingPolicy): Rows the generated plotting code runs on, the default sample if None
         
         Returns:
-            list: Visualizations
+            tuple: Visualizations and a description of the sample they were drawn from
         
         Raises:
             HTTPException: Internal server error if an error occurs during visualization generation
         """
 
-        logger.info(f"Entered visual generator with selected goal: {selected_goal}, visualization option: {visualization_option}, number of visualizations: {num_visualizations}, visualization title: {visualization_title}, user data: {user_data}, dataset: {dataset}")
+        logger.info(f"Entered visual generator with selected goal: {selected_goal}, visualization option: {visualization_option}, number of visualizations: {num_visualizations}, visualization title: {visualization_title}, user data: {user_data}, dataset: {dataset.shape}")
 
         try:
 
@@ -67,6 +69,9 @@ class VisualizationManager:
 
             selected_goal_object["rationale"] = ""
 
+            # The generated plotting code runs over every row it is given
+            dataset, sample_info = sample_dataset(dataset, sampling)
+
             visualization = self.lida.visualize(summary=summary,goal=selected_goal_object,textgen_config=textgen_config,library=visualization_option,dataframe=dataset)
 
             VisualizationManager.editing_stage = 0
@@ -96,7 +101,7 @@ class VisualizationManager:
                     "total_edits": 1
                 })
 
-            return visualization
+            return visualization, sample_info
         
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error in visual generator: {str(e)}")
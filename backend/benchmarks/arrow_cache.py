@@ -0,0 +1,90 @@
+# arrow_cache.py - Benchmark of dataset load latency and per-worker memory with the Arrow disk cache
+#
+# Run from the backend folder:
+#   python -m benchmarks.arrow_cache --rows 5000000 --workers 4
+#
+# "parse" reads the Parquet sidecar into every worker, "mapped" opens the Arrow IPC file written
+# by the first worker. Each worker is a separate process, its private memory is the RSS growth
+# minus the pages it shares with the other workers through the page cache.
+
+import os
+import time
+import argparse
+import tempfile
+import multiprocessing
+
+import numpy as np
+import pandas as pd
+
+from Components.dataset_cache import ArrowDiskCache
+
+
+def make_dataset(rows):
+
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "id": np.arange(rows),
+        "value": rng.normal(size=rows),
+        "amount": rng.integers(0, 10_000, size=rows),
+        "category": pd.Categorical(rng.choice(["north", "south", "east", "west"], size=rows)),
+    })
+
+
+def private_memory_mb():
+
+    # Private pages of this process (Linux), shared mapped file pages are not counted
+    with open("/proc/self/smaps_rollup") as smaps:
+        fields = dict(line.split(":", 1) for line in smaps if ":" in line)
+    private_kb = sum(int(fields[name].split()[0]) for name in ("Private_Clean", "Private_Dirty"))
+    return private_kb / 1024
+
+
+def load(mode, sidecar_path, cache_root, results):
+
+    baseline = private_memory_mb()
+    start = time.perf_counter()
+
+    if mode == "parse":
+        dataset = pd.read_parquet(sidecar_path)
+    else:
+        dataset = ArrowDiskCache(cache_root, max_bytes=1 << 40).get("benchmark", "v1")
+
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    float(dataset["value"].sum())  # touch the data so mapped pages are faulted in
+
+    results.put((elapsed_ms, private_memory_mb() - baseline))
+
+
+def run(mode, workers, sidecar_path, cache_root):
+
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=load, args=(mode, sidecar_path, cache_root, results)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    measurements = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    print({
+        "mode": mode,
+        "workers": workers,
+        "load_ms": round(max(elapsed for elapsed, _ in measurements), 1),
+        "private_mb_per_worker": round(sum(memory for _, memory in measurements) / workers, 1),
+    })
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        dataset = make_dataset(args.rows)
+        sidecar_path = os.path.join(directory, "benchmark.parquet")
+        dataset.to_parquet(sidecar_path, index=False)
+        ArrowDiskCache(os.path.join(directory, "arrow"), max_bytes=1 << 40).put("benchmark", "v1", dataset)
+        del dataset
+
+        run("parse", args.workers, sidecar_path, os.path.join(directory, "arrow"))
+        run("mapped", args.workers, sidecar_path, os.path.join(directory, "arrow"))
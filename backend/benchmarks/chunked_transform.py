@@ -0,0 +1,103 @@
+# chunked_transform.py - Benchmark of peak memory of chunked versus in-memory feature engineering
+#
+# Run from the backend folder:
+#   python -m benchmarks.chunked_transform --rows 5000000 --chunk-rows 100000 --fit-rows 200000
+#
+# "in-memory" reads the whole CSV and runs the steps with FeatureEngineering.manager, "chunked"
+# fits the steps on a sample and streams the CSV through them into a Parquet file. Peak memory is
+# measured with tracemalloc, the chunked mode reports its own.
+
+import os
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from Components.feature_engineering import FeatureEngineering
+from Components.chunked_transform import run_chunked_steps
+
+
+STEPS = [
+    {"columns": ["with_missing"], "featureTask": "Missing Data Imputation", "featureSubTask": "MedianImputer"},
+    {"columns": ["category"], "featureTask": "Categorical Encoding", "featureSubTask": "CountEncoder"},
+    {"columns": ["positive"], "featureTask": "Discretisation", "featureSubTask": "EqualFrequencyDiscretiser"},
+    {"columns": ["positive_2"], "featureTask": "Feature Transformation", "featureSubTask": "YeoJohnsonTransformer"},
+]
+
+
+def write_csv(path, rows, extra_columns):
+
+    rng = np.random.default_rng(0)
+    batch_rows = 500_000
+
+    for start in range(0, rows, batch_rows):
+        size = min(batch_rows, rows - start)
+        with_missing = rng.normal(size=size)
+        with_missing[::10] = np.nan
+        data = {
+            "with_missing": with_missing,
+            "category": rng.choice(["north", "south", "east", "west"], size=size),
+            "positive": rng.lognormal(size=size),
+            "positive_2": rng.lognormal(size=size),
+            "target": rng.normal(size=size)
+        }
+        for index in range(extra_columns):
+            data[f"extra_{index}"] = rng.normal(size=size)
+        pd.DataFrame(data).to_csv(path, mode="a", header=start == 0, index=False)
+
+
+def in_memory(path):
+
+    dataset = pd.read_csv(path)
+    for step in STEPS:
+        dataset = FeatureEngineering({}, engineering_columns=step["columns"], target_feature="target",
+                                     featureengineeringTask=step["featureTask"],
+                                     featureengineeringSubTask=step["featureSubTask"]).manager(dataset)
+    return len(dataset)
+
+
+def chunked(path, output_path, chunk_rows, fit_rows):
+
+    steps = [{**step, "targetFeature": "target"} for step in STEPS]
+
+    start = time.perf_counter()
+    info = run_chunked_steps("benchmark.csv", path, output_path, steps, chunk_rows, fit_rows)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    # The chunked run traces its own peak memory
+    return {"rows": info["rowCount"], "seconds": round(elapsed_ms / 1000, 1),
+            "peak_mb": round(info["chunked"]["peakMemoryBytes"] / 2 ** 20, 1)}
+
+
+def measure_in_memory(path):
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    rows = in_memory(path)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"rows": rows, "seconds": round(elapsed_ms / 1000, 1), "peak_mb": round(peak / 2 ** 20, 1)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--extra-columns", type=int, default=10)
+    parser.add_argument("--chunk-rows", type=int, default=100_000)
+    parser.add_argument("--fit-rows", type=int, default=200_000)
+    parser.add_argument("--skip-in-memory", action="store_true", help="only run the chunked mode, e.g. when the dataset does not fit in memory")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "benchmark.csv")
+        write_csv(path, args.rows, args.extra_columns)
+        print({"rows": args.rows, "csv_mb": round(os.path.getsize(path) / 2 ** 20, 1)})
+
+        if not args.skip_in_memory:
+            print({"mode": "in-memory", **measure_in_memory(path)})
+
+        print({"mode": "chunked", **chunked(path, os.path.join(folder, "output.parquet"), args.chunk_rows, args.fit_rows)})
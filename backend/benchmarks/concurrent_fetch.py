@@ -0,0 +1,114 @@
+# concurrent_fetch.py - Benchmark of request latency while one user loads a large dataset
+#
+# Run from the backend folder:
+#   python -m benchmarks.concurrent_fetch --rows 2000000
+#
+# A local HTTP server stands in for GitHub. While one coroutine downloads and parses the large
+# file, small requests keep hitting the same event loop and their latency is recorded. The
+# "blocking" mode reproduces the old requests.get + pd.read_csv path, the "pooled" mode uses the
+# shared httpx client and the parser pool from Components.dataset_io.
+
+import time
+import asyncio
+import argparse
+import tempfile
+import threading
+import statistics
+from io import BytesIO
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+import numpy as np
+import pandas as pd
+import requests
+
+from Components.dataset_io import get_http_client, parse_dataset, close_http_client
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server(directory):
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(QuietHandler, directory=directory))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def write_files(directory, rows):
+
+    rng = np.random.default_rng(0)
+    pd.DataFrame({
+        "id": np.arange(rows),
+        "value": rng.normal(size=rows),
+        "category": rng.choice(["a", "b", "c", "d"], size=rows),
+    }).to_csv(f"{directory}/big.csv", index=False)
+    pd.DataFrame({"id": range(100)}).to_csv(f"{directory}/small.csv", index=False)
+
+
+async def load_blocking(url, filename):
+
+    response = requests.get(url)
+    return pd.read_csv(BytesIO(response.content))
+
+
+async def load_pooled(url, filename):
+
+    response = await get_http_client().get(url)
+    return await parse_dataset(filename, response.content)
+
+
+async def run(mode, base_url, small_requests):
+
+    loader = load_blocking if mode == "blocking" else load_pooled
+    latencies = []
+
+    async def small_request(due):
+        # Latency is measured from the moment the request was due, so time spent waiting
+        # for a blocked event loop counts against it
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        await loader(f"{base_url}/small.csv", "small.csv")
+        latencies.append((time.perf_counter() - due) * 1000)
+
+    big_start = time.perf_counter()
+    big_load = asyncio.ensure_future(loader(f"{base_url}/big.csv", "big.csv"))
+    small_loads = [small_request(big_start + i * 0.02) for i in range(small_requests)]
+
+    await asyncio.gather(big_load, *small_loads)
+    big_ms = (time.perf_counter() - big_start) * 1000
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "big_load_ms": round(big_ms, 1),
+        "small_p50_ms": round(statistics.median(latencies), 1),
+        "small_p99_ms": round(latencies[int(len(latencies) * 0.99) - 1], 1),
+        "small_max_ms": round(latencies[-1], 1),
+    }
+
+
+async def main(rows, small_requests):
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_files(directory, rows)
+        server = start_server(directory)
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+        try:
+            for mode in ("blocking", "pooled"):
+                print(await run(mode, base_url, small_requests))
+        finally:
+            server.shutdown()
+            await close_http_client()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--small-requests", type=int, default=50)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.rows, args.small_requests))
@@ -0,0 +1,77 @@
+# correlations.py - Benchmark of the correlation matrix kernel and cache of the correlation selectors
+#
+# Run from the backend folder:
+#   python -m benchmarks.correlations --rows 200000 --features 60
+#
+# Compares computing the matrix with pandas' DataFrame.corr, which the feature_engine correlation selectors
+# called on every request, against the row-blocked kernel, deriving the matrix of a version with dropped
+# columns by slicing the cached matrix, updating it after one rewritten column, and thresholding a cached
+# matrix the way DropCorrelatedFeatures and SmartCorrelatedSelection group features.
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from feature_engine.selection import DropCorrelatedFeatures
+
+from Components import correlations
+from Components.correlations import correlation_matrix, correlated_groups, correlated_pairs
+
+
+def make_dataset(rows, features):
+
+    rng = np.random.default_rng(0)
+    factors = rng.normal(size=(rows, -(-features // 3)))
+    # Every factor drives three features, so the selectors find correlated groups
+    values = np.repeat(factors, 3, axis=1)[:, :features] + rng.normal(scale=0.5, size=(rows, features))
+    return pd.DataFrame(values, columns=[f"feature_{index}" for index in range(features)])
+
+
+def timed(function, *args):
+
+    start = time.perf_counter()
+    result = function(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--features", type=int, default=60)
+    args = parser.parse_args()
+
+    dataset = make_dataset(args.rows, args.features)
+    features = sorted(dataset.columns)
+    print({"rows": args.rows, "features": args.features})
+
+    reference, pandas_ms = timed(lambda: dataset.corr(method="pearson"))
+    _, selector_ms = timed(lambda: DropCorrelatedFeatures(threshold=0.8).fit(dataset))
+
+    lineage = [("base", None)]
+    (matrix, _), kernel_ms = timed(correlation_matrix, dataset, lineage)
+    assert np.allclose(matrix.to_numpy(), reference.to_numpy())
+
+    # A selection step dropped every third column
+    step = {"kind": "selection", "featureSubTask": "DropFeatures", "columns": features[::3]}
+    sliced_lineage = [("dropped", step)] + lineage
+    (_, source), sliced_ms = timed(correlation_matrix, dataset.drop(columns=features[::3]), sliced_lineage)
+    assert source == "sliced"
+
+    # An engineering step rewrote one column
+    step = {"kind": "engineering", "featureSubTask": "YeoJohnsonTransformer", "columns": ["feature_0"]}
+    rewritten = dataset.assign(feature_0=np.cbrt(dataset["feature_0"]))
+    (_, source), updated_ms = timed(correlation_matrix, rewritten, [("rewritten", step)] + lineage)
+    assert source == "updated"
+
+    (_, dropped, _), groups_ms = timed(correlated_groups, matrix, features, 0.8)
+    assert dropped == DropCorrelatedFeatures(threshold=0.8).fit(dataset).features_to_drop_
+    _, pairs_ms = timed(correlated_pairs, matrix, 0.8)
+
+    for name, elapsed_ms in [("pandas DataFrame.corr", pandas_ms), ("DropCorrelatedFeatures.fit", selector_ms),
+                             ("blocked kernel", kernel_ms), ("sliced after dropping columns", sliced_ms),
+                             ("updated after rewriting one column", updated_ms),
+                             ("grouping a cached matrix", groups_ms), ("pairs of a cached matrix", pairs_ms)]:
+        print({"operation": name, "ms": round(elapsed_ms, 2)})
+
+    print(correlations.correlation_cache.stats())
@@ -0,0 +1,90 @@
+# csv_export.py - Benchmark of time-to-first-byte and peak RSS of the CSV export
+#
+# Run from the backend folder:
+#   python -m benchmarks.csv_export --rows 3000000
+#
+# Every mode runs in its own process so the peak RSS of one mode does not hide another's.
+# Memory held by the export itself, on top of the dataset, is the tracemalloc peak.
+# "buffered" is the old StringIO export, "streamed" the row-batch generator, "gzip" and "zstd"
+# the streamed export with Content-Encoding (zstd needs the zstandard package).
+
+import io
+import sys
+import time
+import argparse
+import resource
+import subprocess
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from Components.dataset_io import iter_csv, compress_chunks, zstandard
+
+MODES = ("buffered", "streamed", "gzip", "zstd")
+
+
+def make_dataset(rows):
+
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "id": np.arange(rows),
+        "value": rng.normal(size=rows),
+        "amount": rng.integers(0, 10_000, size=rows),
+        "category": rng.choice(["north", "south", "east", "west"], size=rows),
+    })
+
+
+def buffered_chunks(dataset):
+
+    stream = io.StringIO()
+    dataset.to_csv(stream, index=False)
+    return iter([stream.getvalue().encode('utf-8')])
+
+
+def run_mode(mode, rows):
+
+    dataset = make_dataset(rows)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    if mode == "buffered":
+        chunks = buffered_chunks(dataset)
+    else:
+        chunks = compress_chunks(iter_csv(dataset), None if mode == "streamed" else mode)
+
+    first_byte_ms = None
+    sent_bytes = 0
+    for chunk in chunks:
+        if first_byte_ms is None:
+            first_byte_ms = (time.perf_counter() - start) * 1000
+        sent_bytes += len(chunk)
+    total_ms = (time.perf_counter() - start) * 1000
+
+    _, export_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print({
+        "mode": mode,
+        "ttfb_ms": round(first_byte_ms, 1),
+        "total_ms": round(total_ms, 1),
+        "sent_mb": round(sent_bytes / 1024 ** 2, 1),
+        "export_peak_mb": round(export_peak / 1024 ** 2, 1),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    })
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=3_000_000)
+    parser.add_argument("--mode", choices=MODES)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.rows)
+    else:
+        for mode in MODES:
+            if mode == "zstd" and zstandard is None:
+                print({"mode": mode, "skipped": "zstandard is not installed"})
+                continue
+            subprocess.run([sys.executable, "-m", "benchmarks.csv_export", "--rows", str(args.rows), "--mode", mode], check=True)
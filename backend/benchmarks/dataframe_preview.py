@@ -0,0 +1,79 @@
+# dataframe_preview.py - Benchmark of the /datacleaner/dataframe-info preview as the dataset grows
+#
+# Run from the backend folder:
+#   python -m benchmarks.dataframe_preview --columns 50
+#
+# "per-cell" is the old preview, which converted every cell of the dataset with a Python call
+# and then kept the first 10 rows. "head-only" converts just the previewed rows, column by column.
+
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from Components.dataset_io import preview_records
+
+
+def safe_convert(val):
+
+    if pd.isna(val) or val is None:
+        return ''
+    if isinstance(val, (float, int)):
+        if abs(val) > 1e15:
+            return str(val)
+        return float(val)
+    return str(val)
+
+
+def per_cell_preview(dataset):
+
+    # DataFrame.applymap was renamed to DataFrame.map in pandas 2.1
+    element_map = dataset.map if hasattr(dataset, "map") else dataset.applymap
+    return element_map(safe_convert).head(10).to_dict('records')
+
+
+def make_dataset(rows, columns):
+
+    rng = np.random.default_rng(0)
+    data = {}
+    for index in range(columns):
+        if index % 3 == 0:
+            data[f"text_{index}"] = rng.choice(["north", "south", "east", None], size=rows)
+        elif index % 3 == 1:
+            values = rng.normal(size=rows)
+            values[::7] = np.nan
+            data[f"float_{index}"] = values
+        else:
+            data[f"int_{index}"] = rng.integers(0, 10 ** 16, size=rows)
+    return pd.DataFrame(data)
+
+
+def measure(preview, dataset, repeats):
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        preview(dataset)
+        timings.append((time.perf_counter() - start) * 1000)
+    return round(min(timings), 2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--columns", type=int, default=50)
+    parser.add_argument("--max-rows", type=int, default=1_000_000)
+    parser.add_argument("--per-cell-max-rows", type=int, default=100_000, help="largest size the old preview is run on")
+    args = parser.parse_args()
+
+    rows = 1_000
+    while rows <= args.max_rows:
+        dataset = make_dataset(rows, args.columns)
+
+        result = {"rows": rows, "columns": args.columns, "head_only_ms": measure(preview_records, dataset, 5)}
+        if rows <= args.per_cell_max_rows:
+            assert per_cell_preview(dataset) == preview_records(dataset)
+            result["per_cell_ms"] = measure(per_cell_preview, dataset, 1)
+
+        print(result)
+        rows *= 10
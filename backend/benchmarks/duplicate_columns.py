@@ -0,0 +1,73 @@
+# duplicate_columns.py - Benchmark of constant and duplicate column detection on wide tables
+#
+# Run from the backend folder:
+#   python -m benchmarks.duplicate_columns --rows 50000 --columns 1000
+#
+# Compares fitting feature_engine's DropConstantFeatures and DropDuplicateFeatures, which the constant and
+# duplicate sub tasks use, against find_constant_and_duplicate_columns, which hashes every column once and finds
+# both in the same pass. The table looks one-hot encoded: integer indicator columns, some of them constant or
+# duplicated, next to float and text columns. Both must drop the same columns.
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from feature_engine.selection import DropConstantFeatures, DropDuplicateFeatures
+
+from Components.column_hashing import find_constant_and_duplicate_columns
+
+
+def make_dataset(rows, columns):
+
+    rng = np.random.default_rng(0)
+    categories = rng.integers(0, columns, size=rows)
+    data = {}
+    for index in range(columns - 20):
+        if index % 50 == 0:
+            # Constant indicators of categories that never occur
+            data[f"onehot_{index}"] = np.zeros(rows, dtype=np.int64)
+        elif index % 50 == 3:
+            # Duplicate of the previous indicator, stored as float as pandas does after a merge
+            data[f"onehot_{index}"] = data[f"onehot_{index - 1}"].astype(np.float64)
+        else:
+            data[f"onehot_{index}"] = (categories == index).astype(np.int64)
+    for index in range(10):
+        data[f"value_{index}"] = rng.normal(size=rows)
+    for index in range(10):
+        data[f"text_{index}"] = rng.choice(["a", "b", "c"], size=rows) if index else np.full(rows, "a")
+    data["value_copy"] = data["value_0"].copy()
+    data["text_copy"] = data["text_1"].copy()
+    return pd.DataFrame(data)
+
+
+def feature_engine_drops(dataset):
+
+    constant = DropConstantFeatures(variables=None).fit(dataset)
+    remaining = dataset.drop(columns=constant.features_to_drop_)
+    duplicate = DropDuplicateFeatures(variables=None).fit(remaining)
+    return set(constant.features_to_drop_) | set(duplicate.features_to_drop_)
+
+
+def hashed_drops(dataset):
+
+    constant, duplicate_of, _ = find_constant_and_duplicate_columns(dataset)
+    return set(constant) | set(duplicate_of)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--columns", type=int, default=1000)
+    args = parser.parse_args()
+
+    dataset = make_dataset(args.rows, args.columns)
+    print({"rows": args.rows, "columns": len(dataset.columns)})
+
+    results = {}
+    for name, detect in [("feature_engine", feature_engine_drops), ("hashed", hashed_drops)]:
+        start = time.perf_counter()
+        results[name] = detect(dataset)
+        print({"detector": name, "seconds": round(time.perf_counter() - start, 2), "dropped": len(results[name])})
+
+    assert results["feature_engine"] == results["hashed"], results["feature_engine"] ^ results["hashed"]
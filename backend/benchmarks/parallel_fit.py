@@ -0,0 +1,86 @@
+# parallel_fit.py - Benchmark of fitting feature_engine transformers on column partitions across 1 to N processes
+#
+# Run from the backend folder:
+#   python -m benchmarks.parallel_fit --rows 50000 --columns 200 --max-workers 8
+#
+# "1" fits the transformer on all the columns in this process, as FIT_WORKERS=1 does. "n" splits the columns
+# into n partitions, fits them in a pool of n spawned processes and merges the fitted parameters, as
+# parallel_fit.fit_columns does. The pool is started before timing, the app keeps it for its lifetime.
+# Every parallel fit must transform the data exactly like the serial one.
+
+import os
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from feature_engine.transformation import BoxCoxTransformer, YeoJohnsonTransformer
+from feature_engine.discretisation import DecisionTreeDiscretiser
+
+from Components.parallel_fit import fit_in_partitions
+
+
+def make_dataset(rows, columns):
+
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame({f"feature_{index}": rng.lognormal(size=rows) for index in range(columns)})
+    y = pd.Series(X.iloc[:, :10].sum(axis=1) + rng.normal(size=rows), name="target")
+    return X, y
+
+
+def make_transformers(columns):
+
+    return [
+        (BoxCoxTransformer(variables=columns), False),
+        (YeoJohnsonTransformer(variables=columns), False),
+        (DecisionTreeDiscretiser(variables=columns, cv=3, regression=True, random_state=0), True)
+    ]
+
+
+def _ready(_):
+
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--columns", type=int, default=200)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    X, y = make_dataset(args.rows, args.columns)
+    columns = X.columns.tolist()
+    print({"rows": args.rows, "columns": args.columns, "cpus": os.cpu_count()})
+
+    serial_outputs = {}
+
+    for workers in range(1, args.max_workers + 1):
+        pool = None
+        if workers > 1:
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            list(pool.map(_ready, range(workers)))
+
+        for transformer, supervised in make_transformers(columns):
+            name = type(transformer).__name__
+            y_train = y if supervised else None
+
+            start = time.perf_counter()
+            if pool is None:
+                fitted = transformer.fit(X, y_train)
+            else:
+                fitted = fit_in_partitions(transformer, X, y_train, pool, workers)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            output = fitted.transform(X)
+            if workers == 1:
+                serial_outputs[name] = output
+            else:
+                pd.testing.assert_frame_equal(output, serial_outputs[name])
+
+            print({"transformer": name, "workers": workers, "fit_ms": round(elapsed_ms, 1)})
+
+        if pool is not None:
+            pool.shutdown()
@@ -0,0 +1,60 @@
+# row_browser.py - Benchmark of /datacleaner/rows page latency on a large cached dataset
+#
+# Run from the backend folder:
+#   python -m benchmarks.row_browser --rows 5000000 --columns 20
+#
+# "cold" computes the sorted/filtered row order, "scroll" is the median of the following pages,
+# which reuse the cached order the way the endpoint does.
+
+import time
+import argparse
+import statistics
+
+import numpy as np
+import pandas as pd
+
+from Components.row_browser import row_order, row_page
+
+
+def make_dataset(rows, columns):
+
+    rng = np.random.default_rng(0)
+    data = {"id": np.arange(rows)}
+    for index in range(1, columns):
+        if index % 2:
+            data[f"value_{index}"] = rng.normal(size=rows)
+        else:
+            data[f"region_{index}"] = pd.Categorical(rng.choice(["north", "south", "east", "west"], size=rows))
+    return pd.DataFrame(data)
+
+
+def measure(dataset, view, pages, limit):
+
+    start = time.perf_counter()
+    positions = row_order(dataset, **view)
+    row_page(dataset, positions, 0, limit)
+    cold_ms = (time.perf_counter() - start) * 1000
+
+    scroll_ms = []
+    for page in range(1, pages):
+        start = time.perf_counter()
+        row_page(dataset, positions, page * limit, limit)
+        scroll_ms.append((time.perf_counter() - start) * 1000)
+
+    return {"view": view or "file order", "cold_ms": round(cold_ms, 1), "scroll_ms": round(statistics.median(scroll_ms), 1)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--columns", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--pages", type=int, default=20)
+    args = parser.parse_args()
+
+    dataset = make_dataset(args.rows, args.columns)
+
+    for view in ({},
+                 {"sort_by": "value_1", "descending": True},
+                 {"filter_column": "region_2", "filter_operator": "eq", "filter_value": "north", "sort_by": "value_3"}):
+        print(measure(dataset, view, args.pages, args.limit))
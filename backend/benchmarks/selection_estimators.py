@@ -0,0 +1,66 @@
+# selection_estimators.py - Benchmark of the estimator settings of the model-based feature selectors
+#
+# Run from the backend folder:
+#   python -m benchmarks.selection_estimators --rows 200000 --features 20
+#
+# Every sub task runs with each setting: "rf-1-core-all-rows" is the old random forest on one core fitted on
+# every row, the others size the cores from the machine and/or fit on a stratified sample of --max-rows rows,
+# "hgb" uses the histogram gradient boosting estimator. Wall time and selected features are the ones the
+# endpoint reports under "selection".
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from Components import selection_estimators
+from Components.feature_selection import FeatureSelection
+
+
+SUB_TASKS = ["SelectBySingleFeaturePerformance", "ShuffleFeaturesSelector", "RecursiveFeatureElimination"]
+
+
+def make_dataset(rows, features):
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(rows, features))
+    # The first three features carry the signal, the others are noise
+    logits = 1.5 * X[:, 0] - 1.0 * X[:, 1] + 0.5 * X[:, 2]
+    dataset = pd.DataFrame(X, columns=[f"feature_{index}" for index in range(features)])
+    dataset["target"] = (logits + rng.logistic(size=rows) > 0).astype(int)
+    return dataset
+
+
+def run(dataset, sub_task, estimator, n_jobs, max_rows):
+
+    selection_estimators.SELECTION_N_JOBS = n_jobs
+    selection_estimators.SELECTION_MAX_ROWS = max_rows
+
+    operation = FeatureSelection({}, featureselectionSubTask=sub_task, target_feature="target", estimator=estimator)
+    operation.manager(dataset)
+    return operation.report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--features", type=int, default=20)
+    parser.add_argument("--max-rows", type=int, default=50_000)
+    parser.add_argument("--sub-tasks", nargs="+", default=SUB_TASKS)
+    args = parser.parse_args()
+
+    dataset = make_dataset(args.rows, args.features)
+    print({"rows": args.rows, "features": args.features, "cores": selection_estimators.selection_n_jobs()})
+
+    settings = [
+        ("rf-1-core-all-rows", "random_forest", 1, 0),
+        ("rf-all-cores-all-rows", "random_forest", 0, 0),
+        ("rf-all-cores-sampled", "random_forest", 0, args.max_rows),
+        ("hgb-all-cores-sampled", "hist_gradient_boosting", 0, args.max_rows)
+    ]
+
+    for sub_task in args.sub_tasks:
+        for name, estimator, n_jobs, max_rows in settings:
+            report = run(dataset, sub_task, estimator, n_jobs, max_rows)
+            print({"sub_task": sub_task, "setting": name, "fit_rows": report["fitRows"], "n_jobs": report["nJobs"],
+                   "seconds": round(report["elapsedMs"] / 1000, 1), "selected": report["selectedFeatures"]})
@@ -0,0 +1,69 @@
+# storage_backends.py - Benchmark of dataset upload/download latency per storage backend
+#
+# Run from the backend folder:
+#   python -m benchmarks.storage_backends --size-mb 20
+#
+# The local backend always runs. The GitHub backend runs too when GITHUB_TOKEN, GITHUB_USERNAME
+# and GITHUB_REPO are set, and uses a throwaway file name that is deleted afterwards.
+
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+import statistics
+
+from Components.dataset_io import close_http_client
+from Components.storage import (LocalStorageBackend, GitHubStorageBackend,
+                                GITHUB_USERNAME, GITHUB_REPO, GITHUB_TOKEN)
+
+
+async def measure(backend, name, content, repeats):
+
+    put_ms, get_ms, revalidate_ms = [], [], []
+
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = await backend.put(name, content)
+        put_ms.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        _, version = await backend.get(result["download_url"])
+        get_ms.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        await backend.get(result["download_url"], if_none_match=version)
+        revalidate_ms.append((time.perf_counter() - start) * 1000)
+
+    await backend.delete(name)
+
+    return {
+        "backend": type(backend).__name__,
+        "put_ms": round(statistics.median(put_ms), 1),
+        "get_ms": round(statistics.median(get_ms), 1),
+        "revalidate_ms": round(statistics.median(revalidate_ms), 1),
+    }
+
+
+async def main(size_mb, repeats):
+
+    content = os.urandom(size_mb * 1024 * 1024)
+
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            print(await measure(LocalStorageBackend(directory), "benchmark.csv", content, repeats))
+
+        if GITHUB_TOKEN and GITHUB_USERNAME and GITHUB_REPO:
+            backend = GitHubStorageBackend(GITHUB_USERNAME, GITHUB_REPO, GITHUB_TOKEN)
+            print(await measure(backend, "storage_benchmark.csv", content, repeats))
+    finally:
+        await close_http_client()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=int, default=20)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.size_mb, args.repeats))
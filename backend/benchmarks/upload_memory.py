@@ -0,0 +1,105 @@
+# upload_memory.py - Benchmark of peak memory while uploading a large dataset
+#
+# Run from the backend folder:
+#   python -m benchmarks.upload_memory --size-mb 200
+#
+# Compares the old upload path (read the whole upload, base64-encode it and build the JSON body
+# for the GitHub contents API) with the streaming path (parse the multipart request body and spool
+# the file to disk while hashing, then stream the base64 JSON body). Peak memory is measured with tracemalloc, the GitHub request itself is
+# replaced by draining the body.
+
+import os
+import json
+import time
+import base64
+import asyncio
+import argparse
+import tempfile
+import tracemalloc
+
+from starlette.requests import Request
+
+from Components.dataset_io import spool_multipart_upload
+from Components.storage import GitHubStorageBackend
+
+
+BOUNDARY = "benchmark-boundary"
+
+
+def make_request(source):
+
+    # Multipart body of a single file part, delivered in the 64 KB chunks a server reads
+    head = (f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; filename="benchmark.csv"\r\n'
+            f'Content-Type: text/csv\r\n\r\n').encode()
+    tail = f"\r\n--{BOUNDARY}--\r\n".encode()
+    pending = [head]
+
+    async def receive():
+        chunk = pending.pop() if pending else source.read(64 * 1024)
+        if not chunk:
+            return {"type": "http.request", "body": tail, "more_body": False}
+        return {"type": "http.request", "body": chunk, "more_body": True}
+
+    headers = [(b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode())]
+    return Request({"type": "http", "method": "PUT", "path": "/", "headers": headers}, receive)
+
+
+async def buffered_upload(path):
+
+    with open(path, "rb") as file:
+        file_content = file.read()
+    encoded_content = base64.b64encode(file_content).decode('utf-8')
+    body = json.dumps({"message": "Add benchmark.csv", "content": encoded_content}).encode("utf-8")
+    return len(body)
+
+
+async def streamed_upload(path):
+
+    with open(path, "rb") as source:
+        _, spooled_upload = await spool_multipart_upload(make_request(source), max_bytes=1 << 40)
+
+    try:
+        size = 0
+        async for chunk in GitHubStorageBackend.stream_upload_body({"message": "Add benchmark.csv"}, spooled_upload.path):
+            size += len(chunk)
+        return size
+    finally:
+        os.remove(spooled_upload.path)
+
+
+async def measure(name, upload, path):
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    body_size = await upload(path)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "path": name,
+        "body_mb": round(body_size / 1024 ** 2, 1),
+        "peak_mb": round(peak / 1024 ** 2, 1),
+        "elapsed_ms": round(elapsed_ms, 1),
+    }
+
+
+async def main(size_mb):
+
+    with tempfile.NamedTemporaryFile(suffix=".csv", delete=False) as source:
+        row = b"12345,0.123456789,category_a,2024-01-01\n"
+        source.write(row * (size_mb * 1024 * 1024 // len(row)))
+
+    try:
+        print(await measure("buffered", buffered_upload, source.name))
+        print(await measure("streamed", streamed_upload, source.name))
+    finally:
+        os.remove(source.name)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=int, default=200)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.size_mb))
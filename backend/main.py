@@ -1,4 +1,5 @@
 import os
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 from typing import Optional
 
@@ -14,6 +15,9 @@ from Components.datacontrol import router as datacontrol_router
 from Components.datasummarizer import router as datasummarizer_router
 from Components.dashboard_visualize import router as dashboard_visualize_router
 from Components.datacleaner import router as datacleaner_router
+from Components.dataset_io import close_http_client
+from Components.parallel_fit import close_fit_pool
+from Components.jobs import job_runner
 from Components.auth import (
     UserRole
 )
@@ -22,8 +26,16 @@ from Components.auth import (
 from dotenv import load_dotenv
 load_dotenv()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The shared HTTP client, the fit pool and the jobs live as long as the app
+    yield
+    await close_http_client()
+    close_fit_pool()
+    job_runner.shutdown()
+
 # Initialize FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -35,7 +47,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["Content-Type", "Content-Disposition"]
+    expose_headers=["Content-Type", "Content-Disposition", "Content-Length", "Content-Range",
+                    "Accept-Ranges", "ETag", "Last-Modified"]
 )
 
 app.include_router(user_router, prefix="/users", tags=["users"])
@@ -0,0 +1,136 @@
+# conftest.py - Test setup: point the storage, caches and job store at a temporary folder and replace MongoDB
+#
+# Run from the backend folder:
+#   python -m pytest -q
+
+import os
+import sys
+import copy
+import types
+import asyncio
+import tempfile
+
+import pytest
+
+TEST_ROOT = tempfile.mkdtemp(prefix="backend-tests-")
+
+# Module-level settings are read at import time, they must be set before any Component is imported
+os.environ.update({
+    "SECRET_KEY": "test-secret",
+    "ALGORITHM": "HS256",
+    "STORAGE_BACKEND": "local",
+    "LOCAL_STORAGE_PATH": os.path.join(TEST_ROOT, "storage"),
+    "ARROW_CACHE_PATH": os.path.join(TEST_ROOT, "arrow"),
+    "JOB_STORE_PATH": os.path.join(TEST_ROOT, "jobs.sqlite"),
+    "TRANSFORMER_CACHE_MAX_MB": "0",
+    "FIT_WORKERS": "1"
+})
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeCollection:
+
+    """
+    In-memory stand-in for the pymongo collections, supporting the queries and updates the components use
+    """
+
+    def __init__(self):
+
+        self.documents = []
+
+    @staticmethod
+    def _matches(document: dict, query: dict) -> bool:
+
+        return all(document.get(key) == value for key, value in query.items())
+
+    def find_one(self, query: dict, projection: dict = None):
+
+        for document in self.documents:
+            if self._matches(document, query):
+                return copy.deepcopy(document)
+        return None
+
+    def find(self, query: dict = None, projection: dict = None):
+
+        return [copy.deepcopy(document) for document in self.documents if self._matches(document, query or {})]
+
+    def insert_one(self, document: dict):
+
+        self.documents.append(copy.deepcopy(document))
+
+    def replace_one(self, query: dict, document: dict, upsert: bool = False):
+
+        for index, existing in enumerate(self.documents):
+            if self._matches(existing, query):
+                self.documents[index] = copy.deepcopy(document)
+                return types.SimpleNamespace(matched_count=1, modified_count=1)
+        if upsert:
+            self.documents.append(copy.deepcopy(document))
+        return types.SimpleNamespace(matched_count=0, modified_count=0)
+
+    def update_one(self, query: dict, update: dict, upsert: bool = False):
+
+        for document in self.documents:
+            if self._matches(document, query):
+                for key, value in update.get("$set", {}).items():
+                    document[key] = copy.deepcopy(value)
+                for key, value in update.get("$push", {}).items():
+                    values = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+                    document.setdefault(key, []).extend(copy.deepcopy(values))
+                return types.SimpleNamespace(matched_count=1, modified_count=1, upserted_id=None)
+        if upsert:
+            self.documents.append(copy.deepcopy({**query, **update.get("$setOnInsert", {}), **update.get("$set", {})}))
+            return types.SimpleNamespace(matched_count=0, modified_count=0, upserted_id=len(self.documents))
+        return types.SimpleNamespace(matched_count=0, modified_count=0, upserted_id=None)
+
+    def delete_one(self, query: dict):
+
+        for index, document in enumerate(self.documents):
+            if self._matches(document, query):
+                del self.documents[index]
+                return types.SimpleNamespace(deleted_count=1)
+        return types.SimpleNamespace(deleted_count=0)
+
+    def delete_many(self, query: dict):
+
+        before = len(self.documents)
+        self.documents = [document for document in self.documents if not self._matches(document, query)]
+        return types.SimpleNamespace(deleted_count=before - len(self.documents))
+
+
+# The real module connects to MongoDB Atlas when it is imported
+database = types.ModuleType("Components.database")
+for name in ["registered_users_collection", "user_secrets_collection", "users_edited_dataframe_collection",
+             "users_goals_collection", "users_visual_code_collection"]:
+    setattr(database, name, FakeCollection())
+sys.modules["Components.database"] = database
+
+
+@pytest.fixture
+def upload_dataset(monkeypatch):
+
+    """
+    Store a dataframe as the uploaded CSV file of a test user, with an empty version log
+
+    Returns:
+        Callable[[pd.DataFrame], dict]: Uploads a dataframe and returns the user details the routes take
+    """
+
+    from Components import datacleaner, feature_engineering, feature_selection
+    from Components.storage import storage
+
+    database.users_edited_dataframe_collection.documents = []
+
+    def upload(dataset, name: str = "dataset.csv") -> dict:
+
+        upload_result = asyncio.run(storage.put(name, dataset.to_csv(index=False).encode("utf-8")))
+        user = {"username": "user", "role": "user", "file": name, "file_url": upload_result["download_url"],
+                "file_version": upload_result["version"], "file_schema": None}
+
+        for module in (datacleaner, feature_engineering, feature_selection):
+            monkeypatch.setattr(module, "get_user_details", lambda username, role: dict(user))
+
+        return {"username": "user", "role": "user"}
+
+    return upload
@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Components.chunked_transform import run_chunked_steps
+from Components.feature_engineering import FeatureEngineering, ENGINEERING_SUB_TASKS
+
+ROWS = 3000
+
+# Columns each sub task runs on, the other sub tasks of a task use its first entry
+STEP_COLUMNS = {
+    "Missing Data Imputation": ["with_missing"],
+    "AddMissingIndicator": ["label_missing"],
+    "Categorical Encoding": ["label"],
+    "Discretisation": ["x"],
+    "GeometricWidthDiscretiser": ["positive"],
+    "Outlier Capping or Removal": ["x"],
+    "Feature Transformation": ["positive"],
+    "YeoJohnsonTransformer": ["x"],
+    "Feature Scaling": ["x"],
+    "Datetime Feature Handling": []
+}
+
+SUB_TASKS = [(task, sub_task) for task, sub_tasks in ENGINEERING_SUB_TASKS.items() for sub_task in sub_tasks]
+
+
+def make_dataset(rows=ROWS):
+
+    rng = np.random.default_rng(0)
+    with_missing = rng.normal(size=rows)
+    with_missing[::7] = np.nan
+    label_missing = rng.choice(["a", "b", "c"], size=rows).astype(object)
+    label_missing[::9] = None
+
+    return pd.DataFrame({
+        "x": rng.normal(size=rows),
+        "positive": rng.lognormal(size=rows),
+        "with_missing": with_missing,
+        "label": rng.choice(["north", "south", "east", "west"], size=rows, p=[0.4, 0.3, 0.2, 0.1]),
+        "label_missing": label_missing,
+        "day": pd.date_range("2024-01-01", periods=rows, freq="h"),
+        "target": rng.normal(size=rows)
+    })
+
+
+def make_step(task, sub_task):
+
+    return {"columns": STEP_COLUMNS.get(sub_task, STEP_COLUMNS[task]), "targetFeature": "target",
+            "featureTask": task, "featureSubTask": sub_task}
+
+
+def in_memory(dataset, steps):
+
+    for step in steps:
+        dataset = FeatureEngineering({}, engineering_columns=step["columns"], target_feature=step["targetFeature"],
+                                     featureengineeringTask=step["featureTask"],
+                                     featureengineeringSubTask=step["featureSubTask"]).manager(dataset)
+    return dataset.reset_index(drop=True)
+
+
+def chunked(dataset, steps, tmp_path, fit_rows):
+
+    source_path, output_path = tmp_path / "source.parquet", tmp_path / "output.parquet"
+    dataset.to_parquet(source_path, index=False)
+
+    info = run_chunked_steps("source.parquet", str(source_path), str(output_path), steps, chunk_rows=700, fit_rows=fit_rows)
+
+    return pd.read_parquet(output_path), info
+
+
+def assert_same_values(chunked_dataset, memory_dataset):
+
+    assert chunked_dataset.columns.tolist() == memory_dataset.columns.tolist()
+    for column in memory_dataset.columns:
+        expected, actual = memory_dataset[column], chunked_dataset[column]
+        if pd.api.types.is_numeric_dtype(expected) and not pd.api.types.is_bool_dtype(expected):
+            np.testing.assert_allclose(actual.astype(float), expected.astype(float), rtol=1e-12, equal_nan=True, err_msg=column)
+        else:
+            assert [None if pd.isna(value) else value for value in actual] == \
+                   [None if pd.isna(value) else value for value in expected], column
+
+
+@pytest.mark.parametrize("task, sub_task", SUB_TASKS)
+def test_chunked_output_matches_memory_mode_when_the_training_set_fits(task, sub_task, tmp_path):
+
+    dataset = make_dataset()
+    steps = [make_step(task, sub_task)]
+
+    chunked_dataset, info = chunked(dataset, steps, tmp_path, fit_rows=ROWS)
+    memory_dataset = in_memory(dataset, steps)
+
+    # The fit sample is the whole training set of memory mode
+    assert info["chunked"]["fitRows"] == ROWS * 0.8
+
+    if sub_task == "RandomSampleImputer":
+        # Imputed values are drawn per transformed batch, memory mode draws for its two sets and chunked mode per chunk
+        missing = dataset["with_missing"].isna()
+        assert_same_values(chunked_dataset[~missing], memory_dataset[~missing])
+        assert chunked_dataset["with_missing"].notna().all()
+        assert chunked_dataset.loc[missing, "with_missing"].isin(dataset["with_missing"]).all()
+    else:
+        assert_same_values(chunked_dataset, memory_dataset)
+
+
+@pytest.mark.parametrize("sub_task", ["CountEncoder", "FrequencyEncoder"])
+def test_counts_cover_the_whole_training_set_of_a_small_sample(sub_task, tmp_path):
+
+    dataset = make_dataset()
+    steps = [make_step("Categorical Encoding", sub_task)]
+
+    chunked_dataset, info = chunked(dataset, steps, tmp_path, fit_rows=100)
+
+    assert info["chunked"]["fitRows"] == 100
+    assert_same_values(chunked_dataset, in_memory(dataset, steps))
+
+
+def test_counts_follow_the_steps_before_them(tmp_path):
+
+    dataset = make_dataset()
+    steps = [make_step("Missing Data Imputation", "AddMissingIndicator"),
+             make_step("Categorical Encoding", "CountEncoder") | {"columns": ["label_missing"]}]
+
+    chunked_dataset, _ = chunked(dataset, steps, tmp_path, fit_rows=100)
+    memory_dataset = in_memory(dataset, steps)
+
+    # The missing labels imputed by the first step are counted as their own category
+    assert_same_values(chunked_dataset, memory_dataset)
+    assert chunked_dataset["label_missing"].max() < ROWS * 0.8
@@ -0,0 +1,150 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Components import column_hashing
+from Components.column_hashing import find_constant_and_duplicate_columns
+
+
+def make_dataset(rows=300):
+
+    rng = np.random.default_rng(0)
+    dataset = pd.DataFrame({
+        "x0": rng.normal(size=rows),
+        "x1": rng.normal(size=rows),
+        "ints": rng.integers(0, 5, size=rows),
+        "label": rng.choice(["a", "b", "c"], size=rows)
+    })
+    dataset["x0_copy"] = dataset["x0"]
+    dataset["ints_as_float"] = dataset["ints"].astype(float)
+    dataset["label_copy"] = dataset["label"]
+    dataset["constant"] = 7
+    dataset["constant_text"] = "same"
+    return dataset
+
+
+def test_constant_and_duplicate_columns():
+
+    constant, duplicate_of, share_of = find_constant_and_duplicate_columns(make_dataset())
+
+    assert constant == ["constant", "constant_text"]
+    assert duplicate_of == {"x0_copy": "x0", "ints_as_float": "ints", "label_copy": "label"}
+    assert share_of is None
+
+
+def test_colliding_hashes_do_not_make_duplicates(monkeypatch):
+
+    # Every value of every column hashes the same, so all columns share one column hash and look constant
+    monkeypatch.setattr(column_hashing, "row_hashes", lambda series: np.zeros(len(series), dtype=np.uint64))
+
+    constant, duplicate_of, _ = find_constant_and_duplicate_columns(make_dataset())
+
+    assert constant == ["constant", "constant_text"]
+    assert duplicate_of == {"x0_copy": "x0", "ints_as_float": "ints", "label_copy": "label"}
+
+
+def test_colliding_column_hashes_of_reordered_values(monkeypatch):
+
+    # Unit weights make the column hash ignore the row order, so the same values in another order collide
+    class UnitWeights:
+        def __init__(self, seed):
+            pass
+
+        def integers(self, low, high, size, dtype, endpoint):
+            return np.zeros(size, dtype=dtype)
+
+    monkeypatch.setattr(column_hashing.np.random, "default_rng", UnitWeights)
+    dataset = pd.DataFrame({"values": np.arange(10.0), "reversed": np.arange(10.0)[::-1], "copy": np.arange(10.0)})
+
+    _, duplicate_of, _ = find_constant_and_duplicate_columns(dataset)
+
+    assert duplicate_of == {"copy": "values"}
+
+
+def test_missing_values_count_as_a_value():
+
+    dataset = pd.DataFrame({
+        "all_missing": [np.nan] * 4,
+        "some_missing": [1.0, np.nan, 1.0, np.nan],
+        "some_missing_copy": [1.0, np.nan, 1.0, np.nan],
+        "other_missing": [np.nan, 1.0, np.nan, 1.0]
+    })
+
+    constant, duplicate_of, _ = find_constant_and_duplicate_columns(dataset)
+
+    assert constant == ["all_missing"]
+    assert duplicate_of == {"some_missing_copy": "some_missing"}
+
+
+def test_negative_zero_and_integers_equal_their_floats():
+
+    dataset = pd.DataFrame({"zeros": [0.0, 1.0, 2.0], "negative_zeros": [-0.0, 1.0, 2.0],
+                            "ints": [0, 1, 2], "bools": [False, True, True], "bool_floats": [0.0, 1.0, 1.0]})
+
+    _, duplicate_of, _ = find_constant_and_duplicate_columns(dataset)
+
+    assert duplicate_of == {"negative_zeros": "zeros", "ints": "zeros", "bool_floats": "bools"}
+
+
+def test_quasi_constant_columns_and_shares():
+
+    dataset = pd.DataFrame({
+        "mostly_zero": [0] * 9 + [1],
+        "balanced": [0, 1] * 5,
+        "mostly_text": ["a"] * 8 + ["b", None]
+    })
+
+    constant, _, share_of = find_constant_and_duplicate_columns(dataset, tol=0.8, shares=True)
+
+    assert constant == ["mostly_zero", "mostly_text"]
+    assert share_of == {"mostly_zero": 0.9, "balanced": 0.5, "mostly_text": 0.8}
+
+
+@pytest.mark.parametrize("tol", [0, -0.5, 1.5])
+def test_tol_outside_the_unit_interval_is_rejected(tol):
+
+    with pytest.raises(ValueError):
+        find_constant_and_duplicate_columns(make_dataset(), tol=tol)
+
+
+
+def test_integers_beyond_float64_precision_are_not_duplicates():
+
+    big = 2 ** 53
+    dataset = pd.DataFrame({
+        "ids": np.array([big, big + 2, 7], dtype=np.int64),
+        "neighbours": np.array([big + 1, big + 3, 7], dtype=np.int64),
+        "ids_copy": np.array([big, big + 2, 7], dtype=np.int64),
+        "unsigned": np.array([big, big + 2, 7], dtype=np.uint64),
+        "as_float": np.array([big, big + 2, 7], dtype=np.float64),
+        "neighbours_as_float": np.array([big + 1, big + 3, 7], dtype=np.int64).astype(np.float64),
+        "huge": np.array([2 ** 64 - 1, 2 ** 63, 7], dtype=np.uint64),
+        "huge_neighbours": np.array([2 ** 64 - 2, 2 ** 63 + 1, 7], dtype=np.uint64)
+    })
+
+    constant, duplicate_of, _ = find_constant_and_duplicate_columns(dataset)
+
+    # big and big + 2 are exact float64 values, so the float column equals the exact integers only
+    assert constant == []
+    assert duplicate_of == {"ids_copy": "ids", "unsigned": "ids", "as_float": "ids"}
+
+
+def test_integers_beyond_float64_precision_with_colliding_hashes(monkeypatch):
+
+    monkeypatch.setattr(column_hashing, "row_hashes", lambda series: np.zeros(len(series), dtype=np.uint64))
+    dataset = pd.DataFrame({"ids": np.array([2 ** 53 + 1, 5], dtype=np.int64),
+                            "neighbours": np.array([2 ** 53, 5], dtype=np.int64),
+                            "neighbours_as_float": np.array([2.0 ** 53, 5.0])})
+
+    _, duplicate_of, _ = find_constant_and_duplicate_columns(dataset)
+
+    assert duplicate_of == {"neighbours_as_float": "neighbours"}
+
+
+def test_nullable_integers_equal_their_floats():
+
+    dataset = pd.DataFrame({"nullable": pd.array([1, None, 3], dtype="Int64"), "floats": [1.0, np.nan, 3.0]})
+
+    _, duplicate_of, _ = find_constant_and_duplicate_columns(dataset)
+
+    assert duplicate_of == {"floats": "nullable"}
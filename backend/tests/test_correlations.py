@@ -0,0 +1,197 @@
+import numpy as np
+import pandas as pd
+import pytest
+from feature_engine.selection.base_selection_functions import find_correlated_features
+
+from Components import correlations
+from Components.correlations import (CorrelationCache, correlation_matrix, correlated_groups, max_abs_correlations,
+                                     correlated_pairs, pearson_block)
+from Components.dataset_versions import step_fingerprint
+
+
+def make_dataset(rows=500):
+
+    rng = np.random.default_rng(0)
+    dataset = pd.DataFrame({f"x{index}": rng.normal(size=rows) for index in range(5)})
+    dataset["x5"] = dataset["x0"] * 2 + rng.normal(scale=0.1, size=rows)
+    dataset["x6"] = -dataset["x1"] + rng.normal(scale=0.3, size=rows)
+    dataset["count"] = rng.integers(0, 10, size=rows).astype(np.int32)
+    dataset["label"] = rng.choice(["a", "b"], size=rows)
+    return dataset
+
+
+def expected_matrix(dataset):
+
+    return dataset.select_dtypes(include="number").corr(method="pearson")
+
+
+def lineage_of(*steps):
+
+    # Fingerprints of a root version and the versions its steps produce, newest first
+    fingerprint = "root"
+    lineage = [(fingerprint, None)]
+    for step in steps:
+        fingerprint = step_fingerprint(fingerprint, step)
+        lineage.append((fingerprint, step))
+    return lineage[::-1]
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+
+    cache = CorrelationCache(max_entries=16)
+    monkeypatch.setattr(correlations, "correlation_cache", cache)
+    return cache
+
+
+def test_computed_matrix_matches_pandas(monkeypatch):
+
+    # Small blocks make the kernel accumulate over several row blocks
+    monkeypatch.setattr(correlations, "CORRELATION_BLOCK_ROWS", 64)
+    dataset = make_dataset()
+
+    matrix, source = correlation_matrix(dataset)
+
+    assert source == "computed"
+    assert list(matrix.columns) == list(expected_matrix(dataset).columns)
+    pd.testing.assert_frame_equal(matrix, expected_matrix(dataset), atol=1e-12, rtol=0)
+
+
+def test_missing_values_fall_back_to_pairwise_correlations():
+
+    dataset = make_dataset()
+    dataset.loc[::7, "x2"] = np.nan
+
+    matrix, _ = correlation_matrix(dataset)
+
+    pd.testing.assert_frame_equal(matrix, expected_matrix(dataset), atol=1e-12, rtol=0)
+
+
+def test_constant_columns_have_undefined_correlations():
+
+    dataset = make_dataset()
+    dataset["constant"] = 3.0
+
+    block = pearson_block(dataset, ["constant", "x0"], ["constant", "x0"])
+
+    assert np.isnan(block[0]).all() and np.isnan(block[:, 0]).all()
+    assert block[1, 1] == pytest.approx(1.0)
+
+
+def test_cached_matrix_is_returned_for_the_same_version(fresh_cache):
+
+    dataset = make_dataset()
+    lineage = lineage_of()
+
+    first, first_source = correlation_matrix(dataset, lineage)
+    second, second_source = correlation_matrix(dataset, lineage)
+
+    assert (first_source, second_source) == ("computed", "cached")
+    assert second is first
+    assert fresh_cache.stats()["hits"] == 1
+
+
+def test_selection_step_slices_the_ancestor_matrix():
+
+    dataset = make_dataset()
+    correlation_matrix(dataset, lineage_of())
+
+    step = {"kind": "selection", "featureSubTask": "DropCorrelatedFeatures", "columns": []}
+    selected = dataset.drop(columns=["x5", "count"])
+    matrix, source = correlation_matrix(selected, lineage_of(step))
+
+    assert source == "sliced"
+    pd.testing.assert_frame_equal(matrix, expected_matrix(selected), atol=1e-12, rtol=0)
+
+
+def test_engineering_step_recomputes_only_the_rewritten_columns():
+
+    dataset = make_dataset()
+    correlation_matrix(dataset, lineage_of())
+
+    step = {"kind": "engineering", "featureTask": "Variable Transformation", "featureSubTask": "LogTransformer",
+            "columns": ["x2", "count"]}
+    engineered = dataset.assign(x2=np.log1p(dataset["x2"].abs()), count=dataset["count"] ** 2,
+                                added=dataset["x3"] + dataset["x4"])
+    matrix, source = correlation_matrix(engineered, lineage_of(step))
+
+    assert source == "updated"
+    pd.testing.assert_frame_equal(matrix, expected_matrix(engineered), atol=1e-12, rtol=0)
+
+
+def test_update_walks_up_to_the_nearest_cached_ancestor():
+
+    dataset = make_dataset()
+    correlation_matrix(dataset, lineage_of())
+
+    scaled = {"kind": "engineering", "featureTask": "Feature Scaling", "featureSubTask": "StandardScaler", "columns": ["x0"]}
+    dropped = {"kind": "selection", "featureSubTask": "DropFeatures", "columns": ["x1"]}
+    engineered = dataset.assign(x0=(dataset["x0"] - dataset["x0"].mean()) * 10).drop(columns=["x1"])
+    matrix, source = correlation_matrix(engineered, lineage_of(scaled, dropped))
+
+    assert source == "updated"
+    pd.testing.assert_frame_equal(matrix, expected_matrix(engineered), atol=1e-12, rtol=0)
+
+
+def test_steps_changing_rows_recompute_the_matrix():
+
+    dataset = make_dataset()
+    correlation_matrix(dataset, lineage_of())
+
+    step = {"kind": "engineering", "featureTask": "Missing Data Imputation", "featureSubTask": "DropMissingData", "columns": []}
+    fewer_rows = dataset.iloc[::2]
+    matrix, source = correlation_matrix(fewer_rows, lineage_of(step))
+
+    assert source == "computed"
+    pd.testing.assert_frame_equal(matrix, expected_matrix(fewer_rows), atol=1e-12, rtol=0)
+
+
+def test_missing_values_in_rewritten_columns_recompute_the_matrix():
+
+    dataset = make_dataset()
+    correlation_matrix(dataset, lineage_of())
+
+    step = {"kind": "engineering", "featureTask": "Outlier Handling", "featureSubTask": "OutlierTrimmer", "columns": ["x3"]}
+    engineered = dataset.assign(x3=dataset["x3"].where(dataset["x3"].abs() < 2))
+    matrix, source = correlation_matrix(engineered, lineage_of(step))
+
+    assert source == "computed"
+    pd.testing.assert_frame_equal(matrix, expected_matrix(engineered), atol=1e-12, rtol=0)
+
+
+@pytest.mark.parametrize("threshold", [0.3, 0.8, 0.95])
+def test_correlated_groups_match_feature_engine(threshold):
+
+    dataset = make_dataset()
+    features = list(expected_matrix(dataset).columns)
+    matrix, _ = correlation_matrix(dataset)
+
+    groups, features_to_drop, correlated_dict = correlated_groups(matrix, features, threshold)
+
+    assert (groups, features_to_drop, correlated_dict) == find_correlated_features(dataset, features, "pearson", threshold)
+
+
+def test_max_abs_correlations():
+
+    dataset = make_dataset()
+    dataset["constant"] = 1.0
+    matrix, _ = correlation_matrix(dataset)
+    features = ["x0", "x1", "x5", "constant"]
+
+    scores = max_abs_correlations(matrix, features)
+
+    assert scores["x0"] == pytest.approx(abs(matrix.loc["x0", "x5"]))
+    assert scores["x1"] == pytest.approx(matrix.loc["x1", ["x0", "x5"]].abs().max())
+    assert np.isnan(scores["constant"])
+    assert np.isnan(max_abs_correlations(matrix, ["x0"])["x0"])
+
+
+def test_correlated_pairs_are_listed_strongest_first():
+
+    dataset = make_dataset()
+    matrix, _ = correlation_matrix(dataset)
+
+    pairs = correlated_pairs(matrix, 0.5)
+
+    assert [(pair["left"], pair["right"]) for pair in pairs] == [("x0", "x5"), ("x1", "x6")]
+    assert pairs[1]["correlation"] == pytest.approx(matrix.loc["x1", "x6"]) and pairs[1]["correlation"] < 0
@@ -0,0 +1,192 @@
+import json
+import asyncio
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi import HTTPException
+
+from Components import datacleaner
+from Components.jobs import job_runner, job_store
+from Components.datacleaner import (FeatureEngineeringConfig, FeatureSelectionConfig, PipelineConfig, PipelineStep,
+                                    validate_pipeline_steps)
+
+
+def make_dataset(rows=200):
+
+    rng = np.random.default_rng(0)
+    dataset = pd.DataFrame({f"x{index}": rng.normal(size=rows) for index in range(4)})
+    dataset["target"] = (dataset["x0"] + rng.normal(size=rows) > 0).astype(int)
+    return dataset
+
+
+def run(handler, *args):
+
+    return asyncio.run(handler(*args))
+
+
+@pytest.mark.parametrize("step", [
+    {"kind": "engineering", "featureTask": "Feature Scaling", "featureSubTask": "NoSuchScaler"},
+    {"kind": "engineering", "featureTask": "No Such Task", "featureSubTask": "MeanImputer"},
+    {"kind": "engineering", "featureTask": None, "featureSubTask": "MeanImputer"},
+    {"kind": "selection", "featureSubTask": "NoSuchSelector"}
+])
+def test_pipeline_with_an_unknown_step_fails_before_any_step_runs(upload_dataset, monkeypatch, step):
+
+    user_details = upload_dataset(make_dataset())
+    ran = []
+    monkeypatch.setattr(datacleaner.FeatureEngineering, "manager", lambda self, dataset: ran.append(self) or dataset)
+
+    steps = [PipelineStep(kind="engineering", columns=["x0"], featureTask="Missing Data Imputation",
+                          featureSubTask="MeanImputer", targetFeature="target"), PipelineStep(**step)]
+
+    with pytest.raises(HTTPException) as error:
+        run(datacleaner.handle_pipeline, PipelineConfig(steps=steps), user_details)
+
+    assert error.value.status_code == 400
+    assert "pipeline step 1" in error.value.detail
+    assert ran == []
+
+
+def test_known_steps_pass_validation():
+
+    validate_pipeline_steps([PipelineStep(kind="engineering", featureTask="Discretisation", featureSubTask="EqualWidthDiscretiser"),
+                             PipelineStep(kind="selection", featureSubTask="DropConstantAndDuplicateFeatures")])
+
+
+def test_unknown_engineering_sub_task_is_a_bad_request(upload_dataset):
+
+    user_details = upload_dataset(make_dataset())
+    config = FeatureEngineeringConfig(columns=["x0"], featureTask="Feature Scaling", featureSubTask="NoSuchScaler", targetFeature="target")
+
+    with pytest.raises(HTTPException) as error:
+        run(datacleaner.handle_engineering_columns, config, user_details)
+
+    assert error.value.status_code == 400
+
+
+def test_engineering_without_a_result_is_a_bad_request(upload_dataset, monkeypatch):
+
+    user_details = upload_dataset(make_dataset())
+    monkeypatch.setattr(datacleaner.FeatureEngineering, "manager", lambda self, dataset: None)
+    config = FeatureEngineeringConfig(columns=["x0"], featureTask="Feature Scaling", featureSubTask="MeanNormalizationScaler", targetFeature="target")
+
+    with pytest.raises(HTTPException) as error:
+        run(datacleaner.handle_engineering_columns, config, user_details)
+
+    assert error.value.status_code == 400
+
+
+def test_unknown_selection_sub_task_is_a_bad_request(upload_dataset):
+
+    user_details = upload_dataset(make_dataset())
+    config = FeatureSelectionConfig(columns=[], featureSubTask="NoSuchSelector", targetFeature="target")
+
+    with pytest.raises(HTTPException) as error:
+        run(datacleaner.handle_selection_columns, config, user_details)
+
+    assert error.value.status_code == 400
+
+
+def test_pipeline_runs_its_steps_and_records_a_version_per_step(upload_dataset):
+
+    dataset = make_dataset()
+    dataset.loc[::10, "x1"] = np.nan
+    dataset["constant"] = 1.0
+    user_details = upload_dataset(dataset)
+
+    steps = [PipelineStep(kind="engineering", columns=["x1"], featureTask="Missing Data Imputation",
+                          featureSubTask="MeanImputer", targetFeature="target"),
+             PipelineStep(kind="selection", featureSubTask="DropConstantFeatures", targetFeature="target")]
+    info = json.loads(run(datacleaner.handle_pipeline, PipelineConfig(steps=steps), user_details).body)
+
+    assert info["columnCount"] == len(dataset.columns) - 1
+    assert [step["featureSubTask"] for step in info["timings"]["steps"]] == ["MeanImputer", "DropConstantFeatures"]
+    assert info["version"]["head"] == 2
+
+
+def test_pipeline_steps_run_off_the_event_loop(upload_dataset, monkeypatch):
+
+    user_details = upload_dataset(make_dataset())
+    threads = []
+    monkeypatch.setattr(datacleaner.FeatureEngineering, "manager", lambda self, dataset: threads.append(threading.get_ident()) or dataset)
+
+    steps = [PipelineStep(kind="engineering", columns=["x0"], featureTask="Missing Data Imputation",
+                          featureSubTask="MeanImputer", targetFeature="target")]
+    response = run(datacleaner.handle_pipeline, PipelineConfig(steps=steps), user_details)
+
+    assert response.status_code == 200
+    assert threads and threading.get_ident() not in threads
+
+
+def test_single_steps_run_off_the_event_loop(upload_dataset, monkeypatch):
+
+    user_details = upload_dataset(make_dataset())
+    threads = []
+    monkeypatch.setattr(datacleaner.FeatureEngineering, "manager", lambda self, dataset: threads.append(threading.get_ident()) or dataset)
+    monkeypatch.setattr(datacleaner.FeatureSelection, "manager", lambda self, dataset: threads.append(threading.get_ident()) or dataset)
+
+    engineering = FeatureEngineeringConfig(columns=["x0"], featureTask="Feature Scaling", featureSubTask="MeanNormalizationScaler", targetFeature="target")
+    selection = FeatureSelectionConfig(columns=[], featureSubTask="DropConstantFeatures", targetFeature="target")
+    run(datacleaner.handle_engineering_columns, engineering, user_details)
+    run(datacleaner.handle_selection_columns, selection, user_details)
+
+    assert len(threads) == 2 and threading.get_ident() not in threads
+
+
+def test_pipeline_with_a_long_running_step_runs_as_a_job(upload_dataset, monkeypatch):
+
+    user_details = upload_dataset(make_dataset())
+    monkeypatch.setattr(job_runner, "_slots", None)
+
+    steps = [PipelineStep(kind="engineering", columns=["x1"], featureTask="Feature Scaling",
+                          featureSubTask="MeanNormalizationScaler", targetFeature="target"),
+             PipelineStep(kind="engineering", columns=["x0"], featureTask="Discretisation",
+                          featureSubTask="DecisionTreeDiscretiser", targetFeature="x2")]
+
+    async def submit_and_wait():
+        response = await datacleaner.handle_pipeline(PipelineConfig(steps=steps), user_details)
+        await asyncio.gather(*list(job_runner._tasks))
+        return response
+
+    response = asyncio.run(submit_and_wait())
+    assert response.status_code == 202
+
+    job = job_store.get(json.loads(response.body)["jobId"], user_details["username"])
+    assert job["kind"] == "pipeline"
+    assert job["status"] == "succeeded", job["error"]
+    assert job["progress"]["total"] == job["progress"]["done"] > 0
+    assert job["result"]["version"]["head"] == 2
+    assert [step["featureSubTask"] for step in job["result"]["timings"]["steps"]] == ["MeanNormalizationScaler", "DecisionTreeDiscretiser"]
+
+
+def test_selection_without_a_result_is_a_bad_request(upload_dataset, monkeypatch):
+
+    user_details = upload_dataset(make_dataset())
+    monkeypatch.setattr(datacleaner.FeatureSelection, "manager", lambda self, dataset: None)
+    config = FeatureSelectionConfig(columns=[], featureSubTask="DropConstantFeatures", targetFeature="target")
+
+    with pytest.raises(HTTPException) as error:
+        run(datacleaner.handle_selection_columns, config, user_details)
+
+    assert error.value.status_code == 400
+
+
+def test_unsupported_estimator_fails_before_a_job_is_queued(upload_dataset):
+
+    user_details = upload_dataset(make_dataset())
+    config = FeatureSelectionConfig(columns=[], featureSubTask="StepRecursiveFeatureElimination", targetFeature="target",
+                                    estimator="hist_gradient_boosting")
+
+    with pytest.raises(HTTPException) as error:
+        run(datacleaner.handle_selection_columns, config, user_details)
+
+    assert error.value.status_code == 400
+
+    with pytest.raises(HTTPException) as error:
+        validate_pipeline_steps([PipelineStep(kind="selection", featureSubTask="StepRecursiveFeatureElimination",
+                                              estimator="hist_gradient_boosting")])
+
+    assert error.value.status_code == 400
+    assert "pipeline step 0" in error.value.detail
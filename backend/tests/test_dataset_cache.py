@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Components.dataset_cache import DatasetCache
+
+
+def make_dataset(rows=100):
+
+    return pd.DataFrame({
+        "number": np.arange(rows, dtype=np.float64),
+        "count": pd.array(np.arange(rows), dtype="Int64"),
+        "label": pd.Categorical(np.where(np.arange(rows) % 2, "odd", "even"))
+    })
+
+
+def test_get_returns_the_cached_dataset_for_its_version_only():
+
+    cache = DatasetCache(max_bytes=10 * 1024 * 1024)
+    cache.put("file.csv", "v1", make_dataset())
+
+    assert cache.get("file.csv", "v1").equals(make_dataset())
+    assert cache.get("file.csv", "v2") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_arrays_of_cached_datasets_are_read_only():
+
+    cache = DatasetCache(max_bytes=10 * 1024 * 1024)
+    cached = cache.put("file.csv", "v1", make_dataset())
+
+    with pytest.raises(ValueError):
+        cached["number"].to_numpy()[0] = -1.0
+
+    assert cache.get("file.csv", "v1")["number"].iloc[0] == 0.0
+
+
+def test_derived_frames_stay_writable_and_leave_the_cache_unchanged():
+
+    cache = DatasetCache(max_bytes=10 * 1024 * 1024)
+    cache.put("file.csv", "v1", make_dataset())
+
+    dataset = cache.get("file.csv", "v1")
+    dataset["number"] = dataset["number"] * 2
+    dataset.loc[0, "count"] = 42
+
+    assert dataset["number"].iloc[1] == 2.0 and dataset["count"].iloc[0] == 42
+    assert cache.get("file.csv", "v1").equals(make_dataset())
+
+
+def test_writes_through_the_stored_frame_leave_the_cache_unchanged():
+
+    cache = DatasetCache(max_bytes=10 * 1024 * 1024)
+    dataset = make_dataset()
+    returned = cache.put("file.csv", "v1", dataset)
+
+    dataset.loc[0, "number"] = -1.0
+    dataset.iloc[1, 2] = "odd"
+    returned.loc[2, "count"] = 7
+
+    assert cache.get("file.csv", "v1").equals(make_dataset())
+
+
+def test_least_recently_used_entries_are_evicted_over_budget():
+
+    size = int(make_dataset().memory_usage(index=True, deep=True).sum())
+    cache = DatasetCache(max_bytes=2 * size)
+
+    cache.put("a.csv", "v1", make_dataset())
+    cache.put("b.csv", "v1", make_dataset())
+    cache.get("a.csv", "v1")
+    cache.put("c.csv", "v1", make_dataset())
+
+    assert cache.version("a.csv") == "v1"
+    assert cache.version("b.csv") is None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_datasets_larger_than_the_budget_are_not_cached():
+
+    cache = DatasetCache(max_bytes=10)
+    dataset = cache.put("file.csv", "v1", make_dataset())
+
+    assert dataset.equals(make_dataset())
+    assert cache.version("file.csv") is None
@@ -0,0 +1,38 @@
+import pytest
+
+from Components import dataset_io
+from Components.dataset_io import choose_content_encoding
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    (None, None),
+    ("", None),
+    ("gzip", "gzip"),
+    ("gzip, zstd", "zstd"),
+    ("gzip;q=0", None),
+    ("gzip;q=0, zstd;q=0", None),
+    ("zstd;q=0, gzip", "gzip"),
+    ("zstd;q=0.5, gzip;q=0.8", "gzip"),
+    ("zstd;q=1.0, gzip;q=0.8", "zstd"),
+    ("GZIP; Q=0.5", "gzip"),
+    ("gzip;q=oops", None),
+    ("br", None),
+    ("*", "zstd"),
+    ("*;q=0", None),
+    ("zstd;q=0, *", "gzip"),
+    ("identity, *;q=0", None)
+])
+def test_choose_content_encoding(monkeypatch, accept_encoding, expected):
+
+    # Only the availability of zstandard matters for the choice
+    monkeypatch.setattr(dataset_io, "zstandard", object())
+
+    assert choose_content_encoding(accept_encoding) == expected
+
+
+def test_without_zstandard_only_gzip_is_chosen(monkeypatch):
+
+    monkeypatch.setattr(dataset_io, "zstandard", None)
+
+    assert choose_content_encoding("zstd, gzip;q=0.5") == "gzip"
+    assert choose_content_encoding("zstd") is None
@@ -0,0 +1,232 @@
+import json
+import asyncio
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi import HTTPException
+
+from Components import datacleaner, dataset_versions, feature_engineering
+from Components.database import users_edited_dataframe_collection
+from Components.storage import storage
+from Components.dataset_cache import DatasetCache
+from Components.transformer_store import TransformerStore
+from Components.datacleaner import PipelineConfig, PipelineStep, CheckoutRequest
+from Components.dataset_versions import get_version_log, commit_steps, move_head, materialize, version_fingerprint
+
+
+def make_dataset(rows=100):
+
+    rng = np.random.default_rng(0)
+    dataset = pd.DataFrame({"x0": rng.normal(size=rows), "x1": rng.normal(size=rows), "constant": 1.0})
+    dataset.loc[::10, "x1"] = np.nan
+    return dataset
+
+
+STEPS = [
+    PipelineStep(kind="engineering", columns=["x1"], featureTask="Missing Data Imputation", featureSubTask="MeanImputer"),
+    PipelineStep(kind="selection", featureSubTask="DropConstantFeatures"),
+    PipelineStep(kind="selection", columns=["x0"], featureSubTask="DropFeatures")
+]
+
+
+def run(handler, *args):
+
+    return json.loads(asyncio.run(handler(*args)).body)
+
+
+def user_data():
+
+    return datacleaner.get_user_details(username="user", role="user")
+
+
+def stored_log():
+
+    return users_edited_dataframe_collection.find_one({"username": "user", "role": "user", "file": "dataset.csv"})
+
+
+def materialized(version_id):
+
+    data = user_data()
+    return asyncio.run(materialize(data, asyncio.run(get_version_log(data)), version_id))
+
+
+@pytest.fixture
+def versions(upload_dataset, monkeypatch):
+
+    # Versions are rebuilt by replaying their steps, not served from the cache
+    monkeypatch.setattr(dataset_versions, "dataset_cache", DatasetCache(max_bytes=0))
+
+    user_details = upload_dataset(make_dataset())
+    run(datacleaner.handle_pipeline, PipelineConfig(steps=STEPS), user_details)
+    return user_details
+
+
+def test_every_pipeline_step_is_a_version(versions):
+
+    log = stored_log()
+
+    assert (log["head"], log["next_id"], log["redo"]) == (3, 4, [])
+    assert [(entry["id"], entry["parent"]) for entry in log["versions"]] == [(0, None), (1, 0), (2, 1), (3, 2)]
+    assert log["versions"][2]["droppedColumns"] == ["constant"]
+    assert list(materialized(3).columns) == ["x1"]
+
+
+def test_undo_redo_round_trip(versions):
+
+    after_steps = [materialized(version_id) for version_id in range(4)]
+
+    assert run(datacleaner.handle_undo, versions)["version"]["head"] == 2
+    assert run(datacleaner.handle_undo, versions)["version"]["head"] == 1
+    assert stored_log()["redo"] == [3, 2]
+    pd.testing.assert_frame_equal(materialized(1), after_steps[1])
+    assert materialized(1)["x1"].notna().all()
+
+    assert run(datacleaner.handle_redo, versions)["version"]["head"] == 2
+    info = run(datacleaner.handle_redo, versions)
+    assert info["version"]["head"] == 3 and not info["version"]["canRedo"]
+    pd.testing.assert_frame_equal(materialized(3), after_steps[3])
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(datacleaner.handle_redo(versions))
+    assert error.value.status_code == 400
+
+
+def test_checkout_round_trip(versions):
+
+    info = run(datacleaner.handle_checkout, CheckoutRequest(version=0), versions)
+
+    assert info["version"]["head"] == 0 and not info["version"]["canUndo"]
+    assert info["columnCount"] == 3
+    pd.testing.assert_frame_equal(materialized(0), make_dataset(), check_exact=False)
+
+    assert run(datacleaner.handle_checkout, CheckoutRequest(version=3), versions)["columnCount"] == 1
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(datacleaner.handle_checkout(CheckoutRequest(version=42), versions))
+    assert error.value.status_code == 404
+
+
+def test_a_step_after_undo_branches_and_clears_redo(versions):
+
+    run(datacleaner.handle_undo, versions)
+    run(datacleaner.handle_pipeline, PipelineConfig(steps=[STEPS[2]]), versions)
+    log = stored_log()
+
+    assert log["head"] == 4 and log["redo"] == []
+    assert log["versions"][-1]["parent"] == 2
+    # Versions reached by the same steps have the same content fingerprint
+    assert version_fingerprint(log, 4) == version_fingerprint(log, 3)
+
+
+def test_commit_from_a_stale_log_is_a_conflict(versions):
+
+    data = user_data()
+    first, stale = asyncio.run(get_version_log(data)), asyncio.run(get_version_log(data))
+    dataset = asyncio.run(materialize(data, first, first["head"]))
+    step = {"kind": "selection", "featureTask": None, "featureSubTask": "DropFeatures", "columns": ["x1"]}
+
+    asyncio.run(commit_steps(data, first, [(step, dataset, dataset.drop(columns=["x1"]), None)]))
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(commit_steps(data, stale, [(step, dataset, dataset.drop(columns=["x1"]), None)]))
+
+    assert error.value.status_code == 409
+    log = stored_log()
+    assert (log["head"], log["next_id"]) == (4, 5)
+    assert [entry["id"] for entry in log["versions"]] == [0, 1, 2, 3, 4]
+
+
+def test_commit_on_a_given_parent_retries_on_the_stored_log(versions):
+
+    data = user_data()
+    stale = asyncio.run(get_version_log(data))
+    run(datacleaner.handle_undo, versions)
+
+    dataset = asyncio.run(materialize(data, stale, 3))
+    step = {"kind": "selection", "featureTask": None, "featureSubTask": "DropFeatures", "columns": ["x1"]}
+    version_log = asyncio.run(commit_steps(data, stale, [(step, dataset, dataset.drop(columns=["x1"]), None)], parent_id=3))
+
+    assert (version_log["head"], version_log["next_id"]) == (4, 5)
+    log = stored_log()
+    assert (log["head"], log["next_id"], log["redo"]) == (4, 5, [])
+    assert log["versions"][-1]["parent"] == 3
+
+
+def test_moving_the_head_of_a_stale_log_applies_to_the_stored_head(versions):
+
+    data = user_data()
+    stale = asyncio.run(get_version_log(data))
+    run(datacleaner.handle_undo, versions)
+
+    # Undo from the stale copy steps back from version 2, where the other undo left the head
+    version_log = move_head(stale, "undo")
+
+    assert version_log["head"] == 1 and version_log["redo"] == [3, 2]
+    assert (stored_log()["head"], stored_log()["redo"]) == (1, [3, 2])
+
+
+def test_racing_commits_do_not_share_checkpoint_names(versions, monkeypatch):
+
+    monkeypatch.setattr(dataset_versions, "DATASET_CHECKPOINT_INTERVAL", 1)
+    data = user_data()
+    first, stale = asyncio.run(get_version_log(data)), asyncio.run(get_version_log(data))
+    dataset = asyncio.run(materialize(data, first, first["head"]))
+    step = {"kind": "selection", "featureTask": None, "featureSubTask": "DropFeatures", "columns": ["x1"]}
+
+    asyncio.run(commit_steps(data, first, [(step, dataset, dataset.drop(columns=["x1"]), None)]))
+    with pytest.raises(HTTPException):
+        asyncio.run(commit_steps(data, stale, [(step, dataset, dataset.assign(extra=1.0), None)]))
+
+    checkpoint = stored_log()["versions"][-1]["checkpoint"]
+    stored = asyncio.run(dataset_versions.fetch_and_read_github_file(checkpoint["file"], checkpoint["url"]))
+    assert "extra" not in stored.columns and list(stored.columns) == []
+
+
+@pytest.fixture
+def counted_fits(monkeypatch, tmp_path):
+
+    # Without the node-local store every fit that is not replayed from the version log runs again
+    monkeypatch.setattr(feature_engineering, "transformer_store", TransformerStore(str(tmp_path), max_bytes=0))
+    fits = []
+    fit_columns = feature_engineering.fit_columns
+
+    def counting_fit_columns(transformer, X_train, y_train=None):
+        fits.append(type(transformer).__name__)
+        return fit_columns(transformer, X_train, y_train)
+
+    monkeypatch.setattr(feature_engineering, "fit_columns", counting_fit_columns)
+    return fits
+
+
+def test_engineering_steps_record_their_fitted_transformer(versions):
+
+    entries = stored_log()["versions"]
+    fitted = entries[1]["fitted"]
+
+    assert fitted["file"].endswith(".joblib") and fitted["versions"] == dataset_versions.LIBRARY_VERSIONS
+    assert asyncio.run(storage.exists(fitted["file"]))
+    assert [entry["fitted"] for entry in entries[2:]] == [None, None]
+
+
+def test_replay_transforms_with_the_recorded_transformer(versions, counted_fits):
+
+    dataset = materialized(1)
+
+    assert counted_fits == []
+    assert dataset["x1"].notna().all()
+    pd.testing.assert_frame_equal(dataset, materialized(1))
+
+
+@pytest.mark.parametrize("lost", ["file", "versions"])
+def test_replay_refits_a_transformer_it_cannot_load(versions, counted_fits, monkeypatch, lost):
+
+    expected = materialized(1)
+
+    if lost == "file":
+        asyncio.run(storage.delete(stored_log()["versions"][1]["fitted"]["file"]))
+    else:
+        monkeypatch.setattr(dataset_versions, "LIBRARY_VERSIONS", ["0.0", "0.0"])
+
+    pd.testing.assert_frame_equal(materialized(1), expected)
+    assert counted_fits == ["MeanMedianImputer"]
@@ -0,0 +1,129 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from Components import datacontrol
+from Components.auth import get_current_user
+from Components.storage import storage
+
+CONTENT = bytes(range(256)) * 40
+
+
+@pytest.fixture
+def client(monkeypatch):
+
+    upload_result = asyncio.run(storage.put("download.csv", CONTENT))
+    user_details = {
+        "file": "download.csv",
+        "file_url": upload_result["download_url"],
+        "file_version": upload_result["version"],
+        "file_size": len(CONTENT),
+        "file_uploaded_at": datetime(2026, 1, 2, 3, 4, 5)
+    }
+    monkeypatch.setattr(datacontrol, "get_user_details", lambda username, role: dict(user_details))
+
+    app = FastAPI()
+    app.include_router(datacontrol.router)
+    app.dependency_overrides[get_current_user] = lambda: {"username": "user", "role": "user"}
+
+    test_client = TestClient(app)
+    test_client.etag = f'"{upload_result["version"]}"'
+    return test_client
+
+
+def test_whole_file(client):
+
+    response = client.get("/datacontrol/download")
+
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["Content-Length"] == str(len(CONTENT))
+    assert response.headers["Accept-Ranges"] == "bytes"
+    assert response.headers["ETag"] == client.etag
+    assert response.headers["Last-Modified"] == "Fri, 02 Jan 2026 03:04:05 GMT"
+
+
+@pytest.mark.parametrize("range_header, start, end", [
+    ("bytes=0-99", 0, 99),
+    ("bytes=1000-", 1000, len(CONTENT) - 1),
+    ("bytes=-500", len(CONTENT) - 500, len(CONTENT) - 1),
+    ("bytes=10000-99999", 10000, len(CONTENT) - 1)
+])
+def test_byte_range(client, range_header, start, end):
+
+    response = client.get("/datacontrol/download", headers={"Range": range_header})
+
+    assert response.status_code == 206
+    assert response.content == CONTENT[start:end + 1]
+    assert response.headers["Content-Range"] == f"bytes {start}-{end}/{len(CONTENT)}"
+    assert response.headers["Content-Length"] == str(end - start + 1)
+
+
+@pytest.mark.parametrize("range_header", ["bytes=10240-", "bytes=20000-30000", "bytes=-0"])
+def test_unsatisfiable_range(client, range_header):
+
+    response = client.get("/datacontrol/download", headers={"Range": range_header})
+
+    assert response.status_code == 416
+    assert response.headers["Content-Range"] == f"bytes */{len(CONTENT)}"
+
+
+@pytest.mark.parametrize("range_header", ["bytes=0-1,5-9", "lines=0-10", "bytes=a-b", "bytes=50-10", "bytes=-", "bytes=+5-9", "bytes=5"])
+def test_unsupported_range_sends_the_whole_file(client, range_header):
+
+    response = client.get("/datacontrol/download", headers={"Range": range_header})
+
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+
+def test_if_range_honours_the_range_only_while_the_file_is_unchanged(client):
+
+    current = client.get("/datacontrol/download", headers={"Range": "bytes=0-9", "If-Range": client.etag})
+    stale = client.get("/datacontrol/download", headers={"Range": "bytes=0-9", "If-Range": '"old-version"'})
+
+    assert current.status_code == 206 and current.content == CONTENT[:10]
+    assert stale.status_code == 200 and stale.content == CONTENT
+
+
+@pytest.mark.parametrize("if_range", ["W/{etag}", "Fri, 02 Jan 2026 03:04:05 GMT", "{etag}x"])
+def test_if_range_without_a_strong_etag_match_sends_the_whole_file(client, if_range):
+
+    response = client.get("/datacontrol/download", headers={"Range": "bytes=0-9", "If-Range": if_range.format(etag=client.etag)})
+
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+
+@pytest.mark.parametrize("headers", [
+    {"If-None-Match": "{etag}"},
+    {"If-None-Match": '"other", {etag}'},
+    {"If-None-Match": "*"},
+    {"If-Modified-Since": "Fri, 02 Jan 2026 03:04:05 GMT"},
+    {"If-Modified-Since": "Sat, 03 Jan 2026 00:00:00 GMT"}
+])
+def test_not_modified(client, headers):
+
+    headers = {name: value.format(etag=client.etag) for name, value in headers.items()}
+    response = client.get("/datacontrol/download", headers=headers)
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == client.etag
+
+
+@pytest.mark.parametrize("headers", [
+    {"If-None-Match": '"old-version"'},
+    {"If-Modified-Since": "Thu, 01 Jan 2026 00:00:00 GMT"},
+    # If-None-Match takes precedence over If-Modified-Since
+    {"If-None-Match": '"old-version"', "If-Modified-Since": "Sat, 03 Jan 2026 00:00:00 GMT"}
+])
+def test_modified(client, headers):
+
+    response = client.get("/datacontrol/download", headers=headers)
+
+    assert response.status_code == 200
+    assert response.content == CONTENT
@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from Components.recursive_elimination import StepRecursiveFeatureElimination, elimination_rounds
+
+
+def make_dataset(rows=400, noise_features=6):
+
+    rng = np.random.default_rng(0)
+    dataset = pd.DataFrame({"signal0": rng.normal(size=rows), "signal1": rng.normal(size=rows)})
+    for index in range(noise_features):
+        dataset[f"noise{index}"] = rng.normal(size=rows)
+    target = (dataset["signal0"] + dataset["signal1"] + rng.normal(scale=0.3, size=rows) > 0).astype(int)
+    return dataset, target
+
+
+def scripted_rounds(monkeypatch, scores):
+
+    # Round i scores scores[i], the features are ranked by their position so the last ones are eliminated first
+    scores = iter(scores)
+
+    def score_round(self, X, y, features):
+        return next(scores), {feature: -index for index, feature in enumerate(features)}, 10
+
+    monkeypatch.setattr(StepRecursiveFeatureElimination, "_score_round", score_round)
+
+
+class CountingProgress:
+
+    def __init__(self):
+        self.done = 0
+
+    def advance(self, folds=1):
+        self.done += folds
+
+
+def test_default_estimator_is_a_random_forest():
+
+    X, y = make_dataset()
+    selector = StepRecursiveFeatureElimination(drop_fraction=0.5).fit(X, y)
+
+    assert selector.estimator is None
+    assert isinstance(selector.estimator_, RandomForestClassifier)
+    assert {"signal0", "signal1"}.isdisjoint(selector.features_to_drop_)
+    assert 0.5 < selector.best_score_ <= 1
+
+
+def test_rounds_are_numbered_from_one_and_drop_a_fraction(monkeypatch):
+
+    scripted_rounds(monkeypatch, [0.6, 0.7, 0.8, 0.9, 0.95, 0.96, 0.97])
+    X, y = make_dataset(noise_features=8)
+    progress = CountingProgress()
+
+    selector = StepRecursiveFeatureElimination(drop_fraction=0.3, progress=progress).fit(X, y)
+
+    assert [entry["round"] for entry in selector.rounds_] == list(range(1, len(selector.rounds_) + 1))
+    assert [entry["features"] for entry in selector.rounds_] == [10, 7, 5, 4, 3, 2, 1]
+    assert [len(entry["eliminated"]) for entry in selector.rounds_] == [3, 2, 1, 1, 1, 1, 0]
+    assert progress.done == len(selector.rounds_)
+
+
+def test_rising_scores_eliminate_down_to_one_feature(monkeypatch):
+
+    scripted_rounds(monkeypatch, np.linspace(0.6, 0.99, 20))
+    X, y = make_dataset()
+
+    selector = StepRecursiveFeatureElimination(drop_fraction=0.2).fit(X, y)
+
+    assert len(selector.rounds_) == elimination_rounds(len(X.columns), 0.2)
+    assert selector.rounds_[-1]["features"] == 1
+    assert selector.features_to_drop_ == list(X.columns[1:])
+
+
+def test_elimination_stops_after_patience_rounds_below_the_best(monkeypatch):
+
+    scripted_rounds(monkeypatch, [0.80, 0.90, 0.85, 0.84, 0.99])
+    X, y = make_dataset()
+
+    selector = StepRecursiveFeatureElimination(drop_fraction=0.25, tolerance=0.01, patience=2).fit(X, y)
+
+    # Rounds 3 and 4 score below the best round 2, the fifth round never runs
+    assert [entry["score"] for entry in selector.rounds_] == [0.80, 0.90, 0.85, 0.84]
+    assert selector.rounds_[-1]["eliminated"] == []
+    assert selector.best_score_ == 0.90
+    assert len(selector.features_to_drop_) == len(X.columns) - selector.rounds_[1]["features"]
+
+
+def test_elimination_stops_on_a_plateau(monkeypatch):
+
+    scripted_rounds(monkeypatch, [0.80, 0.85, 0.855, 0.858, 0.99])
+    X, y = make_dataset()
+
+    selector = StepRecursiveFeatureElimination(drop_fraction=0.25, tolerance=0.01, patience=2).fit(X, y)
+
+    # Rounds 3 and 4 gain less than the tolerance on the best score, although they never decline
+    assert [entry["score"] for entry in selector.rounds_] == [0.80, 0.85, 0.855, 0.858]
+    assert selector.best_score_ == 0.858
+    assert len(selector.features_to_drop_) == len(X.columns) - selector.rounds_[3]["features"]
+
+
+def test_a_gain_above_the_tolerance_resets_the_patience(monkeypatch):
+
+    scripted_rounds(monkeypatch, [0.80, 0.805, 0.83, 0.835, 0.836, 0.99])
+    X, y = make_dataset()
+
+    selector = StepRecursiveFeatureElimination(drop_fraction=0.25, tolerance=0.01, patience=2).fit(X, y)
+
+    assert len(selector.rounds_) == 5
+
+
+@pytest.mark.parametrize("tree_tolerance, trees", [(1.0, 50), (0.0, 100)])
+def test_tree_tolerance_only_decides_the_trees_of_a_round(tree_tolerance, trees):
+
+    X, y = make_dataset()
+    estimator = RandomForestClassifier(n_estimators=100, random_state=0)
+
+    selector = StepRecursiveFeatureElimination(estimator=estimator, drop_fraction=0.5, tolerance=0.01, patience=1,
+                                               tree_tolerance=tree_tolerance).fit(X, y)
+
+    assert {entry["trees"] for entry in selector.rounds_} == {trees}
+
+
+@pytest.mark.parametrize("drop_fraction", [0, 1, 1.5])
+def test_drop_fraction_outside_the_unit_interval_is_rejected(drop_fraction):
+
+    X, y = make_dataset()
+
+    with pytest.raises(ValueError):
+        StepRecursiveFeatureElimination(drop_fraction=drop_fraction).fit(X, y)
+
+
+def test_fewer_than_two_variables_are_rejected():
+
+    X, y = make_dataset()
+
+    with pytest.raises(ValueError):
+        StepRecursiveFeatureElimination(variables=["signal0"]).fit(X, y)
+
+
+@pytest.mark.parametrize("features, drop_fraction, rounds", [(1, 0.2, 1), (2, 0.2, 2), (10, 0.5, 5), (100, 0.2, 21)])
+def test_elimination_rounds(features, drop_fraction, rounds):
+
+    assert elimination_rounds(features, drop_fraction) == rounds
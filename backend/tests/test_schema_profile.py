@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+from Components.schema_profile import build_schema_profile, apply_schema_profile, read_options
+
+
+def profile_of(dataset):
+
+    return {column["name"]: column for column in build_schema_profile(dataset)["columns"]}
+
+
+def test_integers_are_downcast_to_int32_at_the_smallest_and_stay_signed():
+
+    dataset = pd.DataFrame({
+        "small": np.array([0, 1, 127], dtype=np.int64),
+        "unsigned": np.array([0, 1, 255], dtype=np.uint64),
+        "wide": np.array([0, 2 ** 40], dtype=np.int64)[[0, 1, 1]],
+        "huge": np.array([0, 1, 2 ** 63], dtype=np.uint64)
+    })
+    profile = profile_of(dataset)
+
+    assert profile["small"]["dtype"] == "int32"
+    assert profile["unsigned"]["dtype"] == "int32"
+    assert profile["wide"]["dtype"] == "int64"
+    # Values no signed integer holds keep their dtype
+    assert profile["huge"]["dtype"] == "uint64"
+    assert (profile["small"]["min"], profile["small"]["max"]) == (0, 127)
+
+
+def test_downcast_integers_do_not_wrap_around_on_arithmetic():
+
+    dataset = pd.DataFrame({"small": np.array([0, 1, 127], dtype=np.int64), "unsigned": np.array([0, 1, 255], dtype=np.uint64)})
+    converted = apply_schema_profile(dataset, build_schema_profile(dataset))
+
+    assert (converted["small"] + 1).tolist() == [1, 2, 128]
+    assert (converted["unsigned"] - 1).tolist() == [-1, 0, 254]
+
+
+def test_floats_strings_and_dates():
+
+    rows = 100
+    dataset = pd.DataFrame({
+        "halves": np.arange(rows) / 2,
+        "thirds": np.arange(rows) / 3,
+        "color": ["red", "blue"] * (rows // 2),
+        "name": [f"user{index}" for index in range(rows)],
+        "day": pd.date_range("2020-01-01", periods=rows).strftime("%Y-%m-%d"),
+        "flag": [True, False] * (rows // 2)
+    })
+    profile = profile_of(dataset)
+
+    assert profile["halves"]["dtype"] == "float32"
+    assert profile["thirds"]["dtype"] == "float64"
+    assert profile["color"]["dtype"] == "category" and profile["color"]["unique"] == 2
+    assert profile["name"]["dtype"] == profile["name"]["sourceDtype"] and profile["name"]["unique"] == rows
+    assert profile["day"]["dtype"] == "datetime"
+    assert profile["flag"]["dtype"] == "bool"
+
+
+def test_read_options_and_memory_figures():
+
+    dataset = pd.DataFrame({"count": np.arange(1000, dtype=np.int64), "day": ["2020-01-01"] * 1000})
+    schema_profile = build_schema_profile(dataset)
+
+    assert read_options(schema_profile) == {"dtype": {"count": "int32"}, "parse_dates": ["day"]}
+    assert schema_profile["memorySavedBytes"] == schema_profile["memoryDefaultBytes"] - schema_profile["memoryOptimizedBytes"] > 0
+    assert read_options(None) == {}
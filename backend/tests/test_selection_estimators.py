@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi import HTTPException
+
+from Components.feature_selection import FeatureSelection
+
+USER_DETAILS = {"username": "user", "role": "user"}
+
+
+def make_dataset(rows=300):
+
+    rng = np.random.default_rng(0)
+    dataset = pd.DataFrame({f"x{index}": rng.normal(size=rows) for index in range(4)})
+    dataset["target"] = (dataset["x0"] + rng.normal(scale=0.5, size=rows) > 0).astype(int)
+    return dataset
+
+
+@pytest.mark.parametrize("sub_task, threshold, estimator", [
+    ("SelectBySingleFeaturePerformance", 0.99, "hist_gradient_boosting"),
+    ("ShuffleFeaturesSelector", 0.5, "hist_gradient_boosting"),
+    ("RecursiveFeatureElimination", 0.5, "hist_gradient_boosting"),
+    ("StepRecursiveFeatureElimination", None, None)
+])
+def test_the_target_is_never_evaluated_or_dropped(sub_task, threshold, estimator):
+
+    # Thresholds no predictor reaches drop every feature the selector evaluates, the target must survive them
+    dataset = make_dataset()
+    feature_selection = FeatureSelection(USER_DETAILS, featureselectionSubTask=sub_task, target_feature="target",
+                                         estimator=estimator, threshold=threshold)
+
+    edited_dataset = feature_selection.manager(dataset)
+
+    assert "target" in edited_dataset.columns
+    assert edited_dataset["target"].equals(dataset["target"])
+    assert "target" not in feature_selection.report["selectedFeatures"]
+    assert "target" not in feature_selection.report["droppedFeatures"]
+
+
+@pytest.mark.parametrize("estimator", [None, "random_forest"])
+def test_step_recursive_elimination_reports_its_estimator(estimator):
+
+    feature_selection = FeatureSelection(USER_DETAILS, featureselectionSubTask="StepRecursiveFeatureElimination",
+                                         target_feature="target", estimator=estimator)
+
+    feature_selection.manager(make_dataset())
+
+    assert feature_selection.report["estimator"] == "random_forest"
+
+
+def test_step_recursive_elimination_rejects_other_estimators():
+
+    feature_selection = FeatureSelection(USER_DETAILS, featureselectionSubTask="StepRecursiveFeatureElimination",
+                                         target_feature="target", estimator="hist_gradient_boosting")
+
+    with pytest.raises(HTTPException) as error:
+        feature_selection.manager(make_dataset())
+
+    assert error.value.status_code == 400
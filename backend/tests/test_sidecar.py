@@ -0,0 +1,105 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from Components import dataset_io
+from Components.dataset_io import build_sidecar, read_dataset, file_digest
+from Components.schema_profile import build_schema_profile, apply_schema_profile
+
+
+@pytest.fixture
+def small_batches(monkeypatch):
+
+    # One megabyte batches, so the test files are converted in several batches
+    monkeypatch.setattr(dataset_io, "SIDECAR_BLOCK_MB", 1)
+
+
+def write_csv(path, rows=100000):
+
+    rng = np.random.default_rng(0)
+    dataset = pd.DataFrame({
+        "id": np.arange(rows),
+        "late_missing": np.where(np.arange(rows) > rows - 10, np.nan, np.arange(rows) % 100),
+        "half": rng.integers(0, 8, rows) / 2,
+        "noise": rng.random(rows),
+        "color": rng.choice(["red", "green", "blue"], rows),
+        "name": [f"user{index}" for index in range(rows)],
+        "day": pd.date_range("2020-01-01", periods=rows, freq="h").strftime("%Y-%m-%d %H:%M"),
+        "flag": rng.random(rows) > 0.5,
+        "empty": np.nan
+    })
+    dataset.loc[5, "color"] = None
+    dataset.to_csv(path, index=False)
+
+    return str(path)
+
+
+def test_batched_profile_matches_the_whole_file_profile(tmp_path, small_batches):
+
+    path = write_csv(tmp_path / "data.csv")
+    sidecar, schema_profile = build_sidecar("data.csv", path)
+    os.remove(sidecar.path)
+
+    expected = build_schema_profile(read_dataset("data.csv", path))
+
+    assert schema_profile["columns"] == expected["columns"]
+    assert [column["dtype"] for column in schema_profile["columns"]] == \
+           ["int32", "float32", "float32", "float64", "category", "str", "datetime", "bool", "float64"]
+    assert schema_profile["memoryOptimizedBytes"] < schema_profile["memoryDefaultBytes"]
+
+
+def test_batched_sidecar_holds_the_profiled_dataset(tmp_path, small_batches):
+
+    path = write_csv(tmp_path / "data.csv")
+    sidecar, schema_profile = build_sidecar("data.csv", path)
+
+    try:
+        assert (sidecar.sha256, sidecar.size) == file_digest(sidecar.path)
+
+        # Arrow parses floats exactly, as pandas does with round-trip precision
+        expected = apply_schema_profile(pd.read_csv(path, float_precision="round_trip"), schema_profile)
+        pd.testing.assert_frame_equal(pd.read_parquet(sidecar.path), expected)
+    finally:
+        os.remove(sidecar.path)
+
+
+def test_rows_not_fitting_the_first_batch_types_read_the_file_whole(tmp_path, small_batches):
+
+    rows = 100000
+    codes = np.arange(rows).astype(str)
+    codes[-1] = "unknown"
+    path = tmp_path / "codes.csv"
+    pd.DataFrame({"code": codes, "value": np.arange(rows)}).to_csv(path, index=False)
+
+    sidecar, schema_profile = build_sidecar("codes.csv", str(path))
+
+    try:
+        assert schema_profile == build_schema_profile(read_dataset("codes.csv", str(path)))
+        assert pd.read_parquet(sidecar.path)["code"].iloc[-1] == "unknown"
+    finally:
+        os.remove(sidecar.path)
+
+
+def test_file_without_rows(tmp_path):
+
+    path = tmp_path / "header.csv"
+    path.write_text("a,b\n")
+
+    sidecar, schema_profile = build_sidecar("header.csv", str(path))
+    os.remove(sidecar.path)
+
+    assert [column["name"] for column in schema_profile["columns"]] == ["a", "b"]
+
+
+def test_temporary_file_is_removed_when_the_file_cannot_be_read(tmp_path, monkeypatch):
+
+    monkeypatch.setattr(dataset_io, "UPLOAD_SPOOL_PATH", str(tmp_path))
+    path = tmp_path / "broken.csv"
+    path.write_bytes(b"a,b\n1,2,3,4\n\"unterminated")
+
+    with pytest.raises(Exception):
+        build_sidecar("broken.csv", str(path))
+
+    assert os.listdir(tmp_path) == ["broken.csv"]
@@ -0,0 +1,233 @@
+import os
+import json
+import base64
+import asyncio
+import hashlib
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from Components import data
+from Components import storage as storage_module
+from Components.storage import StorageBackend, LocalStorageBackend, GitHubStorageBackend
+
+
+def read_stream(backend, file_url, **kwargs):
+
+    async def collect():
+        return b"".join([chunk async for chunk in backend.stream(file_url, **kwargs)])
+
+    return asyncio.run(collect())
+
+
+def test_storage_backend_is_abstract():
+
+    with pytest.raises(TypeError):
+        StorageBackend()
+
+    class Incomplete(StorageBackend):
+        async def exists(self, name):
+            return False
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_local_put_get_and_conditional_get(tmp_path):
+
+    backend = LocalStorageBackend(str(tmp_path))
+    result = asyncio.run(backend.put("data.csv", b"a,b\n1,2\n"))
+
+    assert result["version"] == hashlib.sha256(b"a,b\n1,2\n").hexdigest()
+    assert asyncio.run(backend.exists("data.csv"))
+    assert asyncio.run(backend.get(result["download_url"])) == (b"a,b\n1,2\n", result["version"])
+    assert asyncio.run(backend.get(result["download_url"], if_none_match=result["version"])) == (None, result["version"])
+
+
+def test_local_put_file_matches_put(tmp_path):
+
+    backend = LocalStorageBackend(str(tmp_path / "store"))
+    upload = tmp_path / "upload.csv"
+    upload.write_bytes(b"x\n" * 1000)
+
+    from_file = asyncio.run(backend.put_file("a.csv", str(upload), hashlib.sha256(upload.read_bytes()).hexdigest(), 2000))
+    from_bytes = asyncio.run(backend.put("b.csv", upload.read_bytes()))
+
+    assert from_file["version"] == from_bytes["version"]
+    assert asyncio.run(backend.get(from_file["download_url"]))[0] == upload.read_bytes()
+
+
+def test_local_identical_files_share_a_blob_until_both_are_deleted(tmp_path):
+
+    backend = LocalStorageBackend(str(tmp_path))
+    first = asyncio.run(backend.put("a.csv", b"same"))
+    asyncio.run(backend.put("b.csv", b"same"))
+    blob_path = backend._blob_path(first["version"])
+
+    assert asyncio.run(backend.delete("a.csv")) == first["download_url"]
+    assert os.path.exists(blob_path)
+
+    asyncio.run(backend.delete("b.csv"))
+    assert not os.path.exists(blob_path)
+
+    with pytest.raises(FileNotFoundError):
+        asyncio.run(backend.get(first["download_url"]))
+    with pytest.raises(FileNotFoundError):
+        asyncio.run(backend.delete("a.csv"))
+
+
+def test_local_stream_ranges(tmp_path):
+
+    backend = LocalStorageBackend(str(tmp_path))
+    content = bytes(range(256)) * 10
+    file_url = asyncio.run(backend.put("data.bin", content))["download_url"]
+
+    assert read_stream(backend, file_url, chunk_size=100) == content
+    assert read_stream(backend, file_url, chunk_size=7, start=10, end=99) == content[10:100]
+    assert read_stream(backend, file_url, start=2500) == content[2500:]
+
+
+class FakeGitHub:
+
+    """
+    Contents API and raw download host of a single repository
+    """
+
+    def __init__(self):
+
+        self.files = {}
+        self.api_reads = 0
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+
+        name = request.url.path.rsplit("/", 1)[-1]
+
+        if request.url.host == "raw.example.com":
+            if name not in self.files:
+                return httpx.Response(404)
+            # Raw downloads answer with an ETag unrelated to the blob sha
+            return httpx.Response(200, content=self.files[name], headers={"ETag": '"raw-etag"'})
+
+        if request.method == "GET":
+            self.api_reads += 1
+            if name not in self.files:
+                return httpx.Response(404)
+            return httpx.Response(200, json=self._info(name))
+
+        if request.method == "PUT":
+            body = json.loads(request.read())
+            self.files[name] = base64.b64decode(body["content"])
+            return httpx.Response(201, json={"content": self._info(name)})
+
+        del self.files[name]
+        return httpx.Response(200, json={})
+
+    def _info(self, name: str) -> dict:
+
+        return {"sha": GitHubStorageBackend.blob_sha(self.files[name]), "download_url": f"https://raw.example.com/main/{name}"}
+
+
+@pytest.fixture
+def github(monkeypatch):
+
+    fake = FakeGitHub()
+    client = httpx.AsyncClient(transport=httpx.MockTransport(fake.handler))
+    monkeypatch.setattr(storage_module, "get_http_client", lambda: client)
+
+    return fake, GitHubStorageBackend("user", "repo", "token")
+
+
+def test_github_put_and_get_return_the_same_version(github):
+
+    fake, backend = github
+    result = asyncio.run(backend.put("data.csv", b"a,b\n1,2\n"))
+    content, version = asyncio.run(backend.get(result["download_url"]))
+
+    assert content == b"a,b\n1,2\n"
+    assert version == result["version"]
+    # The contents API reports the git blob sha
+    assert version == hashlib.sha1(b"blob 8\0a,b\n1,2\n").hexdigest()
+
+
+def test_github_get_skips_the_download_while_the_version_is_current(github):
+
+    fake, backend = github
+    result = asyncio.run(backend.put("data.csv", b"first"))
+
+    assert asyncio.run(backend.get(result["download_url"], if_none_match=result["version"])) == (None, result["version"])
+
+    updated = asyncio.run(backend.put("data.csv", b"second"))
+    content, version = asyncio.run(backend.get(result["download_url"], if_none_match=result["version"]))
+
+    assert content == b"second"
+    assert version == updated["version"] != result["version"]
+
+
+def test_github_conditional_reads_reuse_the_blob_sha_within_the_ttl(github, monkeypatch):
+
+    fake, backend = github
+    result = asyncio.run(backend.put("data.csv", b"first"))
+    fake.api_reads = 0
+
+    for _ in range(5):
+        assert asyncio.run(backend.get(result["download_url"], if_none_match=result["version"])) == (None, result["version"])
+    assert fake.api_reads == 0
+
+    # Another worker replaces the file, the sha is asked for again once the TTL has passed
+    fake.files["data.csv"] = b"second"
+    now = storage_module.time.monotonic()
+    monkeypatch.setattr(storage_module.time, "monotonic", lambda: now + backend.sha_ttl + 1)
+    content, version = asyncio.run(backend.get(result["download_url"], if_none_match=result["version"]))
+
+    assert content == b"second"
+    assert fake.api_reads == 1
+    assert asyncio.run(backend.get(result["download_url"], if_none_match=version)) == (None, version)
+    assert fake.api_reads == 1
+
+
+def test_github_without_a_ttl_asks_on_every_conditional_read(github):
+
+    fake, _ = github
+    backend = GitHubStorageBackend("user", "repo", "token", sha_ttl=0)
+    result = asyncio.run(backend.put("data.csv", b"first"))
+
+    for _ in range(3):
+        asyncio.run(backend.get(result["download_url"], if_none_match=result["version"]))
+
+    assert fake.api_reads == 4
+
+
+def test_github_put_file_streams_the_same_content(github, tmp_path):
+
+    fake, backend = github
+    upload = tmp_path / "upload.csv"
+    upload.write_bytes(b"0123456789" * 100)
+
+    result = asyncio.run(backend.put_file("upload.csv", str(upload), "", 1000))
+
+    assert fake.files["upload.csv"] == upload.read_bytes()
+    assert asyncio.run(backend.get(result["download_url"]))[1] == result["version"]
+
+
+def test_github_missing_file(github):
+
+    fake, backend = github
+
+    with pytest.raises(FileNotFoundError):
+        asyncio.run(backend.get("https://raw.example.com/main/missing.csv"))
+    with pytest.raises(FileNotFoundError):
+        asyncio.run(backend.delete("missing.csv"))
+
+
+def test_deleting_a_missing_file_is_not_found(monkeypatch):
+
+    async def delete(name):
+        raise FileNotFoundError(name)
+
+    monkeypatch.setattr(data.storage, "delete", delete)
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(data.delete_file_from_github("missing.csv"))
+
+    assert error.value.status_code == 404
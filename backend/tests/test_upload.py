@@ -0,0 +1,191 @@
+import os
+import asyncio
+import hashlib
+import functools
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+from Components import datacontrol, dataset_io
+from Components.auth import get_current_user
+from Components.dataset_io import spool_multipart_upload
+
+CONTENT = b"a,b\n" + b"1,2\n" * 1000
+BOUNDARY = "upload-boundary"
+
+
+def multipart_body(fields: dict, filename: str = None, content: bytes = b"") -> bytes:
+
+    parts = [f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+             for name, value in fields.items()]
+    if filename is not None:
+        parts.append(f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+                     f'Content-Type: text/csv\r\n\r\n'.encode() + content + b"\r\n")
+    return b"".join(parts) + f"--{BOUNDARY}--\r\n".encode()
+
+
+def make_request(body: bytes, chunk_size: int = 100, content_length: bool = True) -> Request:
+
+    # Deliver the body in small chunks so parts span chunk boundaries
+    chunks = [body[start:start + chunk_size] for start in range(0, len(body), chunk_size)]
+    messages = [{"type": "http.request", "body": chunk, "more_body": True} for chunk in chunks]
+    messages.append({"type": "http.request", "body": b"", "more_body": False})
+
+    async def receive():
+        return messages.pop(0)
+
+    headers = [(b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode())]
+    if content_length:
+        headers.append((b"content-length", str(len(body)).encode()))
+
+    return Request({"type": "http", "method": "PUT", "path": "/", "headers": headers}, receive)
+
+
+@pytest.fixture
+def spool_path(tmp_path, monkeypatch):
+
+    monkeypatch.setattr(dataset_io, "UPLOAD_SPOOL_PATH", str(tmp_path))
+    return tmp_path
+
+
+def test_fields_and_file_are_parsed_from_the_stream(spool_path):
+
+    request = make_request(multipart_body({"apiLink": "https://api", "aws_region": "eu"}, "data.csv", CONTENT))
+
+    fields, spooled_upload = asyncio.run(spool_multipart_upload(request))
+
+    assert fields == {"apiLink": "https://api", "aws_region": "eu"}
+    assert spooled_upload.filename == "data.csv"
+    assert spooled_upload.size == len(CONTENT)
+    assert spooled_upload.sha256 == hashlib.sha256(CONTENT).hexdigest()
+    with open(spooled_upload.path, "rb") as spool_file:
+        assert spool_file.read() == CONTENT
+    assert os.path.dirname(spooled_upload.path) == str(spool_path)
+
+
+def test_an_empty_file_part_is_no_upload(spool_path):
+
+    fields, spooled_upload = asyncio.run(spool_multipart_upload(make_request(multipart_body({"apiLink": ""}, ""))))
+
+    assert fields == {"apiLink": ""}
+    assert spooled_upload is None
+    assert os.listdir(spool_path) == []
+
+
+@pytest.mark.parametrize("content_length", [True, False])
+def test_a_file_above_the_limit_is_rejected_and_removed(spool_path, content_length):
+
+    request = make_request(multipart_body({"apiLink": "x"}, "data.csv", CONTENT), content_length=content_length)
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(spool_multipart_upload(request, max_bytes=1000))
+
+    assert error.value.status_code == 413
+    assert os.listdir(spool_path) == []
+
+
+def test_a_declared_length_above_the_limit_is_rejected_before_reading(spool_path):
+
+    request = make_request(multipart_body({}, "data.csv", CONTENT * 100))
+
+    async def receive():
+        raise AssertionError("The body must not be read")
+
+    request._receive = receive
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(spool_multipart_upload(request, max_bytes=1000))
+
+    assert error.value.status_code == 413
+
+
+def test_a_file_with_another_suffix_is_rejected_before_it_is_spooled(spool_path):
+
+    request = make_request(multipart_body({}, "data.json", CONTENT))
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(spool_multipart_upload(request, suffixes=(".csv", ".xlsx")))
+
+    assert error.value.status_code == 400
+    assert os.listdir(spool_path) == []
+
+
+@pytest.fixture
+def client(spool_path, monkeypatch):
+
+    updates = []
+    user_details = {"apiLink": None, "aws_access_key_ID": None, "aws_access_key": None, "aws_region": None,
+                    "gcp_account_key": None, "gcp_project_ID": None}
+    monkeypatch.setattr(datacontrol, "get_user_details", lambda username, role: dict(user_details))
+    monkeypatch.setattr(datacontrol, "update_user_details", lambda username, update_data: updates.append(update_data) or "ok")
+
+    # Starlette's form parser would spool the whole body before the handler runs
+    async def form(self, **kwargs):
+        raise AssertionError("The form must be parsed from the request stream")
+
+    monkeypatch.setattr(Request, "form", form)
+
+    app = FastAPI()
+    app.include_router(datacontrol.router)
+    app.dependency_overrides[get_current_user] = lambda: {"username": "user", "role": "user"}
+
+    test_client = TestClient(app)
+    test_client.updates = updates
+    return test_client
+
+
+def put_form(client, body: bytes):
+
+    return client.put("/datacontrol/update", content=body,
+                      headers={"Content-Type": f"multipart/form-data; boundary={BOUNDARY}"})
+
+
+def test_update_stores_the_fields_and_the_file(client, spool_path):
+
+    response = put_form(client, multipart_body({"apiLink": "https://api", "gcp_project_ID": "project"}, "update.csv", CONTENT))
+
+    assert response.status_code == 200
+    update_data = client.updates[0]
+    assert update_data["apiLink"] == "https://api"
+    assert update_data["gcp_project_ID"] == "project"
+    assert update_data["file"] == "update.csv"
+    assert update_data["file_size"] == len(CONTENT)
+    assert os.listdir(spool_path) == []
+
+
+def test_update_without_a_file(client):
+
+    response = put_form(client, multipart_body({"apiLink": "https://api"}))
+
+    assert response.status_code == 200
+    assert "file" not in client.updates[0]
+
+
+def test_update_without_api_link_is_unprocessable(client, spool_path):
+
+    response = put_form(client, multipart_body({}, "update.csv", CONTENT))
+
+    assert response.status_code == 422
+    assert client.updates == []
+    assert os.listdir(spool_path) == []
+
+
+def test_update_above_the_upload_limit(client, spool_path, monkeypatch):
+
+    monkeypatch.setattr(datacontrol, "spool_multipart_upload", functools.partial(spool_multipart_upload, max_bytes=1000))
+
+    response = put_form(client, multipart_body({"apiLink": "https://api"}, "update.csv", CONTENT))
+
+    assert response.status_code == 413
+    assert client.updates == []
+    assert os.listdir(spool_path) == []
+
+
+def test_update_with_another_format(client):
+
+    response = put_form(client, multipart_body({"apiLink": "https://api"}, "update.json", CONTENT))
+
+    assert response.status_code == 400
+    assert client.updates == []
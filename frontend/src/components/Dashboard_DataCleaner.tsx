@@ -81,11 +81,13 @@ export default function DataCleaner({ darkMode, }: DataCleanerPageProps) {
     'DropFeatures',
     'DropConstantFeatures',
     'DropDuplicateFeatures',
+    'DropConstantAndDuplicateFeatures',
     'DropCorrelatedFeatures',
     'SmartCorrelationSelection',
     'ShuffleFeaturesSelector',
     'SelectBySingleFeaturePerformance',
-    'RecursiveFeatureElimination'
+    'RecursiveFeatureElimination',
+    'StepRecursiveFeatureElimination'
   ];
 
   useEffect(() => {
@@ -111,6 +113,23 @@ export default function DataCleaner({ darkMode, }: DataCleanerPageProps) {
     }
   };
 
+  const waitForJob = async (jobId: string) => {
+    while (true) {
+      await new Promise((resolve) => setTimeout(resolve, 2000));
+      const response = await fetch(`http://localhost:8000/datacleaner/jobs/${jobId}`, {
+        headers: {
+          'Authorization': `Bearer ${localStorage.getItem('token')}`
+        }
+      });
+      if (!response.ok) throw new Error('Failed to fetch job status');
+      const job = await response.json();
+      if (job.status === 'succeeded') return job.result;
+      if (job.status === 'failed' || job.status === 'cancelled') {
+        throw new Error(`Job ${job.status}: ${job.error ?? ''}`);
+      }
+    }
+  };
+
   const handleColumnSelectionSubmit = async (type: 'engineering' | 'selection') => {
     try {
       const columns = type === 'engineering' ? selectedColumnsForEngineering : selectedColumnsForSelection;
@@ -128,7 +147,12 @@ export default function DataCleaner({ darkMode, }: DataCleanerPageProps) {
       });
 
       if (!response.ok) throw new Error(`Failed to submit columns for ${type}`);
-      const data = await response.json();
+      let data = await response.json();
+
+      // Long-running operations are queued as a background job, poll it until it finishes
+      if (response.status === 202) {
+        data = await waitForJob(data.jobId);
+      }
       setDataFrameInfo(data);
 
       // Close column selection and show the respective section